@@ -0,0 +1,278 @@
+# Magasin local des artefacts du modèle, adressé par contenu
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs lus et écrits pendant un téléchargement
+CHUNK_SIZE = 1024 * 1024
+
+MANIFEST_NAME = "manifest.json"
+
+
+class ArtifactIntegrityError(Exception):
+    """Levée lorsqu'un artefact téléchargé est incomplet ou ne correspond pas à sa somme de contrôle."""
+
+
+def file_digest(path: Path, chunk_size: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """Calcule le SHA-256 et la taille d'un fichier, bloc par bloc."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def recorded_sha256(directory: Path, name: str) -> Optional[str]:
+    """
+    Renvoie la somme SHA-256 d'un artefact telle qu'enregistrée dans le manifeste de son
+    répertoire (vérifiée au téléchargement), ou None si le répertoire n'a pas de manifeste.
+    """
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path) as f:
+        entry = json.load(f).get(name)
+    return entry["sha256"] if entry is not None else None
+
+
+class ArtifactStore:
+    """
+    Magasin local des artefacts, adressé par contenu.
+
+    Chaque fichier est stocké une seule fois sous `objects/<sha256>` ; le
+    répertoire `runs/<run_id>/` de chaque exécution MLflow contient des liens
+    vers ces objets et un manifeste (nom -> somme de contrôle, taille, date de
+    modification et inode). Le manifeste est écrit en dernier : une exécution
+    n'est complète que si son manifeste existe et que chaque fichier y correspond.
+    Plusieurs exécutions peuvent ainsi cohabiter, et les artefacts communs ne sont
+    stockés qu'une fois.
+
+    Un fichier vérifié au téléchargement n'est pas relu ensuite : tant que sa
+    taille, sa date de modification et son inode sont ceux du manifeste, il est
+    tenu pour intact. La somme de contrôle n'est recalculée qu'à la demande
+    (`verify=True`), ou lorsque ces métadonnées ont changé ; si le contenu est
+    toujours le bon, le manifeste est mis à jour avec les nouvelles métadonnées.
+
+    Les téléchargements sont lancés en parallèle, écrits par blocs dans un
+    fichier temporaire, vérifiés (statut HTTP, taille attendue, somme de contrôle
+    attendue si elle est connue) puis renommés de façon atomique.
+
+    Args:
+        root: Répertoire racine du magasin
+        max_workers: Nombre maximal de téléchargements simultanés
+        timeout: Délai maximal (en secondes) d'attente du serveur HTTP
+        fallback: Fonction `(uri, répertoire) -> chemin local` utilisée pour les
+            schémas autres que file:// et http(s):// (par exemple s3://)
+    """
+
+    def __init__(self, root: Path, max_workers: int = 4, timeout: float = 60.0,
+                 fallback: Optional[Callable[[str, str], str]] = None):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.runs_dir = self.root / "runs"
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.fallback = fallback
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+
+    def run_dir(self, run_id: str) -> Path:
+        """Renvoie le répertoire des artefacts d'une exécution."""
+        if not run_id or "/" in run_id or run_id in (".", ".."):
+            raise ValueError(f"Identifiant d'exécution invalide: {run_id!r}")
+        return self.runs_dir / run_id
+
+    def manifest(self, run_id: str) -> Optional[Dict[str, Dict[str, object]]]:
+        """Renvoie le manifeste d'une exécution, ou None si elle n'est pas complète."""
+        path = self.run_dir(run_id) / MANIFEST_NAME
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def is_complete(self, run_id: str, names, verify: bool = False) -> bool:
+        """
+        Indique si tous les artefacts `names` d'une exécution sont présents et intacts.
+
+        Args:
+            run_id: Identifiant de l'exécution MLflow
+            names: Noms des artefacts attendus
+            verify: Recalculer la somme de contrôle de chaque fichier (sinon, elle ne l'est
+                que pour les fichiers dont la taille, la date de modification ou l'inode a changé)
+        """
+        manifest = self.manifest(run_id)
+        if manifest is None:
+            return False
+        recorded = json.dumps(manifest, sort_keys=True)
+        complete = all(self._is_intact(run_id, name, manifest.get(name), verify) for name in names)
+        self._refresh_manifest(run_id, manifest, recorded)
+        return complete
+
+    def _is_intact(self, run_id: str, name: str, entry: Optional[Dict[str, object]], verify: bool) -> bool:
+        # Met à jour la date de modification et l'inode de `entry` si le contenu a été relu et reconnu
+        path = self.run_dir(run_id) / name
+        if entry is None:
+            return False
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        if stat.st_size != entry["size"]:
+            return False
+        if not verify and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("inode") == stat.st_ino:
+            return True
+        if file_digest(path)[0] != entry["sha256"]:
+            logger.warning(f"Artefact {name} corrompu pour l'exécution {run_id}.")
+            return False
+        entry.update(mtime_ns=stat.st_mtime_ns, inode=stat.st_ino)
+        return True
+
+    def _refresh_manifest(self, run_id: str, manifest: Dict[str, Dict[str, object]], recorded: str):
+        # Les métadonnées relevées après une relecture évitent de la refaire au prochain démarrage
+        if json.dumps(manifest, sort_keys=True) == recorded:
+            return
+        try:
+            self._write_json(self.run_dir(run_id) / MANIFEST_NAME, manifest)
+        except OSError as e:
+            logger.warning(f"Impossible de mettre à jour le manifeste de l'exécution {run_id}: {str(e)}")
+
+    def fetch(self, run_id: str, uris: Dict[str, str], sizes: Optional[Dict[str, int]] = None,
+              checksums: Optional[Dict[str, str]] = None, verify: bool = False) -> Path:
+        """
+        Garantit la présence locale des artefacts d'une exécution et renvoie leur répertoire.
+
+        Seuls les artefacts absents ou altérés sont téléchargés ; avec `verify=True`,
+        la somme de contrôle de chaque fichier présent est recalculée (réparation).
+
+        Args:
+            run_id: Identifiant de l'exécution MLflow
+            uris: Dictionnaire nom de l'artefact -> URI (file://, chemin local, http(s):// ou autre schéma via `fallback`)
+            sizes: Tailles attendues (en octets), si elles sont connues
+            checksums: Sommes SHA-256 attendues, si elles sont connues
+            verify: Recalculer la somme de contrôle des artefacts déjà présents
+
+        Returns:
+            Répertoire contenant un fichier par artefact
+        """
+        manifest = self.manifest(run_id) or {}
+        recorded = json.dumps(manifest, sort_keys=True)
+        manifest = {name: entry for name, entry in manifest.items()
+                    if name in uris and self._is_intact(run_id, name, entry, verify)}
+        missing = [name for name in uris if name not in manifest]
+        if not missing:
+            self._refresh_manifest(run_id, manifest, recorded)
+            logger.info(f"Artefacts de l'exécution {run_id} déjà présents et vérifiés.")
+            return self.run_dir(run_id)
+
+        sizes = sizes or {}
+        checksums = checksums or {}
+        logger.info(f"Téléchargement de {len(missing)} artefacts pour l'exécution {run_id}")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="artifact") as pool:
+            futures = {
+                name: pool.submit(self._download, name, uris[name], sizes.get(name), checksums.get(name))
+                for name in missing
+            }
+            downloaded = {name: future.result() for name, future in futures.items()}
+
+        run_dir = self.run_dir(run_id)
+        run_dir.mkdir(parents=True, exist_ok=True)
+        for name, entry in downloaded.items():
+            self._link(self.objects_dir / entry["sha256"], run_dir / name)
+            stat = (run_dir / name).stat()
+            entry.update(mtime_ns=stat.st_mtime_ns, inode=stat.st_ino)
+        manifest.update(downloaded)
+        self._write_json(run_dir / MANIFEST_NAME, manifest)
+        logger.info(f"Artefacts de l'exécution {run_id} enregistrés dans {run_dir}.")
+        return run_dir
+
+    def _download(self, name: str, uri: str, expected_size: Optional[int], expected_sha256: Optional[str]) -> Dict[str, object]:
+        temp_path = self.objects_dir / f".tmp-{uuid.uuid4().hex}"
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with open(temp_path, "wb") as out:
+                for block in self._open(uri):
+                    out.write(block)
+                    digest.update(block)
+                    size += len(block)
+                out.flush()
+                os.fsync(out.fileno())
+
+            sha256 = digest.hexdigest()
+            if expected_size is not None and size != expected_size:
+                raise ArtifactIntegrityError(f"Artefact {name} incomplet : {size} octets reçus, {expected_size} attendus.")
+            if expected_sha256 is not None and sha256 != expected_sha256:
+                raise ArtifactIntegrityError(f"Somme de contrôle invalide pour l'artefact {name}.")
+
+            os.replace(temp_path, self.objects_dir / sha256)
+            logger.info(f"Artefact {name} téléchargé ({size} octets).")
+            return {"sha256": sha256, "size": size}
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def _open(self, uri: str):
+        """Renvoie un itérateur sur les blocs du contenu de `uri`."""
+        parsed = urlparse(uri)
+        if parsed.scheme in ("http", "https"):
+            yield from self._open_http(uri)
+        elif parsed.scheme in ("", "file"):
+            yield from self._open_file(Path(unquote(parsed.path)) if parsed.scheme else Path(uri))
+        elif self.fallback is not None:
+            with tempfile.TemporaryDirectory(dir=self.objects_dir) as temp_dir:
+                yield from self._open_file(Path(self.fallback(uri, temp_dir)))
+        else:
+            raise ValueError(f"Schéma d'URI non pris en charge: {uri}")
+
+    def _open_http(self, uri: str):
+        with requests.get(uri, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            announced = response.headers.get("Content-Length")
+            received = 0
+            try:
+                for block in response.iter_content(chunk_size=CHUNK_SIZE):
+                    received += len(block)
+                    yield block
+            except requests.exceptions.ChunkedEncodingError as e:
+                # Connexion interrompue avant la fin du corps annoncé
+                raise ArtifactIntegrityError(f"Réponse tronquée pour {uri} : {str(e)}")
+            if announced is not None and "Content-Encoding" not in response.headers and received != int(announced):
+                raise ArtifactIntegrityError(f"Réponse tronquée pour {uri} : {received} octets reçus, {announced} annoncés.")
+
+    @staticmethod
+    def _open_file(path: Path):
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+    @staticmethod
+    def _link(source: Path, destination: Path):
+        # Lien physique (ou copie si le système de fichiers ne le permet pas), remplacé atomiquement
+        temp_path = destination.with_name(f".tmp-{uuid.uuid4().hex}")
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+
+    @staticmethod
+    def _write_json(path: Path, document: Dict):
+        # Fichier temporaire propre à l'écrivain : plusieurs processus peuvent rafraîchir le manifeste
+        temp_path = path.with_name(f".tmp-{uuid.uuid4().hex}-{path.name}")
+        with open(temp_path, "w") as f:
+            json.dump(document, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
@@ -0,0 +1,200 @@
+# Micro-batching des requêtes de prédiction
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Regroupe les requêtes concurrentes en un seul lot avant l'inférence.
+
+    Les textes soumis sont accumulés pendant au plus `max_wait_ms` millisecondes,
+    ou jusqu'à atteindre `max_batch_size` textes, puis envoyés au modèle en une
+    seule passe. Chaque appelant récupère uniquement ses propres résultats.
+
+    Args:
+        runner: Coroutine qui prend une liste de textes et renvoie la liste des résultats
+        max_batch_size: Nombre maximal de textes par lot
+        max_wait_ms: Fenêtre d'attente maximale (en millisecondes) pour compléter un lot
+        context: Variable de contexte à propager des appelants vers l'exécution du lot.
+            Ses valeurs sont des tuples : le lot s'exécute avec la concaténation des
+            tuples de ses appelants (par exemple les durées par étape des requêtes)
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        context: Optional[ContextVar] = None,
+    ):
+        self.runner = runner
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.context = context
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._carry: Optional[Tuple[List[str], asyncio.Future, tuple]] = None
+        self._running = set()
+
+        # Statistiques de remplissage des lots
+        self._batches = 0
+        self._texts = 0
+        self._requests = 0
+        self._max_observed = 0
+        self._size_histogram = {bucket: 0 for bucket in self._histogram_buckets()}
+
+    def _histogram_buckets(self) -> List[int]:
+        buckets, size = [], 1
+        while size < self.max_batch_size:
+            buckets.append(size)
+            size *= 2
+        buckets.append(self.max_batch_size)
+        return buckets
+
+    async def start(self):
+        """Démarre la tâche de fond qui constitue et exécute les lots."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrête la tâche de fond et annule les requêtes encore en attente."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+        pending = [self._carry] if self._carry else []
+        self._carry = None
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.cancel()
+
+    async def submit(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Soumet des textes au prochain lot et attend leurs résultats.
+
+        Args:
+            texts: Liste de textes à analyser
+
+        Returns:
+            Liste des résultats, dans le même ordre que `texts`
+        """
+        if self._worker is None:
+            raise RuntimeError("Le micro-batcher n'est pas démarré.")
+        if not texts:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        shared = self.context.get() if self.context is not None else ()
+        await self._queue.put((list(texts), future, shared))
+        return await future
+
+    async def _next_item(self, timeout: Optional[float]):
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        if timeout is None:
+            return await self._queue.get()
+        if timeout <= 0:
+            return self._queue.get_nowait()
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def _collect(self) -> List[Tuple[List[str], asyncio.Future, tuple]]:
+        # Attendre la première requête, puis ouvrir la fenêtre de regroupement
+        first = await self._next_item(None)
+        batch, size = [first], len(first[0])
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            try:
+                item = await self._next_item(deadline - time.monotonic())
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if size + len(item[0]) > self.max_batch_size:
+                # Le lot serait trop grand : la requête ouvrira le lot suivant
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Ignorer les appelants qui ont abandonné entre-temps
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            # Exécuter le lot en tâche de fond pour constituer le suivant sans attendre
+            task = asyncio.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: List[Tuple[List[str], asyncio.Future, tuple]]):
+        texts = [text for item_texts, _, _ in batch for text in item_texts]
+        self._record(len(batch), len(texts))
+        if self.context is not None:
+            # La tâche du lot a son propre contexte : la variable n'y est visible que du lot
+            self.context.set(tuple(value for _, _, shared in batch for value in shared))
+
+        try:
+            results = await self.runner(texts)
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Redistribuer les résultats à chaque appelant
+        offset = 0
+        for item_texts, future, _ in batch:
+            if not future.done():
+                future.set_result(results[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+
+    def _record(self, requests: int, size: int):
+        self._batches += 1
+        self._requests += requests
+        self._texts += size
+        self._max_observed = max(self._max_observed, size)
+        for bucket in self._size_histogram:
+            if size <= bucket:
+                self._size_histogram[bucket] += 1
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """Renvoie les statistiques de remplissage des lots."""
+        mean_size = self._texts / self._batches if self._batches else 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self._batches,
+            "requests": self._requests,
+            "texts": self._texts,
+            "mean_batch_size": mean_size,
+            "mean_fill_ratio": mean_size / self.max_batch_size,
+            "max_observed_batch_size": self._max_observed,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches_in_flight": len(self._running),
+            "batch_size_histogram": {f"<={bucket}": count for bucket, count in self._size_histogram.items()},
+        }
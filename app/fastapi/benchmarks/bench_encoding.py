@@ -0,0 +1,117 @@
+"""
+Benchmark de l'encodage des textes prétraités.
+
+Compare `tokenizer.texts_to_sequences` + `pad_sequences` (chemin historique)
+à `SequenceEncoder.encode` pour plusieurs tailles de lot, ainsi que le
+prétraitement tweet par tweet à `TweetPreprocessor.preprocess_batch` lorsque
+les ressources NLTK sont installées.
+
+Usage :
+    python -m benchmarks.bench_encoding [--output resultats.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import build_tokenizer, sample_texts
+from encoding import SequenceEncoder
+
+BATCH_SIZES = [1, 64, 1024, 10000]
+MAX_SEQUENCE_LENGTH = 100
+
+
+def time_per_text(fn, texts, min_duration: float = 0.5) -> float:
+    """Renvoie le temps moyen par texte (en microsecondes)."""
+    fn(texts)
+    repeats, start = 0, time.perf_counter()
+    while True:
+        fn(texts)
+        repeats += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_duration:
+            return elapsed / (repeats * len(texts)) * 1e6
+
+
+def bench_tokenization(texts_pool):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    tokenizer, _ = build_tokenizer()
+    encoder = SequenceEncoder.from_tokenizer(tokenizer)
+
+    def reference(texts):
+        sequences = tokenizer.texts_to_sequences(texts)
+        return pad_sequences(sequences, maxlen=MAX_SEQUENCE_LENGTH, padding='post', truncating='post')
+
+    def vectorized(texts):
+        return encoder.encode(texts, MAX_SEQUENCE_LENGTH)
+
+    results = []
+    for batch_size in BATCH_SIZES:
+        texts = texts_pool[:batch_size]
+        assert np.array_equal(reference(texts), vectorized(texts))
+        before = time_per_text(reference, texts)
+        after = time_per_text(vectorized, texts)
+        results.append({
+            "batch_size": batch_size,
+            "reference_us_per_text": before,
+            "vectorized_us_per_text": after,
+            "speedup": before / after,
+        })
+    return results
+
+
+def bench_preprocessing(raw_texts):
+    try:
+        from main import custom_preprocess_tweet
+        from preprocessing import TweetPreprocessor
+        preprocessor = TweetPreprocessor()
+        preprocessor(raw_texts[0])
+    except LookupError:
+        return None
+
+    results = []
+    for batch_size in BATCH_SIZES:
+        texts = raw_texts[:batch_size]
+        before = time_per_text(lambda batch: [custom_preprocess_tweet(text) for text in batch], texts)
+        after = time_per_text(preprocessor.preprocess_batch, texts)
+        results.append({
+            "batch_size": batch_size,
+            "reference_us_per_text": before,
+            "vectorized_us_per_text": after,
+            "speedup": before / after,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    args = parser.parse_args()
+
+    _, vocabulary = build_tokenizer()
+    texts_pool = sample_texts(max(BATCH_SIZES), vocabulary, seed=42)
+    raw_texts = [f"@AirParadis {text} http://t.co/x #travel" for text in texts_pool]
+
+    report = {
+        "tokenization": bench_tokenization(texts_pool),
+        "preprocessing": bench_preprocessing(raw_texts),
+    }
+    for stage, rows in report.items():
+        if rows is None:
+            print(f"{stage}: ignoré (ressources NLTK non installées)")
+            continue
+        for row in rows:
+            print(f"{stage:13s} batch={row['batch_size']:>6d}  "
+                  f"référence={row['reference_us_per_text']:8.2f} µs/texte  "
+                  f"vectorisé={row['vectorized_us_per_text']:8.2f} µs/texte  "
+                  f"gain=x{row['speedup']:.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
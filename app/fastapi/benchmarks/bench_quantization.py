@@ -0,0 +1,248 @@
+"""
+Rapport précision / taille / latence des variantes compressées du modèle
+(voir `quantization.py`), comparées au modèle float32 d'origine.
+
+Chaque modèle (le modèle d'origine puis chaque variante, pour chaque moteur)
+est chargé dans un processus séparé : durée du chargement, mémoire résidente
+ajoutée, latences p50/p99 de `predict` par taille de lot, et scores du jeu
+d'évaluation. Le rapport donne pour chaque variante :
+
+- taille sur disque du modèle chargé par le moteur (modèle Keras, ou flatbuffers
+  TFLite et SavedModel exportés) et du vocabulaire, lignes d'embedding ;
+- exactitude sur le jeu étiqueté (s'il comporte des étiquettes), accord des
+  prédictions avec le modèle float32 et écart maximal et moyen des scores.
+
+Le jeu d'évaluation est un fichier lu par `quantization.read_texts`, par exemple
+l'export Sentiment140 de `/feedback/export` mis de côté (non utilisé pour
+l'élagage) ; `--traffic` donne les textes dont les fréquences guident l'élagage des
+variantes `-top<N>`. Sans `--model-dir`, le modèle synthétique de
+`benchmarks.synthetic` est utilisé, avec des textes synthétiques non étiquetés.
+
+Usage :
+    python -m benchmarks.bench_quantization --output benchmarks/results/quantization.json
+    python -m benchmarks.bench_quantization --model-dir model/runs/<run_id> --dataset heldout.csv \\
+        --traffic feedback.csv --variants float16 int8 int8-top50000 --backends compiled tflite
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.bench_runtime import peak_rss_mb, rss_mb
+from benchmarks.bench_suite import APP_DIR, metadata, nltk_missing
+
+BATCH_SIZES = [1, 32]
+DEFAULT_VARIANTS = ["float16", "int8", "int8-top10000"]
+
+# Taille des lots de prédiction du jeu d'évaluation
+SCORE_BATCH_SIZE = 128
+
+
+def directory_size_mb(paths: List[Path]) -> float:
+    return sum(path.stat().st_size for path in paths if path.exists()) / 2**20
+
+
+def artifact_size_mb(directory: Path, backend: str) -> float:
+    """Taille sur disque des fichiers du modèle chargés par le moteur (modèle Keras ou export)."""
+    from runtime import EXPORT_DIR, KERAS_MODEL_FILE, load_export_metadata
+
+    export_dir = directory / EXPORT_DIR
+    if backend == "tflite":
+        return directory_size_mb([export_dir / name for name in load_export_metadata(export_dir)["tflite"].values()])
+    if backend == "savedmodel":
+        return directory_size_mb([path for path in (export_dir / "saved_model").rglob("*") if path.is_file()])
+    return directory_size_mb([directory / KERAS_MODEL_FILE])
+
+
+def measure_model(model_dir: Path, backend: str, texts_path: Path, iterations: int) -> Dict[str, Any]:
+    """Charge un modèle et mesure chargement, mémoire, latences et scores (appelé dans un sous-processus)."""
+    from quantization import load_variant_metadata
+    from runtime import load_runtime
+    from vocabulary import VOCABULARY_FILE, Vocabulary, VocabularyEncoder
+
+    with open(model_dir / "parameters.json") as f:
+        maxlen = json.load(f).get("max_sequence_length", 100)
+    with open(texts_path) as f:
+        texts = json.load(f)
+    variant = load_variant_metadata(model_dir)
+
+    rss_start = rss_mb()
+    started = time.perf_counter()
+    runtime = load_runtime(backend, model_dir, maxlen, quantization=variant["dtype"] if variant else None)
+    encoder = VocabularyEncoder(Vocabulary.open(model_dir / VOCABULARY_FILE))
+    load_seconds = time.perf_counter() - started
+    rss_loaded = rss_mb()
+
+    tokens = encoder.encode(texts, maxlen)
+    scores = np.concatenate([
+        runtime.predict(tokens[start:start + SCORE_BATCH_SIZE]) for start in range(0, len(tokens), SCORE_BATCH_SIZE)
+    ]) if len(tokens) else np.zeros(0, dtype=np.float32)
+
+    latencies = {}
+    for batch_size in BATCH_SIZES:
+        batch = np.resize(tokens, (batch_size, maxlen))
+        runtime.predict(batch)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            runtime.predict(batch)
+            timings.append(time.perf_counter() - started)
+        latencies[str(batch_size)] = {
+            "p50_ms": float(np.percentile(timings, 50) * 1000),
+            "p99_ms": float(np.percentile(timings, 99) * 1000),
+        }
+
+    return {
+        "load_seconds": load_seconds,
+        "rss_added_mb": rss_loaded - rss_start,
+        "rss_peak_mb": peak_rss_mb(),
+        "latency": latencies,
+        "scores": scores.tolist(),
+    }
+
+
+def accuracy_report(scores: np.ndarray, reference: np.ndarray, labels: Optional[np.ndarray]) -> Dict[str, Any]:
+    """Exactitude (si étiqueté), accord avec le modèle float32 et écarts de score."""
+    predictions = scores >= 0.5
+    differences = np.abs(scores - reference)
+    return {
+        "accuracy": float(np.mean(predictions == labels.astype(bool))) if labels is not None else None,
+        "agreement": float(np.mean(predictions == (reference >= 0.5))) if len(scores) else None,
+        "max_score_diff": float(differences.max(initial=0.0)),
+        "mean_score_diff": float(differences.mean()) if len(scores) else 0.0,
+    }
+
+
+def print_rows(rows: List[Dict[str, Any]]):
+    for row in rows:
+        accuracy = "-" if row["accuracy"] is None else f"{row['accuracy']:.2%}"
+        latency = "  ".join(f"lot={size}: p50={values['p50_ms']:6.1f} ms" for size, values in row["latency"].items())
+        print(f"{row['variant']:16s} {row['backend']:10s} modèle={row['model_mb']:6.1f} Mo  vocabulaire={row['vocabulary_mb']:5.1f} Mo  "
+              f"embedding={row['embedding_rows'] or 0:7d} lignes  exactitude={accuracy:>7s}  accord={row['agreement']:.2%}  "
+              f"écart max={row['max_score_diff']:.1e}  chargement={row['load_seconds']:4.1f} s  "
+              f"RSS +{row['rss_added_mb']:.0f} Mo  {latency}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", type=Path, help="Répertoire des artefacts float32 (défaut : modèle synthétique)")
+    parser.add_argument("--dataset", type=Path, help="Jeu d'évaluation étiqueté (défaut : textes synthétiques)")
+    parser.add_argument("--traffic", type=Path, help="Textes de trafic guidant l'élagage (défaut : fréquences d'entraînement)")
+    parser.add_argument("--preprocessed", action="store_true", help="Les textes de --dataset et --traffic sont déjà prétraités")
+    parser.add_argument("--variants", nargs="+", default=DEFAULT_VARIANTS, help="Variantes comparées au modèle float32")
+    parser.add_argument("--backends", nargs="+", default=["compiled"], help="Moteurs d'exécution mesurés")
+    parser.add_argument("--vocabulary-size", type=int, default=20000, help="Taille du vocabulaire du modèle synthétique")
+    parser.add_argument("--embedding-dim", type=int, default=100, help="Dimension de l'embedding du modèle synthétique")
+    parser.add_argument("--limit", type=int, default=5000, help="Nombre maximal de textes évalués")
+    parser.add_argument("--iterations", type=int, default=30, help="Appels mesurés par taille de lot")
+    parser.add_argument("--output", help="Fichier JSON où écrire le rapport")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--texts", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure_model(args.worker, args.backends[0], args.texts, args.iterations)))
+        return
+
+    from quantization import VARIANTS_DIR, build_variant, load_variant_metadata, parse_variant, read_texts
+    from runtime import EXPORT_DIR, export_model, load_export_metadata, load_keras_model
+    from vocabulary import VOCABULARY_FILE, Vocabulary, convert_tokenizer
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        model_dir, labels, traffic = args.model_dir, None, None
+        if model_dir is None:
+            from benchmarks.synthetic import make_vocabulary, sample_texts, write_model_artifacts
+
+            model_dir = write_model_artifacts(work_dir / "model", vocabulary_size=args.vocabulary_size,
+                                              embedding_dim=args.embedding_dim)
+            # Vocabulaire du tokenizer synthétique (voir `write_model_artifacts`)
+            words = make_vocabulary(int(args.vocabulary_size * 1.5))
+            texts = sample_texts(args.limit, words, seed=7)
+            traffic = sample_texts(args.limit, words, seed=8)
+        else:
+            if args.dataset is None:
+                parser.error("--dataset est requis avec --model-dir.")
+            texts, labels = read_texts(args.dataset)
+            texts = texts[:args.limit]
+            labels = None if labels is None else np.array(labels[:args.limit])
+            if args.traffic:
+                traffic, _ = read_texts(args.traffic)
+            if not args.preprocessed:
+                missing = nltk_missing()
+                if missing:
+                    parser.exit(1, f"Prétraitement impossible : {missing}.\n")
+                from preprocessing import TweetPreprocessor
+                preprocessor = TweetPreprocessor()
+                texts = preprocessor.preprocess_batch(texts)
+                traffic = preprocessor.preprocess_batch(traffic) if traffic else None
+        texts_path = work_dir / "texts.json"
+        with open(texts_path, "w") as f:
+            json.dump(texts, f)
+
+        vocabulary_path = model_dir / VOCABULARY_FILE
+        if vocabulary_path.exists():
+            vocabulary = Vocabulary.open(vocabulary_path)
+        else:
+            vocabulary = convert_tokenizer(model_dir / "tokenizer.pickle", vocabulary_path)
+        for name in args.variants:
+            dtype, top = parse_variant(name)
+            build_variant(model_dir, vocabulary, dtype, top, traffic)
+
+        rows, source_rows = [], None
+        for name in ["float32"] + args.variants:
+            directory = model_dir if name == "float32" else model_dir / VARIANTS_DIR / name
+            quantization = None if name == "float32" else parse_variant(name)[0]
+            if set(args.backends) & {"savedmodel", "tflite"}:
+                # L'export est fait une fois, hors des mesures
+                export_dir = directory / EXPORT_DIR
+                export = load_export_metadata(export_dir)
+                if export is None or export.get("quantization") != quantization:
+                    with open(directory / "parameters.json") as f:
+                        maxlen = json.load(f).get("max_sequence_length", 100)
+                    export_model(load_keras_model(directory), export_dir, maxlen, quantization=quantization)
+            for backend in args.backends:
+                print(f"Mesure de {name} ({backend})...", flush=True)
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_quantization", "--worker", str(directory),
+                     "--backends", backend, "--texts", str(texts_path), "--iterations", str(args.iterations)],
+                    cwd=APP_DIR, check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                variant_metadata = {}
+                if name != "float32":
+                    variant_metadata = load_variant_metadata(directory)
+                    source_rows = variant_metadata["source_embedding_rows"]
+                rows.append({
+                    "variant": name,
+                    "backend": backend,
+                    "model_mb": artifact_size_mb(directory, backend),
+                    "vocabulary_mb": directory_size_mb([directory / VOCABULARY_FILE]),
+                    "embedding_rows": variant_metadata.get("embedding_rows"),
+                    "traffic_coverage": variant_metadata.get("traffic_coverage"),
+                    **result,
+                })
+
+        for row in rows:
+            if row["variant"] == "float32":
+                row["embedding_rows"] = source_rows
+        references = {row["backend"]: np.array(row["scores"]) for row in rows if row["variant"] == "float32"}
+        for row in rows:
+            row.update(accuracy_report(np.array(row.pop("scores")), references[row["backend"]], labels))
+        print_rows(rows)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        report_metadata = {**metadata(args), "texts": len(texts), "labelled": labels is not None}
+        with open(args.output, "w") as f:
+            json.dump({"metadata": report_metadata, "runs": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark des moteurs d'exécution du modèle (keras, compiled, savedmodel, tflite) sur CPU.
+
+Chaque moteur est mesuré dans un processus séparé : mémoire résidente (RSS)
+après chargement et au pic, puis latences p50/p99 de `predict` pour plusieurs
+tailles de lot. La ligne `keras` (`model.predict`) sert de référence : la
+latence d'un tweet seul (lot=1) avant et après le passage au moteur `compiled`
+se lit directement sur les deux premières lignes. Sans `--model-dir`, un LSTM synthétique de même architecture
+que le modèle des notebooks est utilisé.
+
+Usage :
+    python -m benchmarks.bench_runtime [--model-dir model/runs/<run_id>] [--output resultats.json]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BATCH_SIZES = [1, 8, 32]
+MAX_SEQUENCE_LENGTH = 100
+
+
+def _proc_status_mb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    """Mémoire résidente actuelle du processus (en Mo)."""
+    value = _proc_status_mb("VmRSS")
+    return peak_rss_mb() if value is None else value
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus (en Mo)."""
+    # VmHWM est remis à zéro par exec, contrairement à ru_maxrss hérité du processus parent
+    value = _proc_status_mb("VmHWM")
+    if value is not None:
+        return value
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def realistic_tokens(count: int, maxlen: int, vocabulary_size: int, seed: int = 0) -> np.ndarray:
+    """Séquences de 4 à 30 tokens complétées par des zéros, comme des tweets prétraités."""
+    rng = np.random.default_rng(seed)
+    tokens = np.zeros((count, maxlen), dtype=np.int32)
+    for row, length in enumerate(rng.integers(4, 31, size=count)):
+        tokens[row, :length] = rng.integers(1, vocabulary_size, size=length)
+    return tokens
+
+
+def measure_backend(backend: str, model_dir: Path, maxlen: int, iterations: int, tflite_threads: int) -> dict:
+    """Mesure un moteur dans le processus courant (appelé dans un sous-processus)."""
+    from runtime import load_runtime
+
+    rss_start = rss_mb()
+    started = time.perf_counter()
+    runtime = load_runtime(backend, model_dir, maxlen, tflite_threads=tflite_threads)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = rss_mb()
+
+    latencies = {}
+    for batch_size in BATCH_SIZES:
+        tokens = realistic_tokens(batch_size, maxlen, 1000, seed=batch_size)
+        runtime.predict(tokens)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            runtime.predict(tokens)
+            timings.append(time.perf_counter() - started)
+        latencies[str(batch_size)] = {
+            "p50_ms": float(np.percentile(timings, 50) * 1000),
+            "p99_ms": float(np.percentile(timings, 99) * 1000),
+        }
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_start_mb": rss_start,
+        "rss_loaded_mb": rss_loaded,
+        "rss_peak_mb": peak_rss_mb(),
+        "latency": latencies,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", type=Path, help="Répertoire des artefacts du modèle (défaut : modèle synthétique)")
+    parser.add_argument("--backends", nargs="+", default=["keras", "compiled", "savedmodel", "tflite"])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--tflite-threads", type=int, default=1)
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = measure_backend(args.worker, args.model_dir, MAX_SEQUENCE_LENGTH, args.iterations, args.tflite_threads)
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_dir = args.model_dir
+        if model_dir is None:
+            from benchmarks.synthetic import build_model
+            from runtime import KERAS_MODEL_FILE
+
+            model_dir = Path(temp_dir)
+            build_model(maxlen=MAX_SEQUENCE_LENGTH).save(model_dir / KERAS_MODEL_FILE)
+
+        # L'export est fait une fois, hors des mesures
+        from runtime import EXPORT_DIR, load_export_metadata
+        if load_export_metadata(model_dir / EXPORT_DIR) is None:
+            from runtime import export_model, load_keras_model
+            export_model(load_keras_model(model_dir), model_dir / EXPORT_DIR, MAX_SEQUENCE_LENGTH)
+
+        report = []
+        for backend in args.backends:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_runtime", "--worker", backend,
+                 "--model-dir", str(model_dir), "--iterations", str(args.iterations),
+                 "--tflite-threads", str(args.tflite_threads)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            report.append(result)
+            latency = "  ".join(
+                f"lot={size}: p50={values['p50_ms']:7.2f} ms p99={values['p99_ms']:7.2f} ms"
+                for size, values in result["latency"].items()
+            )
+            print(f"{backend:10s} chargement={result['load_seconds']:5.1f} s  "
+                  f"RSS={result['rss_loaded_mb']:7.1f} Mo (pic {result['rss_peak_mb']:7.1f} Mo)  {latency}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+Suite de benchmarks reproductible et hors ligne : cœur d'inférence et charge de l'API.
+
+Un jeu d'artefacts synthétiques (LSTM de même architecture que celui des
+notebooks, tokenizer et parameters.json, voir `benchmarks.synthetic`) est écrit
+dans un répertoire temporaire et servi comme MODEL_DIR, sans RUN_ID ni MLflow.
+Sections mesurées :
+
+- preprocessing : `custom_preprocess_tweet` tweet par tweet et
+  `TweetPreprocessor.preprocess_batch`, en µs par texte ;
+- encoding : `texts_to_sequences` + `pad_sequences`, `SequenceEncoder.encode` et
+  `VocabularyEncoder.encode` (vocabulaire compact) ;
+- predict : `predict_sentiment_batch` pour plusieurs tailles de lot (latences,
+  débit et temps par étape, lus dans les histogrammes de /metrics) ;
+- load_in_process : charge sur /predict et /predict-batch, application appelée
+  directement (ASGI), sans réseau ;
+- load_http : même charge sur un serveur uvicorn lancé dans un sous-processus.
+
+Le rapport JSON contient le commit git, les versions et le nombre de CPU ;
+`--compare` affiche l'évolution par rapport à un rapport précédent et signale
+les régressions. Le cache des prédictions est désactivé (les tweets sont
+réutilisés en boucle). Les sections qui ont besoin des ressources NLTK sont
+ignorées, avec leur raison, si elles ne sont pas installées.
+
+Usage :
+    python -m benchmarks.bench_suite --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.bench_suite --quick --compare benchmarks/results/base.json
+    python -m benchmarks.bench_suite --compare base.json --against nouveau.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.bench_encoding import time_per_text
+from benchmarks.load_test import ENDPOINTS, make_payloads, make_tweets, process_memory_mb, run_load
+
+APP_DIR = Path(__file__).resolve().parent.parent
+SECTIONS = ["preprocessing", "encoding", "predict", "load_in_process", "load_http"]
+BATCH_SIZES = [1, 8, 32, 128]
+QUICK_BATCH_SIZES = [1, 32]
+MAX_SEQUENCE_LENGTH = 100
+
+# Suffixes des mesures comparées par --compare : plus petit est meilleur, ou plus grand est meilleur
+LOWER_IS_BETTER = ("_ms", "_us_per_text", "rss_mb", "rss_peak_mb")
+HIGHER_IS_BETTER = ("_per_second",)
+
+
+def server_environment(model_dir: Path, work_dir: Path, cache_mb: float) -> Dict[str, str]:
+    """Variables d'environnement de l'API servant les artefacts synthétiques, sans MLflow ni Azure."""
+    return {
+        "MODEL_DIR": str(model_dir),
+        "RUN_ID": "",
+        "CANDIDATE_RUN_ID": "",
+        "APPINSIGHTS_INSTRUMENTATION_KEY": "",
+        "PREDICTION_CACHE_MAX_MB": str(cache_mb),
+        "PREDICTION_CACHE_URL": "",
+        "FEEDBACK_DB_PATH": str(work_dir / "feedback.db"),
+    }
+
+
+def nltk_missing() -> Optional[str]:
+    """Renvoie la raison pour laquelle les ressources NLTK sont indisponibles, ou None."""
+    try:
+        from preprocessing import TweetPreprocessor
+        TweetPreprocessor()
+    except LookupError:
+        return "ressources NLTK (punkt, stopwords, wordnet) non installées"
+    return None
+
+
+def metadata(args) -> Dict[str, Any]:
+    """Contexte de la mesure : commit, versions et machine, pour comparer des rapports entre eux."""
+    def git(*command):
+        try:
+            return subprocess.run(["git", *command], cwd=APP_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    import tensorflow as tf
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "tensorflow": tf.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        # Options de la charge HTTP, absentes des benchmarks hors ligne
+        **{option: getattr(args, option, None) for option in ("quick", "concurrency", "requests", "cache_mb")},
+    }
+
+
+def bench_preprocessing(raw_texts: List[str], batch_sizes: List[int], min_duration: float) -> List[Dict[str, Any]]:
+    from main import custom_preprocess_tweet
+    from preprocessing import TweetPreprocessor
+
+    preprocessor = TweetPreprocessor()
+    rows = []
+    for batch_size in batch_sizes:
+        texts = raw_texts[:batch_size]
+        rows.append({
+            "batch_size": batch_size,
+            "custom_preprocess_tweet_us_per_text": time_per_text(
+                lambda batch: [custom_preprocess_tweet(text) for text in batch], texts, min_duration),
+            "preprocess_batch_us_per_text": time_per_text(preprocessor.preprocess_batch, texts, min_duration),
+        })
+    return rows
+
+
+def bench_encoding(tokenizer, texts: List[str], batch_sizes: List[int], min_duration: float) -> List[Dict[str, Any]]:
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    from encoding import SequenceEncoder
+    from vocabulary import Vocabulary, VocabularyEncoder
+
+    encoder = SequenceEncoder.from_tokenizer(tokenizer)
+    vocabulary_encoder = VocabularyEncoder(Vocabulary.from_tokenizer(tokenizer))
+
+    def reference(batch):
+        return pad_sequences(tokenizer.texts_to_sequences(batch), maxlen=MAX_SEQUENCE_LENGTH, padding='post', truncating='post')
+
+    rows = []
+    for batch_size in batch_sizes:
+        batch = texts[:batch_size]
+        rows.append({
+            "batch_size": batch_size,
+            "texts_to_sequences_pad_us_per_text": time_per_text(reference, batch, min_duration),
+            "encode_us_per_text": time_per_text(lambda b: encoder.encode(b, MAX_SEQUENCE_LENGTH), batch, min_duration),
+            "vocabulary_encode_us_per_text": time_per_text(
+                lambda b: vocabulary_encoder.encode(b, MAX_SEQUENCE_LENGTH), batch, min_duration),
+        })
+    return rows
+
+
+def stage_totals(histogram) -> Dict[str, Dict[str, float]]:
+    """Somme (`_sum`) et nombre (`_count`) des observations de chaque étape, lus dans l'histogramme des étapes."""
+    totals: Dict[str, Dict[str, float]] = {}
+    for suffix, labels, value in histogram.samples():
+        if suffix in ("_sum", "_count"):
+            totals.setdefault(labels["stage"], {})[suffix] = value
+    return totals
+
+
+def stage_means_ms(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Durée moyenne (en millisecondes) de chaque étape observée entre deux relevés."""
+    means = {}
+    for stage, totals in after.items():
+        previous = before.get(stage, {"_sum": 0.0, "_count": 0})
+        count = totals["_count"] - previous["_count"]
+        if count:
+            means[stage] = (totals["_sum"] - previous["_sum"]) / count * 1000.0
+    return means
+
+
+def bench_predict(model_dir: Path, raw_texts: List[str], batch_sizes: List[int], min_duration: float) -> List[Dict[str, Any]]:
+    import main
+
+    pack = main.load_model(None, model_dir)
+    main.warmup_model(pack)
+    rows = []
+    for batch_size in batch_sizes:
+        texts = raw_texts[:batch_size]
+        main.predict_sentiment_batch(texts, pack)
+        before = stage_totals(main.PREDICT_STAGE_SECONDS)
+        latencies = []
+        started = time.perf_counter()
+        while time.perf_counter() - started < min_duration or len(latencies) < 5:
+            call_started = time.perf_counter()
+            main.predict_sentiment_batch(texts, pack)
+            latencies.append(time.perf_counter() - call_started)
+        after = stage_totals(main.PREDICT_STAGE_SECONDS)
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000.0, [50, 95, 99])
+        rows.append({
+            "batch_size": batch_size,
+            "calls": len(latencies),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "texts_per_second": batch_size * len(latencies) / sum(latencies),
+            # Temps moyen de chaque étape par lot : prétraitement, encodage, passe du modèle, réponse
+            "stages_ms": stage_means_ms(before, after),
+        })
+    return rows
+
+
+async def _load_all(client, args) -> List[Dict[str, Any]]:
+    results = []
+    for endpoint in ENDPOINTS:
+        payloads = make_payloads(endpoint, min(args.requests, 500), args.batch_size)
+        results.append(await run_load(client, endpoint, payloads, args.concurrency, args.requests))
+    return results
+
+
+def bench_load_in_process(args) -> List[Dict[str, Any]]:
+    import httpx
+
+    import main
+
+    async def run():
+        async with main.lifespan(main.app):
+            while not main.startup.ready:
+                if main.startup.status == "failed":
+                    raise RuntimeError(f"Échec du chargement du modèle : {main.startup.error}")
+                await asyncio.sleep(0.05)
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+                results = await _load_all(client, args)
+        for result in results:
+            result.update(process_memory_mb())
+        return results
+
+    return asyncio.run(run())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bench_load_http(args, environment: Dict[str, str], ready_timeout: float = 300.0) -> List[Dict[str, Any]]:
+    import httpx
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--log-level", "warning"],
+        cwd=APP_DIR, env={**os.environ, **environment},
+    )
+    try:
+        deadline = time.monotonic() + ready_timeout
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"Le serveur s'est arrêté au démarrage (code {server.returncode}).")
+            try:
+                if httpx.get(f"{url}/health/ready", timeout=1.0).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Le serveur n'est pas prêt après {ready_timeout:.0f} s.")
+            time.sleep(0.2)
+
+        async def run():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=url, timeout=60.0, limits=limits) as client:
+                return await _load_all(client, args)
+
+        results = asyncio.run(run())
+        for result in results:
+            result.update(process_memory_mb(server.pid))
+        return results
+    finally:
+        server.terminate()
+        try:
+            server.wait(30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def flatten(report: Any, prefix: str = "") -> Dict[str, float]:
+    """Mesures numériques d'un rapport, indexées par chemin (les lignes par taille de lot ou endpoint)."""
+    values = {}
+    if isinstance(report, dict):
+        for key, value in report.items():
+            if key != "metadata":
+                values.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(report, list):
+        for index, row in enumerate(report):
+            key = (row.get("endpoint") or row.get("batch_size", index)) if isinstance(row, dict) else index
+            values.update(flatten(row, f"{prefix}{key}."))
+    elif isinstance(report, (int, float)) and not isinstance(report, bool):
+        values[prefix.rstrip(".")] = float(report)
+    return values
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Compare deux rapports, mesure par mesure.
+
+    Args:
+        baseline: Rapport de référence
+        current: Nouveau rapport
+        threshold: Dégradation relative au-delà de laquelle une mesure est une régression
+
+    Returns:
+        Lignes `{metric, baseline, current, change, regression}` pour les mesures
+        de latence, de débit et de mémoire présentes dans les deux rapports
+    """
+    before, after = flatten(baseline), flatten(current)
+    rows = []
+    for metric in sorted(set(before) & set(after)):
+        name = metric.rsplit(".", 1)[-1]
+        lower = name.endswith(LOWER_IS_BETTER) or ".stages_ms." in metric
+        higher = name.endswith(HIGHER_IS_BETTER)
+        if not (lower or higher) or before[metric] == 0:
+            continue
+        change = after[metric] / before[metric] - 1.0
+        rows.append({
+            "metric": metric,
+            "baseline": before[metric],
+            "current": after[metric],
+            "change": change,
+            "regression": change > threshold if lower else change < -threshold,
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]], baseline: Dict[str, Any]):
+    commit = baseline.get("metadata", {}).get("commit")
+    print(f"\nComparaison avec {commit or 'le rapport de référence'} :")
+    for row in rows:
+        flag = "  RÉGRESSION" if row["regression"] else ""
+        print(f"  {row['metric']:60s} {row['baseline']:12.3f} -> {row['current']:12.3f}  ({row['change']:+.1%}){flag}")
+
+
+def run_suite(args) -> Dict[str, Any]:
+    work_dir = Path(tempfile.mkdtemp(prefix="bench-suite-"))
+    model_dir = work_dir / "model"
+    environment = server_environment(model_dir, work_dir, args.cache_mb)
+    # L'API lit sa configuration à l'import : l'environnement est fixé avant d'importer main
+    os.environ.update(environment)
+    # Une ligne de log par requête fausserait les tests de charge
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    from benchmarks.synthetic import write_model_artifacts
+    write_model_artifacts(model_dir, vocabulary_size=args.vocabulary_size, maxlen=MAX_SEQUENCE_LENGTH)
+
+    import pickle
+    with open(model_dir / "tokenizer.pickle", "rb") as f:
+        tokenizer = pickle.load(f)
+
+    batch_sizes = QUICK_BATCH_SIZES if args.quick else BATCH_SIZES
+    min_duration = 0.2 if args.quick else 1.0
+    raw_texts = make_tweets(max(batch_sizes))
+    # Textes déjà prétraités (pour l'encodage seul) : mots du vocabulaire du tokenizer
+    from benchmarks.synthetic import sample_texts
+    vocabulary = sorted(tokenizer.word_index, key=tokenizer.word_index.get)[:args.vocabulary_size]
+    preprocessed = sample_texts(max(batch_sizes), vocabulary, seed=7)
+
+    missing = nltk_missing()
+    report: Dict[str, Any] = {"metadata": metadata(args), "skipped": {}}
+    for section in args.sections:
+        if missing and section != "encoding":
+            report["skipped"][section] = missing
+            continue
+        print(f"Section {section}...", flush=True)
+        if section == "preprocessing":
+            report[section] = bench_preprocessing(raw_texts, batch_sizes, min_duration)
+        elif section == "encoding":
+            report[section] = bench_encoding(tokenizer, preprocessed, batch_sizes, min_duration)
+        elif section == "predict":
+            report[section] = bench_predict(model_dir, raw_texts, batch_sizes, min_duration)
+        elif section == "load_in_process":
+            report[section] = bench_load_in_process(args)
+        elif section == "load_http":
+            report[section] = bench_load_http(args, environment)
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    for section in SECTIONS:
+        if section in report["skipped"]:
+            print(f"{section}: ignorée ({report['skipped'][section]})")
+        for row in report.get(section, []):
+            if "endpoint" in row:
+                print(f"{section:16s} {row['endpoint']:14s} {row['requests_per_second']:8.1f} req/s "
+                      f"{row['texts_per_second']:8.1f} textes/s  p50={row['p50_ms']:7.1f} ms  "
+                      f"p95={row['p95_ms']:7.1f} ms  p99={row['p99_ms']:7.1f} ms  RSS={row.get('rss_mb') or 0:.0f} Mo")
+            else:
+                values = "  ".join(f"{key}={value:.2f}" for key, value in row.items()
+                                   if key != "batch_size" and isinstance(value, float))
+                stages = "  ".join(f"{stage}={ms:.2f}" for stage, ms in row.get("stages_ms", {}).items())
+                print(f"{section:16s} lot={row['batch_size']:<5d} {values}" + (f"  étapes (ms) : {stages}" if stages else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=SECTIONS)
+    parser.add_argument("--quick", action="store_true", help="Moins de tailles de lot et des mesures plus courtes")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients simultanés des tests de charge")
+    parser.add_argument("--requests", type=int, default=500, help="Requêtes mesurées par endpoint")
+    parser.add_argument("--batch-size", type=int, default=32, help="Textes par requête /predict-batch")
+    parser.add_argument("--vocabulary-size", type=int, default=20000, help="Taille du vocabulaire du modèle synthétique")
+    parser.add_argument("--cache-mb", type=float, default=0, help="Taille du cache des prédictions (défaut : désactivé)")
+    parser.add_argument("--output", help="Fichier JSON où écrire le rapport")
+    parser.add_argument("--compare", help="Rapport JSON de référence")
+    parser.add_argument("--against", help="Rapport JSON à comparer à --compare, sans nouvelle mesure")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Dégradation relative signalée comme régression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Code de sortie 1 en cas de régression")
+    args = parser.parse_args()
+    if args.quick and args.requests == parser.get_default("requests"):
+        args.requests = 100
+
+    if args.against:
+        if not args.compare:
+            parser.error("--against nécessite --compare")
+        with open(args.against) as f:
+            report = json.load(f)
+    else:
+        report = run_suite(args)
+        print_report(report)
+        if args.output:
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows, baseline)
+        if args.fail_on_regression and any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de la troncature dynamique des séquences (moteur compiled).
+
+Compare le débit (séquences par seconde) du moteur `compiled` à pleine longueur
+et avec troncature dynamique, sur des lots dont les longueurs suivent une
+distribution réaliste de tweets prétraités (après suppression des mots vides,
+la plupart comptent 8 à 20 tokens). Le contrôle de parité est d'abord effectué
+sur un échantillon distinct ; l'écart maximal et le nombre de décisions inversées
+sur les lots mesurés sont également rapportés. Sans `--model-dir`, un LSTM
+synthétique de même architecture que le modèle des notebooks est utilisé.
+
+Usage :
+    python -m benchmarks.bench_truncation [--model-dir model/runs/<run_id>] [--lengths 16 32 48 64] [--output resultats.json]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+MAX_SEQUENCE_LENGTH = 100
+BATCH_SIZES = [1, 32, 128]
+
+
+def tweet_lengths(count: int, seed: int = 0) -> np.ndarray:
+    """Longueurs en tokens de tweets prétraités : médiane d'environ 13, rares tweets au-delà de 30."""
+    rng = np.random.default_rng(seed)
+    return np.clip(np.round(rng.lognormal(mean=np.log(13), sigma=0.45, size=count)), 2, MAX_SEQUENCE_LENGTH).astype(int)
+
+
+def tweet_tokens(count: int, maxlen: int, vocabulary_size: int, seed: int = 0) -> np.ndarray:
+    """Séquences complétées par des zéros à la fin, de longueurs données par `tweet_lengths`."""
+    rng = np.random.default_rng(seed + 1)
+    tokens = np.zeros((count, maxlen), dtype=np.int32)
+    for row, length in enumerate(tweet_lengths(count, seed)):
+        tokens[row, :min(length, maxlen)] = rng.integers(1, vocabulary_size, size=min(length, maxlen))
+    return tokens
+
+
+def throughput(runtime, tokens: np.ndarray, batch_size: int, repeats: int) -> float:
+    """Débit (séquences par seconde) de `runtime.predict` sur `tokens` découpés en lots de `batch_size`."""
+    batches = [tokens[start:start + batch_size] for start in range(0, len(tokens), batch_size)]
+    runtime.predict(batches[0])
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for batch in batches:
+            runtime.predict(batch)
+    return repeats * len(tokens) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", type=Path, help="Répertoire des artefacts du modèle (défaut : modèle synthétique)")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[16, 32, 48, 64], help="Longueurs tronquées pré-compilées")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Écart maximal toléré sur le score brut")
+    parser.add_argument("--sequences", type=int, default=512, help="Nombre de séquences mesurées")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    args = parser.parse_args()
+
+    from runtime import CompiledRuntime, LengthBucketedRuntime, load_keras_model
+
+    if args.model_dir is None:
+        from benchmarks.synthetic import build_model
+        model, vocabulary_size = build_model(maxlen=MAX_SEQUENCE_LENGTH), 20000
+    else:
+        model = load_keras_model(args.model_dir)
+        vocabulary_size = model.layers[1].input_dim
+
+    full = CompiledRuntime(model, MAX_SEQUENCE_LENGTH)
+    bucketed = LengthBucketedRuntime(model, MAX_SEQUENCE_LENGTH, args.lengths)
+    calibration = bucketed.calibrate(tweet_tokens(64, MAX_SEQUENCE_LENGTH, vocabulary_size, seed=1), args.tolerance)
+    print(f"Contrôle de parité : marge retenue {calibration['margin']} "
+          f"({json.dumps(calibration['margins'])})")
+
+    tokens = tweet_tokens(args.sequences, MAX_SEQUENCE_LENGTH, vocabulary_size, seed=2)
+    reference, scores = full.predict(tokens), bucketed.predict(tokens)
+    parity = {
+        "max_abs_diff": float(np.abs(scores - reference).max()),
+        "decision_flips": int(np.sum((scores >= 0.5) != (reference >= 0.5))),
+    }
+    print(f"Longueur réelle médiane {np.median((tokens != 0).sum(axis=1)):.0f} tokens ; "
+          f"écart maximal {parity['max_abs_diff']:.2e}, décisions inversées {parity['decision_flips']}")
+
+    results = []
+    for batch_size in BATCH_SIZES:
+        before = throughput(full, tokens, batch_size, args.repeats)
+        after = throughput(bucketed, tokens, batch_size, args.repeats)
+        results.append({"batch_size": batch_size, "full_per_second": before, "truncated_per_second": after})
+        print(f"lot={batch_size:4d}  pleine longueur={before:8.1f} séq/s  tronqué={after:8.1f} séq/s  (x{after / before:.2f})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"calibration": calibration, "parity": parity, "throughput": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Courbe de montée en charge du service multi-processus (`serve.py`) : débit et
+mémoire de 1 à N processus.
+
+Pour chaque nombre de processus, l'API est lancée sur les artefacts synthétiques
+(voir `benchmarks.synthetic`), chargée par `benchmarks.load_test`, puis la
+mémoire de chaque processus est lue dans `/proc/<pid>/smaps_rollup` :
+
+- RSS : pages résidentes, partagées comprises (la somme sur les processus
+  compte plusieurs fois les pages partagées) ;
+- PSS : pages résidentes, chaque page partagée étant divisée entre les
+  processus qui la partagent (la somme est l'empreinte réelle du service) ;
+- USS : pages propres au processus (ce que libérerait son arrêt).
+
+`--mode uvicorn` mesure la même chose avec `uvicorn --workers N`, où chaque
+processus charge tout lui-même, pour chiffrer le gain du préchargement.
+
+Usage :
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --output benchmarks/results/workers.json
+    python -m benchmarks.bench_workers --workers 1 2 4 --mode prefork uvicorn --endpoints /predict-batch
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.bench_suite import APP_DIR, _free_port, metadata, nltk_missing, server_environment
+from benchmarks.load_test import ENDPOINTS, make_payloads, run_load
+
+MODES = ("prefork", "uvicorn")
+
+
+def child_pids(pid: int) -> List[int]:
+    """PIDs des processus enfants directs de `pid` (Linux)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Le nom du processus (2e champ) peut contenir des espaces : lire après la parenthèse fermante
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def smaps_memory_mb(pid: int) -> Dict[str, float]:
+    """RSS, PSS, USS et mémoire partagée (en Mo) d'un processus, lus dans /proc/<pid>/smaps_rollup."""
+    values: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[0].endswith(":"):
+                values[parts[0][:-1]] = int(parts[1])
+    private = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    shared = values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)
+    return {
+        "rss_mb": values.get("Rss", 0) / 2**10,
+        "pss_mb": values.get("Pss", 0) / 2**10,
+        "uss_mb": private / 2**10,
+        "shared_mb": shared / 2**10,
+    }
+
+
+def service_memory(master_pid: int, mode: str) -> Dict[str, Any]:
+    """Mémoire du maître et de chaque processus de service, et empreinte totale (somme des PSS)."""
+    workers = child_pids(master_pid)
+    if mode == "uvicorn":
+        # uvicorn --workers lance aussi un processus de suivi des ressources de multiprocessing
+        workers = [pid for pid in workers if _is_server(pid)]
+    master = smaps_memory_mb(master_pid)
+    if not workers:
+        # Un seul processus (serve.py --workers 1) : le maître sert lui-même les requêtes
+        return {"master": None, "workers": [{"pid": master_pid, **master}],
+                "total_pss_mb": master["pss_mb"], "total_rss_mb": master["rss_mb"]}
+    per_worker = [{"pid": pid, **smaps_memory_mb(pid)} for pid in workers]
+    return {
+        "master": master,
+        "workers": per_worker,
+        "total_pss_mb": master["pss_mb"] + sum(worker["pss_mb"] for worker in per_worker),
+        "total_rss_mb": master["rss_mb"] + sum(worker["rss_mb"] for worker in per_worker),
+    }
+
+
+def _is_server(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"resource_tracker" not in f.read()
+    except OSError:
+        return False
+
+
+def start_service(mode: str, workers: int, port: int, environment: Dict[str, str]) -> subprocess.Popen:
+    if mode == "prefork":
+        command = [sys.executable, "serve.py", "--workers", str(workers)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(workers)]
+    command += ["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(command, cwd=APP_DIR, env={**os.environ, **environment})
+
+
+def wait_ready(server: subprocess.Popen, url: str, workers: int, timeout: float = 300.0):
+    """
+    Attend que tous les processus soient prêts : chaque connexion nouvelle est acceptée par
+    l'un d'eux, `/health/ready` doit donc répondre 200 sur plusieurs connexions de suite.
+    """
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    consecutive = 0
+    while consecutive < 5 * workers:
+        if server.poll() is not None:
+            raise RuntimeError(f"Le service s'est arrêté au démarrage (code {server.returncode}).")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Le service n'est pas prêt après {timeout:.0f} s.")
+        try:
+            ready = httpx.get(f"{url}/health/ready", timeout=1.0).status_code == 200
+        except httpx.TransportError:
+            ready = False
+        consecutive = consecutive + 1 if ready else 0
+        if not ready:
+            time.sleep(0.2)
+
+
+def measure(mode: str, workers: int, args, environment: Dict[str, str]) -> Dict[str, Any]:
+    import httpx
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    server = start_service(mode, workers, port, environment)
+    try:
+        wait_ready(server, url, workers)
+        startup_s = time.monotonic() - started
+        idle_memory = service_memory(server.pid, mode)
+
+        async def run():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=url, timeout=60.0, limits=limits) as client:
+                results = []
+                for endpoint in args.endpoints:
+                    payloads = make_payloads(endpoint, min(args.requests, 500), args.batch_size)
+                    results.append(await run_load(client, endpoint, payloads, args.concurrency, args.requests))
+                return results
+
+        load = asyncio.run(run())
+        return {
+            "mode": mode,
+            "workers": workers,
+            "startup_s": startup_s,
+            "load": load,
+            "memory_idle": idle_memory,
+            "memory": service_memory(server.pid, mode),
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def scaling(rows: List[Dict[str, Any]]):
+    """Ajoute à chaque mesure son accélération par rapport au plus petit nombre de processus mesuré (même mode et endpoint)."""
+    reference: Dict[tuple, float] = {}
+    for row in sorted(rows, key=lambda row: row["workers"]):
+        for result in row["load"]:
+            base = reference.setdefault((row["mode"], result["endpoint"]), result["texts_per_second"])
+            result["speedup"] = result["texts_per_second"] / base if base else 0.0
+
+
+def print_rows(rows: List[Dict[str, Any]]):
+    for row in rows:
+        memory = row["memory"]
+        workers = memory["workers"]
+        average = {key: sum(worker[key] for worker in workers) / len(workers) for key in ("rss_mb", "pss_mb", "uss_mb")}
+        master_rss = memory["master"]["rss_mb"] if memory["master"] else 0.0
+        print(f"{row['mode']:8s} {row['workers']:2d} processus  démarrage {row['startup_s']:5.1f} s  "
+              f"par processus RSS={average['rss_mb']:.0f} PSS={average['pss_mb']:.0f} USS={average['uss_mb']:.0f} Mo  "
+              f"maître RSS={master_rss:.0f} Mo  total PSS={memory['total_pss_mb']:.0f} Mo "
+              f"(somme des RSS {memory['total_rss_mb']:.0f} Mo)")
+        for result in row["load"]:
+            print(f"    {result['endpoint']:14s} {result['requests_per_second']:8.1f} req/s {result['texts_per_second']:8.1f} textes/s "
+                  f"x{result['speedup']:.2f}  p50={result['p50_ms']:.1f} ms  p95={result['p95_ms']:.1f} ms  "
+                  f"erreurs={result['errors'] or 0}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Nombres de processus mesurés")
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=["prefork"])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--quick", action="store_true", help="Moins de requêtes par mesure")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients simultanés (identique pour toutes les mesures)")
+    parser.add_argument("--requests", type=int, default=500, help="Requêtes mesurées par endpoint")
+    parser.add_argument("--batch-size", type=int, default=32, help="Textes par requête /predict-batch")
+    parser.add_argument("--vocabulary-size", type=int, default=20000, help="Taille du vocabulaire du modèle synthétique")
+    parser.add_argument("--cache-mb", type=float, default=0, help="Taille du cache des prédictions (défaut : désactivé)")
+    parser.add_argument("--output", help="Fichier JSON où écrire le rapport")
+    args = parser.parse_args()
+    if args.quick and args.requests == parser.get_default("requests"):
+        args.requests = 100
+
+    missing = nltk_missing()
+    if missing:
+        parser.exit(1, f"Mesure impossible : {missing}.\n")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench-workers-"))
+    model_dir = work_dir / "model"
+    from benchmarks.synthetic import write_model_artifacts
+    write_model_artifacts(model_dir, vocabulary_size=args.vocabulary_size)
+    environment = server_environment(model_dir, work_dir, args.cache_mb)
+
+    rows = []
+    for mode in args.mode:
+        for workers in sorted(set(args.workers)):
+            print(f"Mesure {mode} avec {workers} processus...", flush=True)
+            rows.append(measure(mode, workers, args, environment))
+    scaling(rows)
+    print_rows(rows)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"metadata": metadata(args), "runs": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
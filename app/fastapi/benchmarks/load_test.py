@@ -0,0 +1,153 @@
+"""
+Générateur de charge pour /predict et /predict-batch.
+
+Un nombre fixe de clients concurrents envoient les requêtes en boucle fermée
+(chaque client attend sa réponse avant d'envoyer la suivante) ; le rapport
+donne le débit (requêtes et textes par seconde), les latences p50/p95/p99, les
+erreurs par code de statut et, si le serveur tourne sur la même machine, sa
+mémoire résidente. La cible est une URL (API déployée ou lancée localement) ;
+`benchmarks.bench_suite` l'utilise aussi dans le processus, sans réseau.
+
+Usage :
+    python -m benchmarks.load_test http://localhost:8000 --endpoint /predict --concurrency 16 --requests 2000
+    python -m benchmarks.load_test http://localhost:8000 --endpoint /predict-batch --batch-size 32 --pid $(pgrep -f uvicorn)
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import make_vocabulary, sample_texts
+
+ENDPOINTS = ("/predict", "/predict-batch")
+
+
+def process_memory_mb(pid: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """Mémoire résidente actuelle et pic (en Mo) d'un processus (défaut : le processus courant), sous Linux."""
+    values = {"rss_mb": None, "rss_peak_mb": None}
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    values["rss_mb"] = int(line.split()[1]) / 2**10
+                elif line.startswith("VmHWM:"):
+                    values["rss_peak_mb"] = int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return values
+
+
+def make_tweets(count: int, seed: int = 42) -> List[str]:
+    """Tweets bruts synthétiques et reproductibles (mentions, liens et hashtags compris)."""
+    texts = sample_texts(count, make_vocabulary(5000, seed=seed), seed=seed)
+    return [f"@AirParadis {text} http://t.co/x #travel" for text in texts]
+
+
+def make_payloads(endpoint: str, count: int, batch_size: int = 32, seed: int = 42) -> List[Dict[str, Any]]:
+    """Corps des requêtes : un tweet par requête pour /predict, `batch_size` pour /predict-batch."""
+    if endpoint == "/predict":
+        return [{"text": text} for text in make_tweets(count, seed)]
+    tweets = make_tweets(count * batch_size, seed)
+    return [{"texts": tweets[i * batch_size:(i + 1) * batch_size]} for i in range(count)]
+
+
+def summarize(latencies: List[float], statuses: Counter, elapsed: float, texts: int) -> Dict[str, Any]:
+    """Débit, percentiles de latence (en millisecondes) et erreurs d'une série de requêtes."""
+    samples = np.array(latencies) * 1000.0
+    percentiles = np.percentile(samples, [50, 95, 99]) if len(samples) else [0.0, 0.0, 0.0]
+    return {
+        "requests": len(latencies),
+        "errors": {str(status): count for status, count in sorted(statuses.items()) if status != 200},
+        "elapsed_s": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "texts_per_second": texts / elapsed if elapsed else 0.0,
+        "p50_ms": float(percentiles[0]),
+        "p95_ms": float(percentiles[1]),
+        "p99_ms": float(percentiles[2]),
+        "max_ms": float(samples.max()) if len(samples) else 0.0,
+    }
+
+
+async def run_load(client, endpoint: str, payloads: List[Dict[str, Any]], concurrency: int = 8,
+                   requests: int = 1000, warmup: int = 20) -> Dict[str, Any]:
+    """
+    Envoie `requests` requêtes avec `concurrency` clients en boucle fermée.
+
+    Args:
+        client: `httpx.AsyncClient` (réseau ou application ASGI)
+        endpoint: "/predict" ou "/predict-batch"
+        payloads: Corps des requêtes, réutilisés en boucle
+        concurrency: Nombre de clients simultanés
+        requests: Nombre de requêtes mesurées
+        warmup: Nombre de requêtes envoyées avant la mesure (non comptées)
+
+    Returns:
+        Résumé de `summarize`, avec la configuration de la charge
+    """
+    for i in range(warmup):
+        await client.post(endpoint, json=payloads[i % len(payloads)])
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    texts = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request, texts
+        while next_request < requests:
+            payload = payloads[next_request % len(payloads)]
+            next_request += 1
+            started = time.perf_counter()
+            response = await client.post(endpoint, json=payload)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                texts += len(payload.get("texts", [None]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "texts_per_request": len(payloads[0].get("texts", [None])),
+        **summarize(latencies, statuses, elapsed, texts),
+    }
+
+
+def main():
+    import httpx
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="URL de base de l'API")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="/predict")
+    parser.add_argument("--concurrency", type=int, default=8, help="Nombre de clients simultanés")
+    parser.add_argument("--requests", type=int, default=1000, help="Nombre de requêtes mesurées")
+    parser.add_argument("--batch-size", type=int, default=32, help="Textes par requête /predict-batch")
+    parser.add_argument("--pid", type=int, help="PID du serveur local, pour rapporter sa mémoire résidente")
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    args = parser.parse_args()
+
+    async def run():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.url, timeout=60.0, limits=limits) as client:
+            payloads = make_payloads(args.endpoint, min(args.requests, 500), args.batch_size)
+            return await run_load(client, args.endpoint, payloads, args.concurrency, args.requests)
+
+    result = asyncio.run(run())
+    if args.pid:
+        result.update(process_memory_mb(args.pid))
+    print(f"{result['endpoint']}  {result['requests_per_second']:.1f} req/s  {result['texts_per_second']:.1f} textes/s  "
+          f"p50={result['p50_ms']:.1f} ms  p95={result['p95_ms']:.1f} ms  p99={result['p99_ms']:.1f} ms  "
+          f"erreurs={result['errors'] or 0}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Données synthétiques pour les benchmarks et les tests hors ligne
+import random
+from typing import List, Tuple
+
+# Longueurs (en mots) typiques d'un tweet prétraité
+MIN_WORDS = 4
+MAX_WORDS = 30
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """Génère `size` pseudo-mots distincts et reproductibles."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(2, 10))))
+    return sorted(words)
+
+
+def sample_texts(count: int, vocabulary: List[str], seed: int = 1, unknown_rate: float = 0.05) -> List[str]:
+    """
+    Génère des textes prétraités suivant une distribution de Zipf sur le vocabulaire.
+
+    Une fraction `unknown_rate` des mots est absente du vocabulaire, et quelques
+    tokens spéciaux et signes de ponctuation sont ajoutés comme dans les vrais tweets.
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    specials = ["<URL>", "<MENTION>", "#", "!", "?"]
+    texts = []
+    for _ in range(count):
+        length = rng.randint(MIN_WORDS, MAX_WORDS)
+        words = rng.choices(vocabulary, weights=weights, k=length)
+        for i in range(length):
+            draw = rng.random()
+            if draw < unknown_rate:
+                words[i] = f"zz{rng.randint(0, 10**6)}"
+            elif draw < unknown_rate + 0.05:
+                words[i] = rng.choice(specials)
+        texts.append(" ".join(words))
+    return texts
+
+
+def build_tokenizer(vocabulary_size: int = 30000, num_words: int = 20000, oov_token: str = "<OOV>", seed: int = 0):
+    """Construit un Tokenizer Keras configuré comme celui des notebooks."""
+    from tensorflow.keras.preprocessing.text import Tokenizer
+
+    vocabulary = make_vocabulary(vocabulary_size, seed=seed)
+    tokenizer = Tokenizer(num_words=num_words, oov_token=oov_token)
+    tokenizer.fit_on_texts(sample_texts(20000, vocabulary, seed=seed, unknown_rate=0.0))
+    return tokenizer, vocabulary
+
+
+def build_model(vocabulary_size: int = 20000, embedding_dim: int = 100, maxlen: int = 100,
+                units: Tuple[int, int] = (128, 64), seed: int = 0):
+    """
+    Construit un LSTM bidirectionnel non entraîné, de même architecture que le modèle
+    des notebooks (embedding figé, deux couches Bidirectional(LSTM), sortie sigmoïde).
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.layers.Input(shape=(maxlen,))
+    x = tf.keras.layers.Embedding(vocabulary_size, embedding_dim, trainable=False)(inputs)
+    x = tf.keras.layers.SpatialDropout1D(0.3)(x)
+    x = tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(units[0], dropout=0.2, return_sequences=True))(x)
+    x = tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(units[1], dropout=0.2))(x)
+    x = tf.keras.layers.Dense(64, activation='relu')(x)
+    x = tf.keras.layers.Dropout(0.4)(x)
+    outputs = tf.keras.layers.Dense(1, activation='sigmoid')(x)
+    model = tf.keras.Model(inputs=inputs, outputs=outputs)
+    model.compile(loss='binary_crossentropy', optimizer='adam', metrics=['accuracy'])
+    return model
+
+
+def write_model_artifacts(model_dir, vocabulary_size: int = 20000, maxlen: int = 100, seed: int = 0, **model_options):
+    """
+    Écrit dans `model_dir` un jeu d'artefacts synthétiques complet (modèle Keras,
+    tokenizer, parameters.json et fonction de prétraitement), chargeable par
+    `main.load_model` et utilisable comme MODEL_DIR sans RUN_ID.
+    """
+    import json
+    import pickle
+    from pathlib import Path
+
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer, _ = build_tokenizer(vocabulary_size=int(vocabulary_size * 1.5), num_words=vocabulary_size, seed=seed)
+    build_model(vocabulary_size=vocabulary_size, maxlen=maxlen, seed=seed, **model_options).save(
+        model_dir / "final_model_LSTM_Word2Vec-Fige.keras"
+    )
+    with open(model_dir / "tokenizer.pickle", "wb") as f:
+        pickle.dump(tokenizer, f)
+    with open(model_dir / "parameters.json", "w") as f:
+        json.dump({"max_sequence_length": maxlen}, f)
+    # L'API ne charge pas ce fichier (elle utilise preprocessing.TweetPreprocessor), mais il fait
+    # partie des artefacts attendus d'une exécution MLflow
+    from preprocessing import TweetPreprocessor
+    with open(model_dir / "preprocess_function.dill", "wb") as f:
+        pickle.dump(TweetPreprocessor, f)
+    return model_dir
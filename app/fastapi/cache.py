@@ -0,0 +1,268 @@
+# Cache des prédictions, indexé par la séquence de tokens prétraitée
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Surcoût mémoire approximatif d'une entrée (nœud de l'OrderedDict et tuple de valeur)
+ENTRY_OVERHEAD_BYTES = 120
+
+
+def make_keys(run_id: Optional[str], padded_tokens: np.ndarray) -> List[bytes]:
+    """
+    Calcule la clé de cache de chaque séquence encodée.
+
+    La clé est un condensat de l'identifiant du modèle et des indices de la
+    séquence : deux tweets qui donnent les mêmes tokens partagent la même entrée,
+    et un changement de modèle invalide toutes les entrées.
+
+    Args:
+        run_id: Identifiant de l'exécution MLflow du modèle
+        padded_tokens: Tableau (lot, longueur) des séquences encodées
+
+    Returns:
+        Liste des clés, une par ligne
+    """
+    prefix = hashlib.blake2b((run_id or "").encode(), digest_size=16)
+    rows = np.ascontiguousarray(padded_tokens)
+    keys = []
+    for row in rows:
+        digest = prefix.copy()
+        digest.update(row.tobytes())
+        keys.append(digest.digest())
+    return keys
+
+
+class HTTPCacheBackend:
+    """
+    Cache partagé accessible en HTTP (voir `serve` pour le serveur local).
+
+    Les erreurs réseau sont comptées et traitées comme des absences : le cache
+    partagé ne doit jamais faire échouer une prédiction.
+
+    Args:
+        url: URL de base du serveur de cache
+        timeout: Délai maximal d'une requête (en secondes)
+    """
+
+    def __init__(self, url: str, timeout: float = 0.2):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.errors = 0
+        self._session = requests.Session()
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[float]]:
+        try:
+            response = self._session.post(
+                f"{self.url}/mget", json={"keys": [key.hex() for key in keys]}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()["values"]
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache partagé indisponible (lecture): {str(e)}")
+            return [None] * len(keys)
+
+    def set_many(self, items: Dict[bytes, float], ttl: float):
+        try:
+            response = self._session.post(
+                f"{self.url}/mset",
+                json={"items": {key.hex(): value for key, value in items.items()}, "ttl": ttl},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache partagé indisponible (écriture): {str(e)}")
+
+
+class PredictionCache:
+    """
+    Cache LRU avec durée de vie des scores bruts du modèle.
+
+    Le cache local est borné en mémoire (`max_bytes`). Un cache partagé
+    optionnel est consulté pour les absences locales et alimenté avec les
+    nouveaux scores.
+
+    Args:
+        max_bytes: Taille mémoire maximale approximative du cache local
+        ttl: Durée de vie d'une entrée (en secondes)
+        backend: Cache partagé optionnel
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600.0, backend: Optional[HTTPCacheBackend] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_hits = 0
+
+    @staticmethod
+    def _entry_size(key: bytes) -> int:
+        return sys.getsizeof(key) + ENTRY_OVERHEAD_BYTES
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[float]]:
+        """Renvoie le score en cache de chaque clé, ou None en cas d'absence."""
+        now = time.monotonic()
+        values: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] <= now:
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+
+        if self.backend is not None:
+            missing = [i for i, value in enumerate(values) if value is None]
+            if missing:
+                remote = self.backend.get_many([keys[i] for i in missing])
+                found = {keys[i]: value for i, value in zip(missing, remote) if value is not None}
+                for i in missing:
+                    values[i] = found.get(keys[i])
+                if found:
+                    self.backend_hits += len(found)
+                    self._store(found)
+
+        with self._lock:
+            hits = sum(value is not None for value in values)
+            self.hits += hits
+            self.misses += len(values) - hits
+        return values
+
+    def set_many(self, items: Dict[bytes, float]):
+        """Ajoute des scores au cache local et au cache partagé."""
+        if not items:
+            return
+        self._store(items)
+        if self.backend is not None:
+            self.backend.set_many(items, self.ttl)
+
+    def _store(self, items: Dict[bytes, float]):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = (float(value), expires_at)
+                self._bytes += self._entry_size(key)
+            # Évincer les entrées les moins récemment utilisées
+            while self._bytes > self.max_bytes and self._entries:
+                key = next(iter(self._entries))
+                self._remove(key)
+                self.evictions += 1
+
+    def _remove(self, key: bytes):
+        del self._entries[key]
+        self._bytes -= self._entry_size(key)
+
+    def clear(self):
+        """Vide le cache local."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        """Renvoie les compteurs du cache."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "backend": None if self.backend is None else {
+                "url": self.backend.url,
+                "hits": self.backend_hits,
+                "errors": self.backend.errors,
+            },
+        }
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Construit un serveur de cache partagé minimal, en mémoire.
+
+    Il remplace localement le service de cache partagé : plusieurs instances de
+    l'API peuvent le désigner via `PREDICTION_CACHE_URL`.
+    """
+    store: Dict[str, tuple] = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            now = time.monotonic()
+            with lock:
+                if self.path == "/mget":
+                    values = []
+                    for key in body.get("keys", []):
+                        entry = store.get(key)
+                        values.append(entry[0] if entry is not None and entry[1] > now else None)
+                    payload = {"values": values}
+                elif self.path == "/mset":
+                    expires_at = now + float(body.get("ttl", 3600))
+                    for key, value in body.get("items", {}).items():
+                        store[key] = (value, expires_at)
+                    payload = {"stored": len(body.get("items", {}))}
+                else:
+                    self.send_error(404)
+                    return
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Serveur de cache partagé local pour les prédictions.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port)
+    print(f"Serveur de cache partagé à l'écoute sur http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Déduplication des lots et mise en commun des prédictions identiques en cours de calcul
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+def deduplicate(keys: Sequence[Hashable]) -> Tuple[List[Hashable], List[int]]:
+    """
+    Regroupe les clés identiques d'un lot.
+
+    Returns:
+        Les clés distinctes (dans l'ordre de première apparition) et, pour chaque
+        clé d'entrée, la position de sa clé distincte
+    """
+    positions: Dict[Hashable, int] = {}
+    inverse = [positions.setdefault(key, len(positions)) for key in keys]
+    return list(positions), inverse
+
+
+class InFlightPredictions:
+    """
+    Table des prédictions en cours de calcul, partagée par les threads d'inférence.
+
+    `run` déduplique d'abord le lot, puis réserve les clés distinctes que personne
+    ne calcule encore : le thread appelant ne calcule que celles-ci et emprunte les
+    autres au thread qui les calcule déjà. Chaque thread calcule ses propres clés
+    avant d'attendre celles des autres, si bien que deux lots qui se recouvrent ne
+    peuvent pas s'attendre mutuellement. Une clé quitte la table dès que son
+    résultat est connu : ce n'est pas un cache, seules les requêtes simultanées
+    partagent un calcul. Si le calcul échoue, les requêtes qui l'attendaient
+    échouent avec la même exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, Future] = {}
+
+        self._texts = 0
+        self._batch_duplicates = 0
+        self._coalesced = 0
+        self._computed = 0
+
+    def run(self, keys: Sequence[Hashable], compute: Callable[[List[Hashable]], Sequence[Any]]) -> List[Any]:
+        """
+        Renvoie la valeur de chaque clé, en ne calculant que les clés distinctes
+        qu'aucun autre thread n'est en train de calculer.
+
+        Args:
+            keys: Clés du lot (par exemple le modèle et le texte prétraité)
+            compute: Fonction qui prend une liste de clés distinctes et renvoie leurs valeurs
+
+        Returns:
+            Valeurs dans l'ordre de `keys`
+        """
+        unique, inverse = deduplicate(keys)
+        owned: List[int] = []
+        borrowed: List[Tuple[int, Future]] = []
+        with self._lock:
+            for i, key in enumerate(unique):
+                future = self._pending.get(key)
+                if future is None:
+                    self._pending[key] = Future()
+                    owned.append(i)
+                else:
+                    borrowed.append((i, future))
+            self._texts += len(keys)
+            self._batch_duplicates += len(keys) - len(unique)
+            self._coalesced += len(borrowed)
+            self._computed += len(owned)
+
+        values: List[Any] = [None] * len(unique)
+        if owned:
+            owned_keys = [unique[i] for i in owned]
+            try:
+                computed = compute(owned_keys)
+            except BaseException as e:
+                self._settle(owned_keys, error=e)
+                raise
+            self._settle(owned_keys, computed)
+            for i, value in zip(owned, computed):
+                values[i] = value
+
+        for i, future in borrowed:
+            values[i] = future.result()
+        return [values[i] for i in inverse]
+
+    def _settle(self, keys: List[Hashable], values: Sequence[Any] = (), error: Optional[BaseException] = None):
+        with self._lock:
+            futures = [self._pending.pop(key) for key in keys]
+        for i, future in enumerate(futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(values[i])
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie le travail économisé : textes reçus, doublons retirés des lots,
+        textes empruntés à une prédiction simultanée, textes calculés, et clés en cours.
+        """
+        with self._lock:
+            saved = self._batch_duplicates + self._coalesced
+            return {
+                "texts": self._texts,
+                "batch_duplicates": self._batch_duplicates,
+                "coalesced": self._coalesced,
+                "computed": self._computed,
+                "saved_ratio": saved / self._texts if self._texts else 0.0,
+                "in_flight": len(self._pending),
+            }
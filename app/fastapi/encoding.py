@@ -0,0 +1,161 @@
+# Encodage vectorisé des textes prétraités en séquences d'indices
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Filtres par défaut du Tokenizer Keras
+DEFAULT_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+# Séparateur des textes d'un lot et indices sentinelles utilisés lors de l'encodage
+BATCH_SEPARATOR = '\x1e'
+BOUNDARY = -1
+DROP = -2
+
+# En dessous de cette taille de lot, l'encodage texte par texte est plus rapide
+MIN_VECTORIZED_BATCH = 8
+
+
+class _Lookup(dict):
+    """Table mot -> indice renvoyant `default` pour les mots absents."""
+
+    __slots__ = ("default",)
+
+    def __init__(self, default: int):
+        super().__init__()
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default
+
+
+class SequenceEncoder:
+    """
+    Équivalent par lot de `tokenizer.texts_to_sequences` suivi de
+    `pad_sequences(..., padding='post', truncating='post')`.
+
+    La table de correspondance mot -> indice est construite une seule fois à
+    partir du `word_index` du tokenizer, en appliquant déjà la limite `num_words`.
+    Les indices sont écrits directement dans un tableau int32 préalloué.
+
+    Args:
+        word_index: Dictionnaire mot -> indice du tokenizer
+        num_words: Taille maximale du vocabulaire (les indices >= num_words sont hors vocabulaire)
+        oov_token: Token hors vocabulaire, ou None pour ignorer les mots inconnus
+        filters: Caractères remplacés par le séparateur avant le découpage
+        lower: Mettre le texte en minuscules avant le découpage
+        split: Séparateur de mots
+    """
+
+    def __init__(
+        self,
+        word_index: Dict[str, int],
+        num_words: Optional[int] = None,
+        oov_token: Optional[str] = None,
+        filters: str = DEFAULT_FILTERS,
+        lower: bool = True,
+        split: str = ' ',
+    ):
+        self.num_words = num_words
+        self.lower = lower
+        self.split = split
+        self._translate_table = str.maketrans({c: split for c in filters})
+        # Les filtres ASCII peuvent être appliqués sur les octets UTF-8, bien plus rapidement
+        self._byte_table = None
+        if (filters + split).isascii() and len(split) == 1:
+            self._byte_table = bytes.maketrans(filters.encode(), split.encode() * len(filters))
+
+        # Indice utilisé pour les mots inconnus (None : le mot est ignoré)
+        self.oov_index = None
+        if oov_token is not None:
+            if oov_token not in word_index:
+                raise ValueError(f"Le token hors vocabulaire {oov_token!r} est absent du word_index.")
+            self.oov_index = word_index[oov_token]
+
+        # Les mots au-delà de num_words se comportent exactement comme des mots inconnus
+        self.lookup = _Lookup(DROP if self.oov_index is None else self.oov_index)
+        for word, index in word_index.items():
+            if not num_words or index < num_words:
+                self.lookup[word] = index
+
+        # Table du chemin par lot : le séparateur et les mots vides y sont des sentinelles
+        self._batch_ready = BATCH_SEPARATOR not in self.lookup and BATCH_SEPARATOR not in filters + split
+        self._batch_lookup = _Lookup(self.lookup.default)
+        self._batch_lookup.update(self.lookup)
+        self._batch_lookup[''] = DROP
+        self._batch_lookup[BATCH_SEPARATOR] = BOUNDARY
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer) -> "SequenceEncoder":
+        """Construit l'encodeur à partir d'un Tokenizer Keras."""
+        if getattr(tokenizer, "char_level", False) or getattr(tokenizer, "analyzer", None) is not None:
+            raise ValueError("Seuls les tokenizers au niveau des mots, sans analyseur personnalisé, sont pris en charge.")
+        return cls(
+            tokenizer.word_index,
+            num_words=tokenizer.num_words,
+            oov_token=tokenizer.oov_token,
+            filters=tokenizer.filters,
+            lower=tokenizer.lower,
+            split=tokenizer.split,
+        )
+
+    def _clean(self, text: str) -> str:
+        # Minuscules puis remplacement des filtres par le séparateur, comme text_to_word_sequence
+        if self.lower:
+            text = text.lower()
+        if self._byte_table is not None:
+            return text.encode('utf-8', 'surrogatepass').translate(self._byte_table).decode('utf-8', 'surrogatepass')
+        return text.translate(self._translate_table)
+
+    def texts_to_ids(self, text: str) -> List[int]:
+        """Renvoie la séquence d'indices d'un texte, comme `texts_to_sequences`."""
+        ids = map(self.lookup.__getitem__, filter(None, self._clean(text).split(self.split)))
+        if self.oov_index is None:
+            return [index for index in ids if index != DROP]
+        return list(ids)
+
+    def encode(self, texts: List[str], maxlen: int) -> np.ndarray:
+        """
+        Encode un lot de textes dans un tableau (len(texts), maxlen) de type int32.
+
+        Les séquences trop longues sont tronquées à la fin et les plus courtes
+        complétées par des zéros à la fin.
+
+        Args:
+            texts: Liste de textes prétraités
+            maxlen: Longueur des séquences
+
+        Returns:
+            Tableau NumPy int32 des indices
+        """
+        buffer = np.zeros((len(texts), maxlen), dtype=np.int32)
+        if len(texts) < MIN_VECTORIZED_BATCH or not self._batch_ready \
+                or any(BATCH_SEPARATOR in text for text in texts):
+            for row, text in enumerate(texts):
+                ids = self.texts_to_ids(text)[:maxlen]
+                buffer[row, :len(ids)] = ids
+            return buffer
+
+        # Découper tout le lot en une seule passe : le séparateur devient un mot sentinelle
+        split = self.split
+        words = self._clean((split + BATCH_SEPARATOR + split).join(texts)).split(split)
+        ids = np.fromiter(map(self._batch_lookup.__getitem__, words), dtype=np.int64, count=len(words))
+        return fill_batch(buffer, ids)
+
+
+def fill_batch(buffer: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """
+    Écrit dans `buffer` (une ligne par texte) les indices d'un lot découpé en une seule
+    passe : BOUNDARY sépare les textes et les autres indices négatifs sont ignorés. Les
+    séquences trop longues sont tronquées à la fin.
+    """
+    # Numéro de ligne de chaque mot, puis position dans sa ligne
+    rows = np.cumsum(ids == BOUNDARY)
+    keep = ids >= 0
+    ids, rows = ids[keep], rows[keep]
+    counts = np.bincount(rows, minlength=len(buffer))
+    positions = np.arange(len(ids)) - (np.cumsum(counts) - counts)[rows]
+
+    # Troncature à la fin, puis écriture directe dans le tableau préalloué
+    inside = positions < buffer.shape[1]
+    buffer[rows[inside], positions[inside]] = ids[inside]
+    return buffer
@@ -0,0 +1,217 @@
+# Exécution de l'inférence hors de la boucle d'événements
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloaded(Exception):
+    """Levée lorsque la file d'attente de l'inférence est pleine."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("La file d'attente de l'inférence est pleine.")
+        self.retry_after = retry_after
+
+
+class TimingStats:
+    """Cumule le nombre, la somme et le maximum de durées (en secondes)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": (self.total / self.count) * 1000.0 if self.count else 0.0,
+            "max_ms": self.max * 1000.0,
+        }
+
+
+class InferenceExecutor:
+    """
+    Pool de threads dédié à l'inférence, avec une file d'attente bornée.
+
+    Au plus `max_workers` tâches s'exécutent en parallèle et au plus `max_queue`
+    tâches attendent un thread libre. Au-delà, `run` lève `InferenceOverloaded`
+    immédiatement au lieu de laisser la latence croître sans limite.
+
+    Les travaux d'arrière-plan (`run_background`) passent après le trafic
+    interactif : ils attendent hors de la file qu'un thread soit libre, et n'en
+    occupent jamais plus de `background_slots` à la fois. Ils ne comptent pas dans
+    la limite qui déclenche `InferenceOverloaded` : ils ralentissent au pire le
+    trafic interactif, sans jamais le faire rejeter. Avec un seul thread, un
+    travail d'arrière-plan ne démarre que lorsque aucune requête interactive n'est
+    en cours ni en attente, mais il occupe alors ce thread : une requête arrivée
+    entre-temps attend la fin de ce travail.
+
+    Args:
+        max_workers: Nombre de threads d'inférence
+        max_queue: Nombre maximal de tâches en attente d'un thread
+        retry_after: Délai (en secondes) conseillé aux clients rejetés
+        observe: Fonction appelée avec le temps d'attente et le temps d'exécution
+            (en secondes) de chaque tâche, par exemple pour alimenter des histogrammes
+        background_slots: Nombre maximal de threads occupés par des travaux d'arrière-plan
+            (par défaut, tous sauf un, qui reste réservé au trafic interactif ; au moins un,
+            sans quoi ces travaux ne démarreraient jamais avec un seul thread)
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 64, retry_after: int = 1,
+                 observe: Optional[Callable[[float, float], None]] = None,
+                 background_slots: Optional[int] = None):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.retry_after = retry_after
+        self.observe = observe
+        if background_slots is None:
+            background_slots = self.max_workers - 1
+        self.background_slots = max(1, min(int(background_slots), self.max_workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._in_flight = 0
+        self._background = 0
+        self._waiters = deque()
+
+        self._submitted = 0
+        self._rejected = 0
+        self._failed = 0
+        self._queue_wait = TimingStats()
+        self._execution = TimingStats()
+        self._background_submitted = 0
+        self._background_wait = TimingStats()
+
+    @property
+    def in_flight(self) -> int:
+        """Nombre de tâches en cours d'exécution ou en attente."""
+        return self._in_flight
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Exécute `fn(*args, **kwargs)` dans le pool d'inférence.
+
+        Doit être appelée depuis la boucle d'événements, qui est seule à modifier
+        le compteur de tâches en vol. La tâche s'exécute dans une copie du contexte
+        de l'appelant, comme avec `asyncio.to_thread`.
+
+        Raises:
+            InferenceOverloaded: Si la file d'attente est pleine
+        """
+        # Les travaux d'arrière-plan n'entament pas ce budget : seul le trafic interactif provoque un rejet
+        if self._in_flight - self._background >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise InferenceOverloaded(self.retry_after)
+
+        return await self._submit(fn, args, kwargs)
+
+    async def run_background(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Exécute `fn(*args, **kwargs)` dans le pool d'inférence, en basse priorité.
+
+        La tâche attend, sans occuper la file, qu'un thread soit libre et que moins
+        de `background_slots` travaux d'arrière-plan soient en cours ; elle démarre
+        alors immédiatement. Elle ne passe donc jamais devant une requête
+        interactive et, avec plusieurs threads, ne les occupe jamais tous. Avec un
+        seul thread, elle attend que le trafic interactif soit écoulé, puis occupe
+        ce thread jusqu'à sa fin.
+        """
+        waited_at = time.perf_counter()
+        while self._in_flight >= self.max_workers or self._background >= self.background_slots:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._background_wait.add(time.perf_counter() - waited_at)
+        return await self._submit(fn, args, kwargs, background=True)
+
+    async def _submit(self, fn: Callable[..., Any], args, kwargs, background: bool = False) -> Any:
+        # Le créneau est rendu quand le thread a réellement fini (rappel du future du pool),
+        # et non quand l'appelant cesse d'attendre : une requête annulée (client déconnecté,
+        # délai dépassé) laisse son calcul se terminer, et il occupe toujours un thread.
+        self._in_flight += 1
+        self._submitted += 1
+        if background:
+            self._background += 1
+            self._background_submitted += 1
+        enqueued_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        def timed_call():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished_at = time.perf_counter()
+                self._queue_wait.add(started_at - enqueued_at)
+                self._execution.add(finished_at - started_at)
+                if self.observe is not None:
+                    self.observe(started_at - enqueued_at, finished_at - started_at)
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._release, background)
+            except RuntimeError:
+                # Boucle d'événements fermée (arrêt de l'application) : plus personne n'attend
+                pass
+
+        context = contextvars.copy_context()
+        future = self._pool.submit(context.run, timed_call)
+        # Enregistré avant `wrap_future` : le créneau est rendu avant que l'appelant ne reprenne
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception:
+            self._failed += 1
+            raise
+
+    def _release(self, background: bool):
+        self._in_flight -= 1
+        if background:
+            self._background -= 1
+        self._wake()
+
+    def _wake(self):
+        # Un thread s'est libéré : les travaux d'arrière-plan en attente vérifient s'ils peuvent démarrer
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def shutdown(self):
+        """Arrête le pool après la fin des tâches en cours."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Renvoie les statistiques d'attente et d'exécution, mesurées séparément."""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "failed": self._failed,
+            "queue_wait": self._queue_wait.as_dict(),
+            "execution": self._execution.as_dict(),
+            "background": {
+                "slots": self.background_slots,
+                "running": self._background,
+                "waiting": len(self._waiters),
+                "submitted": self._background_submitted,
+                "wait": self._background_wait.as_dict(),
+            },
+        }
@@ -0,0 +1,422 @@
+"""
+Stockage local et durable du feedback utilisateur, et export pour le réentraînement.
+
+Le feedback est ajouté à une table SQLite en mode WAL, en ajout seul. Les
+requêtes ne font que placer l'enregistrement dans une file bornée ; un thread
+d'écriture regroupe tout ce qui est en attente et l'écrit en une seule
+transaction (group commit), si bien que /feedback n'attend jamais le disque.
+L'export relit la base par morceaux, sans bloquer l'écriture, et produit un jeu
+de données aux étiquettes corrigées : au format Sentiment140 (CSV lu par les
+notebooks) ou en NDJSON.
+
+Usage :
+    python feedback_store.py data/feedback.db feedback.csv --since 2024-01-01 --only-corrections
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger("feedback_store")
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    tweet_text TEXT NOT NULL,
+    prediction TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    is_correct INTEGER NOT NULL,
+    corrected_sentiment TEXT NOT NULL DEFAULT '',
+    comments TEXT NOT NULL DEFAULT '',
+    run_id TEXT
+);
+CREATE INDEX IF NOT EXISTS feedback_created_at ON feedback (created_at);
+CREATE INDEX IF NOT EXISTS feedback_prediction ON feedback (prediction, created_at);
+CREATE INDEX IF NOT EXISTS feedback_is_correct ON feedback (is_correct, created_at);
+"""
+
+COLUMNS = ["created_at", "tweet_text", "prediction", "confidence", "is_correct", "corrected_sentiment", "comments", "run_id"]
+INSERT = f"INSERT INTO feedback ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})"
+
+# Sentiments reconnus (prédictions de l'API, corrections du frontend) et étiquette binaire associée
+LABELS = {
+    "positif": 1,
+    "positive": 1,
+    "négatif": 0,
+    "negatif": 0,
+    "negative": 0,
+}
+
+# Formats d'export : type de contenu et encodage (Sentiment140 est distribué en latin-1)
+EXPORT_FORMATS = {
+    "sentiment140": ("text/csv; charset=latin-1", "latin-1"),
+    "ndjson": ("application/x-ndjson", "utf-8"),
+}
+
+# Nombre de lignes lues à la fois lors d'un export
+EXPORT_FETCH_SIZE = 1000
+
+
+class _FlushRequest:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def connect(path: Union[str, Path], read_only: bool = False) -> sqlite3.Connection:
+    """
+    Ouvre la base de feedback en mode WAL : les lectures (export) ne bloquent pas
+    l'écriture, et inversement.
+
+    Args:
+        path: Chemin du fichier SQLite
+        read_only: Ouvrir la base en lecture seule (elle doit exister)
+    """
+    if read_only:
+        connection = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(path), check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # En mode WAL, NORMAL ne synchronise qu'aux points de contrôle : une transaction validée
+        # survit à l'arrêt brutal du processus, seule une coupure du système peut la perdre
+        connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
+
+
+class FeedbackStore:
+    """
+    Base de feedback alimentée par un thread d'écriture.
+
+    `record` ne fait qu'ajouter l'enregistrement à une file bornée ; le thread
+    d'écriture vide la file et écrit tous les enregistrements en attente (au plus
+    `batch_size`) en une seule transaction. Sous forte charge, les lots grossissent
+    d'eux-mêmes pendant l'écriture du précédent. Si la file est pleine,
+    l'enregistrement est refusé (et compté) plutôt que de bloquer la requête.
+
+    Args:
+        path: Chemin du fichier SQLite (créé au besoin)
+        max_queue: Nombre maximal d'enregistrements en attente d'écriture
+        batch_size: Nombre maximal d'enregistrements par transaction
+    """
+
+    def __init__(self, path: Union[str, Path], max_queue: int = 10000, batch_size: int = 500):
+        self.path = Path(path)
+        self.batch_size = max(1, int(batch_size))
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+        self._enqueued = 0
+        self._rejected = 0
+        self._written = 0
+        self._commits = 0
+        self._failed = 0
+        self._largest_commit = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def record(self, feedback: Dict[str, Any]) -> bool:
+        """
+        Ajoute un feedback à la file d'écriture ; renvoie False si la file est pleine.
+
+        Args:
+            feedback: Champs de `FeedbackRequest` (`run_id` et `created_at` facultatifs)
+        """
+        row = (
+            feedback.get("created_at") or time.time(),
+            feedback["tweet_text"],
+            feedback["prediction"],
+            float(feedback["confidence"]),
+            int(bool(feedback["is_correct"])),
+            feedback.get("corrected_sentiment") or "",
+            feedback.get("comments") or "",
+            feedback.get("run_id"),
+        )
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._rejected += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    def start(self):
+        """Crée la base au besoin et démarre le thread d'écriture (sans effet s'il est déjà démarré)."""
+        if self.running:
+            return
+        connection = connect(self.path)
+        connection.executescript(SCHEMA)
+        connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(connection,), name="feedback-store", daemon=True)
+        self._thread.start()
+        logger.info(f"Base de feedback ouverte : {self.path}")
+
+    def stop(self, timeout: float = 10.0):
+        """Écrit les enregistrements encore en attente puis arrête le thread d'écriture."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Arrêt de la base de feedback : {self._queue.qsize()} enregistrements non écrits.")
+        self._thread = None
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Attend l'écriture de tous les enregistrements ajoutés avant l'appel ; renvoie False en cas d'expiration."""
+        if not self.running:
+            return False
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def _run(self, connection: sqlite3.Connection):
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    first = None
+
+                rows: List[Tuple] = []
+                flushes: List[_FlushRequest] = []
+                item = first
+                while item is not None:
+                    if isinstance(item, _FlushRequest):
+                        flushes.append(item)
+                    else:
+                        rows.append(item)
+                    if len(rows) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+
+                self._write(connection, rows)
+                for request in flushes:
+                    request.done.set()
+                if self._stopping.is_set() and self._queue.empty():
+                    return
+        finally:
+            connection.close()
+
+    def _write(self, connection: sqlite3.Connection, rows: List[Tuple]):
+        if not rows:
+            return
+        try:
+            with connection:
+                connection.executemany(INSERT, rows)
+        except sqlite3.Error as e:
+            self._failed += len(rows)
+            logger.error(f"Échec de l'écriture de {len(rows)} feedbacks: {str(e)}")
+            return
+        self._written += len(rows)
+        self._commits += 1
+        self._largest_commit = max(self._largest_commit, len(rows))
+
+    def stats(self) -> Dict[str, Any]:
+        """Renvoie les compteurs de la file et de l'écriture (ajoutés, refusés, écrits, transactions)."""
+        return {
+            "path": str(self.path),
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self._enqueued,
+            "rejected": self._rejected,
+            "written": self._written,
+            "commits": self._commits,
+            "largest_commit": self._largest_commit,
+            "failed": self._failed,
+        }
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """
+    Convertit une borne d'export en horodatage : secondes depuis l'époque, ou date
+    ISO 8601 (UTC si le fuseau n'est pas précisé).
+
+    Raises:
+        ValueError: Si la valeur n'est pas reconnue
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def corrected_label(row: Dict[str, Any]) -> Optional[int]:
+    """
+    Renvoie l'étiquette (1 positif, 0 négatif) d'un feedback : la prédiction si
+    elle a été jugée correcte, sinon le sentiment corrigé, ou à défaut l'inverse
+    de la prédiction. None si la prédiction n'est pas reconnue.
+    """
+    predicted = LABELS.get(row["prediction"].strip().lower())
+    if predicted is None:
+        return None
+    if row["is_correct"]:
+        return predicted
+    corrected = LABELS.get(row["corrected_sentiment"].strip().lower())
+    return corrected if corrected is not None else 1 - predicted
+
+
+def iter_feedback(path: Union[str, Path], since: Optional[float] = None, until: Optional[float] = None,
+                  only_corrections: bool = False, prediction: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parcourt les feedbacks par ordre chronologique, par morceaux de `EXPORT_FETCH_SIZE`
+    lignes, avec leur étiquette corrigée (`label`).
+
+    Args:
+        path: Chemin de la base
+        since: Horodatage minimal (inclus)
+        until: Horodatage maximal (exclu)
+        only_corrections: Ne garder que les prédictions jugées incorrectes
+        prediction: Ne garder que cette prédiction ("Positif" ou "Négatif")
+    """
+    clauses, parameters = [], []
+    if since is not None:
+        clauses.append("created_at >= ?")
+        parameters.append(since)
+    if until is not None:
+        clauses.append("created_at < ?")
+        parameters.append(until)
+    if only_corrections:
+        clauses.append("is_correct = 0")
+    if prediction:
+        clauses.append("prediction = ?")
+        parameters.append(prediction)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    connection = connect(path, read_only=True)
+    connection.row_factory = sqlite3.Row
+    try:
+        cursor = connection.execute(f"SELECT id, {', '.join(COLUMNS)} FROM feedback {where} ORDER BY created_at, id", parameters)
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                row = dict(row)
+                row["label"] = corrected_label(row)
+                if row["label"] is not None:
+                    yield row
+    finally:
+        connection.close()
+
+
+def format_sentiment140(row: Dict[str, Any]) -> str:
+    """
+    Formate un feedback comme une ligne du jeu Sentiment140 (target, ids, date,
+    flag, user, text), que les notebooks lisent avec
+    `pd.read_csv(path, encoding='latin-1', names=[...])`.
+    """
+    buffer = io.StringIO()
+    date = time.strftime("%a %b %d %H:%M:%S UTC %Y", time.gmtime(row["created_at"]))
+    csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator="\n").writerow(
+        [4 if row["label"] else 0, row["id"], date, "NO_QUERY", "feedback", row["tweet_text"]]
+    )
+    return buffer.getvalue()
+
+
+def format_ndjson(row: Dict[str, Any]) -> str:
+    """Formate un feedback comme une ligne NDJSON (texte, étiquette corrigée et feedback d'origine)."""
+    return json.dumps({
+        "id": row["id"],
+        "created_at": row["created_at"],
+        "text": row["tweet_text"],
+        "label": row["label"],
+        "prediction": row["prediction"],
+        "confidence": row["confidence"],
+        "is_correct": bool(row["is_correct"]),
+        "corrected_sentiment": row["corrected_sentiment"],
+        "comments": row["comments"],
+        "run_id": row["run_id"],
+    }, ensure_ascii=False) + "\n"
+
+
+def iter_export(path: Union[str, Path], export_format: str = "sentiment140", encode: bool = False,
+                **filters) -> Iterator[Union[str, bytes]]:
+    """
+    Produit le jeu de données exporté ligne par ligne (voir `iter_feedback` pour les filtres).
+
+    Args:
+        path: Chemin de la base
+        export_format: "sentiment140" ou "ndjson"
+        encode: Produire des octets dans l'encodage du format (les caractères non
+            représentables en latin-1 sont remplacés par "?")
+
+    Raises:
+        ValueError: Si le format est inconnu
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu : {export_format} (formats : {', '.join(EXPORT_FORMATS)}).")
+    formatter = format_sentiment140 if export_format == "sentiment140" else format_ndjson
+    encoding = EXPORT_FORMATS[export_format][1]
+    for row in iter_feedback(path, **filters):
+        line = formatter(row)
+        yield line.encode(encoding, errors="replace") if encode else line
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", type=Path, help="Base de feedback (FEEDBACK_DB_PATH)")
+    parser.add_argument("output", help="Fichier de sortie, ou - pour la sortie standard")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS),
+                        help="Format d'export (défaut : ndjson pour .ndjson/.jsonl, sinon sentiment140)")
+    parser.add_argument("--since", help="Date ISO 8601 ou horodatage minimal (inclus)")
+    parser.add_argument("--until", help="Date ISO 8601 ou horodatage maximal (exclu)")
+    parser.add_argument("--only-corrections", action="store_true", help="Ne garder que les prédictions jugées incorrectes")
+    parser.add_argument("--prediction", help="Ne garder que cette prédiction (Positif ou Négatif)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.database.exists():
+        parser.error(f"Base de feedback introuvable : {args.database}")
+    export_format = args.format or ("ndjson" if Path(args.output).suffix in (".ndjson", ".jsonl") else "sentiment140")
+
+    lines = iter_export(
+        args.database, export_format, encode=True,
+        since=parse_time(args.since),
+        until=parse_time(args.until),
+        only_corrections=args.only_corrections,
+        prediction=args.prediction,
+    )
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    total = 0
+    try:
+        for line in lines:
+            output.write(line)
+            total += 1
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    logger.info(f"{total} feedbacks exportés au format {export_format}.")
+
+
+if __name__ == "__main__":
+    main()
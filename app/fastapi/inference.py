@@ -0,0 +1,290 @@
+# Chargement du modèle et prédiction par lot, sans effet de bord à l'import : ce module est
+# partagé par l'API (main.py) et le scoring hors ligne (score.py), qui ne doit ni construire
+# l'application, ni ouvrir ses bases, ni envoyer de télémétrie depuis chacun de ses processus
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from artifacts import recorded_sha256
+from cache import PredictionCache, make_keys
+from coalescing import InFlightPredictions, deduplicate
+from metrics import StageTimer
+from quantization import ensure_variant
+from runtime import KERAS_MODEL_FILE, load_runtime
+from vocabulary import VOCABULARY_FILE, Vocabulary, VocabularyEncoder, convert_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Paramètres par défaut si non spécifiés dans le modèle
+MAX_SEQUENCE_LENGTH = 100
+
+# Module TensorFlow, importé et configuré au premier besoin
+_tensorflow = None
+_tensorflow_lock = threading.Lock()
+
+
+def options_from_env() -> Dict[str, Any]:
+    """
+    Lit dans l'environnement les réglages du chargement du modèle (mêmes variables et
+    mêmes valeurs par défaut que l'API) : MODEL_BACKEND, MODEL_VARIANT, TFLITE_THREADS,
+    SEQUENCE_LENGTH_BUCKETS et TF_INTRA_OP_THREADS.
+
+    Returns:
+        Arguments nommés de `load_model`
+    """
+    return {
+        "backend": os.getenv("MODEL_BACKEND", "compiled"),
+        "variant": os.getenv("MODEL_VARIANT", "").strip() or None,
+        "tflite_threads": int(os.getenv("TFLITE_THREADS", "1")),
+        "length_buckets": [int(length) for length in os.getenv("SEQUENCE_LENGTH_BUCKETS", "").split(",") if length.strip()],
+        "intra_op_threads": int(os.getenv("TF_INTRA_OP_THREADS", "0")),
+    }
+
+
+def configure_tensorflow(intra_op_threads: int = 0):
+    """
+    Importe TensorFlow au premier appel et masque les GPUs (exécution sur CPU uniquement).
+
+    Args:
+        intra_op_threads: Threads de calcul de TensorFlow (0 : tous les cœurs), appliqué au premier appel
+    """
+    global _tensorflow
+    with _tensorflow_lock:
+        if _tensorflow is not None:
+            return _tensorflow
+        import tensorflow as tf
+        tf.config.set_visible_devices([], 'GPU')
+        if intra_op_threads > 0:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        physical_devices = tf.config.list_physical_devices('GPU')
+        if physical_devices:
+            try:
+                # Désactiver l'allocation de mémoire GPU
+                for device in physical_devices:
+                    tf.config.experimental.set_memory_growth(device, False)
+                # Masquer complètement les GPUs
+                tf.config.set_visible_devices([], 'GPU')
+                logger.info("GPU désactivé avec succès pour TensorFlow.")
+            except Exception as e:
+                logger.warning(f"Erreur lors de la désactivation du GPU: {str(e)}")
+        _tensorflow = tf
+        return tf
+
+
+def load_vocabulary(model_dir: Path) -> Vocabulary:
+    """
+    Ouvre le vocabulaire compact du modèle, projeté en mémoire.
+
+    Le vocabulaire est normalement publié avec l'exécution et téléchargé à la place de
+    `tokenizer.pickle`. À défaut, le tokenizer est converti au premier chargement (ou
+    s'il a changé depuis) et le vocabulaire enregistré à côté des artefacts. Pour
+    savoir si le tokenizer a changé, l'empreinte vérifiée au téléchargement (manifeste
+    du magasin d'artefacts) est utilisée, sans relire le fichier.
+
+    Args:
+        model_dir: Répertoire contenant les artefacts du modèle
+    """
+    vocabulary_path = model_dir / VOCABULARY_FILE
+    tokenizer_path = model_dir / "tokenizer.pickle"
+    if vocabulary_path.exists():
+        vocabulary = Vocabulary.open(vocabulary_path)
+        if not tokenizer_path.exists() or vocabulary.matches_source(tokenizer_path, recorded_sha256(model_dir, tokenizer_path.name)):
+            return vocabulary
+        logger.info("Le tokenizer a changé depuis la conversion du vocabulaire.")
+    logger.info("Conversion du tokenizer en vocabulaire compact...")
+    return convert_tokenizer(tokenizer_path, vocabulary_path)
+
+
+def load_text_artifacts(model_dir: Path) -> Dict[str, Any]:
+    """
+    Charge le vocabulaire, l'encodeur et le prétraitement d'un répertoire d'artefacts.
+
+    Args:
+        model_dir: Répertoire contenant les artefacts du modèle
+
+    Returns:
+        Dictionnaire avec les clés "vocabulary", "encoder" et "preprocess"
+    """
+    vocabulary = load_vocabulary(model_dir)
+
+    # Utiliser le moteur de prétraitement compilé (équivalent à custom_preprocess_tweet)
+    # au lieu de charger la fonction via dill
+    from preprocessing import TweetPreprocessor
+    preprocess_function = TweetPreprocessor()
+
+    # Encodeur vectorisé, qui cherche les mots directement dans la table du vocabulaire
+    encoder = VocabularyEncoder(vocabulary)
+
+    return {"vocabulary": vocabulary, "encoder": encoder, "preprocess": preprocess_function}
+
+
+def load_model(run_id: Optional[str], model_dir: Path, backend: str = "compiled", variant: Optional[str] = None,
+               tflite_threads: int = 1, length_buckets: Sequence[int] = (), intra_op_threads: int = 0,
+               text_artifacts: Callable[[Path], Dict[str, Any]] = load_text_artifacts) -> Dict[str, Any]:
+    """
+    Charge le modèle et tous ses artefacts associés.
+
+    Si `variant` est donné, c'est la variante compressée du modèle qui est chargée
+    (construite à partir des artefacts d'origine si elle n'existe pas encore).
+
+    Args:
+        run_id: ID de l'exécution MLflow du modèle, utilisé pour identifier ses prédictions en cache
+        model_dir: Répertoire contenant les artefacts du modèle
+        backend: Moteur d'exécution : compiled, keras, savedmodel ou tflite (voir runtime.py)
+        variant: Variante compressée du modèle (voir quantization.py), ou None
+        tflite_threads: Nombre de threads de chaque interpréteur TFLite
+        length_buckets: Longueurs tronquées pré-compilées (moteur compiled)
+        intra_op_threads: Threads de calcul de TensorFlow (0 : tous les cœurs)
+        text_artifacts: Fonction qui charge le vocabulaire, l'encodeur et le prétraitement
+            d'un répertoire (par exemple pour réutiliser ceux préchargés avant un fork)
+    """
+    try:
+        logger.info("Chargement du modèle et de ses artefacts...")
+
+        built_variant = None
+        if variant:
+            model_dir, built_variant = ensure_variant(model_dir, variant, load_vocabulary(model_dir))
+            logger.info(f"Variante du modèle: {built_variant['name']} ({built_variant['embedding_rows']} lignes d'embedding)")
+
+        # Chemins des artefacts
+        model_path = model_dir / KERAS_MODEL_FILE
+        tokenizer_path = model_dir / "tokenizer.pickle"
+        params_path = model_dir / "parameters.json"
+
+        # Vérifier si les fichiers principaux existent (le vocabulaire compact peut remplacer le tokenizer)
+        for path in [model_path, params_path]:
+            if not path.exists():
+                raise FileNotFoundError(f"Le fichier {path.name} n'existe pas.")
+        if not tokenizer_path.exists() and not (model_dir / VOCABULARY_FILE).exists():
+            raise FileNotFoundError(f"Ni {tokenizer_path.name} ni {VOCABULARY_FILE} n'existent.")
+
+        # Charger les paramètres
+        with open(params_path, 'r') as f:
+            params = json.load(f)
+
+        # Charger le modèle avec le moteur d'exécution configuré (Keras, SavedModel ou TFLite)
+        configure_tensorflow(intra_op_threads)
+        runtime = load_runtime(
+            backend,
+            model_dir,
+            params.get("max_sequence_length", MAX_SEQUENCE_LENGTH),
+            tflite_threads=tflite_threads,
+            length_buckets=length_buckets,
+            quantization=built_variant["dtype"] if built_variant else None
+        )
+        logger.info(f"Moteur d'exécution du modèle: {runtime.name}")
+
+        # Vocabulaire, encodeur et prétraitement
+        loaded_text_artifacts = text_artifacts(model_dir)
+
+        logger.info("Modèle et artefacts chargés avec succès.")
+
+        return {
+            "runtime": runtime,
+            **loaded_text_artifacts,
+            "params": params,
+            "run_id": run_id,
+            "variant": built_variant["name"] if built_variant else None,
+            # Les indices d'une variante élaguée diffèrent de ceux du modèle d'origine :
+            # ses prédictions en cache sont rangées à part
+            "cache_namespace": f"{run_id or ''}/{built_variant['name']}" if built_variant else run_id
+        }
+
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement du modèle: {str(e)}")
+        raise
+
+
+def predict_sentiment_batch(texts: List[str], model_pack: Dict[str, Any], cache: Optional[PredictionCache] = None,
+                            coalescer: Optional[InFlightPredictions] = None,
+                            stages: Optional[StageTimer] = None) -> List[Dict[str, Any]]:
+    """
+    Prédit le sentiment d'une liste de textes en utilisant le modèle chargé.
+    Cette version est optimisée pour le traitement par lot.
+
+    Les textes dont le prétraitement est identique ne sont encodés et prédits
+    qu'une fois par lot.
+
+    Args:
+        texts: Liste de textes à analyser
+        model_pack: Dictionnaire contenant le modèle et ses artefacts
+        cache: Cache optionnel des prédictions ; seules les absences passent par le modèle
+        coalescer: Table optionnelle des prédictions en cours ; les textes qu'un autre
+            thread est déjà en train de prédire avec le même modèle lui sont empruntés
+        stages: Chronomètre optionnel des étapes (prétraitement, encodage, passe du modèle...)
+
+    Returns:
+        Liste de dictionnaires contenant les sentiments prédits et les scores
+    """
+    try:
+        runtime = model_pack["runtime"]
+        encoder = model_pack["encoder"]
+        preprocess = model_pack["preprocess"]
+        params = model_pack["params"]
+        mark = stages.mark if stages is not None else lambda stage: None
+
+        # Prétraiter tous les textes en une passe sur le lot
+        preprocessed_texts = preprocess.preprocess_batch(texts)
+        mark("preprocess")
+
+        max_length = params.get("max_sequence_length", MAX_SEQUENCE_LENGTH)
+        namespace = model_pack.get("cache_namespace", model_pack.get("run_id"))
+
+        def score_unique(unique_texts: List[str]) -> np.ndarray:
+            # Tokeniser et compléter les séquences directement dans un tableau préalloué
+            # (une seule étape : l'encodeur écrit les indices à leur place dans le tableau complété)
+            padded_tokens = encoder.encode(unique_texts, max_length)
+            mark("encode")
+
+            if cache is None:
+                # Prédire les sentiments pour tous les textes en une seule passe
+                scores = runtime.predict(padded_tokens)
+                mark("forward")
+                return scores
+
+            # Ne passer au modèle que les séquences absentes du cache
+            keys = make_keys(namespace, padded_tokens)
+            cached = cache.get_many(keys)
+            scores = np.array([0.0 if score is None else score for score in cached], dtype=np.float32)
+            missing = [i for i, score in enumerate(cached) if score is None]
+            mark("cache_lookup")
+            if missing:
+                scores[missing] = runtime.predict(padded_tokens[missing])
+                mark("forward")
+                cache.set_many({keys[i]: scores[i] for i in missing})
+                mark("cache_store")
+            return scores
+
+        if coalescer is None:
+            # Ne prédire qu'une fois les textes identiques du lot
+            unique_texts, inverse = deduplicate(preprocessed_texts)
+            scores = np.asarray(score_unique(unique_texts))[inverse]
+        else:
+            # Dédupliquer le lot et emprunter aux autres threads les textes qu'ils prédisent déjà avec ce modèle
+            keys = [(namespace, text) for text in preprocessed_texts]
+            scores = coalescer.run(keys, lambda owned: score_unique([text for _, text in owned]))
+            mark("coalesce_wait")
+
+        # Interpréter les prédictions
+        results = []
+        for score in scores:
+            sentiment = "Positif" if score >= 0.5 else "Négatif"
+            confidence = float(score) if score >= 0.5 else float(1 - score)
+
+            results.append({
+                'sentiment': sentiment,
+                'confidence': confidence,
+                'raw_score': float(score)
+            })
+        mark("response")
+
+        return results
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la prédiction par lot optimisée: {str(e)}")
+        raise
@@ -0,0 +1,540 @@
+# Tâches de prédiction asynchrones pour les très gros volumes, persistées dans SQLite
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from feedback_store import connect
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    run_id TEXT,
+    owner TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    item_id,
+    text TEXT NOT NULL,
+    result TEXT,
+    PRIMARY KEY (job_id, position)
+) WITHOUT ROWID;
+"""
+
+# États d'une tâche (`creating` : textes en cours d'enregistrement, ignorée par `claim`)
+CREATING = "creating"
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Nombre de textes insérés à la fois à la création d'une tâche
+INSERT_BATCH_SIZE = 1000
+
+# Une tâche en cours dont le processus n'a pas donné signe de vie depuis ce délai
+# (en secondes) est considérée comme abandonnée et peut être reprise par un autre
+STALE_AFTER = 60.0
+
+# Un morceau de tâche : liste de (position, texte)
+Chunk = List[Tuple[int, str]]
+
+
+class JobNotFound(Exception):
+    """Levée lorsque la tâche demandée n'existe pas (ou plus)."""
+
+
+class JobTooLarge(ValueError):
+    """Levée lorsqu'une tâche dépasse le nombre maximal de textes."""
+
+
+def _item_id(value: Any) -> Any:
+    # SQLite conserve les entiers, réels et chaînes tels quels ; le reste est sérialisé
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+class JobStore:
+    """
+    Base des tâches asynchrones : textes à analyser, avancement et résultats.
+
+    Les textes d'une tâche sont écrits à sa création par lots de `INSERT_BATCH_SIZE`,
+    chacun dans une courte transaction : la lecture d'un gros fichier ne bloque ni
+    le suivi des autres tâches ni leur traitement. La tâche reste à l'état
+    `creating`, que `claim` ignore, jusqu'à son dernier lot. Chaque morceau traité enregistre ses résultats et l'avancement de la tâche en
+    une transaction, si bien qu'une tâche interrompue reprend au premier texte
+    sans résultat. La base est en mode WAL : plusieurs processus peuvent la
+    partager, chaque tâche étant réservée par un seul d'entre eux (`claim`).
+
+    Args:
+        path: Chemin du fichier SQLite (créé au besoin)
+        max_texts: Nombre maximal de textes par tâche
+        stale_after: Délai (en secondes) après lequel une tâche en cours sans signe
+            de vie de son processus peut être reprise
+    """
+
+    def __init__(self, path: Union[str, Path], max_texts: int = 1_000_000, stale_after: float = STALE_AFTER):
+        self.path = Path(path)
+        self.max_texts = max(1, int(max_texts))
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Crée la base au besoin (sans effet si elle est déjà ouverte)."""
+        with self._lock:
+            if self._connection is not None:
+                return
+            # Identifiant du processus qui ouvre la base (après un fork, celui du processus de service)
+            self.owner = f"{socket.gethostname()}:{os.getpid()}"
+            connection = connect(self.path)
+            connection.row_factory = sqlite3.Row
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._connection = connection
+        logger.info(f"Base des tâches ouverte : {self.path}")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise RuntimeError("La base des tâches n'est pas ouverte.")
+        return self._connection
+
+    def create(self, items: Iterable[Tuple[Any, str]], run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Crée une tâche à partir de (identifiant, texte), lus au fil de l'eau.
+
+        Les textes sont lus hors du verrou de la base et insérés par lots, chacun
+        dans sa propre transaction ; la tâche n'est mise en attente (`queued`)
+        qu'une fois tous ses textes enregistrés.
+
+        Args:
+            items: Textes à analyser et leur identifiant (None : la position du texte)
+            run_id: Modèle à utiliser (None : modèle par défaut au moment du traitement)
+
+        Returns:
+            La tâche créée (voir `get`)
+
+        Raises:
+            JobTooLarge: Si la tâche dépasse `max_texts` textes (la tâche est supprimée)
+            ValueError: Si la tâche ne contient aucun texte
+            JobNotFound: Si la tâche a été supprimée pendant son enregistrement
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            with connection:
+                connection.execute(
+                    "INSERT INTO jobs (id, status, created_at, heartbeat_at, total, run_id) VALUES (?, ?, ?, ?, 0, ?)",
+                    (job_id, CREATING, now, now, run_id)
+                )
+        total = 0
+        try:
+            batch = []
+            for item_id, text in items:
+                if total >= self.max_texts:
+                    raise JobTooLarge(f"La tâche dépasse {self.max_texts} textes.")
+                batch.append((job_id, total, _item_id(item_id), text))
+                total += 1
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    self._insert_items(job_id, batch)
+                    batch = []
+            if batch:
+                self._insert_items(job_id, batch)
+            if total == 0:
+                raise ValueError("La tâche ne contient aucun texte.")
+            with self._lock:
+                connection = self._db()
+                with connection:
+                    queued = connection.execute(
+                        "UPDATE jobs SET status = ?, total = ?, heartbeat_at = NULL WHERE id = ? AND status = ?",
+                        (QUEUED, total, job_id, CREATING)
+                    ).rowcount
+            if not queued:
+                raise JobNotFound(job_id)
+        except BaseException:
+            self._discard(job_id)
+            raise
+        return self.get(job_id)
+
+    def _insert_items(self, job_id: str, batch: List[Tuple[str, int, Any, str]]):
+        # Un lot par transaction ; le signe de vie distingue une création en cours d'une création abandonnée
+        with self._lock:
+            connection = self._db()
+            with connection:
+                if connection.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?", (time.time(), job_id, CREATING)
+                ).rowcount == 0:
+                    raise JobNotFound(job_id)
+                connection.executemany("INSERT INTO job_items (job_id, position, item_id, text) VALUES (?, ?, ?, ?)", batch)
+
+    def _discard(self, job_id: str):
+        # Supprime une tâche dont la création a échoué, et les textes déjà enregistrés
+        try:
+            with self._lock:
+                connection = self._db()
+                with connection:
+                    connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                    connection.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+        except (sqlite3.Error, RuntimeError) as e:
+            logger.warning(f"Impossible de supprimer la tâche {job_id} après l'échec de sa création: {str(e)}")
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """
+        Renvoie l'état d'une tâche : statut, nombre de textes traités sur le total,
+        horodatages, modèle demandé et message d'erreur éventuel.
+
+        Raises:
+            JobNotFound: Si la tâche n'existe pas
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT id, status, created_at, started_at, finished_at, total, processed, run_id, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        job = dict(row)
+        job["progress"] = job["processed"] / job["total"] if job["total"] else 1.0
+        return job
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Réserve la plus ancienne tâche en attente (ou abandonnée) pour ce processus.
+
+        Returns:
+            La tâche réservée, ou None s'il n'y en a aucune
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            # BEGIN IMMEDIATE : deux processus ne peuvent pas réserver la même tâche
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT id FROM jobs WHERE status = ? OR (status = ? AND heartbeat_at < ?) ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now - self.stale_after)
+                ).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                        (RUNNING, self.owner, now, now, row["id"])
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return None if row is None else self.get(row["id"])
+
+    def pending(self, job_id: str, limit: int, start: int = 0) -> Chunk:
+        """Renvoie les `limit` premiers textes de la tâche, à partir de la position `start`, qui n'ont pas encore de résultat."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT position, text FROM job_items WHERE job_id = ? AND position >= ? AND result IS NULL ORDER BY position LIMIT ?",
+                (job_id, start, limit)
+            ).fetchall()
+        return [(row["position"], row["text"]) for row in rows]
+
+    def save_results(self, job_id: str, positions: List[int], results: List[Dict[str, Any]]) -> bool:
+        """
+        Enregistre les résultats d'un morceau et l'avancement de la tâche en une transaction.
+
+        Returns:
+            False si la tâche n'appartient plus à ce processus (supprimée ou reprise)
+        """
+        with self._lock:
+            connection = self._db()
+            with connection:
+                cursor = connection.execute(
+                    "UPDATE jobs SET processed = processed + ?, heartbeat_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                    (len(positions), time.time(), job_id, RUNNING, self.owner)
+                )
+                if cursor.rowcount == 0:
+                    return False
+                connection.executemany(
+                    "UPDATE job_items SET result = ? WHERE job_id = ? AND position = ?",
+                    [(json.dumps(result, ensure_ascii=False), job_id, position) for position, result in zip(positions, results)]
+                )
+        return True
+
+    def heartbeat(self, job_id: str):
+        """Signale que la tâche est toujours traitée (par exemple pendant une attente du modèle)."""
+        with self._lock:
+            connection = self._db()
+            with connection:
+                connection.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND owner = ?", (time.time(), job_id, self.owner))
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> bool:
+        """Termine une tâche de ce processus (`COMPLETED` ou `FAILED`) ; renvoie False si elle ne lui appartient plus."""
+        with self._lock:
+            connection = self._db()
+            with connection:
+                return connection.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ? AND status = ? AND owner = ?",
+                    (status, time.time(), error, job_id, RUNNING, self.owner)
+                ).rowcount > 0
+
+    def release(self, job_id: str):
+        """Remet en attente une tâche interrompue de ce processus : elle reprendra où elle s'était arrêtée."""
+        with self._lock:
+            connection = self._db()
+            with connection:
+                connection.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL WHERE id = ? AND status = ? AND owner = ?",
+                    (QUEUED, job_id, RUNNING, self.owner)
+                )
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Renvoie au plus `limit` résultats disponibles à partir de la position `offset`.
+
+        Les textes sont traités dans l'ordre : les résultats disponibles forment
+        toujours le début de la tâche.
+
+        Returns:
+            Résultats `{"id", "sentiment", "confidence", "raw_score", "run_id"}` dans l'ordre d'entrée
+        """
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT position, item_id, result FROM job_items "
+                "WHERE job_id = ? AND position >= ? AND result IS NOT NULL ORDER BY position LIMIT ?",
+                (job_id, max(0, offset), max(0, limit))
+            ).fetchall()
+        return [{"id": row["position"] if row["item_id"] is None else row["item_id"], **json.loads(row["result"])} for row in rows]
+
+    def iter_results(self, job_id: str, offset: int = 0, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Parcourt les résultats disponibles à partir de `offset`, par pages de `page_size`."""
+        while True:
+            page = self.results(job_id, offset, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def delete(self, job_id: str):
+        """
+        Supprime une tâche et ses résultats ; si elle est en cours, son traitement s'arrête au morceau suivant.
+
+        Raises:
+            JobNotFound: Si la tâche n'existe pas
+        """
+        with self._lock:
+            connection = self._db()
+            with connection:
+                if connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount == 0:
+                    raise JobNotFound(job_id)
+                connection.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+
+    def purge(self, older_than: float) -> int:
+        """Supprime les tâches terminées avant l'horodatage `older_than` ; renvoie leur nombre."""
+        with self._lock:
+            connection = self._db()
+            with connection:
+                ids = [row["id"] for row in connection.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (COMPLETED, FAILED, older_than)
+                )]
+                for job_id in ids:
+                    connection.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                    connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+    def discard_abandoned(self) -> int:
+        """
+        Supprime les tâches dont la création s'est interrompue (arrêt brutal pendant
+        l'enregistrement des textes) ; renvoie leur nombre.
+        """
+        with self._lock:
+            connection = self._db()
+            with connection:
+                ids = [row["id"] for row in connection.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND heartbeat_at < ?", (CREATING, time.time() - self.stale_after)
+                )]
+                for job_id in ids:
+                    connection.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                    connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+    def counts(self) -> Dict[str, int]:
+        """Renvoie le nombre de tâches par statut."""
+        with self._lock:
+            rows = self._db().execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (CREATING, QUEUED, RUNNING, COMPLETED, FAILED)} | {row["status"]: row["count"] for row in rows}
+
+
+class JobRunner:
+    """
+    Traite les tâches en arrière-plan, morceau par morceau.
+
+    Au plus `max_concurrent` tâches sont traitées à la fois par processus, chacune
+    avec un seul morceau en cours : les tâches n'occupent jamais plus de
+    `max_concurrent` threads du pool d'inférence, qui reste disponible pour les
+    requêtes interactives. Les morceaux sont soumis à `score`, qui prend une liste
+    de textes et le modèle demandé et renvoie les résultats ; une exception de
+    `score` fait échouer la tâche (les résultats déjà obtenus sont conservés).
+
+    Args:
+        store: Base des tâches
+        score: Coroutine `score(texts, run_id, heartbeat)` ; `heartbeat()` signale
+            une attente (modèle en cours de chargement, pool saturé)
+        max_concurrent: Nombre maximal de tâches traitées en parallèle
+        chunk_size: Nombre de textes par morceau
+        poll_interval: Délai (en secondes) entre deux recherches de tâches en attente
+            (les tâches créées par ce processus sont prises immédiatement)
+        retention: Durée (en secondes) de conservation des tâches terminées (None : sans limite)
+    """
+
+    def __init__(self, store: JobStore,
+                 score: Callable[[List[str], Optional[str], Callable[[], Awaitable[None]]], Awaitable[List[Dict[str, Any]]]],
+                 max_concurrent: int = 1, chunk_size: int = 256, poll_interval: float = 1.0,
+                 retention: Optional[float] = None):
+        self.store = store
+        self.score = score
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.chunk_size = max(1, int(chunk_size))
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: Dict[str, Dict[str, Any]] = {}
+
+        self._completed = 0
+        self._failed = 0
+        self._chunks = 0
+        self._texts = 0
+
+    async def start(self):
+        """Ouvre la base et démarre les tâches de fond."""
+        if self._workers:
+            return
+        await asyncio.to_thread(self.store.open)
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.max_concurrent)]
+
+    async def stop(self):
+        """Interrompt les tâches en cours, qui sont remises en attente et reprendront au prochain démarrage."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job_id in list(self._running):
+            await asyncio.to_thread(self.store.release, job_id)
+        self._running.clear()
+        await asyncio.to_thread(self.store.close)
+
+    def notify(self):
+        """Signale qu'une tâche vient d'être créée, pour qu'elle soit prise sans attendre."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self):
+        last_purge = 0.0
+        while True:
+            if time.monotonic() - last_purge > 60:
+                last_purge = time.monotonic()
+                await self._purge()
+            try:
+                job = await asyncio.to_thread(self.store.claim)
+            except sqlite3.Error as e:
+                logger.error(f"Erreur lors de la réservation d'une tâche: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _purge(self):
+        try:
+            if self.retention is not None:
+                purged = await asyncio.to_thread(self.store.purge, time.time() - self.retention)
+                if purged:
+                    logger.info(f"{purged} tâches terminées supprimées.")
+            abandoned = await asyncio.to_thread(self.store.discard_abandoned)
+            if abandoned:
+                logger.warning(f"{abandoned} tâches dont la création s'est interrompue supprimées.")
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la suppression des anciennes tâches: {str(e)}")
+
+    async def _run(self, job: Dict[str, Any]):
+        # Interrompue par l'arrêt de l'application, la tâche reste dans `_running` pour que `stop` la remette en attente
+        self._running[job["id"]] = job
+        try:
+            await self._process(job)
+        except Exception as e:
+            # Base indisponible : la tâche sera reprise quand elle sera considérée comme abandonnée
+            logger.error(f"Erreur lors du traitement de la tâche {job['id']}: {str(e)}")
+        self._running.pop(job["id"], None)
+
+    async def _process(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        logger.info(f"Tâche {job_id} : {job['total'] - job['processed']} textes à traiter sur {job['total']}.")
+
+        async def heartbeat():
+            await asyncio.to_thread(self.store.heartbeat, job_id)
+
+        start = 0
+        while True:
+            # Reprendre après le dernier morceau plutôt que de reparcourir les textes déjà traités
+            chunk = await asyncio.to_thread(self.store.pending, job_id, self.chunk_size, start)
+            if not chunk:
+                if await asyncio.to_thread(self.store.finish, job_id, COMPLETED):
+                    self._completed += 1
+                    logger.info(f"Tâche {job_id} terminée.")
+                return
+            positions = [position for position, _ in chunk]
+            start = positions[-1] + 1
+            try:
+                results = await self.score([text for _, text in chunk], job["run_id"], heartbeat)
+            except Exception as e:
+                logger.error(f"Échec de la tâche {job_id}: {str(e)}")
+                if await asyncio.to_thread(self.store.finish, job_id, FAILED, str(e) or type(e).__name__):
+                    self._failed += 1
+                return
+            if not await asyncio.to_thread(self.store.save_results, job_id, positions, results):
+                logger.info(f"Tâche {job_id} supprimée ou reprise par un autre processus : traitement arrêté.")
+                return
+            self._chunks += 1
+            self._texts += len(chunk)
+
+    def stats(self) -> Dict[str, Any]:
+        """Renvoie les tâches en cours dans ce processus et les compteurs de traitement."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "chunk_size": self.chunk_size,
+            "running": sorted(self._running),
+            "completed": self._completed,
+            "failed": self._failed,
+            "chunks": self._chunks,
+            "texts": self._texts,
+        }
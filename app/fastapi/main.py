@@ -1,70 +1,59 @@
 # Importation des bibliothèques nécessaires
+# TensorFlow, MLflow, NLTK et les exportateurs Azure sont importés à la demande :
+# l'application doit pouvoir écouter sur son port immédiatement au démarrage
+import time
+_import_started = time.perf_counter()
+
 import os
+import asyncio
+import gc
 import json
-import dill
-import pickle
-import tempfile
+import secrets
 import shutil
+import subprocess
+import sys
+import tempfile
 import uuid
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from pydantic.config import ConfigDict
 from dotenv import load_dotenv
-import mlflow
-import tensorflow as tf
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 import numpy as np
 import logging
 from pathlib import Path
-import requests
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
-# Importation de NLTK pour le traitement du langage naturel
-import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-
-# Téléchargez les ressources NLTK nécessaires
-# nltk.download('punkt')
-# nltk.download('stopwords')
-# nltk.download('wordnet')
-
-
-def ensure_nltk_resources():
-    import nltk
-    from nltk.data import find
-    resources = {
-        'punkt': 'tokenizers/punkt',
-        'stopwords': 'corpora/stopwords',
-        'wordnet': 'corpora/wordnet'
-    }
+from batching import MicroBatcher
+from executor import InferenceExecutor, InferenceOverloaded
+from cache import HTTPCacheBackend, PredictionCache
+from coalescing import InFlightPredictions
+from streaming import JSON_LINES_CONTENT_TYPES, DuplexStreamingResponse, StreamLine, format_result, iter_lines, parse_line
+from artifacts import ArtifactStore
+from startup import DOWNLOADING, FAILED, LOADING, READY, WARMING, StartupState
+from registry import ModelRegistry, UnknownModel
+from shadow import TrafficRouter
+from telemetry import AppInsightsSink, TelemetryQueue, queued_log_handler
+from feedback_store import EXPORT_FORMATS, FeedbackStore, iter_export, parse_time
+from jobs import JobNotFound, JobRunner, JobStore, JobTooLarge
+from profiling import (ProfilerBusy, SamplingProfiler, SlowRequestLog, SlowRequestMiddleware, current_timings,
+                       mark_handler_done, record_input, record_stage)
+from score import detect_format, read_chunks
+from metrics import CONTENT_TYPE, LOAD_BUCKETS, SIZE_BUCKETS, MetricsMiddleware, MetricsRegistry, StageTimer, histogram_samples
 
-    for key, path in resources.items():
-        try:
-            find(path)
-        except LookupError:
-            nltk.download(key)
+import re
 
+from vocabulary import VOCABULARY_FILE
+from runtime import KERAS_MODEL_FILE
+from quantization import VARIANTS_DIR, find_variant, parse_variant
+import inference
+from inference import MAX_SEQUENCE_LENGTH
 
 
-# Forcer TensorFlow à utiliser uniquement le CPU
+# Forcer TensorFlow à utiliser uniquement le CPU (appliqué dès son import)
 os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
-tf.config.set_visible_devices([], 'GPU')
-physical_devices = tf.config.list_physical_devices('GPU')
-if physical_devices:
-    try:
-        # Désactiver l'allocation de mémoire GPU
-        for device in physical_devices:
-            tf.config.experimental.set_memory_growth(device, False)
-        # Masquer complètement les GPUs
-        tf.config.set_visible_devices([], 'GPU')
-        logger.info("GPU désactivé avec succès pour TensorFlow.")
-    except Exception as e:
-        logger.warning(f"Erreur lors de la désactivation du GPU: {str(e)}")
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -77,16 +66,151 @@ load_dotenv()
 mlflow_tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
 run_id = os.getenv("RUN_ID")
 
-# Paramètres par défaut si non spécifiés dans le modèle
-MAX_SEQUENCE_LENGTH = 100
+# Moteur d'exécution du modèle : compiled, keras, savedmodel ou tflite (voir runtime.py)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "compiled")
+TFLITE_THREADS = int(os.getenv("TFLITE_THREADS", "1"))
+
+# Variante compressée du modèle servie à la place du modèle float32 (voir quantization.py) :
+# int8, float16 ou <type>-top<N> avec vocabulaire élagué ; vide pour le modèle d'origine
+MODEL_VARIANT = os.getenv("MODEL_VARIANT", "").strip() or None
+
+# Threads de calcul de TensorFlow par processus (0 : tous les cœurs) ; en mode multi-processus,
+# serve.py le fixe à (nombre de cœurs / nombre de processus) s'il n'est pas défini
+TF_INTRA_OP_THREADS = int(os.getenv("TF_INTRA_OP_THREADS", "0"))
+
+# Troncature dynamique des séquences (moteur compiled) : longueurs pré-compilées, séparées
+# par des virgules (vide pour la désactiver), et écart maximal toléré sur le score brut
+# par le contrôle de parité effectué au préchauffage
+SEQUENCE_LENGTH_BUCKETS = [int(length) for length in os.getenv("SEQUENCE_LENGTH_BUCKETS", "").split(",") if length.strip()]
+TRUNCATION_TOLERANCE = float(os.getenv("TRUNCATION_TOLERANCE", "1e-3"))
+
+# Paramètres du micro-batching des requêtes /predict et /predict-batch
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+
+# Paramètres du pool d'inférence (hors de la boucle d'événements)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_DEPTH = int(os.getenv("INFERENCE_QUEUE_DEPTH", "64"))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "1"))
+
+# Paramètres du cache des prédictions (0 Mo pour le désactiver)
+PREDICTION_CACHE_MAX_MB = float(os.getenv("PREDICTION_CACHE_MAX_MB", "32"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_URL = os.getenv("PREDICTION_CACHE_URL")
+
+# Nombre de lignes traitées ensemble par l'endpoint /predict-stream
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "256"))
+
+# Nombre maximal de modèles chargés simultanément (modèle par défaut compris)
+MAX_LOADED_MODELS = int(os.getenv("MAX_LOADED_MODELS", "2"))
+
+# Modèle candidat chargé au démarrage à côté du modèle par défaut, fraction des requêtes
+# rejouées en miroir sur lui (sans effet sur les réponses) et fraction servie par lui (canari)
+CANDIDATE_RUN_ID = os.getenv("CANDIDATE_RUN_ID")
+SHADOW_FRACTION = float(os.getenv("SHADOW_FRACTION", "0"))
+CANARY_FRACTION = float(os.getenv("CANARY_FRACTION", "0"))
+SHADOW_MAX_IN_FLIGHT = int(os.getenv("SHADOW_MAX_IN_FLIGHT", "2"))
+
+# File de télémétrie : taille maximale (au-delà, les éléments sont abandonnés), taille des lots
+# et délai maximal (en secondes) avant l'envoi d'un lot incomplet
+TELEMETRY_QUEUE_SIZE = int(os.getenv("TELEMETRY_QUEUE_SIZE", "1000"))
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "50"))
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "5"))
+
+# Base SQLite où le feedback est conservé pour le réentraînement (vide : désactivée), taille de la
+# file d'écriture (au-delà, /feedback répond 503) et nombre maximal de feedbacks écrits par transaction
+FEEDBACK_DB_PATH = os.getenv("FEEDBACK_DB_PATH", str(Path(__file__).resolve().parent / "data" / "feedback.db"))
+FEEDBACK_QUEUE_SIZE = int(os.getenv("FEEDBACK_QUEUE_SIZE", "10000"))
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "500"))
+
+# Tâches asynchrones de /jobs : base SQLite des textes et des résultats (vide : désactivées), tâches
+# traitées en parallèle par processus, textes par morceau (une transaction), textes par sous-lot
+# d'inférence (ce qu'une requête interactive peut avoir à attendre), nombre maximal de textes par
+# tâche et durée de conservation (en secondes) des tâches terminées (0 : sans limite)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", str(Path(__file__).resolve().parent / "data" / "jobs.db"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "1"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "256"))
+JOB_SUB_BATCH_SIZE = int(os.getenv("JOB_SUB_BATCH_SIZE", "32"))
+JOB_MAX_TEXTS = int(os.getenv("JOB_MAX_TEXTS", "1000000"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+
+# Nombre de requêtes de prédiction les plus lentes conservées avec leur détail par étape pour
+# /admin/slow-requests (0 : désactivé) et durée maximale (en secondes) d'un profilage /admin/profile
+SLOW_REQUESTS_KEPT = int(os.getenv("SLOW_REQUESTS_KEPT", "20"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
 
-# Répertoire local pour sauvegarder les artefacts du modèle
+# Jeton requis (en-tête X-Admin-Token) par les endpoints /admin ; s'il n'est pas défini, ils sont désactivés
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Répertoire local pour sauvegarder les artefacts du modèle (MODEL_DIR : autre emplacement, par
+# exemple les artefacts synthétiques des benchmarks)
 BASE_DIR = Path(__file__).resolve().parent
-MODEL_DIR = BASE_DIR / "model"
-MODEL_DIR.mkdir(exist_ok=True)
+MODEL_DIR = Path(os.getenv("MODEL_DIR", BASE_DIR / "model"))
+MODEL_DIR.mkdir(parents=True, exist_ok=True)
+
+# Recalculer au démarrage la somme de contrôle de chaque artefact déjà présent (réparation d'un magasin
+# suspect) ; par défaut, la taille, la date de modification et l'inode du manifeste suffisent
+VERIFY_ARTIFACTS = os.getenv("VERIFY_ARTIFACTS", "0") == "1"
+
+# Identifiant du modèle chargé sans RUN_ID (artefacts copiés à la main dans model/)
+LOCAL_MODEL_ID = "local"
+
+
+def release_model_pack(pack: Dict[str, Any]):
+    """Libère le moteur d'exécution d'un modèle retiré du registre, une fois sa dernière requête terminée."""
+    pack.pop("runtime", None)
+    gc.collect()
+
+
+# Registre des modèles chargés ; le modèle par défaut est celui de RUN_ID, puis celui publié par /admin/models
+registry = ModelRegistry(max_models=MAX_LOADED_MODELS, release=release_model_pack)
+
+# État du démarrage (téléchargement, chargement et préchauffage en arrière-plan)
+startup = StartupState()
+model_loader = None
+
+# Chargements lancés par /admin/models : état par identifiant d'exécution, et tâches en cours
+model_loads: Dict[str, StartupState] = {}
+model_load_tasks = set()
+
+# Routage d'une partie du trafic vers le modèle candidat (miroir et canari)
+router = TrafficRouter(CANDIDATE_RUN_ID, SHADOW_FRACTION, CANARY_FRACTION, max_shadow_in_flight=SHADOW_MAX_IN_FLIGHT)
+
+# Base de feedback, écrite par un thread de fond (None si elle est désactivée)
+feedback_store = None
+if FEEDBACK_DB_PATH:
+    feedback_store = FeedbackStore(FEEDBACK_DB_PATH, max_queue=FEEDBACK_QUEUE_SIZE, batch_size=FEEDBACK_BATCH_SIZE)
 
-# Variable globale pour stocker le modèle chargé
-model_pack = None
+# Base des tâches asynchrones (None si elles sont désactivées), traitée par `job_runner` en arrière-plan
+job_store = None
+if JOBS_DB_PATH:
+    job_store = JobStore(JOBS_DB_PATH, max_texts=JOB_MAX_TEXTS)
+job_runner = None
+
+# Tweets d'exemple utilisés pour préchauffer le modèle avant de le déclarer prêt,
+# et textes de repli si le fichier n'est pas déployé
+WARMUP_TWEETS_PATH = Path(os.getenv("WARMUP_TWEETS_PATH", Path(__file__).resolve().parent / "tweets.json"))
+WARMUP_TEXTS = ["I love flying with this airline!", "My flight was delayed for hours, terrible service."]
+
+# Micro-batcher et pool d'inférence partagés par les endpoints de prédiction
+batcher = None
+inference_executor = None
+
+# Prédictions en cours de calcul, mises en commun entre les requêtes simultanées
+prediction_coalescer = InFlightPredictions()
+
+# Requêtes de prédiction les plus lentes (None si le journal est désactivé) et profileur à la demande
+slow_requests = SlowRequestLog(SLOW_REQUESTS_KEPT) if SLOW_REQUESTS_KEPT > 0 else None
+profiler = SamplingProfiler()
+
+# Cache des prédictions (None s'il est désactivé)
+prediction_cache = None
+if PREDICTION_CACHE_MAX_MB > 0:
+    prediction_cache = PredictionCache(
+        max_bytes=int(PREDICTION_CACHE_MAX_MB * 1024 * 1024),
+        ttl=PREDICTION_CACHE_TTL,
+        backend=HTTPCacheBackend(PREDICTION_CACHE_URL) if PREDICTION_CACHE_URL else None
+    )
 
 
 # Configuration du logging (avant Application Insights)
@@ -94,58 +218,403 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger(__name__)
 
 # Configuration d'Azure Application Insights
-from opencensus.ext.azure.log_exporter import AzureLogHandler
-from applicationinsights import TelemetryClient
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Récupérer la clé d'instrumentation depuis les variables d'environnement
 appinsights_key = os.getenv("APPINSIGHTS_INSTRUMENTATION_KEY")
 telemetry_client = None
+# Les logs envoyés à Application Insights passent par une file bornée, vidée par cet écouteur
+log_listener = None
 
 if appinsights_key:
+    from opencensus.ext.azure.log_exporter import AzureLogHandler
+    from applicationinsights import TelemetryClient
+    
     # Configurer le client Application Insights
     telemetry_client = TelemetryClient(appinsights_key)
     logger.info("Azure Application Insights configuré avec succès.")
     
     try:
-        # Ajouter un gestionnaire Azure Log Handler
-        logger.addHandler(AzureLogHandler(
-            connection_string=f'InstrumentationKey={appinsights_key}'
-        ))
+        # Ajouter un gestionnaire Azure Log Handler, derrière une file pour ne pas ralentir les requêtes
+        log_handler, log_listener = queued_log_handler(
+            AzureLogHandler(connection_string=f'InstrumentationKey={appinsights_key}'),
+            max_queue=TELEMETRY_QUEUE_SIZE
+        )
+        logger.addHandler(log_handler)
         logger.info("Azure Application Insights configuré avec succès.")
     except Exception as e:
         logger.warning(f"Erreur lors de la configuration d'Azure Log Handler: {str(e)}")
 else:
     logger.warning("Clé d'instrumentation Application Insights non trouvée. La télémétrie ne sera pas envoyée.")
 
+# Événements et métriques envoyés par lots en arrière-plan (désactivé sans Application Insights)
+telemetry = TelemetryQueue(
+    AppInsightsSink(telemetry_client) if telemetry_client else None,
+    max_queue=TELEMETRY_QUEUE_SIZE,
+    batch_size=TELEMETRY_BATCH_SIZE,
+    flush_interval=TELEMETRY_FLUSH_INTERVAL
+)
+
+
+
+# Métriques exposées par /metrics au format Prometheus : les requêtes ne font qu'incrémenter des
+# compteurs en mémoire, les statistiques des autres composants sont lues au moment de la collecte
+metrics = MetricsRegistry()
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "sentiment_http_request_duration_seconds", "Durée des requêtes HTTP, corps de la réponse compris",
+    ("method", "route", "status")
+)
+REQUEST_TEXTS = metrics.histogram(
+    "sentiment_request_texts", "Nombre de textes par requête de prédiction", ("endpoint",), buckets=SIZE_BUCKETS
+)
+PREDICT_STAGE_SECONDS = metrics.histogram(
+    "sentiment_predict_stage_seconds", "Durée de chaque étape de la prédiction d'un lot", ("stage",)
+)
+PREDICT_BATCH_TEXTS = metrics.histogram(
+    "sentiment_predict_batch_texts", "Nombre de textes par lot prédit", buckets=SIZE_BUCKETS
+)
+INFERENCE_QUEUE_WAIT_SECONDS = metrics.histogram(
+    "sentiment_inference_queue_wait_seconds", "Attente d'un thread libre du pool d'inférence"
+)
+INFERENCE_EXECUTION_SECONDS = metrics.histogram(
+    "sentiment_inference_execution_seconds", "Durée d'exécution d'une tâche du pool d'inférence"
+)
+MODEL_LOAD_PHASE_SECONDS = metrics.histogram(
+    "sentiment_model_load_phase_seconds", "Durée des phases de chargement d'un modèle", ("phase",), buckets=LOAD_BUCKETS
+)
+MODEL_LOAD_FAILURES = metrics.counter("sentiment_model_load_failures", "Chargements de modèle en échec")
+
+
+def observe_inference(queue_wait: float, execution: float):
+    """Alimente les histogrammes d'attente et d'exécution du pool d'inférence (et le détail des requêtes lentes)."""
+    INFERENCE_QUEUE_WAIT_SECONDS.observe(queue_wait)
+    INFERENCE_EXECUTION_SECONDS.observe(execution)
+    record_stage("queue_wait", queue_wait)
+
+
+def collect_batch_sizes():
+    """Histogramme des tailles des lots du micro-batcher, lu dans ses statistiques."""
+    if batcher is None:
+        return
+    stats = batcher.stats()
+    histogram = {int(bucket[2:]): count for bucket, count in stats["batch_size_histogram"].items()}
+    yield from histogram_samples({}, list(histogram), list(histogram.values()) + [0], stats["texts"])
+
+
+def collect_cache_lookups():
+    """Recherches dans le cache des prédictions, par résultat."""
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        yield "_total", {"result": "hit"}, stats["hits"]
+        yield "_total", {"result": "miss"}, stats["misses"]
+
+
+def collect_saved_predictions():
+    """Textes qui n'ont pas atteint le modèle : doublons d'un lot, ou empruntés à une prédiction simultanée."""
+    stats = prediction_coalescer.stats()
+    yield "_total", {"reason": "batch_duplicate"}, stats["batch_duplicates"]
+    yield "_total", {"reason": "in_flight"}, stats["coalesced"]
+
+
+def collect_cache_usage():
+    """Entrées et mémoire utilisée par le cache des prédictions."""
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        yield "", {"resource": "entries"}, stats["entries"]
+        yield "", {"resource": "bytes"}, stats["bytes"]
+
+
+def collect_inference_rejections():
+    """Requêtes rejetées (503) faute de place dans la file du pool d'inférence."""
+    if inference_executor is not None:
+        yield "_total", {}, inference_executor.stats()["rejected"]
+
+
+def collect_queue_depths():
+    """Profondeur des files : micro-batcher, pool d'inférence, télémétrie et base de feedback."""
+    if batcher is not None:
+        yield "", {"queue": "batcher"}, batcher.stats()["queue_depth"]
+    if inference_executor is not None:
+        yield "", {"queue": "inference"}, inference_executor.in_flight
+    yield "", {"queue": "telemetry"}, telemetry.stats()["queue_depth"]
+    if feedback_store is not None:
+        yield "", {"queue": "feedback"}, feedback_store.stats()["queue_depth"]
+
+
+def collect_loaded_models():
+    """Nombre de modèles chargés dans le registre."""
+    yield "", {}, len(registry)
+
+
+metrics.collected("sentiment_batch_size", "Nombre de textes par lot du micro-batcher", "histogram", collect_batch_sizes)
+metrics.collected("sentiment_prediction_cache_lookups", "Recherches dans le cache des prédictions", "counter", collect_cache_lookups)
+metrics.collected("sentiment_predictions_coalesced", "Textes prédits par une autre requête ou un doublon du lot", "counter", collect_saved_predictions)
+metrics.collected("sentiment_prediction_cache_usage", "Occupation du cache des prédictions", "gauge", collect_cache_usage)
+metrics.collected("sentiment_inference_rejected", "Requêtes rejetées par le pool d'inférence", "counter", collect_inference_rejections)
+metrics.collected("sentiment_queue_depth", "Éléments en attente dans les files internes", "gauge", collect_queue_depths)
+metrics.collected("sentiment_models_loaded", "Modèles chargés", "gauge", collect_loaded_models)
+
+
+# Durée des imports et de la configuration du module
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+
+def configure_tensorflow():
+    """Importe TensorFlow au premier appel et masque les GPUs (exécution sur CPU uniquement)."""
+    return inference.configure_tensorflow(TF_INTRA_OP_THREADS)
+
+
+async def load_and_publish(model_run_id: Optional[str], state: StartupState, make_default: bool = True):
+    """
+    Télécharge les artefacts, charge le modèle puis le préchauffe, hors de la boucle
+    d'événements. Le modèle n'est publié dans le registre qu'une fois préchauffé.
+    
+    Args:
+        model_run_id: ID de l'exécution MLflow (None : artefacts locaux de model/)
+        state: État suivi pendant le chargement (phases et durées)
+        make_default: Publier le modèle comme modèle par défaut
+    """
+    try:
+        with state.phase(DOWNLOADING):
+            artifacts_dir = await asyncio.to_thread(download_artifacts_from_mlflow, model_run_id, MODEL_DIR)
+        if artifacts_dir is None:
+            raise RuntimeError("Impossible de télécharger les artefacts du modèle depuis MLflow.")
+        
+        with state.phase(LOADING):
+            pack = await asyncio.to_thread(load_model, model_run_id, artifacts_dir)
+        
+        with state.phase(WARMING):
+            await asyncio.to_thread(warmup_model, pack)
+    except Exception:
+        MODEL_LOAD_FAILURES.inc()
+        raise
+    finally:
+        for phase in (DOWNLOADING, LOADING, WARMING):
+            if phase in state.durations:
+                MODEL_LOAD_PHASE_SECONDS.observe(state.durations[phase], phase)
+    
+    registry.publish(model_run_id or LOCAL_MODEL_ID, pack, make_default=make_default)
+    state.mark_ready()
+
+
+async def load_model_in_background():
+    """Charge le modèle de RUN_ID au démarrage et le publie comme modèle par défaut."""
+    try:
+        await load_and_publish(run_id, startup)
+        logger.info("Modèle chargé avec succès et prêt pour les prédictions.")
+        
+        if CANDIDATE_RUN_ID and CANDIDATE_RUN_ID != run_id:
+            # Charger ensuite le candidat, sans retarder la disponibilité du modèle par défaut
+            start_model_load(CANDIDATE_RUN_ID, make_default=False)
+        
+        # Suivre la durée du démarrage à froid comme métrique
+        for name, seconds in startup.durations.items():
+            telemetry.track_metric(f"startup_{name}_seconds", seconds)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        startup.fail(str(e))
+
+
+async def load_model_for_admin(model_run_id: str, state: StartupState, make_default: bool):
+    """Charge un modèle demandé par /admin/models ; un échec laisse le modèle par défaut en place."""
+    try:
+        await load_and_publish(model_run_id, state, make_default=make_default)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        state.fail(str(e))
+
+
+def start_model_load(model_run_id: str, make_default: bool) -> StartupState:
+    """Lance le chargement d'un modèle en tâche de fond et renvoie l'état suivi dans /models."""
+    state = StartupState()
+    model_loads[model_run_id] = state
+    task = asyncio.create_task(load_model_for_admin(model_run_id, state, make_default))
+    model_load_tasks.add(task)
+    task.add_done_callback(model_load_tasks.discard)
+    return state
+
+
+async def run_inference(texts: List[str], model_id: Optional[str] = None, background: bool = False) -> List[Dict[str, Any]]:
+    """
+    Prédit le sentiment de `texts` dans le pool d'inférence.
+    
+    Le modèle est emprunté au registre pendant toute la prédiction : une bascule
+    du modèle par défaut n'interrompt pas les requêtes en cours, et un modèle retiré
+    n'est libéré qu'après elles.
+    
+    Args:
+        texts: Liste de textes à analyser
+        model_id: Identifiant du modèle (None : modèle par défaut)
+        background: Soumettre en basse priorité, après le trafic interactif (tâches asynchrones)
+    
+    Returns:
+        Résultats de `predict_sentiment_batch`, avec l'identifiant du modèle utilisé
+    """
+    run = inference_executor.run_background if background else inference_executor.run
+    with registry.acquire(model_id) as pack:
+        results = await run(predict_sentiment_batch, texts, pack, prediction_cache, prediction_coalescer)
+        served_by = pack.get("run_id") or LOCAL_MODEL_ID
+    return [{**result, "run_id": served_by} for result in results]
+
+
+async def run_shadow_inference(texts: List[str], model_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Rejoue une requête sur le candidat en basse priorité : le miroir ne prend jamais un thread au trafic réel."""
+    return await run_inference(texts, model_id, background=True)
+
+
+async def predict_texts(texts: List[str], model_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Sert une requête de prédiction : modèle choisi explicitement, candidat (canari)
+    ou modèle par défaut, ce dernier éventuellement rejoué en miroir sur le candidat.
+    
+    Les petits lots du modèle par défaut passent par le micro-batcher, les autres
+    sont traités directement.
+    
+    Args:
+        texts: Liste de textes à analyser
+        model_id: Identifiant du modèle choisi par la requête, ou None
+    """
+    if model_id is not None and model_id != registry.default:
+        return await run_inference(texts, model_id)
+    
+    if model_id is None:
+        candidate = router.choose()
+        if candidate is not None:
+            started = time.perf_counter()
+            try:
+                results = await run_inference(texts, candidate)
+            except UnknownModel:
+                # Candidat pas (ou plus) chargé : servir la requête avec le modèle par défaut
+                router.record_canary_fallback()
+            else:
+                router.record_canary(time.perf_counter() - started)
+                return results
+    
+    started = time.perf_counter()
+    if len(texts) <= BATCH_MAX_SIZE:
+        results = await batcher.submit(texts)
+    else:
+        results = await run_inference(texts)
+    router.record_primary(time.perf_counter() - started)
+    if model_id is None:
+        # Le miroir s'exécute après la réponse : ses durées ne sont pas celles de la requête
+        token = current_timings.set(())
+        try:
+            router.mirror(texts, results, run_shadow_inference)
+        finally:
+            current_timings.reset(token)
+    return results
+
+
+def load_warmup_texts(path: Path = WARMUP_TWEETS_PATH) -> List[str]:
+    """Charge les tweets d'exemple (format de /predict-batch : {"texts": [...]}), ou les textes de repli."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            texts = [text for text in json.load(f)["texts"] if isinstance(text, str)]
+        if texts:
+            return texts
+    except Exception as e:
+        logger.warning(f"Tweets de préchauffage indisponibles ({path}): {str(e)}")
+    return WARMUP_TEXTS
+
+
+def warmup_model(pack: Dict[str, Any]):
+    """
+    Exécute une prédiction pour chaque taille de lot pré-compilée du moteur,
+    avec de vrais tweets : graphes TensorFlow, cache des lemmes et encodeur
+    sont prêts avant la première requête. Si la troncature dynamique est
+    configurée, son contrôle de parité est effectué d'abord.
+    """
+    texts = load_warmup_texts()
+    runtime = pack["runtime"]
+    max_length = pack["params"].get("max_sequence_length", MAX_SEQUENCE_LENGTH)
+    tokens = pack["encoder"].encode(pack["preprocess"].preprocess_batch(texts), max_length)
+    if hasattr(runtime, "calibrate"):
+        # Contrôle de parité de la troncature dynamique sur les tweets d'exemple
+        runtime.calibrate(tokens, TRUNCATION_TOLERANCE)
+    
+    started = time.perf_counter()
+    predict_sentiment_batch(texts, pack)
+    logger.info(f"Préchauffage - {len(texts)} tweets : {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    # Les doublons d'un lot n'atteignent pas le modèle : les tailles de lot pré-compilées
+    # sont préchauffées directement sur le moteur, avec les séquences des tweets répétées
+    for batch_size in getattr(runtime, "batch_sizes", []):
+        started = time.perf_counter()
+        runtime.predict(np.resize(tokens, (batch_size, tokens.shape[1])))
+        logger.info(f"Préchauffage - lot de {batch_size} : {(time.perf_counter() - started) * 1000:.1f} ms")
 
 
 # Définition du gestionnaire de contexte pour le cycle de vie de l'application
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Code exécuté au démarrage
-    global model_pack
+    global batcher, inference_executor, model_loader, job_runner
     
-    # Télécharger les artefacts si nécessaire
-    success = download_artifacts_from_mlflow(run_id, MODEL_DIR)
-    if not success:
-        logger.error("Impossible de télécharger les artefacts du modèle. L'application ne pourra pas fonctionner correctement.")
-    else:
-        # Charger le modèle
-        try:
-            model_pack = load_model()
-            logger.info("Modèle chargé avec succès et prêt pour les prédictions.")
-        except Exception as e:
-            logger.error(f"Erreur lors du chargement du modèle: {str(e)}")
+    startup.reset()
+    startup.record("imports", IMPORT_SECONDS)
+    
+    # Démarrer l'envoi de la télémétrie et des logs en arrière-plan
+    telemetry.start()
+    if log_listener is not None:
+        log_listener.start()
+    
+    # Ouvrir la base de feedback et démarrer son thread d'écriture
+    if feedback_store is not None:
+        feedback_store.start()
+    
+    # Démarrer le pool d'inférence et le micro-batcher (le modèle est lu au moment de chaque lot)
+    inference_executor = InferenceExecutor(
+        max_workers=INFERENCE_WORKERS,
+        max_queue=INFERENCE_QUEUE_DEPTH,
+        retry_after=INFERENCE_RETRY_AFTER,
+        observe=observe_inference
+    )
+    
+    # Le micro-batcher sert le modèle par défaut, lu au moment de chaque lot ; chaque requête du lot
+    # reçoit les durées par étape du lot dans le journal des requêtes lentes
+    batcher = MicroBatcher(run_inference, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_WINDOW_MS,
+                           context=current_timings)
+    await batcher.start()
+    
+    # Traiter les tâches asynchrones en arrière-plan (celles interrompues reprennent où elles s'étaient arrêtées)
+    if job_store is not None:
+        job_runner = JobRunner(job_store, score_job_chunk, max_concurrent=JOB_CONCURRENCY,
+                               chunk_size=JOB_CHUNK_SIZE, retention=JOB_RETENTION or None)
+        await job_runner.start()
+    
+    # Télécharger et charger le modèle en arrière-plan : l'application écoute sur son port immédiatement
+    model_loader = asyncio.create_task(load_model_in_background())
     
     yield  # L'application s'exécute ici
     
     # Code exécuté à l'arrêt
-    # Libérer les ressources si nécessaire
-    if model_pack is not None and "model" in model_pack:
-        logger.info("Libération des ressources du modèle...")
-        del model_pack["model"]
-        model_pack = None
+    if not model_loader.done():
+        model_loader.cancel()
+    for task in list(model_load_tasks):
+        task.cancel()
+    await router.stop()
+    if job_runner is not None:
+        await job_runner.stop()
+        job_runner = None
+    await batcher.stop()
+    # Attendre la fin des calculs en cours hors de la boucle d'événements
+    await asyncio.to_thread(inference_executor.shutdown)
+    
+    # Libérer les ressources des modèles chargés
+    logger.info("Libération des ressources des modèles...")
+    registry.clear()
+    
+    # Écrire le feedback encore en attente
+    if feedback_store is not None:
+        await asyncio.to_thread(feedback_store.stop)
+    
+    # Envoyer la télémétrie et les logs encore en attente
+    await asyncio.to_thread(telemetry.stop)
+    if log_listener is not None:
+        await asyncio.to_thread(log_listener.stop)
 
 # Initialisation de l'application FastAPI
 app = FastAPI(
@@ -164,22 +633,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Durée de chaque requête HTTP, par route
+app.add_middleware(MetricsMiddleware, histogram=HTTP_REQUEST_SECONDS)
+
+# Détail par étape des requêtes de prédiction, pour garder les plus lentes
+if slow_requests is not None:
+    app.add_middleware(SlowRequestMiddleware, log=slow_requests)
+
 
 # Modèle de données pour les requêtes
+# (run_id : modèle à utiliser parmi ceux chargés, par défaut le modèle par défaut)
 class TweetRequest(BaseModel):
     text: str
+    run_id: Optional[str] = None
     model_config = ConfigDict(extra="forbid")
 
 # Modèle de données pour une requête de lot
 class BatchTweetRequest(BaseModel):
     texts: List[str]
+    run_id: Optional[str] = None
     model_config = ConfigDict(extra="forbid")
 
-# Modèle de données pour une prédiction individuelle
+# Modèle de données pour une prédiction individuelle (run_id : modèle qui l'a produite)
 class SentimentResponse(BaseModel):
     sentiment: str
     confidence: float
     raw_score: float
+    run_id: Optional[str] = None
     model_config = ConfigDict(extra="forbid")
 
 # Modèle de données pour la réponse par lot
@@ -187,6 +667,19 @@ class BatchSentimentResponse(BaseModel):
     results: List[SentimentResponse]
     model_config = ConfigDict(extra="forbid")
 
+# Modèle de données pour le chargement d'un modèle par /admin/models
+class ModelLoadRequest(BaseModel):
+    run_id: str
+    make_default: bool = True
+    model_config = ConfigDict(extra="forbid")
+
+# Modèle de données pour la configuration du routage vers un candidat (/admin/rollout)
+class RolloutRequest(BaseModel):
+    candidate: Optional[str] = None
+    shadow_fraction: float = 0.0
+    canary_fraction: float = 0.0
+    model_config = ConfigDict(extra="forbid")
+
 # Modèle de données pour le feedback utilisateur
 class FeedbackRequest(BaseModel):
     tweet_text: str
@@ -195,90 +688,109 @@ class FeedbackRequest(BaseModel):
     is_correct: bool
     corrected_sentiment: str = ""
     comments: str = ""
+    run_id: Optional[str] = None
     model_config = ConfigDict(extra="forbid")
 
 
+# Artefacts du modèle, enregistrés dans le dossier local_artifacts de l'exécution MLflow
+MODEL_ARTIFACTS = [
+    "parameters.json",
+    "preprocess_function.dill",
+    KERAS_MODEL_FILE
+]
+
+# Vocabulaire du modèle, par ordre de préférence : le vocabulaire compact publié avec l'exécution
+# (`python vocabulary.py ... --log-to-run`), sinon le tokenizer picklé, converti au premier chargement
+VOCABULARY_ARTIFACTS = [VOCABULARY_FILE, "tokenizer.pickle"]
+
+
+def download_with_mlflow(artifact_uri: str, dst_path: str) -> str:
+    """Télécharge un artefact via MLflow (schémas s3://, mlflow-artifacts:/, etc.)."""
+    import mlflow
+    return mlflow.artifacts.download_artifacts(artifact_uri=artifact_uri, dst_path=dst_path)
+
+
 # Fonction pour télécharger les artefacts depuis MLflow
 # et les sauvegarder localement
-def download_artifacts_from_mlflow(run_id: str, model_dir: Path) -> bool:
+def download_artifacts_from_mlflow(run_id: str, model_dir: Path) -> Optional[Path]:
     """
-    Télécharge les artefacts nécessaires depuis MLFlow s'ils n'existent pas déjà.
+    Télécharge les artefacts nécessaires depuis MLFlow s'ils ne sont pas déjà présents et intacts.
+    
+    Les artefacts sont conservés dans un magasin local adressé par contenu
+    (voir `artifacts.py`) : chaque exécution a son propre répertoire
+    `runs/<run_id>/`, et les fichiers sont téléchargés en parallèle puis vérifiés.
     
     Args:
         run_id: ID de l'exécution MLFlow
-        model_dir: Répertoire où sauvegarder les artefacts
+        model_dir: Répertoire racine du magasin d'artefacts
     
     Returns:
-        bool: True si le téléchargement a réussi, False sinon
+        Répertoire contenant les artefacts de l'exécution, ou None en cas d'échec
     """
     try:
+        if not run_id:
+            # Sans RUN_ID, seuls des artefacts copiés à la main dans model_dir peuvent être utilisés
+            if (all((model_dir / name).exists() for name in MODEL_ARTIFACTS)
+                    and any((model_dir / name).exists() for name in VOCABULARY_ARTIFACTS)):
+                logger.info("RUN_ID non défini : utilisation des artefacts présents dans le répertoire du modèle.")
+                return model_dir
+            raise ValueError("La variable d'environnement RUN_ID n'est pas définie.")
+        
+        store = ArtifactStore(model_dir, fallback=download_with_mlflow)
+        for name in VOCABULARY_ARTIFACTS:
+            if store.is_complete(run_id, MODEL_ARTIFACTS + [name], verify=VERIFY_ARTIFACTS):
+                logger.info("Tous les artefacts existent déjà localement et sont intacts. Pas besoin de télécharger.")
+                return store.run_dir(run_id)
+        
+        import mlflow
+        
         logger.info(f"Configuration de MLflow avec l'URI: {mlflow_tracking_uri}")
         mlflow.set_tracking_uri(mlflow_tracking_uri)
+        client = mlflow.tracking.MlflowClient()
+        artifact_uri = client.get_run(run_id).info.artifact_uri
         
-        # Vérifier si tous les artefacts nécessaires existent déjà
-        artifacts_to_check = [
-            "local_artifacts/parameters.json",
-            "local_artifacts/preprocess_function.dill",
-            "local_artifacts/tokenizer.pickle",
-            "local_artifacts/final_model_LSTM_Word2Vec-Fige.keras"
-        ]
-        
-        all_exist = True
-        for artifact in artifacts_to_check:
-            artifact_path = model_dir / Path(artifact).name
-            if not artifact_path.exists():
-                all_exist = False
-                break
-                
-        if all_exist:
-            logger.info("Tous les artefacts existent déjà localement. Pas besoin de télécharger.")
-            return True
-            
-        # Si certains artefacts n'existent pas, télécharger tous les artefacts
-        logger.info(f"Téléchargement des artefacts depuis MLflow pour l'exécution {run_id}")
+        # Artefacts publiés et tailles annoncées par MLflow, pour rejeter les téléchargements tronqués
+        published, sizes = set(), {}
+        try:
+            for info in client.list_artifacts(run_id, "local_artifacts"):
+                if not info.is_dir:
+                    published.add(Path(info.path).name)
+                    if info.file_size is not None:
+                        sizes[Path(info.path).name] = info.file_size
+        except Exception as e:
+            logger.warning(f"Impossible de lister les artefacts de l'exécution {run_id}: {str(e)}")
         
-        # Créer un répertoire temporaire pour le téléchargement
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Télécharger les artefacts dans le répertoire temporaire
-            client = mlflow.tracking.MlflowClient()
-            for artifact in artifacts_to_check:
-                artifact_name = Path(artifact).name
-                local_path = Path(temp_dir) / artifact_name
-                
-                # Télécharger l'artefact depuis MLflow
-                artifact_uri = client.get_run(run_id).info.artifact_uri
-                artifact_path = f"{artifact_uri}/local_artifacts/{artifact_name}"
-                
-                # Gestion du préfixe s3:// ou autres protocoles
-                if artifact_path.startswith("s3://"):
-                    # Utiliser boto3 ou mlflow.artifacts.download_artifacts
-                    mlflow.artifacts.download_artifacts(
-                        artifact_uri=f"runs:/{run_id}/local_artifacts/{artifact_name}",
-                        dst_path=str(local_path.parent)
-                    )
-                else:
-                    # Pour les chemins HTTP ou FILE
-                    response = requests.get(artifact_path.replace("file://", ""))
-                    with open(local_path, 'wb') as f:
-                        f.write(response.content)
-                
-                # Copier l'artefact dans le répertoire du modèle
-                dest_path = model_dir / artifact_name
-                shutil.copy(local_path, dest_path)
-                logger.info(f"Artefact {artifact_name} téléchargé avec succès.")
+        # Le tokenizer picklé n'est téléchargé que si l'exécution ne publie pas de vocabulaire compact
+        vocabulary_name = next((name for name in VOCABULARY_ARTIFACTS if name in published), "tokenizer.pickle")
+        if vocabulary_name != VOCABULARY_FILE:
+            logger.warning(f"L'exécution {run_id} ne publie pas {VOCABULARY_FILE} : le tokenizer picklé sera converti au chargement.")
         
+        run_dir = store.fetch(
+            run_id,
+            {name: f"{artifact_uri}/local_artifacts/{name}" for name in MODEL_ARTIFACTS + [vocabulary_name]},
+            sizes=sizes,
+            verify=VERIFY_ARTIFACTS
+        )
         logger.info("Tous les artefacts ont été téléchargés avec succès.")
-        return True
+        return run_dir
         
     except Exception as e:
         logger.error(f"Erreur lors du téléchargement des artefacts: {str(e)}")
-        return False
+        return None
 
 # Fonction de prétraitement personnalisée
 def custom_preprocess_tweet(tweet):
     """
     Réimplémentation de la fonction de prétraitement.
+    
+    Version de référence, exécutée tweet par tweet : le service utilise
+    `TweetPreprocessor`, qui produit exactement la même sortie.
     """
+    from nltk.tokenize import word_tokenize
+    from nltk.stem import WordNetLemmatizer
+    from nltk.corpus import stopwords
+    from preprocessing import ensure_nltk_resources
+    
     ensure_nltk_resources()
     # Vérifier si le tweet est une chaîne de caractères
     if not isinstance(tweet, str):
@@ -316,98 +828,163 @@ def custom_preprocess_tweet(tweet):
     return ' '.join(tokens)
 
 # Fonction pour charger le modèle et ses artefacts
-def load_model() -> Dict[str, Any]:
+def load_model(run_id: Optional[str] = None, model_dir: Path = MODEL_DIR) -> Dict[str, Any]:
     """
-    Charge le modèle et tous ses artefacts associés.
+    Charge le modèle et tous ses artefacts associés avec les réglages de l'API
+    (voir `inference.load_model`).
+    
+    Si MODEL_VARIANT est défini, c'est la variante compressée du modèle qui est chargée
+    (construite à partir des artefacts d'origine si elle n'existe pas encore).
+    
+    Args:
+        run_id: ID de l'exécution MLflow du modèle, utilisé pour identifier ses prédictions en cache
+        model_dir: Répertoire contenant les artefacts du modèle
     """
+    return inference.load_model(
+        run_id,
+        model_dir,
+        backend=MODEL_BACKEND,
+        variant=MODEL_VARIANT,
+        tflite_threads=TFLITE_THREADS,
+        length_buckets=SEQUENCE_LENGTH_BUCKETS,
+        intra_op_threads=TF_INTRA_OP_THREADS,
+        # Vocabulaire, encodeur et prétraitement partagés s'ils ont été préchargés avant le fork
+        text_artifacts=load_text_artifacts
+    )
+
+
+# Artefacts texte chargés par le processus maître de serve.py avant le fork, par répertoire
+# d'artefacts : les processus de service les réutilisent (pages partagées en copie sur écriture)
+shared_artifacts: Dict[str, Dict[str, Any]] = {}
+
+
+def load_text_artifacts(model_dir: Path) -> Dict[str, Any]:
+    """
+    Charge le vocabulaire, l'encodeur et le prétraitement d'un répertoire d'artefacts,
+    ou renvoie ceux préchargés pour ce répertoire par `preload_shared_artifacts`.
+    
+    Args:
+        model_dir: Répertoire contenant les artefacts du modèle
+    
+    Returns:
+        Dictionnaire avec les clés "vocabulary", "encoder" et "preprocess"
+    """
+    shared = shared_artifacts.get(str(Path(model_dir).resolve()))
+    if shared is not None:
+        logger.info("Vocabulaire, encodeur et prétraitement préchargés par le processus maître.")
+        return dict(shared)
+    return inference.load_text_artifacts(model_dir)
+
+
+def preload_shared_artifacts(model_run_id: Optional[str]) -> Optional[Path]:
+    """
+    Prépare, dans le processus maître de serve.py, tout ce que les processus de service
+    peuvent partager après le fork : artefacts téléchargés une seule fois, vocabulaire
+    projeté en mémoire, encodeur, données WordNet de NLTK et modules de TensorFlow. Le moteur
+    d'exécution du modèle n'est pas chargé ici : les pools de threads de TensorFlow ne
+    survivent pas à un fork, chaque processus construit donc le sien.
+    
+    Args:
+        model_run_id: ID de l'exécution MLflow (None : artefacts locaux de model/)
+    
+    Returns:
+        Répertoire des artefacts préchargés, ou None en cas d'échec (chaque processus
+        tentera alors le chargement complet lui-même)
+    """
+    artifacts_dir = download_artifacts_from_mlflow(model_run_id, MODEL_DIR)
+    if artifacts_dir is None:
+        return None
     try:
-        logger.info("Chargement du modèle et de ses artefacts...")
-        
-        # Chemins des artefacts
-        model_path = MODEL_DIR / "final_model_LSTM_Word2Vec-Fige.keras"
-        tokenizer_path = MODEL_DIR / "tokenizer.pickle"
-        params_path = MODEL_DIR / "parameters.json"
-        
-        # Vérifier si les fichiers principaux existent
-        for path in [model_path, tokenizer_path, params_path]:
-            if not path.exists():
-                raise FileNotFoundError(f"Le fichier {path.name} n'existe pas.")
-        
-        # Charger le modèle
-        model = tf.keras.models.load_model(str(model_path))
-        
-        # Charger le tokenizer
-        with open(tokenizer_path, 'rb') as handle:
-            tokenizer = pickle.load(handle)
-        
-        # Utiliser la fonction de prétraitement personnalisée au lieu de charger celle via dill
-        preprocess_function = custom_preprocess_tweet
-        
-        # Charger les paramètres
-        with open(params_path, 'r') as f:
-            params = json.load(f)
-        
-        logger.info("Modèle et artefacts chargés avec succès.")
-        
-        return {
-            "model": model,
-            "tokenizer": tokenizer,
-            "preprocess": preprocess_function,
-            "params": params
-        }
-        
+        if MODEL_VARIANT:
+            artifacts_dir = preload_variant(artifacts_dir)
+        shared_artifacts[str(artifacts_dir.resolve())] = load_text_artifacts(artifacts_dir)
     except Exception as e:
-        logger.error(f"Erreur lors du chargement du modèle: {str(e)}")
-        raise
+        logger.warning(f"Préchargement des artefacts texte impossible: {str(e)}")
+        return None
+    # Importer TensorFlow sans créer de contexte d'exécution : seuls les modules sont partagés
+    import tensorflow  # noqa: F401
+    return artifacts_dir
+
+
+def preload_variant(artifacts_dir: Path) -> Path:
+    """
+    Renvoie le répertoire de la variante MODEL_VARIANT des artefacts, après l'avoir construite
+    si besoin dans un sous-processus : TensorFlow ne doit pas être initialisé dans le processus
+    maître avant le fork, et la variante n'est ainsi construite qu'une fois pour tous les processus.
+    """
+    found = find_variant(artifacts_dir, MODEL_VARIANT)
+    if found is None:
+        dtype, top = parse_variant(MODEL_VARIANT)
+        command = [sys.executable, str(BASE_DIR / "quantization.py"), "--model-dir", str(artifacts_dir), "--dtype", dtype]
+        if top:
+            command += ["--top", str(top)]
+        logger.info(f"Construction de la variante {MODEL_VARIANT} du modèle...")
+        subprocess.run(command, check=True)
+    return artifacts_dir / VARIANTS_DIR / MODEL_VARIANT
 
 
 # Fonction pour prédire le sentiment d'un lot de textes
-def predict_sentiment_batch(texts: List[str], model_pack: Dict[str, Any]) -> List[Dict[str, Any]]:
+def predict_sentiment_batch(texts: List[str], model_pack: Dict[str, Any], cache: Optional[PredictionCache] = None,
+                            coalescer: Optional[InFlightPredictions] = None) -> List[Dict[str, Any]]:
     """
-    Prédit le sentiment d'une liste de textes en utilisant le modèle chargé.
-    Cette version est optimisée pour le traitement par lot.
+    Prédit le sentiment d'une liste de textes (voir `inference.predict_sentiment_batch`),
+    en chronométrant chaque étape pour /metrics et le journal des requêtes lentes.
     
     Args:
         texts: Liste de textes à analyser
         model_pack: Dictionnaire contenant le modèle et ses artefacts
+        cache: Cache optionnel des prédictions ; seules les absences passent par le modèle
+        coalescer: Table optionnelle des prédictions en cours, partagée entre les threads
     
     Returns:
         Liste de dictionnaires contenant les sentiments prédits et les scores
     """
-    try:
-        model = model_pack["model"]
-        tokenizer = model_pack["tokenizer"]
-        preprocess = model_pack["preprocess"]
-        params = model_pack["params"]
-        
-        # Prétraiter tous les textes
-        preprocessed_texts = [preprocess(text) for text in texts]
-        
-        # Tokeniser et encoder tous les textes
-        tokens = tokenizer.texts_to_sequences(preprocessed_texts)
-        max_length = params.get("max_sequence_length", MAX_SEQUENCE_LENGTH)
-        padded_tokens = pad_sequences(tokens, maxlen=max_length, padding='post', truncating='post')
-        
-        # Prédire les sentiments pour tous les textes en une seule passe
-        predictions = model.predict(padded_tokens, verbose=0)
-        
-        # Interpréter les prédictions
-        results = []
-        for pred in predictions:
-            sentiment = "Positif" if pred[0] >= 0.5 else "Négatif"
-            confidence = float(pred[0]) if pred[0] >= 0.5 else float(1 - pred[0])
-            
-            results.append({
-                'sentiment': sentiment,
-                'confidence': confidence,
-                'raw_score': float(pred[0])
-            })
-        
-        return results
-        
-    except Exception as e:
-        logger.error(f"Erreur lors de la prédiction par lot optimisée: {str(e)}")
-        raise
+    # Chronométrer chaque étape (histogramme sentiment_predict_stage_seconds de /metrics)
+    PREDICT_BATCH_TEXTS.observe(len(texts))
+    stages = StageTimer(PREDICT_STAGE_SECONDS, record_stage)
+    return inference.predict_sentiment_batch(texts, model_pack, cache, coalescer, stages=stages)
+
+
+def overloaded_exception(error: InferenceOverloaded) -> HTTPException:
+    """
+    Construit la réponse 503 renvoyée lorsque la file d'inférence est pleine.
+    
+    Args:
+        error: Exception levée par le pool d'inférence
+    
+    Returns:
+        HTTPException avec l'en-tête Retry-After
+    """
+    return HTTPException(
+        status_code=503,
+        detail="Le service de prédiction est surchargé. Veuillez réessayer plus tard.",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+def unknown_model_exception(model_id: Optional[str]) -> HTTPException:
+    """Construit la réponse 404 renvoyée lorsqu'une requête choisit un modèle qui n'est pas chargé."""
+    return HTTPException(
+        status_code=404,
+        detail=f"Le modèle {model_id} n'est pas chargé (modèles disponibles : {', '.join(m['run_id'] for m in registry.snapshot()['models'])})."
+    )
+
+
+def model_unavailable(model_id: Optional[str] = None) -> Optional[HTTPException]:
+    """Renvoie l'erreur à lever si le modèle demandé (ou le modèle par défaut) n'est pas chargé, sinon None."""
+    if registry.default is None:
+        return HTTPException(status_code=503, detail="Le modèle n'est pas encore chargé. Veuillez réessayer plus tard.")
+    if model_id is not None and model_id not in registry:
+        return unknown_model_exception(model_id)
+    return None
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Vérifie le jeton d'administration (en-tête X-Admin-Token)."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Les endpoints d'administration sont désactivés (ADMIN_TOKEN non défini).")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Jeton d'administration invalide.")
 
 
 # Définition des routes de l'API
@@ -419,13 +996,14 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Endpoint de vérification de santé."""
-    if model_pack is None:
+    """Endpoint de vérification de santé (compatible avec les versions précédentes : 200 une fois le modèle prêt)."""
+    if registry.default is None:
         raise HTTPException(
             status_code=503,
             detail={
                 "status": "erreur",
                 "message": "Le modèle n'est pas chargé. Vérifiez que les artefacts ont bien été téléchargés depuis MLflow.",
+                "startup": startup.snapshot(),
                 "environment_variables": {
                     "MLFLOW_TRACKING_URI": os.environ.get("MLFLOW_TRACKING_URI", "Not set"),
                     "RUN_ID": os.environ.get("RUN_ID", "Not set"),
@@ -435,9 +1013,57 @@ async def health_check():
         )
     return {"status": "ok", "message": "Le modèle est chargé et prêt pour les prédictions."}
 
+@app.get("/health/live")
+async def liveness_check():
+    """Endpoint de vivacité : le processus répond, même pendant le chargement du modèle."""
+    return {"status": "alive", "startup": startup.snapshot()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Endpoint de disponibilité : 200 une fois le modèle chargé et préchauffé, 503 sinon.
+    
+    L'état indique la progression du démarrage : starting, downloading, loading,
+    warming, ready ou failed.
+    """
+    state = startup.snapshot()
+    if registry.default is None:
+        raise HTTPException(status_code=503, detail=state, headers={"Retry-After": str(INFERENCE_RETRY_AFTER)})
+    return state
+
+@app.get("/stats")
+async def get_stats():
+    """Endpoint exposant les statistiques internes du service de prédiction."""
+    default_pack = registry.get()
+    return {
+        "startup": startup.snapshot(),
+        "batching": batcher.stats() if batcher is not None else None,
+        "executor": inference_executor.stats() if inference_executor is not None else None,
+        "cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "coalescing": prediction_coalescer.stats(),
+        "telemetry": telemetry.stats(),
+        "feedback": feedback_store.stats() if feedback_store is not None else None,
+        "jobs": {**job_runner.stats(), "counts": await asyncio.to_thread(job_store.counts)} if job_runner is not None else None,
+        "truncation": getattr(default_pack.get("runtime"), "calibration", None) if default_pack is not None else None,
+        "models": registry.snapshot()
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Endpoint exposant les métriques au format texte de Prometheus : durée de chaque
+    étape de la prédiction (prétraitement, encodage, passe du modèle, cache,
+    construction de la réponse), attente et exécution dans le pool d'inférence,
+    tailles des requêtes et des lots, phases de chargement des modèles, cache et
+    files internes. Les histogrammes sont tenus en continu ; le texte n'est produit
+    qu'à la collecte.
+    """
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
 @app.get("/info")
 async def get_info():
     """Endpoint pour obtenir des informations sur l'environnement d'exécution."""
+    tf = await asyncio.to_thread(configure_tensorflow)
     return {
         "tensorflow_version": tf.__version__,
         "devices_available": [device.name for device in tf.config.list_logical_devices()],
@@ -459,16 +1085,23 @@ async def predict(request: TweetRequest):
     Returns:
         SentimentResponse contenant le sentiment prédit et les scores
     """
-    global model_pack
-    
-    if model_pack is None:
-        raise HTTPException(status_code=503, detail="Le modèle n'est pas encore chargé. Veuillez réessayer plus tard.")
+    error = model_unavailable(request.run_id)
+    if error is not None:
+        raise error
+    REQUEST_TEXTS.observe(1, "predict")
+    record_input(1)
     
     try:
-        # Utiliser la fonction de traitement par lot avec un seul texte
-        results = predict_sentiment_batch([request.text], model_pack)
+        # Regrouper avec les requêtes concurrentes via le micro-batcher (ou canari, ou modèle choisi)
+        results = await predict_texts([request.text], request.run_id)
         # Renvoyer seulement le premier résultat
-        return SentimentResponse(**results[0])
+        response = SentimentResponse(**results[0])
+        mark_handler_done()
+        return response
+    except InferenceOverloaded as e:
+        raise overloaded_exception(e)
+    except UnknownModel:
+        raise unknown_model_exception(request.run_id)
     except Exception as e:
         logger.error(f"Erreur lors de la prédiction: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction: {str(e)}")
@@ -478,27 +1111,408 @@ async def predict_batch(request: BatchTweetRequest):
     """
     Endpoint de prédiction du sentiment pour un lot de tweets (optimisé).
     """
-    global model_pack
-    
-    if model_pack is None:
-        raise HTTPException(status_code=503, detail="Le modèle n'est pas encore chargé. Veuillez réessayer plus tard.")
+    error = model_unavailable(request.run_id)
+    if error is not None:
+        raise error
     
+    REQUEST_TEXTS.observe(len(request.texts), "predict-batch")
+    record_input(len(request.texts))
     if not request.texts:
         return BatchSentimentResponse(results=[])
     
     try:
-        # Utiliser la version optimisée pour le traitement par lot
-        results = predict_sentiment_batch(request.texts, model_pack)
-        return BatchSentimentResponse(results=[SentimentResponse(**result) for result in results])
+        # Les petits lots du modèle par défaut passent par le micro-batcher, les autres sont traités directement
+        results = await predict_texts(request.texts, request.run_id)
+        response = BatchSentimentResponse(results=[SentimentResponse(**result) for result in results])
+        mark_handler_done()
+        return response
+    except InferenceOverloaded as e:
+        raise overloaded_exception(e)
+    except UnknownModel:
+        raise unknown_model_exception(request.run_id)
     except Exception as e:
         logger.error(f"Erreur lors de la prédiction par lot: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction par lot: {str(e)}")
     
+async def score_stream_chunk(chunk: List[StreamLine], model_id: Optional[str] = None):
+    """
+    Prédit le sentiment d'un morceau du flux et produit les lignes NDJSON dans l'ordre d'entrée.
+    
+    En cas de surcharge, le morceau est resoumis après le délai conseillé plutôt
+    que d'interrompre le flux.
+    """
+    texts = [line.text for line in chunk if line.error is None]
+    results = []
+    while texts:
+        try:
+            results = await run_inference(texts, model_id)
+            break
+        except InferenceOverloaded as e:
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            # Signaler l'erreur sur chaque ligne du morceau sans interrompre le flux
+            logger.error(f"Erreur lors de la prédiction en flux: {str(e)}")
+            for line in chunk:
+                if line.error is None:
+                    line.error = f"Erreur lors de la prédiction: {str(e)}"
+            break
+    
+    scored = iter(results)
+    for line in chunk:
+        yield format_result(line, None if line.error is not None else next(scored))
+
+@app.post("/predict-stream")
+async def predict_stream(request: Request, run_id: Optional[str] = None):
+    """
+    Endpoint de prédiction en flux pour de très gros volumes de tweets.
+    
+    Le corps de la requête est lu au fil de l'eau : une ligne par tweet, en texte brut,
+    ou en NDJSON (`Content-Type: application/x-ndjson`) avec des objets
+    `{"id": ..., "text": ...}`. Les lignes sont traitées par morceaux de
+    `STREAM_CHUNK_SIZE` et les résultats sont renvoyés en NDJSON dès qu'ils sont prêts,
+    si bien que la mémoire utilisée ne dépend pas de la taille de l'entrée.
+    Le paramètre de requête `run_id` choisit le modèle parmi ceux chargés.
+    
+    Returns:
+        Réponse NDJSON en flux, une ligne `{"id", "sentiment", "confidence", "raw_score"}`
+        (ou `{"id", "error"}`) par ligne d'entrée non vide
+    """
+    error = model_unavailable(run_id)
+    if error is not None:
+        raise error
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    json_lines = content_type in JSON_LINES_CONTENT_TYPES
+    
+    async def generate():
+        chunk = []
+        lines = 0
+        async for line_number, line in iter_lines(request.stream()):
+            parsed = parse_line(line_number, line, json_lines)
+            if parsed is None:
+                continue
+            chunk.append(parsed)
+            lines += 1
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                async for output in score_stream_chunk(chunk, run_id):
+                    yield output
+                chunk = []
+        if chunk:
+            async for output in score_stream_chunk(chunk, run_id):
+                yield output
+        REQUEST_TEXTS.observe(lines, "predict-stream")
+        record_input(lines)
+    
+    return DuplexStreamingResponse(generate(), media_type="application/x-ndjson")
+    
+async def score_job_chunk(texts: List[str], model_id: Optional[str], heartbeat) -> List[Dict[str, Any]]:
+    """
+    Prédit le sentiment d'un morceau de tâche asynchrone.
+    
+    Les tâches passent après le trafic interactif : le morceau est prédit par
+    sous-lots de `JOB_SUB_BATCH_SIZE` textes, soumis en basse priorité au pool
+    d'inférence (`run_background`), qui ne les démarre que sur un thread libre et
+    garde un thread pour le trafic interactif. Une requête arrivée pendant un
+    sous-lot attend donc au plus la fin de celui-ci. Pendant les attentes (modèle
+    pas encore chargé, threads occupés), `heartbeat` signale que la tâche n'est
+    pas abandonnée.
+    
+    Raises:
+        UnknownModel: Si le modèle demandé n'est pas (ou plus) chargé
+    """
+    last_heartbeat = time.monotonic()
+    while registry.default is None:
+        if time.monotonic() - last_heartbeat > 10:
+            await heartbeat()
+            last_heartbeat = time.monotonic()
+        await asyncio.sleep(0.5)
+    
+    results = []
+    for start in range(0, len(texts), JOB_SUB_BATCH_SIZE):
+        scoring = asyncio.ensure_future(run_inference(texts[start:start + JOB_SUB_BATCH_SIZE], model_id, background=True))
+        try:
+            while not (await asyncio.wait({scoring}, timeout=10))[0]:
+                await heartbeat()
+        except asyncio.CancelledError:
+            scoring.cancel()
+            raise
+        results.extend(scoring.result())
+    return results
+
+def read_upload(upload, fmt: Optional[str], text_column: str, id_column: Optional[str], model_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Crée une tâche à partir d'un fichier envoyé (CSV, NDJSON, Parquet ou texte brut,
+    comme `score.py`), lu par morceaux sans être chargé en entier.
+    """
+    suffix = Path(upload.filename or "").suffix
+    with tempfile.NamedTemporaryFile(suffix=suffix, dir=job_store.path.parent) as copy:
+        shutil.copyfileobj(upload.file, copy)
+        copy.flush()
+        path = Path(copy.name)
+        chunks = read_chunks(path, detect_format(path, fmt), JOB_CHUNK_SIZE, text_column, id_column)
+        return job_store.create((item for chunk in chunks for item in chunk), model_id)
+
+def jobs_unavailable() -> Optional[HTTPException]:
+    """Renvoie l'erreur à lever si les tâches asynchrones sont désactivées, sinon None."""
+    if job_store is None or job_runner is None:
+        return HTTPException(status_code=404, detail="Les tâches asynchrones sont désactivées (JOBS_DB_PATH vide).")
+    return None
+
+def job_not_found_exception(job_id: str) -> HTTPException:
+    """Construit la réponse 404 renvoyée pour une tâche inconnue (ou supprimée)."""
+    return HTTPException(status_code=404, detail=f"La tâche {job_id} n'existe pas.")
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request, response: Response):
+    """
+    Endpoint de création d'une tâche asynchrone, pour les volumes trop gros pour /predict-batch.
+    
+    Le corps est soit un document JSON `{"texts": [...], "run_id": ...}`, soit un
+    formulaire multipart avec un fichier `file` (CSV, NDJSON, Parquet ou texte brut,
+    format déduit de l'extension ou donné par le champ `format`) et les champs
+    facultatifs `text_column` (défaut : `text`), `id_column` et `run_id`. Les textes
+    sont enregistrés dans la base des tâches puis traités en arrière-plan, par
+    morceaux de `JOB_CHUNK_SIZE`, après le trafic interactif.
+    
+    Returns:
+        État de la tâche (202), avec son identifiant et l'en-tête Location de /jobs/{id}
+    """
+    error = jobs_unavailable()
+    if error is not None:
+        raise error
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type == "multipart/form-data":
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=422, detail="Le formulaire doit contenir un fichier 'file'.")
+            model_id = form.get("run_id") or None
+            if model_id is not None and model_id not in registry:
+                raise unknown_model_exception(model_id)
+            job = await asyncio.to_thread(
+                read_upload, upload, form.get("format") or None, form.get("text_column") or "text",
+                form.get("id_column") or None, model_id
+            )
+        else:
+            try:
+                body = BatchTweetRequest.model_validate(await request.json())
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=f"Corps de requête invalide : {str(e)}")
+            model_id = body.run_id
+            if model_id is not None and model_id not in registry:
+                raise unknown_model_exception(model_id)
+            job = await asyncio.to_thread(job_store.create, ((None, text) for text in body.texts), model_id)
+    except JobTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except JobNotFound as e:
+        # Tâche supprimée (DELETE /jobs/{id}) pendant l'enregistrement de ses textes
+        raise job_not_found_exception(str(e))
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=422, detail=f"Tâche invalide : {str(e)}")
+    
+    REQUEST_TEXTS.observe(job["total"], "jobs")
+    job_runner.notify()
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Endpoint de suivi d'une tâche asynchrone : statut (`creating`, `queued`,
+    `running`, `completed` ou `failed`), textes traités sur le total et avancement (de 0 à 1).
+    """
+    error = jobs_unavailable()
+    if error is not None:
+        raise error
+    try:
+        return await asyncio.to_thread(job_store.get, job_id)
+    except JobNotFound:
+        raise job_not_found_exception(job_id)
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=10000),
+                          format: str = "json"):
+    """
+    Endpoint de lecture des résultats d'une tâche asynchrone, dans l'ordre d'entrée.
+    
+    Les résultats sont disponibles au fur et à mesure du traitement. Avec
+    `format=json`, une page de `limit` résultats à partir de `offset`, et
+    `next_offset` pour la page suivante (null une fois la tâche entièrement lue) ;
+    avec `format=ndjson`, tous les résultats disponibles à partir de `offset`, en flux.
+    """
+    error = jobs_unavailable()
+    if error is not None:
+        raise error
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=422, detail=f"Format inconnu : {format} (formats : json, ndjson).")
+    try:
+        job = await asyncio.to_thread(job_store.get, job_id)
+    except JobNotFound:
+        raise job_not_found_exception(job_id)
+    
+    if format == "ndjson":
+        lines = (
+            (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+            for result in job_store.iter_results(job_id, offset)
+        )
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    
+    results = await asyncio.to_thread(job_store.results, job_id, offset, limit)
+    next_offset = offset + len(results)
+    return {
+        "job": job,
+        "offset": offset,
+        "results": results,
+        "next_offset": next_offset if next_offset < job["total"] else None
+    }
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Endpoint de suppression d'une tâche asynchrone et de ses résultats ; une tâche en cours est arrêtée."""
+    error = jobs_unavailable()
+    if error is not None:
+        raise error
+    try:
+        await asyncio.to_thread(job_store.delete, job_id)
+    except JobNotFound:
+        raise job_not_found_exception(job_id)
+    return {"id": job_id, "status": "deleted"}
+
+@app.get("/models")
+async def list_models():
+    """
+    Endpoint listant les modèles chargés (utilisables avec le champ `run_id` des
+    requêtes de prédiction) et les chargements lancés par /admin/models.
+    """
+    return {
+        **registry.snapshot(),
+        "loads": {model_id: state.snapshot() for model_id, state in model_loads.items()}
+    }
+
+@app.post("/admin/models", status_code=202, dependencies=[Depends(require_admin)])
+async def load_model_version(request: ModelLoadRequest, response: Response):
+    """
+    Endpoint d'administration : charge une exécution MLflow sans redémarrage.
+    
+    Le modèle est téléchargé, chargé et préchauffé en arrière-plan, puis publié
+    dans le registre ; avec `make_default`, il devient atomiquement le modèle par
+    défaut (les requêtes en cours terminent avec l'ancien). La progression est
+    visible dans /models.
+    
+    Returns:
+        État du chargement (202), ou 200 si le modèle était déjà chargé
+    """
+    if request.run_id in registry:
+        if request.make_default:
+            registry.set_default(request.run_id)
+        response.status_code = 200
+        return {"run_id": request.run_id, "status": READY, "default": registry.default}
+    
+    state = model_loads.get(request.run_id)
+    if state is not None and state.status not in (READY, FAILED):
+        raise HTTPException(status_code=409, detail=f"Le modèle {request.run_id} est déjà en cours de chargement.")
+    
+    state = start_model_load(request.run_id, request.make_default)
+    return {"run_id": request.run_id, "status": state.status}
+
+@app.delete("/admin/models/{model_id}", dependencies=[Depends(require_admin)])
+async def unload_model_version(model_id: str):
+    """
+    Endpoint d'administration : retire un modèle du registre. Il est libéré dès
+    que les requêtes qui l'utilisent sont terminées. Le modèle par défaut ne peut
+    pas être retiré.
+    """
+    try:
+        registry.retire(model_id)
+    except UnknownModel:
+        raise unknown_model_exception(model_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"run_id": model_id, "status": "retired"}
+
+@app.get("/rollout")
+async def rollout_stats():
+    """
+    Endpoint exposant la comparaison entre le modèle par défaut et le candidat :
+    taux de désaccord et écart des scores sur le trafic rejoué en miroir, et
+    latences p50/p95/p99 des deux modèles (miroir et canari).
+    """
+    return {"default": registry.default, **router.stats()}
+
+@app.put("/admin/rollout", dependencies=[Depends(require_admin)])
+async def configure_rollout(request: RolloutRequest):
+    """
+    Endpoint d'administration : choisit le candidat (déjà chargé via /admin/models)
+    et les fractions du trafic rejouées en miroir et servies en canari. Les
+    statistiques de /rollout repartent de zéro ; `candidate` à null désactive le routage.
+    """
+    if request.candidate is not None and request.candidate not in registry:
+        raise unknown_model_exception(request.candidate)
+    try:
+        router.configure(request.candidate, request.shadow_fraction, request.canary_fraction)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return router.stats()
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile(seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS), interval_ms: float = Query(10.0, ge=1, le=1000),
+                  idle: bool = False, threads: Optional[str] = None):
+    """
+    Endpoint d'administration : échantillonne les piles de tous les threads du
+    processus pendant `seconds` secondes, toutes les `interval_ms` millisecondes,
+    et renvoie un fichier au format « collapsed » (flamegraph.pl, speedscope).
+    
+    Les threads inactifs sont ignorés, sauf avec `idle=true` ; `threads` ne garde
+    que les threads dont le nom commence par ce préfixe (`inference` : pool
+    d'inférence, `MainThread` : boucle d'événements). Avec plusieurs workers, seul
+    le processus qui reçoit la requête est profilé.
+    """
+    try:
+        stacks = await asyncio.to_thread(profiler.sample, seconds, interval_ms / 1000.0, idle, threads)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks, headers={"Content-Disposition": 'attachment; filename="profile.folded"'})
+
+def slow_requests_unavailable() -> Optional[HTTPException]:
+    """Renvoie l'erreur à lever si le journal des requêtes lentes est désactivé, sinon None."""
+    if slow_requests is None:
+        return HTTPException(status_code=404, detail="Le journal des requêtes lentes est désactivé (SLOW_REQUESTS_KEPT=0).")
+    return None
+
+@app.get("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def get_slow_requests():
+    """
+    Endpoint d'administration : requêtes de prédiction les plus lentes depuis la
+    dernière remise à zéro, avec leur durée totale, leur taille (textes et octets
+    reçus) et leur durée par étape : prétraitement, encodage, passe du modèle,
+    cache, attente dans le pool d'inférence, sérialisation de la réponse, et
+    temps non attribué (`other`). Les requêtes d'un même lot du micro-batcher
+    partagent les durées du lot.
+    """
+    error = slow_requests_unavailable()
+    if error is not None:
+        raise error
+    return slow_requests.snapshot()
+
+@app.delete("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def clear_slow_requests():
+    """Endpoint d'administration : vide le journal des requêtes lentes."""
+    error = slow_requests_unavailable()
+    if error is not None:
+        raise error
+    slow_requests.clear()
+    return {"status": "success"}
+
 @app.post("/feedback")
 async def record_feedback(feedback: FeedbackRequest):
     """
     Endpoint pour enregistrer le feedback utilisateur sur les prédictions.
     
+    Le feedback est mis en file pour la base locale (écrite par lots en
+    arrière-plan) et pour Application Insights : la réponse n'attend aucune écriture.
+    
     Args:
         feedback: Informations sur la prédiction et le feedback de l'utilisateur
     
@@ -507,10 +1521,19 @@ async def record_feedback(feedback: FeedbackRequest):
     """
     try:
         # Log details
-        logger.info(f"Feedback reçu: {feedback.dict()}")
+        record = feedback.model_dump()
+        logger.info(f"Feedback reçu: {record}")
+        
+        # Conserver le feedback dans la base locale ; si la file d'écriture est pleine, le client réessaie
+        if feedback_store is not None and not feedback_store.record(record):
+            raise HTTPException(
+                status_code=503,
+                detail="La file d'enregistrement du feedback est pleine. Veuillez réessayer plus tard.",
+                headers={"Retry-After": str(INFERENCE_RETRY_AFTER)}
+            )
         
-        # Enregistrer dans Application Insights si configuré
-        if telemetry_client:
+        # Enregistrer dans Application Insights si configuré (envoi par lots en arrière-plan)
+        if telemetry.enabled:
             # Construire les propriétés en incluant seulement les champs non vides
             properties = {
                 "tweet": feedback.tweet_text,
@@ -526,42 +1549,85 @@ async def record_feedback(feedback: FeedbackRequest):
             if feedback.comments:
                 properties["comments"] = feedback.comments
             
-            # Enregistrer l'événement de feedback
-            telemetry_client.track_event(
-                name="model_feedback",
-                properties=properties
-            )
+            if feedback.run_id:
+                properties["run_id"] = feedback.run_id
             
-            # Envoyer les données immédiatement
-            telemetry_client.flush()
+            # Mettre l'événement de feedback en file, sans attendre son envoi
+            telemetry.track_event("model_feedback", properties)
             
         return {"status": "success", "message": "Feedback enregistré avec succès"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'enregistrement du feedback: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'enregistrement du feedback: {str(e)}")
 
+@app.get("/feedback/export", dependencies=[Depends(require_admin)])
+async def export_feedback(format: str = "sentiment140", since: Optional[str] = None, until: Optional[str] = None,
+                          only_corrections: bool = False, prediction: Optional[str] = None):
+    """
+    Endpoint d'administration : exporte en flux le feedback enregistré, avec des
+    étiquettes corrigées, pour le réentraînement.
+    
+    Le format `sentiment140` produit un CSV latin-1 sans en-tête (target 0/4, ids,
+    date, flag, user, text), lisible par les notebooks comme le jeu d'origine ;
+    `ndjson` conserve tous les champs du feedback. La base est lue par morceaux,
+    sans bloquer l'écriture du feedback.
+    
+    Args:
+        format: "sentiment140" ou "ndjson"
+        since: Date ISO 8601 ou horodatage minimal (inclus)
+        until: Date ISO 8601 ou horodatage maximal (exclu)
+        only_corrections: Ne garder que les prédictions jugées incorrectes
+        prediction: Ne garder que cette prédiction ("Positif" ou "Négatif")
+    """
+    if feedback_store is None:
+        raise HTTPException(status_code=404, detail="La base de feedback est désactivée (FEEDBACK_DB_PATH vide).")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"Format d'export inconnu : {format} (formats : {', '.join(EXPORT_FORMATS)}).")
+    try:
+        filters = {"since": parse_time(since), "until": parse_time(until)}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Date invalide : {str(e)}")
+    
+    # Inclure le feedback encore en file d'écriture
+    await asyncio.to_thread(feedback_store.flush)
+    
+    extension = "csv" if format == "sentiment140" else "ndjson"
+    return StreamingResponse(
+        iter_export(feedback_store.path, format, encode=True, only_corrections=only_corrections,
+                    prediction=prediction, **filters),
+        media_type=EXPORT_FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="feedback.{extension}"'}
+    )
+
 @app.get("/test-appinsights")
 async def test_appinsights_connection():
     """
     Endpoint pour tester la connexion à Azure Application Insights.
     """
-    if not telemetry_client:
+    if not telemetry.enabled:
         return {
             "status": "error",
             "message": "Aucun client Application Insights n'est configuré. Vérifiez la variable d'environnement APPINSIGHTS_INSTRUMENTATION_KEY."
         }
     
     try:
-        # Envoyer un événement de test
-        telemetry_client.track_event(
-            name="appinsights_connection_test",
-            properties={
+        # Envoyer un événement de test et attendre l'envoi du lot qui le contient
+        failed = telemetry.stats()["failed"]
+        telemetry.track_event(
+            "appinsights_connection_test",
+            {
                 "timestamp": datetime.now().isoformat(),
                 "test_id": str(uuid.uuid4())
             }
         )
-        telemetry_client.flush()
+        if not await asyncio.to_thread(telemetry.flush) or telemetry.stats()["failed"] > failed:
+            return {
+                "status": "error",
+                "message": "L'événement de test n'a pas pu être envoyé à temps à Application Insights."
+            }
         
         return {
             "status": "success",
@@ -0,0 +1,254 @@
+# Métriques au format texte de Prometheus : compteurs, histogrammes et valeurs lues à la collecte
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Bornes (en secondes) des histogrammes de durée, de 0,5 ms à 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Bornes des histogrammes de taille (nombre de textes)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+# Bornes (en secondes) des phases de chargement d'un modèle
+LOAD_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Une série : suffixe du nom, étiquettes et valeur
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    value = float(value)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labelvalues: Tuple) -> Tuple[str, ...]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} attend les étiquettes {self.labelnames} (reçu : {labelvalues}).")
+        return tuple(str(value) for value in labelvalues)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Compteur croissant, éventuellement par combinaison d'étiquettes."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labelvalues):
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(self._key(labelvalues), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield "_total", self._labels(key), value
+
+
+class Histogram(_Metric):
+    """
+    Histogramme à bornes fixes. `observe` ne fait qu'incrémenter un compartiment
+    (recherche dichotomique) : les comptes cumulés ne sont calculés qu'à la collecte.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        # Par combinaison d'étiquettes : comptes par compartiment (le dernier pour +Inf), somme
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labelvalues):
+        key = self._key(labelvalues)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labelvalues) -> int:
+        series = self._series.get(self._key(labelvalues))
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            yield from histogram_samples(self._labels(key), self.buckets, counts, total)
+
+
+def histogram_samples(labels: Dict[str, str], buckets: Sequence[float], counts: Sequence[int],
+                      total: float) -> Iterable[Sample]:
+    """
+    Séries d'un histogramme à partir des comptes par compartiment (non cumulés ;
+    un compte de plus que de bornes pour les valeurs au-delà de la dernière).
+    """
+    cumulative = 0
+    for bound, count in zip(list(buckets) + [math.inf], counts):
+        cumulative += count
+        yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+    yield "_sum", labels, total
+    yield "_count", labels, cumulative
+
+
+class Collected(_Metric):
+    """
+    Métrique lue à chaque collecte par la fonction `collect`, qui renvoie des séries
+    `(suffixe, étiquettes, valeur)`. Sert à exposer des compteurs déjà tenus ailleurs
+    (statistiques du cache, du pool d'inférence...) sans rien ajouter aux requêtes.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, collect: Callable[[], Iterable[Sample]]):
+        super().__init__(name, documentation)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        return self.collect()
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"La métrique {metric.name} est déjà enregistrée.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collected(self, name: str, documentation: str, kind: str, collect: Callable[[], Iterable[Sample]]) -> Collected:
+        return self.register(Collected(name, documentation, kind, collect))
+
+    def render(self) -> str:
+        """Renvoie toutes les métriques au format texte de Prometheus (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            documentation = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {metric.name} {documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Chronomètre les étapes successives d'un traitement : chaque appel à `mark`
+    enregistre dans l'histogramme la durée écoulée depuis l'appel précédent.
+
+    Args:
+        histogram: Histogramme étiqueté par `stage`
+        observe: Fonction appelée en plus avec l'étape et sa durée (en secondes),
+            par exemple pour détailler les requêtes les plus lentes
+    """
+
+    __slots__ = ("histogram", "observe", "_last")
+
+    def __init__(self, histogram: Histogram, observe: Optional[Callable[[str, float], None]] = None):
+        self.histogram = histogram
+        self.observe = observe
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, stage)
+        if self.observe is not None:
+            self.observe(stage, now - self._last)
+        self._last = now
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI qui mesure la durée de chaque requête HTTP (jusqu'à la fin du
+    corps de la réponse, flux compris), par méthode, route et code de statut. La
+    route est le modèle du chemin (`/admin/models/{model_id}`), pas le chemin reçu.
+    """
+
+    def __init__(self, app, histogram: Histogram, skip: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.histogram = histogram
+        self.skip = set(skip)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "inconnue"),
+                status[0],
+            )
+
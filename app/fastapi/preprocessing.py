@@ -0,0 +1,112 @@
+# Prétraitement des tweets, construit une seule fois au démarrage
+import re
+from functools import lru_cache
+from typing import Callable, List
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+# Négations conservées malgré leur présence dans la liste des stopwords
+IMPORTANT_WORDS = frozenset({'no', 'not', 'nor', 'neither', 'never', 'nobody', 'none', 'nothing', 'nowhere'})
+
+
+def ensure_nltk_resources():
+    from nltk.data import find
+    resources = {
+        'punkt': 'tokenizers/punkt',
+        'stopwords': 'corpora/stopwords',
+        'wordnet': 'corpora/wordnet'
+    }
+
+    for key, path in resources.items():
+        try:
+            find(path)
+        except LookupError:
+            nltk.download(key)
+
+
+class TweetPreprocessor:
+    """
+    Moteur de prétraitement des tweets.
+
+    Produit exactement la même sortie que `custom_preprocess_tweet`, mais toute
+    la préparation (ressources NLTK, expressions régulières, stopwords,
+    lemmatiseur) est faite une seule fois à la construction. Les lemmes sont
+    mémorisés dans un cache LRU borné.
+
+    Args:
+        lemma_cache_size: Nombre maximal de lemmes conservés en cache
+    """
+
+    URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+    MENTION_PATTERN = re.compile(r'@\w+')
+    HASHTAG_PATTERN = re.compile(r'#(\w+)')
+    SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s<>@#!?]')
+
+    # Séparateur utilisé pour normaliser un lot en une seule passe : c'est un
+    # caractère d'espacement pour `re`, donc aucun motif ne peut le traverser
+    BATCH_SEPARATOR = '\x1e'
+
+    def __init__(self, lemma_cache_size: int = 100_000):
+        ensure_nltk_resources()
+        self.stop_words = frozenset(set(stopwords.words('english')) - IMPORTANT_WORDS)
+        self._lemmatizer = WordNetLemmatizer()
+        # Forcer le chargement paresseux de WordNet avant tout accès concurrent
+        self._lemmatizer.lemmatize('flights')
+        self.lemmatize: Callable[[str], str] = lru_cache(maxsize=lemma_cache_size)(self._lemmatizer.lemmatize)
+
+    def normalize(self, tweet: str) -> str:
+        """Applique la mise en minuscules et les substitutions par expressions régulières."""
+        tweet = tweet.lower()
+        tweet = self.URL_PATTERN.sub('<URL>', tweet)
+        tweet = self.MENTION_PATTERN.sub('<MENTION>', tweet)
+        tweet = self.HASHTAG_PATTERN.sub(r'# \1', tweet)
+        return self.SPECIAL_CHARS_PATTERN.sub('', tweet)
+
+    def __call__(self, tweet) -> str:
+        # Vérifier si le tweet est une chaîne de caractères
+        if not isinstance(tweet, str):
+            return ""
+        return self._finish(self.normalize(tweet))
+
+    def _finish(self, normalized: str) -> str:
+        # Tokenisation, lemmatisation et suppression des stopwords
+        tokens = word_tokenize(normalized)
+        stop_words = self.stop_words
+        lemmatize = self.lemmatize
+        return ' '.join(lemma for lemma in map(lemmatize, tokens) if lemma not in stop_words)
+
+    def preprocess_batch(self, tweets: List) -> List[str]:
+        """
+        Prétraite un lot de tweets.
+
+        La normalisation par expressions régulières est appliquée une seule fois
+        sur le lot entier ; la sortie est identique à un appel par tweet.
+
+        Args:
+            tweets: Liste de tweets
+
+        Returns:
+            Liste des tweets prétraités, dans le même ordre
+        """
+        positions = [i for i, tweet in enumerate(tweets) if isinstance(tweet, str)]
+        results = [""] * len(tweets)
+        if not positions:
+            return results
+
+        separator = self.BATCH_SEPARATOR
+        if any(separator in tweets[i] for i in positions):
+            # Cas improbable : le séparateur apparaît dans un tweet
+            normalized = [self.normalize(tweets[i]) for i in positions]
+        else:
+            normalized = self.normalize(separator.join(tweets[i] for i in positions)).split(separator)
+
+        for i, text in zip(positions, normalized):
+            results[i] = self._finish(text)
+        return results
+
+    def cache_info(self):
+        """Renvoie les statistiques du cache des lemmes."""
+        return self.lemmatize.cache_info()
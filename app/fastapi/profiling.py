@@ -0,0 +1,267 @@
+# Profilage à la demande et journal des requêtes de prédiction les plus lentes
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Durées par étape des requêtes en cours dans ce contexte. C'est un tuple : un lot du
+# micro-batcher sert plusieurs requêtes à la fois, et chacune reçoit les durées du lot.
+# Hors d'une requête enregistrée, le tuple est vide et l'enregistrement ne coûte rien.
+current_timings: ContextVar[Tuple["RequestTimings", ...]] = ContextVar("current_timings", default=())
+
+# Fonctions (fichier, nom) au sommet de la pile d'un thread inactif : attente d'un verrou ou
+# d'une file, boucle d'événements sans tâche prête, thread d'un pool sans travail
+IDLE_FRAMES = frozenset({
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+})
+
+
+def record_stage(stage: str, seconds: float):
+    """Ajoute la durée d'une étape aux requêtes en cours dans ce contexte."""
+    for timings in current_timings.get():
+        timings.add(stage, seconds)
+
+
+def record_input(texts: int):
+    """Enregistre le nombre de textes reçus par les requêtes en cours dans ce contexte."""
+    for timings in current_timings.get():
+        timings.texts += texts
+
+
+def mark_handler_done():
+    """Marque la fin de l'endpoint : le temps restant jusqu'à l'envoi de la réponse est sa sérialisation."""
+    for timings in current_timings.get():
+        timings.handler_done = time.perf_counter()
+
+
+class RequestTimings:
+    """
+    Durées cumulées par étape d'une requête, alimentées par les threads qui la servent.
+
+    Args:
+        method: Méthode HTTP
+        path: Chemin de la requête
+    """
+
+    __slots__ = ("method", "path", "started", "stages", "texts", "body_bytes", "handler_done", "_lock")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.texts = 0
+        self.body_bytes = 0
+        self.handler_done: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def finish(self, status: int, response_started: Optional[float]) -> Dict[str, Any]:
+        """
+        Termine la mesure et renvoie l'enregistrement : durée totale, durées par étape
+        (en millisecondes), sérialisation de la réponse et temps non attribué (`other` :
+        routage, attente du micro-batcher, envoi du corps).
+        """
+        finished = time.perf_counter()
+        with self._lock:
+            stages = dict(self.stages)
+        if self.handler_done is not None and response_started is not None:
+            stages["serialize"] = max(0.0, response_started - self.handler_done)
+        total = finished - self.started
+        stages["other"] = max(0.0, total - sum(stages.values()))
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "at": time.time(),
+            "total_ms": total * 1000.0,
+            "texts": self.texts,
+            "body_bytes": self.body_bytes,
+            "stages_ms": {stage: seconds * 1000.0 for stage, seconds in stages.items()},
+        }
+
+
+class SlowRequestLog:
+    """
+    Garde en mémoire les `size` requêtes les plus lentes depuis la dernière remise à zéro.
+
+    Le journal est un tas de taille fixe : une requête plus rapide que la plus rapide
+    des requêtes conservées est écartée en une comparaison.
+
+    Args:
+        size: Nombre de requêtes conservées
+    """
+
+    def __init__(self, size: int = 20):
+        self.size = max(1, int(size))
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._recorded = 0
+
+    def offer(self, record: Dict[str, Any]):
+        """Conserve l'enregistrement s'il fait partie des `size` plus lents."""
+        entry = (record["total_ms"], next(self._sequence), record)
+        with self._lock:
+            self._recorded += 1
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Renvoie les requêtes conservées, de la plus lente à la plus rapide."""
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+            recorded = self._recorded
+        return {"size": self.size, "recorded": recorded, "requests": [record for _, _, record in entries]}
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+            self._recorded = 0
+
+
+class SlowRequestMiddleware:
+    """
+    Middleware ASGI qui mesure les requêtes de prédiction étape par étape et
+    transmet chaque mesure au journal des requêtes lentes.
+
+    Les durées sont rattachées à la requête par `current_timings`, que le
+    micro-batcher et le pool d'inférence propagent jusqu'aux threads de calcul.
+
+    Args:
+        app: Application ASGI
+        log: Journal des requêtes lentes
+        paths: Chemins mesurés
+    """
+
+    def __init__(self, app, log: SlowRequestLog, paths: Sequence[str] = ("/predict", "/predict-batch", "/predict-stream")):
+        self.app = app
+        self.log = log
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(scope["method"], scope["path"])
+        status = [500]
+        response_started: List[Optional[float]] = [None]
+
+        async def receive_counting():
+            message = await receive()
+            if message["type"] == "http.request":
+                timings.body_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                response_started[0] = time.perf_counter()
+            await send(message)
+
+        token = current_timings.set((timings,))
+        try:
+            await self.app(scope, receive_counting, send_with_status)
+        finally:
+            current_timings.reset(token)
+            self.log.offer(timings.finish(status[0], response_started[0]))
+
+
+class ProfilerBusy(Exception):
+    """Levée lorsqu'un profilage est déjà en cours."""
+
+
+def _frame_label(code) -> str:
+    # Format « collapsed » de flamegraph.pl : les frames sont séparées par des points-virgules
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage de tous les threads du processus.
+
+    Pendant `duration` secondes, la pile Python de chaque thread est relevée toutes
+    les `interval` secondes (`sys._current_frames`), sans instrumenter le code : le
+    coût est nul hors profilage, et pendant un profilage il se limite au thread
+    d'échantillonnage. Le résultat est au format « collapsed » (une ligne
+    `thread;frame;...;frame nombre` par pile distincte), lisible par flamegraph.pl,
+    speedscope ou inferno. Un seul profilage peut être en cours à la fois.
+
+    Args:
+        max_depth: Nombre maximal de frames relevées par pile (les plus profondes)
+    """
+
+    def __init__(self, max_depth: int = 128):
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def sample(self, duration: float, interval: float = 0.01, idle: bool = False,
+               thread_prefix: Optional[str] = None) -> str:
+        """
+        Échantillonne les piles pendant `duration` secondes.
+
+        Args:
+            duration: Durée du profilage (en secondes)
+            interval: Délai entre deux relevés (en secondes)
+            idle: Conserver les piles des threads inactifs (attente d'un verrou, d'une file
+                ou d'un événement réseau)
+            thread_prefix: Ne relever que les threads dont le nom commence par ce préfixe
+                (par exemple "inference" pour le pool d'inférence)
+
+        Returns:
+            Piles au format « collapsed », de la plus fréquente à la moins fréquente
+
+        Raises:
+            ProfilerBusy: Si un profilage est déjà en cours
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("Un profilage est déjà en cours.")
+        try:
+            counts: Counter = Counter()
+            own = threading.get_ident()
+            names: Dict[int, str] = {}
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    if ident not in names:
+                        names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                    name = names.get(ident, f"thread-{ident}")
+                    if thread_prefix and not name.startswith(thread_prefix):
+                        continue
+                    leaf = frame.f_code
+                    if not idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        stack.append(frame.f_code)
+                        frame = frame.f_back
+                    counts[(name, tuple(stack))] += 1
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+
+        lines = []
+        for (name, stack), count in counts.most_common():
+            frames = ";".join(_frame_label(code) for code in reversed(stack))
+            lines.append(f"{name.replace(';', ':')};{frames} {count}\n")
+        return "".join(lines)
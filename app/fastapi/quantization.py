@@ -0,0 +1,394 @@
+"""
+Variantes compressées du modèle : embedding Word2Vec en int8 ou float16, et
+vocabulaire éventuellement élagué aux N tokens les plus fréquents.
+
+La matrice d'embedding figée (vocabulaire x dimension, en float32) représente
+l'essentiel du modèle Keras : elle fixe la taille de l'artefact, la durée du
+téléchargement et du chargement, et la mémoire résidente de chaque processus.
+Une variante est un répertoire d'artefacts autonome, `variants/<nom>/` à côté
+des artefacts d'origine, chargeable par `main.load_model` :
+
+- `int8` : embedding quantifié ligne par ligne (un facteur d'échelle par mot,
+  `Embedding.quantize("int8")` de Keras), 4 fois plus petit ;
+- `float16` : embedding stocké en demi-précision, 2 fois plus petit ;
+- `-top<N>` (par exemple `int8-top50000`) : seules les N lignes des tokens les
+  plus fréquents sont conservées, les autres mots deviennent des mots inconnus
+  (token hors vocabulaire s'il existe, sinon ignorés, comme au-delà de
+  `num_words`). La fréquence est mesurée sur des textes de trafic réel (export
+  de `/feedback/export`, par exemple) ou, à défaut, sur le corpus d'entraînement
+  (les indices du tokenizer sont triés par fréquence).
+
+Keras n'a pas de LSTM quantifié : les poids des LSTM restent en float32 dans le
+modèle Keras (quelques pourcents de sa taille). Avec les moteurs `tflite` et
+`savedmodel`, la variante est exportée avec la quantification post-entraînement
+du convertisseur TFLite, qui quantifie aussi les poids des LSTM et des couches
+denses (voir `runtime.export_model`).
+
+Usage :
+    python quantization.py --model-dir model/runs/<run_id> --dtype int8
+    python quantization.py --model-dir model/runs/<run_id> --dtype float16 --top 50000 --traffic feedback.csv
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from artifacts import file_digest
+from runtime import KERAS_MODEL_FILE, load_keras_model
+from vocabulary import VOCABULARY_FILE, Vocabulary, VocabularyEncoder, convert_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Sous-répertoire des variantes, à côté des artefacts du modèle, et description de chaque variante
+VARIANTS_DIR = "variants"
+VARIANT_METADATA = "variant.json"
+
+DTYPES = ("int8", "float16")
+
+# Nom d'une variante : type de l'embedding, puis nombre de tokens conservés s'il est élagué
+VARIANT_NAME = re.compile(r"^(int8|float16)(?:-top(\d+))?$")
+
+
+def variant_name(dtype: str, top: Optional[int] = None) -> str:
+    """Nom de la variante (et de son répertoire), par exemple `int8` ou `float16-top50000`."""
+    return f"{dtype}-top{top}" if top else dtype
+
+
+def parse_variant(name: str) -> Tuple[str, Optional[int]]:
+    """
+    Décompose un nom de variante en type de l'embedding et nombre de tokens conservés.
+
+    Raises:
+        ValueError: Si le nom n'est pas de la forme `int8`, `float16` ou `<type>-top<N>`
+    """
+    match = VARIANT_NAME.match(name)
+    if match is None or match.group(2) == "0":
+        raise ValueError(f"Variante de modèle inconnue: {name} (formes possibles : int8, float16, int8-top50000...)")
+    return match.group(1), int(match.group(2)) if match.group(2) else None
+
+
+def read_texts(path: Path) -> Tuple[List[str], Optional[List[int]]]:
+    """
+    Lit un jeu de textes, étiqueté ou non, dans l'un des formats utilisés par le projet :
+
+    - `.csv` : Sentiment140 (target, ids, date, flag, user, text ; target 0 ou 4),
+      format de `/feedback/export` ;
+    - `.ndjson`/`.jsonl` : un objet `{"text", "label"}` par ligne (`/feedback/export?format=ndjson`) ;
+    - `.json` : `{"texts": [...]}` (format de /predict-batch, comme `tweets.json`) ;
+    - sinon, un texte par ligne.
+
+    Returns:
+        Les textes, et leur étiquette (1 positif, 0 négatif) si le format en comporte
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with open(path, encoding="latin-1", newline="") as f:
+            rows = [row for row in csv.reader(f) if len(row) >= 6]
+        return [row[5] for row in rows], [1 if row[0].strip() == "4" else 0 for row in rows]
+    if suffix in (".ndjson", ".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        labels = [row.get("label") for row in rows]
+        return [row["text"] for row in rows], None if None in labels else [int(label) for label in labels]
+    if suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            return [text for text in json.load(f)["texts"] if isinstance(text, str)], None
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()], None
+
+
+def count_tokens(encoder: VocabularyEncoder, texts: List[str], maxlen: int, rows: int, batch_size: int = 1024) -> np.ndarray:
+    """
+    Compte les occurrences de chaque indice dans les séquences encodées de textes prétraités
+    (seuls les tokens que le modèle voit après troncature à `maxlen` sont comptés).
+
+    Args:
+        encoder: Encodeur du vocabulaire d'origine
+        texts: Textes prétraités
+        maxlen: Longueur des séquences du modèle
+        rows: Nombre de lignes de la matrice d'embedding
+
+    Returns:
+        Tableau de `rows` compteurs (l'indice 0, le remplissage, n'est pas compté)
+    """
+    counts = np.zeros(rows, dtype=np.int64)
+    for start in range(0, len(texts), batch_size):
+        tokens = encoder.encode(texts[start:start + batch_size], maxlen)
+        counts += np.bincount(tokens[tokens > 0], minlength=rows)[:rows]
+    return counts
+
+
+def select_rows(vocabulary: Vocabulary, top: int, counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Choisit les `top` indices conservés parmi ceux du vocabulaire : les plus fréquents dans
+    `counts`, puis, à fréquence égale (ou sans `counts`), les plus fréquents à l'entraînement
+    (indices les plus petits). Le token hors vocabulaire est toujours conservé.
+
+    Returns:
+        Indices conservés, triés (sans l'indice 0 de remplissage)
+    """
+    candidates = np.unique(vocabulary.indices[vocabulary.indices > 0]).astype(np.int64)
+    if counts is None:
+        ranked = candidates
+    else:
+        # Tri par fréquence décroissante, puis par indice croissant
+        ranked = candidates[np.lexsort((candidates, -counts[candidates]))]
+    kept = ranked[:top]
+    if vocabulary.oov_index is not None and vocabulary.oov_index not in kept:
+        kept = np.append(kept[:max(top - 1, 0)], vocabulary.oov_index)
+    return np.sort(kept)
+
+
+def prune_vocabulary(vocabulary: Vocabulary, kept: np.ndarray) -> Vocabulary:
+    """
+    Construit le vocabulaire de la variante élaguée : les mots conservés sont renumérotés de 1
+    à N dans l'ordre de `kept` (la ligne i de la nouvelle matrice est la ligne `kept[i - 1]`
+    de l'ancienne), les autres disparaissent et seront traités comme des mots inconnus.
+    """
+    new_indices = np.full(int(vocabulary.indices.max(initial=0)) + 1, -1, dtype=np.int64)
+    new_indices[kept] = np.arange(1, len(kept) + 1)
+    word_index = {}
+    for word, index in zip(vocabulary.table, vocabulary.indices):
+        if new_indices[index] > 0:
+            word_index[word.decode("utf-8", "surrogatepass")] = int(new_indices[index])
+    return Vocabulary.from_word_index(
+        word_index,
+        oov_token=vocabulary.oov_token,
+        filters=vocabulary.filters,
+        lower=vocabulary.lower,
+        split=vocabulary.split,
+    )
+
+
+def embedding_layer(model):
+    """Renvoie l'unique couche Embedding du modèle."""
+    import keras
+
+    layers = [layer for layer in model.layers if isinstance(layer, keras.layers.Embedding)]
+    if len(layers) != 1:
+        raise ValueError(f"Le modèle doit contenir exactement une couche Embedding ({len(layers)} trouvées).")
+    return layers[0]
+
+
+def _rebuild(model, embedding, matrix: np.ndarray, dtype: str):
+    # Reconstruit le modèle à partir de sa configuration, avec une matrice d'embedding de type `dtype`
+    config = model.get_config()
+    for layer_config in config["layers"]:
+        if layer_config["config"].get("name") == embedding.name:
+            layer_config["config"]["input_dim"] = len(matrix)
+            # Les couches suivantes, en float32, convertissent leur entrée à leur tour
+            layer_config["config"]["dtype"] = dtype
+    rebuilt = type(model).from_config(config)
+
+    for source, target in zip(model.layers, rebuilt.layers):
+        if source.name != target.name:
+            raise ValueError(f"Couches inattendues après reconstruction : {source.name} / {target.name}.")
+        if source is embedding:
+            target.set_weights([matrix.astype(dtype)])
+        else:
+            target.set_weights(source.get_weights())
+    return rebuilt
+
+
+def compress_model(model, dtype: str, kept: Optional[np.ndarray] = None):
+    """
+    Reconstruit le modèle avec un embedding en `dtype`, éventuellement réduit aux lignes `kept`.
+
+    Le modèle est reconstruit à partir de sa configuration et n'est pas compilé : l'état
+    de l'optimiseur, inutile à l'inférence, n'est pas conservé.
+
+    Args:
+        model: Modèle Keras d'origine (embedding en float32)
+        dtype: 'int8' ou 'float16'
+        kept: Lignes conservées de la matrice d'embedding (None : toutes)
+
+    Returns:
+        Nouveau modèle Keras, de mêmes couches et de mêmes poids hors embedding
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Type d'embedding inconnu: {dtype} (valeurs possibles : {', '.join(DTYPES)})")
+    embedding = embedding_layer(model)
+    if embedding.quantization_mode is not None or embedding.variable_dtype != "float32":
+        raise ValueError("Le modèle est déjà compressé.")
+    matrix = embedding.get_weights()[0]
+    if kept is not None:
+        matrix = matrix[np.concatenate([[0], kept])]
+
+    compressed = _rebuild(model, embedding, matrix, "float16" if dtype == "float16" else "float32")
+    if dtype == "int8":
+        embedding_layer(compressed).quantize("int8")
+    return compressed
+
+
+def restore_float32(model):
+    """
+    Renvoie le modèle avec son embedding float16 reconverti en float32 (le modèle lui-même
+    s'il n'est pas en float16) : TFLite n'a pas de `gather` en float16, c'est le convertisseur
+    qui stocke alors les poids en float16 (voir `runtime.export_model`).
+    """
+    embedding = embedding_layer(model)
+    if embedding.variable_dtype != "float16":
+        return model
+    return _rebuild(model, embedding, embedding.get_weights()[0], "float32")
+
+
+def load_variant_metadata(variant_dir: Path) -> Optional[Dict]:
+    """Renvoie la description d'une variante complète, ou None si elle n'existe pas."""
+    path = Path(variant_dir) / VARIANT_METADATA
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_variant(model_dir: Path, vocabulary: Vocabulary, dtype: str, top: Optional[int] = None,
+                  traffic: Optional[List[str]] = None) -> Path:
+    """
+    Construit la variante `<dtype>[-top<N>]` des artefacts de `model_dir`.
+
+    La variante est écrite dans un répertoire temporaire puis renommée, pour qu'une
+    construction interrompue ne soit jamais prise pour une variante complète.
+
+    Args:
+        model_dir: Répertoire des artefacts d'origine
+        vocabulary: Vocabulaire d'origine
+        dtype: 'int8' ou 'float16'
+        top: Nombre de tokens conservés (None : pas d'élagage)
+        traffic: Textes prétraités dont les fréquences de tokens guident l'élagage
+            (None : fréquences du corpus d'entraînement)
+
+    Returns:
+        Répertoire de la variante
+    """
+    model_dir = Path(model_dir)
+    name = variant_name(dtype, top)
+    variant_dir = model_dir / VARIANTS_DIR / name
+    variant_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(model_dir / "parameters.json") as f:
+        params = json.load(f)
+
+    model = load_keras_model(model_dir)
+    rows = embedding_layer(model).input_dim
+    metadata = {
+        "name": name,
+        "dtype": dtype,
+        "top": top,
+        "source_sha256": file_digest(model_dir / KERAS_MODEL_FILE)[0],
+        "embedding_rows": rows,
+        "source_embedding_rows": rows,
+    }
+    kept = None
+    if top:
+        counts = None
+        if traffic:
+            maxlen = params.get("max_sequence_length", 100)
+            counts = count_tokens(VocabularyEncoder(vocabulary), traffic, maxlen, rows)
+        kept = select_rows(vocabulary, top, counts)
+        metadata["ranking"] = "traffic" if counts is not None else "training"
+        metadata["embedding_rows"] = len(kept) + 1
+        if counts is not None and counts.sum():
+            # Part des tokens du trafic qui restent connus du modèle élagué
+            metadata["traffic_coverage"] = float(counts[kept].sum() / counts.sum())
+
+    temp_dir = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=variant_dir.parent))
+    try:
+        logger.info(f"Construction de la variante {name} ({metadata['embedding_rows']} lignes d'embedding sur {rows})...")
+        compress_model(model, dtype, kept).save(temp_dir / KERAS_MODEL_FILE)
+        if kept is None:
+            vocabulary.save(temp_dir / VOCABULARY_FILE)
+        else:
+            prune_vocabulary(vocabulary, kept).save(temp_dir / VOCABULARY_FILE)
+        shutil.copyfile(model_dir / "parameters.json", temp_dir / "parameters.json")
+        with open(temp_dir / VARIANT_METADATA, "w") as f:
+            json.dump(metadata, f, indent=2)
+
+        if variant_dir.exists():
+            shutil.rmtree(variant_dir, ignore_errors=True)
+        try:
+            os.replace(temp_dir, variant_dir)
+        except OSError:
+            # Variante construite au même moment par un autre processus
+            if load_variant_metadata(variant_dir) is None:
+                raise
+        logger.info(f"Variante écrite dans {variant_dir} : modèle de "
+                    f"{(variant_dir / KERAS_MODEL_FILE).stat().st_size / 2**20:.1f} Mo "
+                    f"(d'origine : {(model_dir / KERAS_MODEL_FILE).stat().st_size / 2**20:.1f} Mo).")
+        return variant_dir
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def find_variant(model_dir: Path, name: str) -> Optional[Tuple[Path, Dict]]:
+    """
+    Renvoie le répertoire et la description de la variante `name` de `model_dir`, ou None si
+    elle n'a pas été construite ou si le modèle d'origine a changé depuis sa construction.
+    """
+    parse_variant(name)
+    variant_dir = Path(model_dir) / VARIANTS_DIR / name
+    metadata = load_variant_metadata(variant_dir)
+    if metadata is None:
+        return None
+    if metadata["source_sha256"] != file_digest(Path(model_dir) / KERAS_MODEL_FILE)[0]:
+        logger.info(f"Le modèle a changé depuis la construction de la variante {name}.")
+        return None
+    return variant_dir, metadata
+
+
+def ensure_variant(model_dir: Path, name: str, vocabulary: Vocabulary) -> Tuple[Path, Dict]:
+    """
+    Renvoie le répertoire et la description de la variante `name` de `model_dir`, construite
+    au premier chargement si elle n'existe pas (ou si le modèle d'origine a changé depuis).
+
+    Une variante élaguée construite ici l'est selon les fréquences d'entraînement ; pour
+    élaguer selon le trafic, la construire à l'avance avec `python quantization.py --traffic`.
+    """
+    found = find_variant(model_dir, name)
+    if found is not None:
+        return found
+    logger.info(f"Construction de la variante {name} à partir du modèle float32 de {model_dir}.")
+    dtype, top = parse_variant(name)
+    variant_dir = build_variant(model_dir, vocabulary, dtype, top)
+    return variant_dir, load_variant_metadata(variant_dir)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", type=Path, required=True, help="Répertoire des artefacts du modèle")
+    parser.add_argument("--dtype", choices=DTYPES, default="int8", help="Type de l'embedding de la variante")
+    parser.add_argument("--top", type=int, help="Nombre de tokens conservés (défaut : tout le vocabulaire)")
+    parser.add_argument("--traffic", type=Path, help="Textes de trafic réel (csv Sentiment140, ndjson, json ou texte) "
+                                                     "dont les fréquences guident l'élagage")
+    parser.add_argument("--preprocessed", action="store_true", help="Les textes de --traffic sont déjà prétraités")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    vocabulary_path = args.model_dir / VOCABULARY_FILE
+    if vocabulary_path.exists():
+        vocabulary = Vocabulary.open(vocabulary_path)
+    else:
+        vocabulary = convert_tokenizer(args.model_dir / "tokenizer.pickle", vocabulary_path)
+
+    traffic = None
+    if args.traffic:
+        traffic, _ = read_texts(args.traffic)
+        if not args.preprocessed:
+            from preprocessing import TweetPreprocessor
+            traffic = TweetPreprocessor().preprocess_batch(traffic)
+        logger.info(f"{len(traffic)} textes de trafic lus dans {args.traffic}.")
+    variant_dir = build_variant(args.model_dir, vocabulary, args.dtype, args.top, traffic)
+    metadata = load_variant_metadata(variant_dir)
+    if "traffic_coverage" in metadata:
+        logger.info(f"Tokens du trafic couverts par la variante : {metadata['traffic_coverage']:.2%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# Registre des modèles chargés, indexés par identifiant d'exécution MLflow
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownModel(KeyError):
+    """Levée lorsqu'aucun modèle chargé ne correspond à l'identifiant demandé."""
+
+
+class _Entry:
+    __slots__ = ("pack", "references", "retired", "loaded_at", "last_used", "requests")
+
+    def __init__(self, pack: Dict[str, Any]):
+        self.pack = pack
+        self.references = 0
+        self.retired = False
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self.requests = 0
+
+
+class ModelRegistry:
+    """
+    Registre des modèles chargés (runtime, vocabulaire, paramètres), indexés par
+    identifiant d'exécution MLflow, avec un modèle par défaut.
+
+    Chaque requête emprunte un modèle avec `acquire` pendant toute son inférence.
+    Publier un nouveau modèle par défaut est atomique : les requêtes déjà en cours
+    terminent avec l'ancien, les suivantes utilisent le nouveau. Un modèle retiré
+    du registre n'est libéré (fonction `release`) qu'une fois rendu par la
+    dernière requête qui l'utilisait.
+
+    Args:
+        max_models: Nombre maximal de modèles conservés ; au-delà, le modèle le moins
+            récemment utilisé (hors modèle par défaut) est retiré
+        release: Fonction appelée sur un modèle retiré lorsque plus aucune requête ne l'utilise
+    """
+
+    def __init__(self, max_models: int = 2, release: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.max_models = max(1, int(max_models))
+        self.release = release
+        self.default: Optional[str] = None
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._released = 0
+
+    def __contains__(self, run_id: str) -> bool:
+        with self._lock:
+            return run_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, run_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Renvoie le modèle `run_id` (par défaut : le modèle par défaut) sans l'emprunter, ou None."""
+        with self._lock:
+            entry = self._entries.get(run_id or self.default)
+            return entry.pack if entry is not None else None
+
+    @contextmanager
+    def acquire(self, run_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Emprunte un modèle pour la durée du bloc `with`.
+
+        Args:
+            run_id: Identifiant du modèle, ou None pour le modèle par défaut
+
+        Raises:
+            UnknownModel: Si aucun modèle correspondant n'est chargé
+        """
+        with self._lock:
+            key = run_id or self.default
+            entry = self._entries.get(key)
+            if entry is None:
+                raise UnknownModel(run_id)
+            entry.references += 1
+            entry.requests += 1
+            entry.last_used = time.monotonic()
+        try:
+            yield entry.pack
+        finally:
+            with self._lock:
+                entry.references -= 1
+                release = entry.retired and entry.references == 0
+            if release:
+                self._release(key, entry)
+
+    def publish(self, run_id: str, pack: Dict[str, Any], make_default: bool = True) -> List[str]:
+        """
+        Ajoute (ou remplace) un modèle chargé et préchauffé.
+
+        Args:
+            run_id: Identifiant de l'exécution MLflow
+            pack: Modèle et artefacts associés
+            make_default: Utiliser ce modèle pour les requêtes qui n'en choisissent pas
+
+        Returns:
+            Identifiants des modèles retirés pour respecter `max_models`
+        """
+        with self._lock:
+            replaced = self._entries.get(run_id)
+            self._entries[run_id] = _Entry(pack)
+            if make_default or self.default is None:
+                self.default = run_id
+            evicted = []
+            while len(self._entries) > self.max_models:
+                candidates = [key for key in self._entries if key not in (self.default, run_id)]
+                if not candidates:
+                    break
+                oldest = min(candidates, key=lambda key: self._entries[key].last_used)
+                evicted.append((oldest, self._detach(oldest)))
+        if replaced is not None:
+            self._retire(run_id, replaced)
+        for key, entry in evicted:
+            self._retire(key, entry)
+        logger.info(f"Modèle {run_id} publié{' (modèle par défaut)' if self.default == run_id else ''}.")
+        return [key for key, _ in evicted]
+
+    def set_default(self, run_id: str):
+        """Fait d'un modèle déjà chargé le modèle par défaut."""
+        with self._lock:
+            if run_id not in self._entries:
+                raise UnknownModel(run_id)
+            self.default = run_id
+        logger.info(f"Modèle par défaut : {run_id}.")
+
+    def retire(self, run_id: str):
+        """
+        Retire un modèle du registre ; il est libéré dès que plus aucune requête ne l'utilise.
+
+        Raises:
+            UnknownModel: Si le modèle n'est pas chargé
+            ValueError: S'il s'agit du modèle par défaut
+        """
+        with self._lock:
+            if run_id not in self._entries:
+                raise UnknownModel(run_id)
+            if run_id == self.default:
+                raise ValueError(f"Le modèle {run_id} est le modèle par défaut et ne peut pas être retiré.")
+            entry = self._detach(run_id)
+        self._retire(run_id, entry)
+
+    def clear(self):
+        """Retire tous les modèles (arrêt de l'application)."""
+        with self._lock:
+            entries = [(key, self._detach(key)) for key in list(self._entries)]
+            self.default = None
+        for key, entry in entries:
+            self._retire(key, entry)
+
+    def _detach(self, run_id: str) -> _Entry:
+        entry = self._entries.pop(run_id)
+        entry.retired = True
+        return entry
+
+    def _retire(self, run_id: str, entry: _Entry):
+        with self._lock:
+            entry.retired = True
+            release = entry.references == 0
+        if release:
+            self._release(run_id, entry)
+        else:
+            logger.info(f"Modèle {run_id} retiré ; libération après {entry.references} requêtes en cours.")
+
+    def _release(self, run_id: str, entry: _Entry):
+        with self._lock:
+            if entry.pack is None:
+                return
+            pack, entry.pack = entry.pack, None
+            self._released += 1
+        if self.release is not None:
+            self.release(pack)
+        logger.info(f"Modèle {run_id} libéré.")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Renvoie le modèle par défaut et l'état de chaque modèle chargé."""
+        with self._lock:
+            return {
+                "default": self.default,
+                "max_models": self.max_models,
+                "released": self._released,
+                "models": [
+                    {
+                        "run_id": key,
+                        "default": key == self.default,
+                        "in_flight": entry.references,
+                        "requests": entry.requests,
+                        "loaded_at": entry.loaded_at,
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
@@ -0,0 +1,579 @@
+"""
+Moteurs d'exécution du modèle de sentiment.
+
+Le modèle Keras peut être exporté une fois pour toutes en artefacts
+d'inférence figés, plus légers à charger et à exécuter :
+
+- `savedmodel` : fonction TensorFlow concrète à signature fixe `(lot, longueur)` ;
+- `tflite` : flatbuffers TensorFlow Lite, un par taille de lot (le convertisseur
+  ne fusionne les LSTM qu'avec une taille de lot fixe).
+
+Par défaut (`compiled`), le modèle Keras est appelé à travers des graphes
+TensorFlow pré-compilés pour quelques tailles de lot ; ce moteur peut en plus
+tronquer dynamiquement les séquences à la plus petite longueur pré-compilée
+suffisante (voir `LengthBucketedRuntime`). Le moteur est choisi par
+la variable d'environnement `MODEL_BACKEND` (`compiled`, `keras`, `savedmodel`
+ou `tflite`). Tous renvoient le score brut de chaque séquence sous forme d'un
+tableau float32 à une dimension.
+
+Usage (export préalable, pour ne pas charger le modèle Keras au démarrage) :
+    python runtime.py export --model-dir model/runs/<run_id>
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("compiled", "keras", "savedmodel", "tflite")
+
+# Fichier du modèle Keras entraîné, parmi les artefacts de l'exécution MLflow
+KERAS_MODEL_FILE = "final_model_LSTM_Word2Vec-Fige.keras"
+
+# Sous-répertoire des artefacts exportés et description de l'export
+EXPORT_DIR = "export"
+EXPORT_METADATA = "export.json"
+
+# Tailles de lot des flatbuffers TFLite ; un lot est découpé en morceaux de la plus grande taille
+TFLITE_BATCH_SIZES = (1, 8, 32)
+
+# Tailles de lot des graphes pré-compilés du moteur `compiled`
+COMPILED_BATCH_SIZES = (1, 8, 32, 128)
+
+# Marges (pas de remplissage conservés après le dernier token) essayées, dans l'ordre,
+# par le contrôle de parité de la troncature dynamique
+TRUNCATION_MARGINS = (0, 4, 8, 16, 32)
+
+# Coût fixe d'un appel au graphe, en lignes de lot équivalentes (mesuré sur CPU avec le
+# LSTM des notebooks : lot de 1 en 22 ms, lot de 32 en 69 ms)
+CALL_OVERHEAD_ROWS = 14
+
+
+def split_into_buckets(tokens: np.ndarray, batch_sizes: Sequence[int]) -> Iterator[Tuple[int, np.ndarray, int]]:
+    """
+    Découpe un lot en morceaux de tailles prédéfinies.
+
+    Le lot est découpé en morceaux de la plus grande taille ; le dernier morceau
+    est complété par des lignes de zéros jusqu'à la plus petite taille suffisante.
+
+    Yields:
+        Tuples (taille du morceau, morceau complété, nombre de lignes réelles)
+    """
+    largest = batch_sizes[-1]
+    for start in range(0, len(tokens), largest):
+        chunk = tokens[start:start + largest]
+        batch_size = next(size for size in batch_sizes if size >= len(chunk))
+        if batch_size > len(chunk):
+            padded = np.zeros((batch_size,) + chunk.shape[1:], dtype=chunk.dtype)
+            padded[:len(chunk)] = chunk
+            chunk = padded
+        yield batch_size, np.ascontiguousarray(chunk), min(len(tokens) - start, largest)
+
+
+class CompiledRuntime:
+    """
+    Exécution d'une fonction TensorFlow compilée, appelée directement sur le modèle.
+
+    Un graphe est tracé à la construction pour chaque taille de lot de
+    `batch_sizes` ; chaque lot est complété jusqu'à la taille la plus proche
+    (et découpé au-delà de la plus grande), si bien qu'aucune requête ne
+    déclenche de nouveau traçage. Contrairement à `model.predict`, aucun
+    adaptateur de données ni boucle d'époque n'est construit à chaque appel.
+
+    Args:
+        model: Modèle Keras chargé
+        maxlen: Longueur des séquences d'entrée
+        batch_sizes: Tailles de lot pré-compilées
+    """
+
+    name = "compiled"
+
+    def __init__(self, model, maxlen: int, batch_sizes: Sequence[int] = COMPILED_BATCH_SIZES):
+        import tensorflow as tf
+
+        self._tf = tf
+        self.model = model
+        self.batch_sizes = sorted(set(batch_sizes))
+        self._input_dtype = tf.as_dtype(model.inputs[0].dtype)
+        function = tf.function(lambda tokens: model(tokens, training=False)[:, 0])
+        self._functions = {
+            batch_size: function.get_concrete_function(tf.TensorSpec([batch_size, maxlen], self._input_dtype))
+            for batch_size in self.batch_sizes
+        }
+
+    def predict(self, tokens: np.ndarray) -> np.ndarray:
+        tokens = np.asarray(tokens, dtype=self._input_dtype.as_numpy_dtype)
+        scores = [
+            self._functions[batch_size](self._tf.constant(chunk)).numpy()[:rows]
+            for batch_size, chunk, rows in split_into_buckets(tokens, self.batch_sizes)
+        ]
+        if not scores:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(scores).astype(np.float32)
+
+
+def sequence_lengths(tokens: np.ndarray) -> np.ndarray:
+    """Longueur réelle de chaque séquence complétée par des zéros à la fin (`padding='post'`)."""
+    nonzero = np.asarray(tokens) != 0
+    if nonzero.ndim != 2 or nonzero.shape[1] == 0:
+        return np.zeros(len(nonzero), dtype=np.int64)
+    last = nonzero.shape[1] - np.argmax(nonzero[:, ::-1], axis=1)
+    return np.where(nonzero.any(axis=1), last, 0)
+
+
+def variable_length_model(model):
+    """
+    Reconstruit un modèle séquentiel (une chaîne de couches) avec une longueur
+    d'entrée libre. Les couches, et donc les poids, sont partagées avec `model`.
+    """
+    import keras
+
+    layers = [layer for layer in model.layers if not isinstance(layer, keras.layers.InputLayer)]
+    previous = model.inputs[0]
+    for layer in layers:
+        if layer.input is not previous:
+            raise ValueError(f"La troncature dynamique nécessite un modèle séquentiel (couche {layer.name}).")
+        previous = layer.output
+
+    inputs = keras.Input(shape=(None,), dtype=model.inputs[0].dtype)
+    outputs = inputs
+    for layer in layers:
+        outputs = layer(outputs)
+    return keras.Model(inputs, outputs)
+
+
+class LengthBucketedRuntime(CompiledRuntime):
+    """
+    Moteur `compiled` avec troncature dynamique des séquences.
+
+    Les séquences sont complétées par des zéros à la fin jusqu'à `maxlen`, alors
+    qu'un tweet prétraité ne compte souvent que 8 à 20 tokens. Chaque ligne d'un
+    lot est rangée dans la plus petite longueur de `lengths` couvrant sa longueur
+    réelle plus une marge de remplissage, les lignes d'une même longueur sont
+    exécutées ensemble, puis les scores sont remis dans l'ordre du lot. Des
+    longueurs voisines sont regroupées lorsque cela évite de compléter plusieurs
+    petits lots (voir `_merge_buckets`).
+
+    Le modèle entraîné n'utilise pas de masque : le LSTM avant parcourt aussi
+    les pas de remplissage après le dernier token, et le LSTM arrière commence
+    par eux. Tronquer le remplissage modifie donc légèrement le score. Sur une
+    entrée constante, l'état du LSTM converge, si bien que l'écart diminue quand
+    la marge augmente. `calibrate` mesure cet écart sur des séquences de
+    référence et retient la plus petite marge dont l'écart maximal reste sous la
+    tolérance ; tant que la troncature n'a pas été validée (ou si aucune marge
+    ne convient), toutes les séquences sont exécutées à pleine longueur.
+
+    Args:
+        model: Modèle Keras chargé (une chaîne de couches)
+        maxlen: Longueur des séquences d'entrée
+        lengths: Longueurs tronquées pré-compilées (inférieures à `maxlen`)
+        batch_sizes: Tailles de lot pré-compilées
+    """
+
+    def __init__(self, model, maxlen: int, lengths: Sequence[int], batch_sizes: Sequence[int] = COMPILED_BATCH_SIZES):
+        super().__init__(model, maxlen, batch_sizes)
+        tf = self._tf
+        self.maxlen = maxlen
+        self.lengths = sorted({length for length in lengths if 0 < length < maxlen})
+        # Marge retenue par le contrôle de parité (None : troncature désactivée)
+        self.margin: Optional[int] = None
+        self.calibration: Optional[Dict[str, object]] = None
+
+        variable = variable_length_model(model)
+        function = tf.function(lambda tokens: variable(tokens, training=False)[:, 0])
+        self._truncated = {
+            (length, batch_size): function.get_concrete_function(tf.TensorSpec([batch_size, length], self._input_dtype))
+            for length in self.lengths
+            for batch_size in self.batch_sizes
+        }
+
+    def _predict_length(self, length: int, tokens: np.ndarray) -> np.ndarray:
+        scores = [
+            self._truncated[(length, batch_size)](self._tf.constant(chunk)).numpy()[:rows]
+            for batch_size, chunk, rows in split_into_buckets(tokens, self.batch_sizes)
+        ]
+        return np.concatenate(scores)
+
+    def _cost(self, rows: int, length: int) -> int:
+        # Coût estimé de l'exécution de `rows` lignes à la longueur `length`, lots complétés compris
+        if rows == 0:
+            return 0
+        largest = self.batch_sizes[-1]
+        chunks = [largest] * (rows // largest)
+        if rows % largest:
+            chunks.append(next(size for size in self.batch_sizes if size >= rows % largest))
+        return length * sum(size + CALL_OVERHEAD_ROWS for size in chunks)
+
+    def _merge_buckets(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Regroupe des longueurs consécutives quand exécuter leurs lignes ensemble, à la
+        plus grande longueur du groupe, coûte moins cher que plusieurs petits lots complétés.
+
+        Returns:
+            Tableau indice de longueur -> indice de la longueur d'exécution
+        """
+        lengths = self.lengths + [self.maxlen]
+        # best[j] : coût minimal des longueurs 0..j-1, start[j] : début du dernier groupe
+        best, start = [0] * (len(lengths) + 1), [0] * (len(lengths) + 1)
+        for j in range(1, len(lengths) + 1):
+            best[j], start[j] = min(
+                (best[i] + self._cost(int(counts[i:j].sum()), lengths[j - 1]), i) for i in range(j)
+            )
+        targets = np.arange(len(lengths))
+        j = len(lengths)
+        while j > 0:
+            targets[start[j]:j] = j - 1
+            j = start[j]
+        return targets
+
+    def _predict_truncated(self, tokens: np.ndarray, margin: int, merge: bool = True) -> np.ndarray:
+        # Indice de la plus petite longueur suffisante ; len(self.lengths) : pleine longueur
+        buckets = np.searchsorted(self.lengths, sequence_lengths(tokens) + margin)
+        if merge:
+            buckets = self._merge_buckets(np.bincount(buckets, minlength=len(self.lengths) + 1))[buckets]
+        scores = np.empty(len(tokens), dtype=np.float32)
+        for bucket in np.unique(buckets):
+            rows = np.flatnonzero(buckets == bucket)
+            if bucket == len(self.lengths):
+                scores[rows] = super().predict(tokens[rows])
+            else:
+                length = self.lengths[bucket]
+                scores[rows] = self._predict_length(length, np.ascontiguousarray(tokens[rows, :length]))
+        return scores
+
+    def predict(self, tokens: np.ndarray) -> np.ndarray:
+        tokens = np.asarray(tokens, dtype=self._input_dtype.as_numpy_dtype)
+        if self.margin is None or len(tokens) == 0:
+            return super().predict(tokens)
+        return self._predict_truncated(tokens, self.margin)
+
+    def _calibration_set(self, tokens: np.ndarray, margin: int) -> np.ndarray:
+        # Les séquences de référence, plus leurs versions coupées juste à la limite de chaque
+        # longueur tronquée : ce sont les lignes qui gardent le moins de remplissage
+        rows = [tokens]
+        lengths = sequence_lengths(tokens)
+        for length in self.lengths:
+            cut = length - margin
+            longer = tokens[lengths > cut]
+            if cut > 0 and len(longer):
+                cropped = longer.copy()
+                cropped[:, cut:] = 0
+                rows.append(cropped)
+        return np.concatenate(rows)
+
+    def calibrate(self, tokens: np.ndarray, tolerance: float, margins: Sequence[int] = TRUNCATION_MARGINS) -> Dict[str, object]:
+        """
+        Contrôle de parité : active la troncature avec la plus petite marge dont
+        les scores restent à moins de `tolerance` des scores à pleine longueur.
+
+        Args:
+            tokens: Séquences de référence (par exemple les tweets de préchauffage encodés)
+            tolerance: Écart maximal toléré sur le score brut
+            margins: Marges essayées, dans l'ordre
+
+        Returns:
+            Rapport du contrôle (écart maximal et décisions inversées pour chaque marge essayée)
+        """
+        tokens = np.asarray(tokens, dtype=self._input_dtype.as_numpy_dtype)
+        self.margin = None
+        report = {"lengths": self.lengths, "tolerance": tolerance, "margin": None, "margins": {}}
+        for margin in margins:
+            candidates = self._calibration_set(tokens, margin)
+            reference = super().predict(candidates)
+            # Sans regroupement : chaque ligne garde le moins de remplissage possible (pire cas)
+            scores = self._predict_truncated(candidates, margin, merge=False)
+            max_diff = float(np.abs(scores - reference).max()) if len(candidates) else 0.0
+            report["margins"][str(margin)] = {
+                "sequences": len(candidates),
+                "max_abs_diff": max_diff,
+                "decision_flips": int(np.sum((scores >= 0.5) != (reference >= 0.5))),
+            }
+            if max_diff <= tolerance:
+                self.margin = margin
+                report["margin"] = margin
+                break
+
+        if self.margin is None:
+            logger.warning(f"Troncature dynamique désactivée : aucune marge ne respecte la tolérance {tolerance}.")
+        else:
+            logger.info(f"Troncature dynamique activée (longueurs {self.lengths}, marge {self.margin}).")
+        self.calibration = report
+        return report
+
+
+class KerasRuntime:
+    """Exécution par `model.predict` sur le modèle Keras complet (comportement historique)."""
+
+    name = "keras"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, tokens: np.ndarray) -> np.ndarray:
+        return self.model.predict(tokens, verbose=0)[:, 0].astype(np.float32)
+
+
+class SavedModelRuntime:
+    """
+    Exécution de la fonction concrète exportée en SavedModel.
+
+    Args:
+        path: Répertoire du SavedModel
+        input_dtype: Type des entrées attendu par la signature
+    """
+
+    name = "savedmodel"
+
+    def __init__(self, path: Path, input_dtype: str = "float32"):
+        import tensorflow as tf
+
+        self._tf = tf
+        self._loaded = tf.saved_model.load(str(path))
+        self._serve = self._loaded.serve
+        self._input_dtype = tf.as_dtype(input_dtype)
+
+    def predict(self, tokens: np.ndarray) -> np.ndarray:
+        if len(tokens) == 0:
+            return np.zeros(0, dtype=np.float32)
+        scores = self._serve(self._tf.constant(tokens, dtype=self._input_dtype))
+        return scores.numpy().reshape(-1).astype(np.float32)
+
+
+def _tflite_interpreter_class():
+    # Interpréteur autonome s'il est installé (sans importer TensorFlow), sinon celui de TensorFlow
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteRuntime:
+    """
+    Exécution des flatbuffers TensorFlow Lite, un interpréteur par taille de lot.
+
+    Un lot est découpé et complété comme dans `split_into_buckets`. Chaque interpréteur est protégé par un verrou, car le
+    pool d'inférence l'appelle depuis plusieurs threads.
+
+    Args:
+        files: Dictionnaire taille de lot -> chemin du flatbuffer
+        input_dtype: Type des entrées attendu par le modèle
+        num_threads: Nombre de threads de chaque interpréteur
+    """
+
+    name = "tflite"
+
+    def __init__(self, files: Dict[int, Path], input_dtype: str = "float32", num_threads: int = 1):
+        Interpreter = _tflite_interpreter_class()
+        self.batch_sizes = sorted(files)
+        self._input_dtype = np.dtype(input_dtype)
+        self._interpreters = {}
+        for batch_size in self.batch_sizes:
+            interpreter = Interpreter(model_path=str(files[batch_size]), num_threads=num_threads)
+            interpreter.allocate_tensors()
+            self._interpreters[batch_size] = (
+                interpreter,
+                interpreter.get_input_details()[0]["index"],
+                interpreter.get_output_details()[0]["index"],
+                threading.Lock(),
+            )
+
+    def _invoke(self, batch_size: int, tokens: np.ndarray) -> np.ndarray:
+        interpreter, input_index, output_index, lock = self._interpreters[batch_size]
+        with lock:
+            interpreter.set_tensor(input_index, tokens)
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index).reshape(-1).copy()
+
+    def predict(self, tokens: np.ndarray) -> np.ndarray:
+        tokens = np.asarray(tokens, dtype=self._input_dtype)
+        scores = [
+            self._invoke(batch_size, chunk)[:rows]
+            for batch_size, chunk, rows in split_into_buckets(tokens, self.batch_sizes)
+        ]
+        if not scores:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(scores).astype(np.float32)
+
+
+def _export_endpoint(model, path: Path, batch_size: Optional[int], maxlen: int, input_dtype: str):
+    import keras
+    import tensorflow as tf
+
+    archive = keras.export.ExportArchive()
+    archive.track(model)
+    archive.add_endpoint(
+        name="serve",
+        fn=lambda tokens: model(tokens, training=False)[:, 0],
+        input_signature=[tf.TensorSpec([batch_size, maxlen], tf.as_dtype(input_dtype), name="tokens")],
+    )
+    archive.write_out(str(path), verbose=False)
+
+
+def _tflite_converter(saved_model_dir: Path, quantization: Optional[str]):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(str(saved_model_dir))
+    if quantization is not None:
+        # Quantification post-entraînement des poids (embedding, LSTM, couches denses) ;
+        # les activations restent en float32
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+    return converter
+
+
+def export_model(model, export_dir: Path, maxlen: int, tflite_batch_sizes: Sequence[int] = TFLITE_BATCH_SIZES,
+                 quantization: Optional[str] = None) -> Dict:
+    """
+    Exporte le modèle Keras en SavedModel et en flatbuffers TFLite.
+
+    L'export est écrit dans un répertoire temporaire puis renommé, pour qu'un
+    export interrompu ne soit jamais pris pour un export complet.
+
+    Args:
+        model: Modèle Keras chargé
+        export_dir: Répertoire de destination
+        maxlen: Longueur des séquences d'entrée
+        tflite_batch_sizes: Tailles de lot des flatbuffers TFLite
+        quantization: Quantification des poids des flatbuffers TFLite ('int8', 'float16'
+            ou None), pour les variantes compressées du modèle (voir `quantization.py`)
+
+    Returns:
+        Description de l'export (également écrite dans `export.json`)
+    """
+    import tensorflow as tf
+
+    export_dir = Path(export_dir)
+    input_dtype = tf.as_dtype(model.inputs[0].dtype).name
+    temp_dir = Path(tempfile.mkdtemp(prefix=".export-", dir=export_dir.parent))
+    try:
+        logger.info("Export du modèle en SavedModel...")
+        _export_endpoint(model, temp_dir / "saved_model", None, maxlen, input_dtype)
+
+        tflite_model = model
+        if quantization == "float16":
+            # Embedding float16 d'une variante compressée : TFLite n'a pas de gather en float16
+            from quantization import restore_float32
+            tflite_model = restore_float32(model)
+
+        tflite_files = {}
+        for batch_size in sorted(set(tflite_batch_sizes)):
+            logger.info(f"Export du modèle en TFLite (lots de {batch_size})...")
+            fixed_dir = temp_dir / f"saved_model_b{batch_size}"
+            _export_endpoint(tflite_model, fixed_dir, batch_size, maxlen, input_dtype)
+            flatbuffer = _tflite_converter(fixed_dir, quantization).convert()
+            shutil.rmtree(fixed_dir)
+            filename = f"model_b{batch_size}.tflite"
+            (temp_dir / filename).write_bytes(flatbuffer)
+            tflite_files[str(batch_size)] = filename
+
+        metadata = {
+            "maxlen": maxlen,
+            "input_dtype": input_dtype,
+            "savedmodel": "saved_model",
+            "tflite": tflite_files,
+            "quantization": quantization,
+        }
+        with open(temp_dir / EXPORT_METADATA, "w") as f:
+            json.dump(metadata, f, indent=2)
+
+        if export_dir.exists():
+            shutil.rmtree(export_dir)
+        os.replace(temp_dir, export_dir)
+        logger.info(f"Modèle exporté dans {export_dir}.")
+        return metadata
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def load_export_metadata(export_dir: Path) -> Optional[Dict]:
+    """Renvoie la description d'un export complet, ou None s'il n'existe pas."""
+    path = Path(export_dir) / EXPORT_METADATA
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_keras_model(model_dir: Path):
+    import tensorflow as tf
+    return tf.keras.models.load_model(str(Path(model_dir) / KERAS_MODEL_FILE))
+
+
+def load_runtime(backend: str, model_dir: Path, maxlen: int, tflite_threads: int = 1,
+                 length_buckets: Sequence[int] = (), quantization: Optional[str] = None):
+    """
+    Charge le moteur d'exécution demandé à partir des artefacts de `model_dir`.
+
+    Pour `savedmodel` et `tflite`, le modèle est exporté au premier chargement
+    s'il ne l'a pas déjà été (ou si la longueur des séquences ou la quantification a changé).
+
+    Args:
+        backend: 'compiled', 'keras', 'savedmodel' ou 'tflite'
+        model_dir: Répertoire des artefacts du modèle
+        maxlen: Longueur des séquences d'entrée
+        tflite_threads: Nombre de threads de chaque interpréteur TFLite
+        length_buckets: Longueurs tronquées pré-compilées (moteur `compiled` uniquement ;
+            vide pour désactiver la troncature dynamique)
+        quantization: Quantification des flatbuffers TFLite exportés ('int8', 'float16' ou None)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Moteur d'exécution inconnu: {backend} (valeurs possibles : {', '.join(BACKENDS)})")
+    model_dir = Path(model_dir)
+    if backend == "keras":
+        return KerasRuntime(load_keras_model(model_dir))
+    if backend == "compiled":
+        if length_buckets:
+            return LengthBucketedRuntime(load_keras_model(model_dir), maxlen, length_buckets)
+        return CompiledRuntime(load_keras_model(model_dir), maxlen)
+    if length_buckets:
+        logger.warning(f"La troncature dynamique n'est disponible qu'avec le moteur compiled (moteur {backend}).")
+
+    export_dir = model_dir / EXPORT_DIR
+    metadata = load_export_metadata(export_dir)
+    if metadata is None or metadata["maxlen"] != maxlen or metadata.get("quantization") != quantization:
+        logger.info(f"Aucun export utilisable dans {export_dir} : export du modèle Keras.")
+        model = load_keras_model(model_dir)
+        metadata = export_model(model, export_dir, maxlen, quantization=quantization)
+        del model
+
+    if backend == "savedmodel":
+        return SavedModelRuntime(export_dir / metadata["savedmodel"], metadata["input_dtype"])
+    files = {int(size): export_dir / filename for size, filename in metadata["tflite"].items()}
+    return TFLiteRuntime(files, metadata["input_dtype"], num_threads=tflite_threads)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export du modèle Keras en artefacts d'inférence figés.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Exporter le modèle en SavedModel et TFLite")
+    export_parser.add_argument("--model-dir", type=Path, required=True, help="Répertoire des artefacts du modèle")
+    export_parser.add_argument("--maxlen", type=int, help="Longueur des séquences (défaut : parameters.json)")
+    export_parser.add_argument("--tflite-batch-sizes", type=int, nargs="+", default=list(TFLITE_BATCH_SIZES))
+    export_parser.add_argument("--quantization", choices=["int8", "float16"], help="Quantification des poids TFLite")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    maxlen = args.maxlen
+    if maxlen is None:
+        with open(args.model_dir / "parameters.json") as f:
+            maxlen = json.load(f).get("max_sequence_length", 100)
+    export_model(load_keras_model(args.model_dir), args.model_dir / EXPORT_DIR, maxlen, args.tflite_batch_sizes,
+                 args.quantization)
+
+
+if __name__ == "__main__":
+    main()
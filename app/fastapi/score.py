@@ -0,0 +1,384 @@
+"""
+Scoring hors ligne de gros fichiers de tweets, sans démarrer l'API.
+
+Le fichier d'entrée (CSV, Parquet, NDJSON ou texte brut) est lu par morceaux,
+répartis sur plusieurs processus qui chargent chacun le modèle une seule fois
+depuis le répertoire local `model/`. Les résultats sont écrits dans l'ordre
+d'entrée (CSV, NDJSON, ou un répertoire de fichiers Parquet). Un point de
+reprise est enregistré après chaque morceau : une exécution interrompue
+reprend là où elle s'était arrêtée.
+
+Le modèle est chargé par `inference.py`, avec les mêmes variables d'environnement
+que l'API (MODEL_BACKEND, MODEL_VARIANT, TFLITE_THREADS, SEQUENCE_LENGTH_BUCKETS,
+TF_INTRA_OP_THREADS), sans importer `main.py` ni ses bases et sa télémétrie.
+
+Usage :
+    python score.py tweets.csv scores.csv --text-column text --id-column tweet_id --workers 4
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("score")
+
+# Colonnes écrites pour chaque ligne d'entrée
+OUTPUT_FIELDS = ["id", "sentiment", "confidence", "raw_score"]
+
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".txt": "text",
+}
+
+# Un morceau d'entrée : liste de (identifiant, texte)
+Chunk = List[Tuple[Any, str]]
+
+
+def detect_format(path: Path, explicit: Optional[str] = None) -> str:
+    """Déduit le format d'un fichier à partir de son extension."""
+    if explicit:
+        return explicit
+    suffix = path.suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Format non reconnu pour {path.name} ; précisez-le avec --input-format/--output-format.")
+    return FORMATS[suffix]
+
+
+def read_chunks(path: Path, fmt: str, chunk_size: int, text_column: str, id_column: Optional[str],
+                skip_rows: int = 0) -> Iterator[Chunk]:
+    """
+    Lit le fichier d'entrée par morceaux de `chunk_size` lignes.
+
+    Sans colonne d'identifiant, le numéro de ligne (à partir de 0) est utilisé.
+
+    Args:
+        path: Fichier d'entrée
+        fmt: Format du fichier ('csv', 'parquet', 'ndjson' ou 'text')
+        chunk_size: Nombre de lignes par morceau
+        text_column: Colonne (ou champ JSON) contenant le texte
+        id_column: Colonne (ou champ JSON) contenant l'identifiant
+        skip_rows: Nombre de lignes déjà traitées à ignorer (reprise)
+    """
+    chunk: Chunk = []
+    for row_number, (row_id, text) in enumerate(_iter_rows(path, fmt, chunk_size, text_column, id_column)):
+        if row_number < skip_rows:
+            continue
+        chunk.append((row_number if row_id is None else row_id, "" if text is None else str(text)))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_rows(path: Path, fmt: str, chunk_size: int, text_column: str, id_column: Optional[str]):
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames is None or text_column not in reader.fieldnames:
+                raise ValueError(f"La colonne '{text_column}' est absente de {path.name}.")
+            for row in reader:
+                yield (row[id_column] if id_column else None), row[text_column]
+    elif fmt == "ndjson":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                document = json.loads(line)
+                yield (document.get(id_column) if id_column else None), document.get(text_column)
+    elif fmt == "text":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                yield None, line.rstrip("\r\n")
+    elif fmt == "parquet":
+        parquet = _import_pyarrow_parquet()
+        columns = [text_column] + ([id_column] if id_column else [])
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            texts = batch.column(text_column).to_pylist()
+            ids = batch.column(id_column).to_pylist() if id_column else [None] * len(texts)
+            yield from zip(ids, texts)
+    else:
+        raise ValueError(f"Format d'entrée non pris en charge: {fmt}")
+
+
+def _import_pyarrow_parquet():
+    try:
+        import pyarrow.parquet as parquet
+    except ImportError:
+        raise RuntimeError("Le format Parquet nécessite pyarrow : pip install pyarrow")
+    return parquet
+
+
+class ResultWriter:
+    """
+    Écrit les résultats dans l'ordre, en ajout, et sait revenir au dernier point de reprise.
+
+    Pour le CSV et le NDJSON, la position (en octets) après chaque morceau est
+    enregistrée dans le point de reprise, et le fichier est tronqué à cette
+    position à la reprise. Pour le Parquet, `output` est un répertoire qui
+    contient un fichier par morceau.
+    """
+
+    def __init__(self, output: Path, fmt: str, resume_position: Optional[int] = None, chunks_done: int = 0):
+        self.output = output
+        self.fmt = fmt
+        self.chunks_done = chunks_done
+
+        if fmt == "parquet":
+            self._parquet = _import_pyarrow_parquet()
+            output.mkdir(parents=True, exist_ok=True)
+            # Supprimer les morceaux écrits après le dernier point de reprise
+            for part in output.glob("part-*.parquet"):
+                if int(part.stem.split("-")[1]) >= chunks_done:
+                    part.unlink()
+            self._file = None
+            return
+
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"Format de sortie non pris en charge: {fmt}")
+        if resume_position is None:
+            self._file = open(output, "w", newline="", encoding="utf-8")
+            if fmt == "csv":
+                csv.writer(self._file).writerow(OUTPUT_FIELDS)
+        else:
+            self._file = open(output, "r+", newline="", encoding="utf-8")
+            self._file.seek(resume_position)
+            self._file.truncate()
+
+    def write(self, chunk: Chunk, results: List[Dict[str, Any]]):
+        rows = [{"id": row_id, **result} for (row_id, _), result in zip(chunk, results)]
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            table = pa.Table.from_pylist(rows)
+            self._parquet.write_table(table, self.output / f"part-{self.chunks_done:06d}.parquet")
+        elif self.fmt == "csv":
+            writer = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS)
+            writer.writerows(rows)
+        else:
+            self._file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        self.chunks_done += 1
+
+    def position(self) -> Optional[int]:
+        """Vide les tampons sur disque et renvoie la position courante dans le fichier."""
+        if self._file is None:
+            return None
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def load_checkpoint(path: Path, fingerprint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Renvoie le point de reprise s'il correspond à la même entrée et aux mêmes réglages."""
+    if not path.exists():
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("fingerprint") != fingerprint:
+        logger.warning("Point de reprise ignoré : l'entrée ou les réglages ont changé.")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path: Path, checkpoint: Dict[str, Any]):
+    """Enregistre le point de reprise de façon atomique."""
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def default_model_dir() -> Path:
+    """Répertoire des artefacts de l'exécution `RUN_ID` dans le magasin local, sinon `model/`."""
+    model_dir = Path(__file__).resolve().parent / "model"
+    run_id = os.getenv("RUN_ID")
+    if run_id and (model_dir / "runs" / run_id).is_dir():
+        return model_dir / "runs" / run_id
+    return model_dir
+
+
+# Modèle chargé une seule fois par processus de travail
+_worker_model_pack = None
+
+
+def _init_worker(model_dir: str):
+    # `inference` et non `main` : un processus de travail ne construit pas l'application,
+    # n'ouvre pas ses bases et n'envoie pas de télémétrie
+    global _worker_model_pack
+    from inference import load_model, options_from_env
+    _worker_model_pack = load_model(None, Path(model_dir), **options_from_env())
+
+
+def _score_chunk(chunk: Chunk) -> List[Dict[str, Any]]:
+    from inference import predict_sentiment_batch
+    return predict_sentiment_batch([text for _, text in chunk], _worker_model_pack)
+
+
+def run(
+    chunks: Iterator[Chunk],
+    writer: ResultWriter,
+    on_chunk_written: Callable[[int], None],
+    score_chunk: Callable[[Chunk], List[Dict[str, Any]]],
+    workers: int = 1,
+    initializer: Optional[Callable] = None,
+    initargs: tuple = (),
+) -> int:
+    """
+    Score les morceaux sur `workers` processus et écrit les résultats dans l'ordre.
+
+    Au plus deux morceaux par processus sont en vol, ce qui borne la mémoire
+    quelle que soit la taille de l'entrée.
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    rows_written = 0
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for chunk in chunks:
+            writer.write(chunk, score_chunk(chunk))
+            rows_written += len(chunk)
+            on_chunk_written(len(chunk))
+        return rows_written
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(score_chunk, (chunk,))))
+            while len(pending) >= workers * 2:
+                done_chunk, result = pending.popleft()
+                writer.write(done_chunk, result.get())
+                rows_written += len(done_chunk)
+                on_chunk_written(len(done_chunk))
+        while pending:
+            done_chunk, result = pending.popleft()
+            writer.write(done_chunk, result.get())
+            rows_written += len(done_chunk)
+            on_chunk_written(len(done_chunk))
+    return rows_written
+
+
+def score_file(
+    input_path: Path,
+    output_path: Path,
+    input_format: Optional[str] = None,
+    output_format: Optional[str] = None,
+    text_column: str = "text",
+    id_column: Optional[str] = None,
+    chunk_size: int = 2048,
+    workers: int = 1,
+    model_dir: Optional[Path] = None,
+    checkpoint_path: Optional[Path] = None,
+    restart: bool = False,
+    score_chunk: Callable[[Chunk], List[Dict[str, Any]]] = _score_chunk,
+    initializer: Optional[Callable] = _init_worker,
+) -> int:
+    """
+    Score un fichier complet, avec reprise sur point de contrôle.
+
+    Returns:
+        Nombre de lignes traitées lors de cette exécution
+    """
+    input_format = detect_format(input_path, input_format)
+    if output_format is None:
+        output_format = detect_format(output_path) if output_path.suffix else "parquet"
+    model_dir = model_dir or default_model_dir()
+    checkpoint_path = checkpoint_path or output_path.with_name(output_path.name + ".checkpoint.json")
+
+    stat = input_path.stat()
+    fingerprint = {
+        "input": str(input_path.resolve()),
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "output_format": output_format,
+        "chunk_size": chunk_size,
+        "text_column": text_column,
+        "id_column": id_column,
+    }
+    checkpoint = None if restart else load_checkpoint(checkpoint_path, fingerprint)
+    if checkpoint is not None:
+        logger.info(f"Reprise après {checkpoint['rows_done']} lignes déjà traitées.")
+    else:
+        checkpoint = {"fingerprint": fingerprint, "rows_done": 0, "chunks_done": 0, "output_position": None}
+
+    writer = ResultWriter(
+        output_path, output_format,
+        resume_position=checkpoint["output_position"] if checkpoint["chunks_done"] else None,
+        chunks_done=checkpoint["chunks_done"],
+    )
+    chunks = read_chunks(input_path, input_format, chunk_size, text_column, id_column,
+                         skip_rows=checkpoint["rows_done"])
+
+    started_at = time.perf_counter()
+    rows_at_start = checkpoint["rows_done"]
+
+    def on_chunk_written(rows: int):
+        checkpoint["rows_done"] += rows
+        checkpoint["chunks_done"] = writer.chunks_done
+        checkpoint["output_position"] = writer.position()
+        save_checkpoint(checkpoint_path, checkpoint)
+        elapsed = time.perf_counter() - started_at
+        rate = (checkpoint["rows_done"] - rows_at_start) / elapsed if elapsed > 0 else 0.0
+        logger.info(f"{checkpoint['rows_done']} lignes traitées ({rate:.0f} lignes/s)")
+
+    try:
+        total = run(chunks, writer, on_chunk_written, score_chunk, workers=workers,
+                    initializer=initializer, initargs=(str(model_dir),))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started_at
+    logger.info(f"Terminé : {total} lignes en {elapsed:.1f} s ({total / elapsed if elapsed else 0:.0f} lignes/s).")
+    checkpoint_path.unlink(missing_ok=True)
+    return total
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="Fichier d'entrée (.csv, .parquet, .ndjson/.jsonl ou .txt)")
+    parser.add_argument("output", type=Path, help="Fichier de sortie (.csv, .ndjson) ou répertoire Parquet")
+    parser.add_argument("--input-format", choices=sorted(set(FORMATS.values())))
+    parser.add_argument("--output-format", choices=["csv", "ndjson", "parquet"])
+    parser.add_argument("--text-column", default="text", help="Colonne contenant le texte (défaut : text)")
+    parser.add_argument("--id-column", help="Colonne contenant l'identifiant (défaut : numéro de ligne)")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="Nombre de lignes par morceau")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus de scoring")
+    parser.add_argument("--model-dir", type=Path, help="Répertoire des artefacts du modèle (défaut : model/runs/$RUN_ID, ou model/)")
+    parser.add_argument("--checkpoint", type=Path, help="Fichier de reprise (défaut : <sortie>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignorer le point de reprise existant")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    score_file(
+        args.input, args.output,
+        input_format=args.input_format,
+        output_format=args.output_format,
+        text_column=args.text_column,
+        id_column=args.id_column,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        model_dir=args.model_dir,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
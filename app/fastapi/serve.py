@@ -0,0 +1,209 @@
+"""
+Service de l'API sur plusieurs processus (pré-fork), pour utiliser tous les cœurs.
+
+Le processus maître ouvre le socket d'écoute, importe l'application et précharge
+une seule fois ce qui est volumineux et en lecture seule côté Python : artefacts
+téléchargés, vocabulaire projeté en mémoire, encodeur, données WordNet de NLTK et
+modules de TensorFlow (voir `main.preload_shared_artifacts`). Ces objets sont
+gelés (`gc.freeze`, pour que le ramasse-miettes n'écrive pas dans leurs pages)
+puis le maître crée les processus de service par `fork` : leurs pages restent
+partagées en copie sur écriture. Chaque processus construit ensuite son propre
+moteur TensorFlow (les poids du modèle et ses fonctions compilées) au démarrage
+de l'application, sur le socket hérité du maître.
+
+Le maître relance un processus qui s'arrête de façon inattendue, transmet
+SIGTERM/SIGINT à tous les processus et attend leur arrêt propre.
+
+Usage :
+    python serve.py --workers 4 --port 8000
+    API_WORKERS=4 PORT=8000 python serve.py
+
+Le nombre de processus vient de API_WORKERS, et non de WEB_CONCURRENCY : le buildpack
+Python de Heroku fixe ce dernier d'après la taille du dyno, et chaque processus charge
+son propre moteur TensorFlow. Plusieurs processus ne sont lancés que sur demande explicite.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("serve")
+
+# Délai (en secondes) accordé aux processus pour s'arrêter proprement avant SIGKILL
+STOP_TIMEOUT = 30.0
+
+# Un processus qui s'arrête moins de CRASH_WINDOW secondes après son démarrage compte comme
+# un échec de démarrage ; après MAX_CRASHES échecs consécutifs, le maître abandonne
+CRASH_WINDOW = 10.0
+MAX_CRASHES = 5
+
+
+def default_workers() -> int:
+    """Nombre de processus par défaut : API_WORKERS, sinon 1 (WEB_CONCURRENCY est ignoré)."""
+    return max(1, int(os.getenv("API_WORKERS", "1")))
+
+
+def threads_per_worker(workers: int, cpu_count: Optional[int] = None) -> int:
+    """Threads de calcul de TensorFlow par processus, pour que N processus se partagent les cœurs sans les surcharger."""
+    if cpu_count is None:
+        cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, (cpu_count or 1) // max(1, workers))
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Ouvre le socket d'écoute partagé par tous les processus de service."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """
+    Importe l'application et précharge les artefacts partagés dans le processus maître,
+    puis gèle les objets existants pour les exclure des passes du ramasse-miettes.
+    """
+    import main
+
+    started = time.perf_counter()
+    artifacts_dir = main.preload_shared_artifacts(main.run_id)
+    if artifacts_dir is None:
+        logger.warning("Préchargement impossible : chaque processus chargera ses artefacts lui-même.")
+    else:
+        logger.info(f"Artefacts préchargés depuis {artifacts_dir} en {time.perf_counter() - started:.1f} s.")
+    gc.collect()
+    gc.freeze()
+    return main.app
+
+
+def run_worker(app, sock: socket.socket, log_level: str) -> int:
+    """Sert l'application sur le socket hérité du maître (dans le processus de service)."""
+    import uvicorn
+
+    config = uvicorn.Config(app, lifespan="on", log_level=log_level, timeout_graceful_shutdown=STOP_TIMEOUT)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0
+
+
+class Supervisor:
+    """
+    Processus maître : crée `workers` processus de service par fork, relance ceux qui
+    s'arrêtent et les arrête tous à la réception de SIGTERM ou SIGINT.
+
+    Args:
+        app: Application ASGI, importée (et ses artefacts préchargés) avant le fork
+        sock: Socket d'écoute hérité par les processus
+        workers: Nombre de processus de service
+        log_level: Niveau de log d'uvicorn
+    """
+
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str = "info"):
+        self.app = app
+        self.sock = sock
+        self.workers = max(1, int(workers))
+        self.log_level = log_level
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        self.crashes = 0
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 1
+            try:
+                code = run_worker(self.app, self.sock, self.log_level)
+            except BaseException:
+                logger.exception("Arrêt inattendu du processus de service.")
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Processus de service {pid} démarré.")
+
+    def stop(self, signum=None, frame=None):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Arrêt des {len(self.children)} processus de service...")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        """Boucle du maître ; renvoie le code de sortie du service."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        deadline = None
+        while self.children:
+            if self.stopping and deadline is None:
+                deadline = time.monotonic() + STOP_TIMEOUT
+            if deadline is not None and time.monotonic() > deadline:
+                for pid in list(self.children):
+                    logger.warning(f"Le processus {pid} ne s'est pas arrêté à temps : SIGKILL.")
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                deadline = float("inf")
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning(f"Le processus de service {pid} s'est arrêté (code {os.waitstatus_to_exitcode(status)}).")
+            self.crashes = self.crashes + 1 if time.monotonic() - started < CRASH_WINDOW else 0
+            if self.crashes >= MAX_CRASHES:
+                logger.error(f"{self.crashes} échecs de démarrage consécutifs : arrêt du service.")
+                self.stop()
+                continue
+            self.spawn()
+
+        self.sock.close()
+        return 1 if self.crashes >= MAX_CRASHES else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Nombre de processus de service")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Répartir les cœurs entre les processus, sauf si TF_INTRA_OP_THREADS est déjà fixé
+    os.environ.setdefault("TF_INTRA_OP_THREADS", str(threads_per_worker(args.workers)))
+
+    sock = bind_socket(args.host, args.port)
+    app = preload()
+    if args.workers == 1:
+        return run_worker(app, sock, args.log_level)
+
+    logger.info(f"Service sur http://{args.host}:{args.port} avec {args.workers} processus (maître {os.getpid()}).")
+    return Supervisor(app, sock, args.workers, args.log_level).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
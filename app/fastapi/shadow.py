@@ -0,0 +1,209 @@
+# Routage d'une partie du trafic vers un modèle candidat : miroir (shadow) et canari
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Nombre de durées conservées pour le calcul des percentiles
+LATENCY_WINDOW = 2048
+
+
+class LatencyWindow:
+    """Conserve les `size` dernières durées (en secondes) et en calcule les percentiles."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            samples = np.array(self._samples)
+            count = self._count
+        if not len(samples):
+            return {"count": count, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000.0
+        return {
+            "count": count,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(samples.max() * 1000.0),
+        }
+
+
+class TrafficRouter:
+    """
+    Expose un modèle candidat à une partie du trafic réel avant sa promotion.
+
+    - Miroir (shadow) : une fraction `shadow_fraction` des requêtes servies par le
+      modèle par défaut est rejouée sur le candidat en tâche de fond, une fois la
+      réponse obtenue ; la latence de la réponse n'en dépend pas. Les deux
+      prédictions sont comparées (taux de désaccord, écart des scores bruts).
+    - Canari : une fraction `canary_fraction` des requêtes est réellement servie
+      par le candidat.
+
+    Les latences des deux modèles sont mesurées pour la même requête, du point de
+    vue de l'appelant (la latence du modèle par défaut comprend l'attente du
+    micro-batcher).
+
+    Args:
+        candidate: Identifiant du modèle candidat (None : routage désactivé)
+        shadow_fraction: Fraction des requêtes rejouées en miroir sur le candidat
+        canary_fraction: Fraction des requêtes servies par le candidat
+        max_shadow_in_flight: Nombre maximal de requêtes miroir simultanées ; au-delà,
+            elles sont abandonnées pour ne pas concurrencer le trafic réel. Le `runner`
+            passé à `mirror` doit lui-même s'exécuter en basse priorité (par exemple
+            `InferenceExecutor.run_background`)
+        seed: Graine du tirage aléatoire (tests)
+    """
+
+    def __init__(self, candidate: Optional[str] = None, shadow_fraction: float = 0.0, canary_fraction: float = 0.0,
+                 max_shadow_in_flight: int = 4, seed: Optional[int] = None):
+        self.max_shadow_in_flight = max(1, int(max_shadow_in_flight))
+        self._random = random.Random(seed)
+        self._tasks = set()
+        self.configure(candidate, shadow_fraction, canary_fraction)
+
+    def configure(self, candidate: Optional[str], shadow_fraction: float = 0.0, canary_fraction: float = 0.0):
+        """Change le candidat et les fractions du trafic ; les statistiques repartent de zéro."""
+        for name, fraction in (("shadow_fraction", shadow_fraction), ("canary_fraction", canary_fraction)):
+            if not 0.0 <= fraction <= 1.0:
+                raise ValueError(f"{name} doit être compris entre 0 et 1 (reçu : {fraction}).")
+        self.candidate = candidate or None
+        self.shadow_fraction = float(shadow_fraction)
+        self.canary_fraction = float(canary_fraction)
+        self.configured_at = time.time()
+
+        self._primary_latency = LatencyWindow()
+        self._shadow_latency = LatencyWindow()
+        self._canary_latency = LatencyWindow()
+        self._mirrored = 0
+        self._dropped = 0
+        self._shadow_errors = 0
+        self._canary_requests = 0
+        self._canary_fallbacks = 0
+        self._compared = 0
+        self._disagreements = 0
+        self._score_diff_total = 0.0
+        self._score_diff_max = 0.0
+        self._primary_positive = 0
+        self._candidate_positive = 0
+        if self.candidate:
+            logger.info(f"Routage vers le candidat {self.candidate} : miroir {self.shadow_fraction:.0%}, "
+                        f"canari {self.canary_fraction:.0%}.")
+
+    def choose(self) -> Optional[str]:
+        """Renvoie le candidat si la requête est tirée pour le canari, sinon None (modèle par défaut)."""
+        if self.candidate and self.canary_fraction > 0 and self._random.random() < self.canary_fraction:
+            self._canary_requests += 1
+            return self.candidate
+        return None
+
+    def record_primary(self, seconds: float):
+        """Enregistre la latence d'une requête servie par le modèle par défaut."""
+        self._primary_latency.add(seconds)
+
+    def record_canary(self, seconds: float):
+        """Enregistre la latence d'une requête servie par le candidat."""
+        self._canary_latency.add(seconds)
+
+    def record_canary_fallback(self):
+        """Compte une requête canari servie par le modèle par défaut faute de candidat chargé."""
+        self._canary_fallbacks += 1
+
+    def mirror(self, texts: List[str], primary_results: List[Dict[str, Any]],
+               runner: Callable[[List[str], Optional[str]], Awaitable[List[Dict[str, Any]]]]):
+        """
+        Rejoue éventuellement une requête sur le candidat, en tâche de fond.
+
+        Doit être appelée depuis la boucle d'événements, après l'obtention de la
+        réponse du modèle par défaut.
+
+        Args:
+            texts: Textes de la requête
+            primary_results: Résultats du modèle par défaut
+            runner: Coroutine `(textes, identifiant du modèle) -> résultats`
+        """
+        if not self.candidate or self.shadow_fraction <= 0 or self._random.random() >= self.shadow_fraction:
+            return
+        if len(self._tasks) >= self.max_shadow_in_flight:
+            self._dropped += 1
+            return
+        self._mirrored += 1
+        task = asyncio.create_task(self._shadow(self.candidate, texts, primary_results, runner))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _shadow(self, candidate: str, texts: List[str], primary_results: List[Dict[str, Any]], runner):
+        started = time.perf_counter()
+        try:
+            results = await runner(texts, candidate)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._shadow_errors += 1
+            logger.debug(f"Échec de la requête miroir sur {candidate}: {str(e)}")
+            return
+        if candidate != self.candidate:
+            # Le candidat a changé pendant la requête : ne pas mélanger les statistiques
+            return
+        self._shadow_latency.add(time.perf_counter() - started)
+        for primary, shadow in zip(primary_results, results):
+            diff = abs(primary["raw_score"] - shadow["raw_score"])
+            self._compared += 1
+            self._disagreements += primary["sentiment"] != shadow["sentiment"]
+            self._primary_positive += primary["sentiment"] == "Positif"
+            self._candidate_positive += shadow["sentiment"] == "Positif"
+            self._score_diff_total += diff
+            self._score_diff_max = max(self._score_diff_max, diff)
+
+    async def stop(self):
+        """Annule les requêtes miroir en cours (arrêt de l'application)."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Renvoie la configuration, le désaccord entre les modèles et leurs distributions de latence."""
+        compared = self._compared
+        return {
+            "candidate": self.candidate,
+            "shadow_fraction": self.shadow_fraction,
+            "canary_fraction": self.canary_fraction,
+            "configured_at": self.configured_at,
+            "shadow": {
+                "mirrored_requests": self._mirrored,
+                "dropped_requests": self._dropped,
+                "errors": self._shadow_errors,
+                "in_flight": len(self._tasks),
+                "compared_predictions": compared,
+                "disagreements": self._disagreements,
+                "disagreement_rate": self._disagreements / compared if compared else 0.0,
+                "mean_abs_score_diff": self._score_diff_total / compared if compared else 0.0,
+                "max_abs_score_diff": self._score_diff_max,
+                "primary_positive_rate": self._primary_positive / compared if compared else 0.0,
+                "candidate_positive_rate": self._candidate_positive / compared if compared else 0.0,
+            },
+            "canary": {
+                "requests": self._canary_requests,
+                "fallbacks": self._canary_fallbacks,
+            },
+            "latency": {
+                "primary": self._primary_latency.as_dict(),
+                "shadow": self._shadow_latency.as_dict(),
+                "canary": self._canary_latency.as_dict(),
+            },
+        }
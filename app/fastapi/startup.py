@@ -0,0 +1,103 @@
+# Suivi du démarrage de l'API : phases, progression et durées
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Phases successives du démarrage
+STARTING = "starting"
+DOWNLOADING = "downloading"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class StartupState:
+    """
+    État du démarrage de l'API, partagé entre le chargement en arrière-plan et
+    les endpoints de santé.
+
+    Chaque phase (téléchargement des artefacts, chargement du modèle, préchauffage)
+    est chronométrée ; la durée de chaque phase et la durée totale sont journalisées
+    pour suivre le démarrage à froid.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.reset()
+
+    def reset(self):
+        """Remet l'état à zéro au début d'un nouveau démarrage."""
+        with self._lock:
+            self.status = STARTING
+            self.error: Optional[str] = None
+            self.failed_phase: Optional[str] = None
+            self.durations: Dict[str, float] = {}
+            self._started_at = time.perf_counter()
+            self._phase_started_at = self._started_at
+            self._done.clear()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def record(self, name: str, seconds: float):
+        """Enregistre la durée d'une phase mesurée ailleurs (par exemple les imports)."""
+        with self._lock:
+            self.durations[name] = seconds
+        logger.info(f"Démarrage - phase {name} : {seconds:.2f} s")
+
+    @contextmanager
+    def phase(self, name: str):
+        """Passe dans la phase `name` et la chronomètre."""
+        with self._lock:
+            self.status = name
+            self._phase_started_at = time.perf_counter()
+        logger.info(f"Démarrage - début de la phase {name}")
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - self._phase_started_at)
+
+    def mark_ready(self):
+        """Termine le démarrage avec succès et journalise le récapitulatif des durées."""
+        with self._lock:
+            self.status = READY
+            self.durations["total"] = time.perf_counter() - self._started_at
+        breakdown = ", ".join(f"{name}: {seconds:.2f} s" for name, seconds in self.durations.items())
+        logger.info(f"Démarrage terminé ({breakdown})")
+        self._done.set()
+
+    def fail(self, error: str):
+        """Termine le démarrage en échec."""
+        with self._lock:
+            self.error = error
+            self.durations["total"] = time.perf_counter() - self._started_at
+            self.failed_phase = self.status
+            self.status = FAILED
+        logger.error(f"Échec du démarrage pendant la phase {self.failed_phase}: {error}")
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin du démarrage (succès ou échec) ; renvoie True s'il est terminé."""
+        return self._done.wait(timeout)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Renvoie l'état courant, la durée écoulée et la durée de chaque phase terminée."""
+        with self._lock:
+            elapsed = self.durations.get("total", time.perf_counter() - self._started_at)
+            snapshot = {
+                "status": self.status,
+                "ready": self.status == READY,
+                "elapsed_seconds": round(elapsed, 3),
+                "phases": {name: round(seconds, 3) for name, seconds in self.durations.items() if name != "total"},
+            }
+            if self.error is not None:
+                snapshot["error"] = self.error
+                snapshot["failed_phase"] = self.failed_phase
+        return snapshot
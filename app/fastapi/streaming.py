@@ -0,0 +1,117 @@
+# Lecture et écriture des flux NDJSON de l'endpoint /predict-stream
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Types de contenu pour lesquels chaque ligne est un document JSON
+JSON_LINES_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json")
+
+# Taille maximale d'une ligne ; au-delà, la ligne est ignorée et signalée en erreur
+MAX_LINE_BYTES = 64 * 1024
+
+
+class StreamLine:
+    """
+    Ligne d'entrée du flux, avec son identifiant, son texte ou son erreur.
+
+    Args:
+        id: Identifiant de la ligne (fourni par le client ou numéro de ligne)
+        text: Texte à analyser, ou None si la ligne est invalide
+        error: Message d'erreur si la ligne est invalide
+    """
+
+    __slots__ = ("id", "text", "error")
+
+    def __init__(self, id: Any, text: Optional[str] = None, error: Optional[str] = None):
+        self.id = id
+        self.text = text
+        self.error = error
+
+
+async def iter_lines(chunks: AsyncIterable[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Tuple[int, Optional[str]]]:
+    """
+    Découpe un flux d'octets en lignes, sans jamais le charger en entier.
+
+    Args:
+        chunks: Flux d'octets (par exemple `request.stream()`)
+        max_line_bytes: Taille maximale d'une ligne
+
+    Yields:
+        Tuples (numéro de ligne, texte) ; le texte vaut None pour une ligne trop longue
+    """
+    buffer = b""
+    line_number = 0
+    overflow = False
+    async for chunk in chunks:
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if overflow or len(line) > max_line_bytes:
+                overflow = False
+                yield line_number, None
+            else:
+                yield line_number, line.rstrip(b"\r").decode("utf-8", errors="replace")
+            line_number += 1
+        if len(buffer) > max_line_bytes:
+            # Ligne trop longue : abandonner le début et ignorer la suite jusqu'au prochain saut de ligne
+            overflow = True
+            buffer = b""
+    if overflow:
+        yield line_number, None
+    elif buffer:
+        yield line_number, buffer.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def parse_line(line_number: int, line: Optional[str], json_lines: bool) -> Optional[StreamLine]:
+    """
+    Interprète une ligne du flux.
+
+    En mode JSON, une ligne est soit un objet `{"id": ..., "text": ...}`
+    (l'identifiant est facultatif), soit une chaîne JSON. Sinon, la ligne
+    entière est le texte. Sans identifiant fourni, le numéro de ligne est utilisé.
+
+    Returns:
+        La ligne interprétée, ou None pour une ligne vide
+    """
+    if line is None:
+        return StreamLine(line_number, error=f"Ligne trop longue (plus de {MAX_LINE_BYTES} octets).")
+    if not line.strip():
+        return None
+    if not json_lines:
+        return StreamLine(line_number, text=line)
+
+    try:
+        document = json.loads(line)
+    except ValueError as e:
+        return StreamLine(line_number, error=f"JSON invalide: {str(e)}")
+    if isinstance(document, str):
+        return StreamLine(line_number, text=document)
+    if isinstance(document, dict) and isinstance(document.get("text"), str):
+        return StreamLine(document.get("id", line_number), text=document["text"])
+    return StreamLine(line_number, error="Chaque ligne doit être une chaîne ou un objet avec un champ 'text'.")
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Réponse en flux qui peut lire le corps de la requête pendant qu'elle répond.
+
+    `StreamingResponse` écoute la déconnexion du client en parallèle de l'envoi,
+    ce qui consomme les messages du corps de la requête encore en cours de
+    lecture. Ici, la déconnexion est détectée par la lecture du corps elle-même.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def format_result(line: StreamLine, result: Optional[Dict[str, Any]] = None) -> bytes:
+    """Sérialise le résultat (ou l'erreur) d'une ligne en NDJSON."""
+    if result is None:
+        document = {"id": line.id, "error": line.error}
+    else:
+        document = {"id": line.id, **result}
+    return (json.dumps(document, ensure_ascii=False) + "\n").encode("utf-8")
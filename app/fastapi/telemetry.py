@@ -0,0 +1,213 @@
+# Envoi de la télémétrie en arrière-plan, par lots, sans bloquer les requêtes
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AppInsightsSink:
+    """
+    Envoie les lots à Azure Application Insights : les éléments sont ajoutés au
+    client, puis un seul `flush` (un aller-retour réseau) est fait par lot.
+
+    Args:
+        client: `applicationinsights.TelemetryClient` configuré
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def send(self, items: List[Dict[str, Any]]):
+        for item in items:
+            if item["type"] == "event":
+                self.client.track_event(name=item["name"], properties=item["properties"])
+            else:
+                self.client.track_metric(item["name"], item["value"], properties=item["properties"])
+        self.client.flush()
+
+
+class MemorySink:
+    """Puits local (tests et développement) : conserve en mémoire les lots reçus."""
+
+    def __init__(self):
+        self.batches: List[List[Dict[str, Any]]] = []
+
+    def send(self, items: List[Dict[str, Any]]):
+        self.batches.append(list(items))
+
+    @property
+    def items(self) -> List[Dict[str, Any]]:
+        return [item for batch in self.batches for item in batch]
+
+
+class _FlushRequest:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class TelemetryQueue:
+    """
+    File bornée de télémétrie, vidée par un thread de fond.
+
+    `track_event` et `track_metric` ne font qu'ajouter un élément à la file ;
+    le thread de fond regroupe les éléments et les envoie au puits dès que
+    `batch_size` éléments sont en attente ou que le plus ancien attend depuis
+    `flush_interval` secondes. Si la file est pleine, l'élément est abandonné et
+    compté plutôt que de bloquer la requête. Sans puits, la télémétrie est désactivée.
+
+    Args:
+        sink: Objet exposant `send(items)` (par exemple `AppInsightsSink` ou `MemorySink`), ou None
+        max_queue: Nombre maximal d'éléments en attente
+        batch_size: Nombre maximal d'éléments par envoi
+        flush_interval: Délai maximal (en secondes) avant l'envoi d'un lot incomplet
+    """
+
+    def __init__(self, sink=None, max_queue: int = 1000, batch_size: int = 50, flush_interval: float = 5.0):
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+        self._enqueued = 0
+        self._dropped = 0
+        self._sent = 0
+        self._batches = 0
+        self._failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink is not None
+
+    def track_event(self, name: str, properties: Optional[Dict[str, str]] = None) -> bool:
+        """Ajoute un événement à la file ; renvoie False s'il est abandonné."""
+        return self._put({"type": "event", "name": name, "properties": properties or {}})
+
+    def track_metric(self, name: str, value: float, properties: Optional[Dict[str, str]] = None) -> bool:
+        """Ajoute une métrique à la file ; renvoie False si elle est abandonnée."""
+        return self._put({"type": "metric", "name": name, "value": value, "properties": properties or {}})
+
+    def _put(self, item: Dict[str, Any]) -> bool:
+        if self.sink is None:
+            return False
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._dropped += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    def start(self):
+        """Démarre le thread d'envoi (sans effet si la télémétrie est désactivée ou déjà démarrée)."""
+        if self.sink is None or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Envoie les éléments encore en attente puis arrête le thread d'envoi."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Arrêt de la télémétrie : {self._queue.qsize()} éléments non envoyés.")
+        self._thread = None
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Attend l'envoi de tous les éléments ajoutés avant l'appel ; renvoie False en cas d'expiration."""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def _run(self):
+        batch: List[Dict[str, Any]] = []
+        deadline: Optional[float] = None
+        while True:
+            timeout = 0.1 if deadline is None else max(0.0, min(0.1, deadline - time.monotonic()))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _FlushRequest):
+                self._send(batch)
+                batch, deadline = [], None
+                item.done.set()
+                continue
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            stopping = self._stopping.is_set() and self._queue.empty()
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or stopping):
+                self._send(batch)
+                batch, deadline = [], None
+            if stopping:
+                return
+
+    def _send(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        try:
+            self.sink.send(batch)
+        except Exception as e:
+            self._failed += len(batch)
+            logger.warning(f"Échec de l'envoi de {len(batch)} éléments de télémétrie: {str(e)}")
+            return
+        self._sent += len(batch)
+        self._batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Renvoie les compteurs de la file (ajoutés, abandonnés, envoyés, en échec)."""
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self._enqueued,
+            "dropped": self._dropped,
+            "sent": self._sent,
+            "batches": self._batches,
+            "failed": self._failed,
+        }
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """`QueueHandler` sur une file bornée : un enregistrement est abandonné (et compté) si la file est pleine."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def queued_log_handler(handler: logging.Handler, max_queue: int = 1000) -> Tuple[DroppingQueueHandler, logging.handlers.QueueListener]:
+    """
+    Place un gestionnaire de logs lent (par exemple `AzureLogHandler`) derrière une
+    file bornée : le logger ne fait qu'ajouter l'enregistrement à la file, et
+    l'écouteur renvoyé le transmet au gestionnaire depuis son propre thread.
+
+    Returns:
+        Gestionnaire à ajouter au logger, et écouteur à démarrer et arrêter avec l'application
+    """
+    log_queue = queue.Queue(maxsize=max_queue)
+    return DroppingQueueHandler(log_queue), logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
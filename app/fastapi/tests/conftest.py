@@ -1,15 +1,98 @@
 import sys
 import os
+from contextlib import contextmanager
 import pytest
 from fastapi.testclient import TestClient
 
 # Ajout du répertoire parent au chemin Python
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from main import app
+from main import app, startup
+
+# Délai maximal d'attente du chargement du modèle en arrière-plan (en secondes)
+STARTUP_TIMEOUT = 300
 
 @pytest.fixture
 def client():
     """Fixture fournissant un client de test pour l'application FastAPI, avec gestion du lifespan."""
     with TestClient(app) as c:
+        # Le modèle est chargé en arrière-plan : attendre la fin du démarrage
+        startup.wait(timeout=STARTUP_TIMEOUT)
         yield c
+
+# Ressources NLTK du prétraitement (nom du paquet : chemin dans nltk_data)
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+    'omw-1.4': 'corpora/omw-1.4',
+}
+
+@pytest.fixture(scope="session")
+def nltk_resources():
+    """
+    Télécharge une fois par session les ressources NLTK manquantes. Si elles restent
+    introuvables, les tests qui en dépendent échouent au lieu d'être ignorés : la
+    parité du prétraitement n'est jamais considérée comme vérifiée sans l'avoir été.
+    """
+    import nltk
+    missing = []
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            if not nltk.download(name, quiet=True):
+                missing.append(name)
+    if missing:
+        pytest.fail(f"Ressources NLTK introuvables et impossibles à télécharger : {', '.join(missing)} "
+                    f"(python -m nltk.downloader {' '.join(missing)})", pytrace=False)
+
+@pytest.fixture(autouse=True)
+def feedback_store(tmp_path, monkeypatch):
+    """Base de feedback temporaire : les tests n'écrivent pas dans data/feedback.db."""
+    import main
+    from feedback_store import FeedbackStore
+    store = FeedbackStore(tmp_path / "feedback.db")
+    monkeypatch.setattr(main, "feedback_store", store)
+    yield store
+    store.stop()
+
+@pytest.fixture(autouse=True)
+def job_store(tmp_path, monkeypatch):
+    """Base des tâches temporaire : les tests n'écrivent pas dans data/jobs.db."""
+    import main
+    from jobs import JobStore
+    store = JobStore(tmp_path / "jobs.db", max_texts=main.JOB_MAX_TEXTS)
+    monkeypatch.setattr(main, "job_store", store)
+    yield store
+    store.close()
+
+@pytest.fixture
+def stub_model(monkeypatch, tmp_path):
+    """
+    Démarre l'application avec des modèles factices, sans MLflow ni TensorFlow.
+
+    `stub_model(score)` est un gestionnaire de contexte qui fournit un client de test
+    démarré : le modèle par défaut est `run-a`, tout modèle chargé via `/admin/models`
+    est accepté, et `score(texts, pack)` remplace `predict_sentiment_batch` (par
+    défaut, chaque texte est Positif). Les endpoints d'administration acceptent le
+    jeton `secret`.
+    """
+    import main
+
+    def positive(texts, pack):
+        return [{"sentiment": "Positif", "confidence": 1.0, "raw_score": 1.0} for _ in texts]
+
+    @contextmanager
+    def start(score=positive):
+        monkeypatch.setattr(main, "run_id", "run-a")
+        monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+        monkeypatch.setattr(main, "download_artifacts_from_mlflow", lambda model_run_id, model_dir: tmp_path)
+        monkeypatch.setattr(main, "load_model", lambda model_run_id, model_dir: {"run_id": model_run_id, "runtime": object()})
+        monkeypatch.setattr(main, "warmup_model", lambda pack: None)
+        monkeypatch.setattr(main, "predict_sentiment_batch", lambda texts, pack, *args, **kwargs: score(texts, pack))
+        with TestClient(main.app) as client:
+            assert main.startup.wait(timeout=10)
+            yield client
+
+    return start
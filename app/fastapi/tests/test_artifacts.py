@@ -0,0 +1,133 @@
+import os
+import shutil
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import artifacts
+from artifacts import ArtifactIntegrityError, ArtifactStore
+
+ARTIFACTS = {
+    "parameters.json": b'{"max_sequence_length": 50}',
+    "tokenizer.pickle": bytes(range(256)) * 1000,
+}
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source = tmp_path / "mlruns" / "local_artifacts"
+    source.mkdir(parents=True)
+    for name, content in ARTIFACTS.items():
+        (source / name).write_bytes(content)
+    return source
+
+
+@pytest.fixture
+def http_server(source_dir):
+    class Handler(SimpleHTTPRequestHandler):
+        requests_served = []
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            Handler.requests_served.append(self.path)
+            if self.path.startswith("/truncated/"):
+                # Annonce la taille complète mais n'envoie que la moitié du contenu
+                content = ARTIFACTS[self.path.rsplit("/", 1)[1]]
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content[: len(content) // 2])
+                return
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(source_dir)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", Handler.requests_served
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_from_file_uri(tmp_path, source_dir):
+    store = ArtifactStore(tmp_path / "store")
+    run_dir = store.fetch("run-a", {name: (source_dir / name).as_uri() for name in ARTIFACTS})
+
+    for name, content in ARTIFACTS.items():
+        assert (run_dir / name).read_bytes() == content
+    assert store.is_complete("run-a", ARTIFACTS)
+
+
+def test_http_fetch_is_cached_and_shared_between_runs(tmp_path, http_server):
+    base_url, served = http_server
+    store = ArtifactStore(tmp_path / "store")
+    uris = {name: f"{base_url}/{name}" for name in ARTIFACTS}
+    sizes = {name: len(content) for name, content in ARTIFACTS.items()}
+
+    store.fetch("run-a", uris, sizes=sizes)
+    store.fetch("run-a", uris, sizes=sizes)
+    assert len(served) == len(ARTIFACTS)
+
+    run_dir = store.fetch("run-b", uris, sizes=sizes)
+    assert (run_dir / "tokenizer.pickle").read_bytes() == ARTIFACTS["tokenizer.pickle"]
+    assert len(list(store.objects_dir.iterdir())) == len(ARTIFACTS)
+
+
+def test_truncated_download_is_rejected(tmp_path, http_server):
+    base_url, _ = http_server
+    store = ArtifactStore(tmp_path / "store")
+
+    with pytest.raises(ArtifactIntegrityError):
+        store.fetch("run-a", {"tokenizer.pickle": f"{base_url}/truncated/tokenizer.pickle"})
+    assert not store.is_complete("run-a", ["tokenizer.pickle"])
+    assert list(store.objects_dir.iterdir()) == []
+
+
+def test_corrupted_artifact_is_downloaded_again(tmp_path, source_dir):
+    store = ArtifactStore(tmp_path / "store")
+    uris = {name: (source_dir / name).as_uri() for name in ARTIFACTS}
+    run_dir = store.fetch("run-a", uris)
+
+    path = run_dir / "tokenizer.pickle"
+    stat = path.stat()
+    path.write_bytes(b"x" * len(ARTIFACTS["tokenizer.pickle"]))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not store.is_complete("run-a", ARTIFACTS)
+
+    store.fetch("run-a", uris)
+    assert path.read_bytes() == ARTIFACTS["tokenizer.pickle"]
+    assert store.is_complete("run-a", ARTIFACTS)
+
+    # Une altération qui conserve la taille et la date n'est vue que par la vérification complète
+    stat = path.stat()
+    path.write_bytes(b"y" * len(ARTIFACTS["tokenizer.pickle"]))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert store.is_complete("run-a", ARTIFACTS)
+    assert not store.is_complete("run-a", ARTIFACTS, verify=True)
+    store.fetch("run-a", uris, verify=True)
+    assert path.read_bytes() == ARTIFACTS["tokenizer.pickle"]
+
+
+def test_startup_check_does_not_rehash_verified_artifacts(tmp_path, source_dir, monkeypatch):
+    store = ArtifactStore(tmp_path / "store")
+    uris = {name: (source_dir / name).as_uri() for name in ARTIFACTS}
+    run_dir = store.fetch("run-a", uris)
+
+    hashed = []
+    digest = artifacts.file_digest
+    monkeypatch.setattr(artifacts, "file_digest", lambda path: hashed.append(path.name) or digest(path))
+    assert store.is_complete("run-a", ARTIFACTS)
+    store.fetch("run-a", uris)
+    assert hashed == []
+
+    # Fichier déplacé (nouvel inode, par exemple copié dans une image) : relu une fois, puis le manifeste est à jour
+    path = run_dir / "parameters.json"
+    copy = path.with_name("copy")
+    shutil.copy2(path, copy)
+    os.replace(copy, path)
+    assert store.is_complete("run-a", ARTIFACTS)
+    assert store.is_complete("run-a", ARTIFACTS)
+    assert hashed == ["parameters.json"]
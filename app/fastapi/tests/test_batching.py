@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_batcher(calls, **kwargs):
+    async def runner(texts):
+        calls.append(list(texts))
+        return [{"text": text} for text in texts]
+    return MicroBatcher(runner, **kwargs)
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    async def scenario():
+        batcher = make_batcher(calls, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        results = await asyncio.gather(*(batcher.submit([f"t{i}"]) for i in range(5)))
+        stats = batcher.stats()
+        await batcher.stop()
+        return results, stats
+
+    results, stats = run(scenario())
+    assert [r[0]["text"] for r in results] == [f"t{i}" for i in range(5)]
+    assert len(calls) == 1
+    assert stats["batches"] == 1
+    assert stats["texts"] == 5
+
+
+def test_batches_are_capped_at_max_size():
+    calls = []
+
+    async def scenario():
+        batcher = make_batcher(calls, max_batch_size=4, max_wait_ms=50)
+        await batcher.start()
+        results = await asyncio.gather(
+            batcher.submit(["a", "b", "c"]),
+            batcher.submit(["d", "e"]),
+            batcher.submit(["f"]),
+        )
+        await batcher.stop()
+        return results
+
+    results = run(scenario())
+    assert [[r["text"] for r in result] for result in results] == [["a", "b", "c"], ["d", "e"], ["f"]]
+    assert all(len(call) <= 4 for call in calls)
+
+
+def test_runner_errors_are_propagated_to_every_caller():
+    async def runner(texts):
+        raise ValueError("boom")
+
+    async def scenario():
+        batcher = MicroBatcher(runner, max_batch_size=8, max_wait_ms=20)
+        await batcher.start()
+        results = await asyncio.gather(batcher.submit(["a"]), batcher.submit(["b"]), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_submit_requires_started_batcher():
+    batcher = make_batcher([])
+    with pytest.raises(RuntimeError):
+        run(batcher.submit(["a"]))
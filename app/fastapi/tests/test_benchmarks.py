@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from benchmarks.bench_suite import compare
+from benchmarks.load_test import make_payloads, run_load
+
+
+def test_load_generator_reports_throughput_latency_and_errors():
+    app = FastAPI()
+
+    @app.post("/predict-batch")
+    async def predict_batch(payload: dict):
+        if payload["texts"][0] == "refusé":
+            raise HTTPException(status_code=503)
+        return {"results": []}
+
+    payloads = make_payloads("/predict-batch", 3, batch_size=4) + [{"texts": ["refusé"]}]
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await run_load(client, "/predict-batch", payloads, concurrency=4, requests=40, warmup=0)
+
+    result = asyncio.run(scenario())
+    assert result["requests"] == 40 and result["errors"] == {"503": 10}
+    # Seuls les textes des requêtes réussies sont comptés
+    assert abs(result["texts_per_second"] * result["elapsed_s"] - 30 * 4) < 1e-6
+    assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {"metadata": {"commit": "abc"}, "predict": [{"batch_size": 1, "p50_ms": 10.0, "texts_per_second": 100.0, "calls": 50}]}
+    current = {"predict": [{"batch_size": 1, "p50_ms": 10.5, "texts_per_second": 80.0, "calls": 10}]}
+    rows = {row["metric"]: row for row in compare(baseline, current, threshold=0.1)}
+    assert set(rows) == {"predict.1.p50_ms", "predict.1.texts_per_second"}
+    assert not rows["predict.1.p50_ms"]["regression"]
+    assert rows["predict.1.texts_per_second"]["regression"]
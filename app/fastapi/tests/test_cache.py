@@ -0,0 +1,64 @@
+import threading
+import time
+
+import numpy as np
+
+from cache import HTTPCacheBackend, PredictionCache, make_keys, make_server
+
+
+def test_keys_depend_on_tokens_and_run_id():
+    tokens = np.array([[1, 2, 0], [1, 2, 0], [3, 0, 0]], dtype=np.int32)
+    keys = make_keys("run-a", tokens)
+    assert keys[0] == keys[1] != keys[2]
+    assert make_keys("run-b", tokens)[0] != keys[0]
+
+
+def test_hits_misses_and_lru_eviction():
+    keys = make_keys("run", np.arange(30, dtype=np.int32).reshape(10, 3))
+    entry_size = PredictionCache._entry_size(keys[0])
+    cache = PredictionCache(max_bytes=entry_size * 4)
+
+    cache.set_many({key: 0.25 for key in keys[:4]})
+    assert cache.get_many(keys[:1]) == [0.25]
+    cache.set_many({keys[4]: 0.75})
+
+    # keys[1] est la moins récemment utilisée : c'est elle qui est évincée
+    assert cache.get_many([keys[0], keys[1], keys[4]]) == [0.25, None, 0.75]
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["bytes"] <= cache.max_bytes
+
+
+def test_entries_expire_after_ttl():
+    key = make_keys("run", np.ones((1, 3), dtype=np.int32))[0]
+    cache = PredictionCache(ttl=0.01)
+    cache.set_many({key: 0.5})
+    time.sleep(0.02)
+    assert cache.get_many([key]) == [None]
+    assert cache.stats()["expirations"] == 1
+
+
+def test_shared_backend_serves_other_instances():
+    server = make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        key = make_keys("run", np.ones((1, 3), dtype=np.int32))[0]
+        PredictionCache(backend=HTTPCacheBackend(url)).set_many({key: 0.9})
+
+        other = PredictionCache(backend=HTTPCacheBackend(url))
+        assert other.get_many([key]) == [0.9]
+        assert other.stats()["backend"]["hits"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unreachable_backend_is_a_miss():
+    cache = PredictionCache(backend=HTTPCacheBackend("http://127.0.0.1:9", timeout=0.05))
+    key = make_keys("run", np.ones((1, 3), dtype=np.int32))[0]
+    assert cache.get_many([key]) == [None]
+    assert cache.stats()["backend"]["errors"] == 1
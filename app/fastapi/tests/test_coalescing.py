@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import main
+from coalescing import InFlightPredictions, deduplicate
+
+
+class FakePreprocess:
+    def preprocess_batch(self, texts):
+        return [text.lower().strip() for text in texts]
+
+
+class FakeEncoder:
+    def encode(self, texts, maxlen):
+        tokens = np.zeros((len(texts), maxlen), dtype=np.int32)
+        for i, text in enumerate(texts):
+            tokens[i, 0] = len(text)
+        return tokens
+
+
+class BlockingRuntime:
+    """Moteur dont la prédiction attend `release` : les requêtes simultanées se recouvrent à coup sûr."""
+
+    def __init__(self):
+        self.calls = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def predict(self, tokens):
+        self.calls.append(len(tokens))
+        self.entered.set()
+        assert self.release.wait(5)
+        return tokens[:, 0].astype(np.float32) / 100.0
+
+
+def make_pack(runtime):
+    return {"runtime": runtime, "encoder": FakeEncoder(), "preprocess": FakePreprocess(), "params": {}, "run_id": "run-a"}
+
+
+def test_duplicates_in_a_batch_reach_the_model_once():
+    assert deduplicate(["a", "b", "a", "c", "b"]) == (["a", "b", "c"], [0, 1, 0, 2, 1])
+
+    runtime = BlockingRuntime()
+    runtime.release.set()
+    coalescer = InFlightPredictions()
+    texts = ["Bon vol", "bon vol ", "Retard", "BON VOL", "Retard"]
+    results = main.predict_sentiment_batch(texts, make_pack(runtime), coalescer=coalescer)
+    assert runtime.calls == [2]
+    assert [result["raw_score"] for result in results] == pytest.approx([0.07, 0.07, 0.06, 0.07, 0.06])
+    stats = coalescer.stats()
+    assert (stats["texts"], stats["batch_duplicates"], stats["computed"], stats["in_flight"]) == (5, 3, 2, 0)
+
+    # Sans table des prédictions en cours, les doublons du lot sont aussi retirés
+    main.predict_sentiment_batch(texts, make_pack(runtime))
+    assert runtime.calls == [2, 2]
+
+
+def test_concurrent_requests_share_a_pending_prediction():
+    runtime = BlockingRuntime()
+    pack = make_pack(runtime)
+    coalescer = InFlightPredictions()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(main.predict_sentiment_batch, ["Bon vol", "Retard"], pack, None, coalescer)
+        assert runtime.entered.wait(5)
+        # Seul "annulé" reste à calculer pour la seconde requête ; "bon vol" est emprunté à la première
+        second = pool.submit(main.predict_sentiment_batch, ["bon vol", "Annulé"], pack, None, coalescer)
+        deadline = time.monotonic() + 5
+        while len(runtime.calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        runtime.release.set()
+        first, second = first.result(5), second.result(5)
+
+    assert sorted(runtime.calls) == [1, 2]
+    assert second[0] == first[0]
+    stats = coalescer.stats()
+    assert (stats["coalesced"], stats["computed"], stats["in_flight"]) == (1, 3, 0)
+    assert stats["saved_ratio"] == 0.25
+
+
+def test_a_failed_prediction_fails_the_requests_waiting_for_it():
+    coalescer = InFlightPredictions()
+    started, release = threading.Event(), threading.Event()
+
+    def failing(keys):
+        started.set()
+        assert release.wait(5)
+        raise RuntimeError("moteur indisponible")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(coalescer.run, ["a"], failing)
+        assert started.wait(5)
+        second = pool.submit(coalescer.run, ["a"], lambda keys: pytest.fail("calcul en double"))
+        release.set()
+        for future in (first, second):
+            with pytest.raises(RuntimeError, match="moteur indisponible"):
+                future.result(5)
+
+    # La clé a quitté la table : une nouvelle requête la recalcule
+    assert coalescer.run(["a", "a"], lambda keys: [1.0] * len(keys)) == [1.0, 1.0]
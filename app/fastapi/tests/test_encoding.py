@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from tensorflow.keras.preprocessing.sequence import pad_sequences
+from tensorflow.keras.preprocessing.text import Tokenizer
+
+from benchmarks.synthetic import build_tokenizer, sample_texts
+from encoding import SequenceEncoder
+
+MAXLEN = 20
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "<URL> <MENTION> # ! ?",
+    "Été déjà vu — naïve café",
+    "word\x1eseparator inside",
+    "a\tb\nc",
+    " ".join(["repeated"] * 50),
+]
+
+
+def reference(tokenizer, texts, maxlen=MAXLEN):
+    return pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=maxlen, padding='post', truncating='post')
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    tokenizer, vocabulary = build_tokenizer(vocabulary_size=3000, num_words=1000)
+    return tokenizer, sample_texts(300, vocabulary, seed=7) + EDGE_CASES
+
+
+@pytest.mark.parametrize("batch_size", [1, 5, 64, 307])
+def test_encode_matches_keras(synthetic, batch_size):
+    tokenizer, texts = synthetic
+    encoder = SequenceEncoder.from_tokenizer(tokenizer)
+    batch = texts[-batch_size:]
+    encoded = encoder.encode(batch, MAXLEN)
+    assert encoded.dtype == np.int32
+    assert np.array_equal(encoded, reference(tokenizer, batch))
+
+
+@pytest.mark.parametrize("num_words, oov_token", [(None, None), (50, None), (None, "<OOV>")])
+def test_num_words_and_oov_semantics(num_words, oov_token):
+    tokenizer = Tokenizer(num_words=num_words, oov_token=oov_token)
+    tokenizer.fit_on_texts(sample_texts(500, [f"w{i}" for i in range(200)], seed=3))
+    texts = sample_texts(40, [f"w{i}" for i in range(300)], seed=4) + EDGE_CASES
+    encoder = SequenceEncoder.from_tokenizer(tokenizer)
+    assert np.array_equal(encoder.encode(texts, MAXLEN), reference(tokenizer, texts))
+    assert [encoder.texts_to_ids(text) for text in texts] == tokenizer.texts_to_sequences(texts)
+
+
+def test_char_level_tokenizer_is_rejected():
+    with pytest.raises(ValueError):
+        SequenceEncoder.from_tokenizer(Tokenizer(char_level=True))
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import InferenceExecutor, InferenceOverloaded
+
+
+def test_run_executes_off_the_event_loop():
+    async def scenario():
+        executor = InferenceExecutor(max_workers=1, max_queue=0)
+        loop_thread = threading.get_ident()
+        worker_thread = await executor.run(threading.get_ident)
+        executor.shutdown()
+        return loop_thread, worker_thread, executor.stats()
+
+    loop_thread, worker_thread, stats = asyncio.run(scenario())
+    assert loop_thread != worker_thread
+    assert stats["submitted"] == 1
+    assert stats["queue_wait"]["count"] == 1
+    assert stats["execution"]["count"] == 1
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    release = threading.Event()
+
+    async def scenario():
+        executor = InferenceExecutor(max_workers=1, max_queue=1, retry_after=3)
+        running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceOverloaded) as excinfo:
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        executor.shutdown()
+        return excinfo.value, executor.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.retry_after == 3
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_background_work_leaves_a_thread_to_interactive_requests():
+    release = threading.Event()
+    order = []
+
+    def job(name):
+        order.append(name)
+        assert release.wait(5)
+
+    async def scenario():
+        executor = InferenceExecutor(max_workers=2, max_queue=4)
+        background = [asyncio.create_task(executor.run_background(job, f"job-{i}")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        # Un seul thread est ouvert aux travaux d'arrière-plan : l'autre reste libre
+        assert order == ["job-0"] and executor.stats()["background"]["waiting"] == 1
+        interactive = asyncio.create_task(executor.run(order.append, "predict"))
+        await asyncio.sleep(0.05)
+        assert order == ["job-0", "predict"]
+        release.set()
+        await asyncio.gather(interactive, *background)
+        executor.shutdown()
+        return executor.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["background"]["submitted"] == 2 and stats["background"]["running"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_background_work_waits_for_an_idle_thread():
+    release = threading.Event()
+
+    async def scenario():
+        executor = InferenceExecutor(max_workers=1, max_queue=4)
+        interactive = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0)
+        background = asyncio.create_task(executor.run_background(threading.get_ident))
+        await asyncio.sleep(0.05)
+        # Un seul thread, occupé : le travail d'arrière-plan attend hors de la file
+        assert not background.done() and executor.in_flight == 1
+        release.set()
+        await asyncio.gather(interactive, background)
+        executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_request_keeps_its_thread_until_the_call_returns():
+    release = threading.Event()
+
+    async def scenario():
+        executor = InferenceExecutor(max_workers=1, max_queue=0)
+        request = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        # L'appelant abandonne (client déconnecté) : le calcul continue et occupe toujours le thread
+        request.cancel()
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 1
+        with pytest.raises(InferenceOverloaded):
+            await executor.run(threading.get_ident)
+        background = asyncio.create_task(executor.run_background(threading.get_ident))
+        await asyncio.sleep(0.05)
+        assert not background.done()
+        release.set()
+        await background
+        executor.shutdown()
+        return executor.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0 and stats["background"]["running"] == 0
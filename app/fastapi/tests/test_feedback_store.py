@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import time
+
+import main
+from feedback_store import FeedbackStore, iter_export, iter_feedback
+
+
+def feedback(text, prediction="Positif", is_correct=True, corrected_sentiment="", created_at=None):
+    return {
+        "tweet_text": text,
+        "prediction": prediction,
+        "confidence": 0.9,
+        "is_correct": is_correct,
+        "corrected_sentiment": corrected_sentiment,
+        "created_at": created_at,
+    }
+
+
+def test_writes_are_group_committed_off_the_request_path(tmp_path):
+    store = FeedbackStore(tmp_path / "feedback.db", max_queue=20000, batch_size=500)
+    store.start()
+    started = time.perf_counter()
+    assert all(store.record(feedback(f"tweet {i}")) for i in range(5000))
+    # Les enregistrements ne font qu'entrer en file
+    assert time.perf_counter() - started < 1.0
+
+    assert store.flush()
+    stats = store.stats()
+    assert stats["written"] == 5000 and stats["failed"] == 0
+    # Plusieurs milliers d'écritures, mais quelques transactions seulement
+    assert stats["commits"] <= 5000 // 10 and stats["largest_commit"] <= 500
+    store.stop()
+    assert sum(1 for _ in iter_feedback(store.path)) == 5000
+
+
+def test_export_uses_corrected_labels_and_filters(tmp_path):
+    store = FeedbackStore(tmp_path / "feedback.db", max_queue=1)
+    store.start()
+    rows = [
+        feedback("great flight", "Positif", True, created_at=100.0),
+        feedback("lost my bag", "Positif", False, "negative", created_at=200.0),
+        feedback("crème brûlée 🎉", "Négatif", False, created_at=300.0),
+    ]
+    for row in rows:
+        # File d'une place : attendre l'écriture entre deux enregistrements
+        while not store.record(row):
+            time.sleep(0.01)
+    store.stop()
+
+    exported = b"".join(iter_export(store.path, "sentiment140", encode=True))
+    # Même disposition que Sentiment140 : target, ids, date, flag, user, text
+    lines = list(csv.reader(io.StringIO(exported.decode("latin-1"))))
+    assert [line[0] for line in lines] == ["4", "0", "4"]
+    assert [line[5] for line in lines] == ["great flight", "lost my bag", "crème brûlée ?"]
+
+    corrections = [json.loads(line) for line in iter_export(store.path, "ndjson", only_corrections=True, since=150.0)]
+    assert [(row["text"], row["label"]) for row in corrections] == [("lost my bag", 0), ("crème brûlée 🎉", 1)]
+    assert [row["tweet_text"] for row in iter_feedback(store.path, prediction="Négatif", until=1000.0)] == ["crème brûlée 🎉"]
+
+
+def test_feedback_endpoint_and_streaming_export(stub_model, feedback_store):
+    with stub_model() as client:
+        response = client.post("/feedback", json={
+            "tweet_text": "delayed again", "prediction": "Positif", "confidence": 0.7,
+            "is_correct": False, "corrected_sentiment": "negative", "run_id": "run-a"
+        })
+        assert response.status_code == 200
+
+        assert client.get("/feedback/export").status_code == 401
+        headers = {"X-Admin-Token": "secret"}
+        assert client.get("/feedback/export?format=parquet", headers=headers).status_code == 422
+        response = client.get("/feedback/export", headers=headers)
+        assert response.headers["content-type"].startswith("text/csv")
+        assert list(csv.reader(io.StringIO(response.content.decode("latin-1"))))[0][::5] == ["0", "delayed again"]
+
+        response = client.get("/feedback/export?format=ndjson&only_corrections=true", headers=headers)
+        assert json.loads(response.text.splitlines()[0])["run_id"] == "run-a"
+        assert client.get("/stats").json()["feedback"]["written"] == 1
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import main
+from jobs import COMPLETED, CREATING, INSERT_BATCH_SIZE, QUEUED, RUNNING, JobRunner, JobStore, JobTooLarge
+
+
+def fake_results(texts):
+    return [{"sentiment": "Positif", "confidence": 1.0, "raw_score": float(len(text))} for text in texts]
+
+
+def test_jobs_are_claimed_once_and_resume_after_an_interruption(tmp_path):
+    first, second = JobStore(tmp_path / "jobs.db"), JobStore(tmp_path / "jobs.db")
+    first.open()
+    second.open()
+    # Deux processus qui partagent la base
+    second.owner = "autre:1"
+
+    job = first.create([(None, "a"), ("x-1", "bb"), (None, "ccc")])
+    assert (job["status"], job["total"], job["processed"]) == (QUEUED, 3, 0)
+    assert first.claim()["id"] == job["id"]
+    assert second.claim() is None
+
+    chunk = first.pending(job["id"], 2)
+    assert first.save_results(job["id"], [position for position, _ in chunk], fake_results([text for _, text in chunk]))
+    assert first.get(job["id"])["progress"] == 2 / 3
+
+    # Interruption : la tâche est remise en attente et reprend au premier texte sans résultat
+    first.release(job["id"])
+    assert second.claim()["status"] == RUNNING
+    assert second.pending(job["id"], 10) == [(2, "ccc")]
+    assert not first.save_results(job["id"], [2], fake_results(["ccc"]))
+    assert second.save_results(job["id"], [2], fake_results(["ccc"]))
+    assert second.finish(job["id"], COMPLETED)
+
+    assert [(result["id"], result["raw_score"]) for result in first.iter_results(job["id"], page_size=2)] == [
+        (0, 1.0), ("x-1", 2.0), (2, 3.0)
+    ]
+    assert first.counts()[COMPLETED] == 1
+    first.close()
+    second.close()
+
+
+def test_job_creation_does_not_hold_the_database_while_reading_texts(tmp_path):
+    store = JobStore(tmp_path / "jobs.db", max_texts=3 * INSERT_BATCH_SIZE)
+    store.open()
+    other = store.create([(None, "déjà là")])
+    observed = []
+
+    def probe():
+        observed.append((store.get(other["id"])["status"], store.counts()[CREATING], store.claim()["id"]))
+
+    def texts(count, probe_at=None):
+        for position in range(count):
+            if position == probe_at:
+                # Pendant la lecture du fichier, les autres tâches restent consultables et réservables
+                thread = threading.Thread(target=probe)
+                thread.start()
+                thread.join(timeout=5)
+                assert not thread.is_alive()
+            yield None, f"t{position}"
+
+    job = store.create(texts(2 * INSERT_BATCH_SIZE, probe_at=INSERT_BATCH_SIZE + 1))
+    assert observed == [(QUEUED, 1, other["id"])]
+    assert (job["status"], job["total"]) == (QUEUED, 2 * INSERT_BATCH_SIZE)
+    assert store.claim()["id"] == job["id"]
+
+    # Un échec en cours de lecture supprime la tâche et les textes déjà écrits
+    with pytest.raises(JobTooLarge):
+        store.create(texts(3 * INSERT_BATCH_SIZE + 1))
+    assert store.counts()[CREATING] == 0
+    assert store._db().execute("SELECT COUNT(*) FROM job_items").fetchone()[0] == 2 * INSERT_BATCH_SIZE + 1
+
+    # Une création interrompue par un arrêt brutal est supprimée une fois son signe de vie périmé
+    store._db().execute("INSERT INTO jobs (id, status, created_at, heartbeat_at, total) VALUES ('x', ?, 0, 0, 0)", (CREATING,))
+    store._db().commit()
+    assert store.discard_abandoned() == 1
+    store.close()
+
+
+def test_runner_caps_concurrent_jobs_and_requeues_them_on_stop(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    active, observed = [0], []
+
+    async def score(texts, model_id, heartbeat):
+        active[0] += 1
+        observed.append(active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return fake_results(texts)
+
+    async def scenario():
+        runner = JobRunner(store, score, max_concurrent=2, chunk_size=4, poll_interval=0.01)
+        await runner.start()
+        jobs = [await asyncio.to_thread(store.create, [(None, f"t{i}") for i in range(20)]) for _ in range(3)]
+        runner.notify()
+        while store.counts()[COMPLETED] < 3:
+            await asyncio.sleep(0.01)
+        stats = runner.stats()
+
+        # Arrêt en cours de tâche : elle est remise en attente avec les résultats déjà obtenus
+        slow = await asyncio.to_thread(store.create, [(None, f"t{i}") for i in range(400)])
+        runner.notify()
+        while store.get(slow["id"])["processed"] == 0:
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        return jobs, stats, slow
+
+    jobs, stats, slow = asyncio.run(scenario())
+    assert max(observed) == 2
+    assert stats["completed"] == 3 and stats["texts"] == 60
+    store.open()
+    interrupted = store.get(slow["id"])
+    assert interrupted["status"] == QUEUED and 0 < interrupted["processed"] < 400
+    assert len(store.results(jobs[0]["id"], limit=100)) == 20
+    store.close()
+
+
+def test_job_endpoints(monkeypatch, stub_model):
+    monkeypatch.setattr(main, "JOB_CHUNK_SIZE", 64)
+    monkeypatch.setattr(main.job_store, "max_texts", 1000)
+
+    def wait_for(client, job_id):
+        deadline = time.monotonic() + 10
+        while client.get(f"/jobs/{job_id}").json()["status"] != COMPLETED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return client.get(f"/jobs/{job_id}").json()
+
+    with stub_model(lambda texts, pack: fake_results(texts)) as client:
+        response = client.post("/jobs", json={"texts": [f"tweet {i}" for i in range(300)]})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert response.headers["location"] == f"/jobs/{job_id}"
+        job = wait_for(client, job_id)
+        assert (job["processed"], job["progress"]) == (300, 1.0)
+
+        page = client.get(f"/jobs/{job_id}/results?offset=250&limit=40").json()
+        assert [result["id"] for result in page["results"]] == list(range(250, 290))
+        assert page["next_offset"] == 290 and page["results"][0]["run_id"] == "run-a"
+        assert client.get(f"/jobs/{job_id}/results?offset=290").json()["next_offset"] is None
+        lines = client.get(f"/jobs/{job_id}/results?format=ndjson").text.splitlines()
+        assert len(lines) == 300 and json.loads(lines[-1])["id"] == 299
+
+        # Fichier envoyé en multipart, avec sa colonne d'identifiants
+        csv_file = "tweet_id,text\n" + "".join(f"t{i},vol {i}\n" for i in range(5))
+        response = client.post("/jobs", files={"file": ("tweets.csv", csv_file, "text/csv")}, data={"id_column": "tweet_id"})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert wait_for(client, job_id)["total"] == 5
+        assert [result["id"] for result in client.get(f"/jobs/{job_id}/results").json()["results"]] == [f"t{i}" for i in range(5)]
+
+        assert client.post("/jobs", json={"texts": ["x"] * 1001}).status_code == 413
+        assert client.post("/jobs", json={"texts": []}).status_code == 422
+        assert client.post("/jobs", json={"texts": ["x"], "run_id": "run-z"}).status_code == 404
+        assert client.post("/jobs", files={"file": ("tweets.xlsx", b"", "application/octet-stream")}).status_code == 422
+
+        assert client.delete(f"/jobs/{job_id}").status_code == 200
+        assert client.get(f"/jobs/{job_id}").status_code == 404
+        assert client.get("/stats").json()["jobs"]["counts"][COMPLETED] == 1
@@ -0,0 +1,65 @@
+import numpy as np
+
+import main
+from metrics import MetricsRegistry
+
+
+class FakePreprocess:
+    def preprocess_batch(self, texts):
+        return [text.lower() for text in texts]
+
+
+class FakeEncoder:
+    def encode(self, texts, maxlen):
+        return np.ones((len(texts), maxlen), dtype=np.int32)
+
+
+class FakeRuntime:
+    def predict(self, tokens):
+        return np.full(len(tokens), 0.8, dtype=np.float32)
+
+
+def test_histograms_and_counters_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latence_seconds", "Durée \\ d'un appel", ("route",), buckets=(0.1, 1.0))
+    errors = registry.counter("erreurs", "Erreurs", ("code",))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, "/predict")
+    errors.inc(2, 'a"b')
+
+    text = registry.render()
+    assert "# HELP latence_seconds Durée \\\\ d'un appel\n# TYPE latence_seconds histogram\n" in text
+    assert 'latence_seconds_bucket{route="/predict",le="0.1"} 1\n' in text
+    assert 'latence_seconds_bucket{route="/predict",le="1"} 3\n' in text
+    assert 'latence_seconds_bucket{route="/predict",le="+Inf"} 4\n' in text
+    assert 'latence_seconds_sum{route="/predict"} 4.05\n' in text
+    assert 'latence_seconds_count{route="/predict"} 4\n' in text
+    assert '# TYPE erreurs counter\nerreurs_total{code="a\\"b"} 2\n' in text
+
+
+def test_each_prediction_stage_is_timed():
+    pack = {"runtime": FakeRuntime(), "encoder": FakeEncoder(), "preprocess": FakePreprocess(), "params": {}}
+    stages = ("preprocess", "encode", "forward", "response")
+    before = {stage: main.PREDICT_STAGE_SECONDS.count(stage) for stage in stages}
+
+    results = main.predict_sentiment_batch(["Bon vol", "Retard"], pack)
+    assert [result["sentiment"] for result in results] == ["Positif", "Positif"]
+    assert all(main.PREDICT_STAGE_SECONDS.count(stage) == before[stage] + 1 for stage in stages)
+
+
+def test_metrics_endpoint(stub_model):
+    with stub_model() as client:
+        client.post("/predict-batch", json={"texts": ["a", "b", "c"]})
+        client.get("/models/inconnu")
+
+        response = client.get("/metrics")
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert 'sentiment_http_request_duration_seconds_count{method="POST",route="/predict-batch",status="200"}' in text
+        # Les chemins inconnus sont regroupés pour borner le nombre de séries
+        assert 'route="inconnue",status="404"' in text
+        assert 'sentiment_request_texts_bucket{endpoint="predict-batch",le="4"}' in text
+        assert 'sentiment_model_load_phase_seconds_count{phase="warming"}' in text
+        assert "sentiment_inference_queue_wait_seconds_count" in text
+        assert 'sentiment_batch_size_bucket{le="+Inf"}' in text
+        assert 'sentiment_queue_depth{queue="inference"} 0' in text
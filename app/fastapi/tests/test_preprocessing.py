@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from main import custom_preprocess_tweet
+from preprocessing import TweetPreprocessor
+
+TWEETS_PATH = Path(__file__).resolve().parent.parent / "tweets.json"
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "@AirParadis @support why?!! http://t.co/abc www.example.com #fail #NeverAgain",
+    "I'm NOT happy... flights were cancelled, 3 times!!! :(",
+    "Ça c'est un vol génial ! #été",
+    "no nothing nowhere nobody none neither nor never",
+]
+
+
+@pytest.fixture(scope="module")
+def preprocessor(nltk_resources):
+    return TweetPreprocessor()
+
+
+def test_parity_with_reference_on_sample_tweets(preprocessor):
+    texts = json.loads(TWEETS_PATH.read_text(encoding="utf-8"))["texts"]
+    for text in texts + EDGE_CASES:
+        assert preprocessor(text) == custom_preprocess_tweet(text)
+
+
+def test_non_string_input_returns_empty_string(preprocessor):
+    assert preprocessor(None) == custom_preprocess_tweet(None) == ""
+
+
+def test_lemmas_are_memoized(preprocessor):
+    preprocessor("flights flights flights")
+    assert preprocessor.cache_info().hits > 0
+
+
+def test_batch_preprocessing_matches_per_tweet(preprocessor):
+    texts = json.loads(TWEETS_PATH.read_text(encoding="utf-8"))["texts"]
+    batch = texts + EDGE_CASES + [None, "contains \x1e separator"]
+    assert preprocessor.preprocess_batch(batch) == [custom_preprocess_tweet(text) for text in batch]
+
+
+def test_batch_normalization_matches_per_tweet_without_nltk_data():
+    # Seule la normalisation est comparée (sans tokenisation, lemmes ni stopwords) : les motifs
+    # en fin de tweet ne doivent jamais déborder sur le tweet suivant à travers le séparateur
+    engine = TweetPreprocessor.__new__(TweetPreprocessor)
+    engine._finish = lambda text: text
+    batch = [
+        "see www.example.com", "abc", "http://t.co/x", "@user", "#tag", "end #", "@", "!?", None,
+        "#AirParadis", "", "trailing @", "x" * 50, "Ça c'est génial ! #été",
+    ]
+    expected = ["" if text is None else engine.normalize(text) for text in batch]
+    assert engine.preprocess_batch(batch) == expected
+
+    # Le séparateur présent dans un tweet fait basculer sur la normalisation tweet par tweet
+    with_separator = batch + ["contient \x1e le séparateur", "www.a.com\x1esuite"]
+    assert engine.preprocess_batch(with_separator) == ["" if text is None else engine.normalize(text) for text in with_separator]
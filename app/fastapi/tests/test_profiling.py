@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import main
+from batching import MicroBatcher
+from profiling import ProfilerBusy, RequestTimings, SamplingProfiler, SlowRequestLog, current_timings, record_stage
+
+
+def test_slow_request_log_keeps_the_slowest_requests():
+    log = SlowRequestLog(size=3)
+    for total in [5.0, 1.0, 9.0, 3.0, 7.0, 2.0]:
+        log.offer({"total_ms": total})
+    snapshot = log.snapshot()
+    assert [request["total_ms"] for request in snapshot["requests"]] == [9.0, 7.0, 5.0]
+    assert snapshot["recorded"] == 6
+
+    timings = RequestTimings("POST", "/predict")
+    timings.add("forward", 0.002)
+    timings.add("forward", 0.003)
+    record = timings.finish(200, None)
+    assert record["stages_ms"]["forward"] == pytest.approx(5.0)
+    # Sans fin d'endpoint marquée, pas de sérialisation mesurée ; le temps non attribué n'est jamais négatif
+    assert "serialize" not in record["stages_ms"] and record["stages_ms"]["other"] >= 0.0
+
+
+def test_batch_stages_reach_every_request_of_the_batch():
+    async def runner(texts):
+        record_stage("forward", 0.01)
+        return [{"text": text} for text in texts]
+
+    async def submit(batcher, text):
+        timings = RequestTimings("POST", "/predict")
+        current_timings.set((timings,))
+        await batcher.submit([text])
+        return timings
+
+    async def scenario():
+        batcher = MicroBatcher(runner, max_batch_size=8, max_wait_ms=50, context=current_timings)
+        await batcher.start()
+        timings = await asyncio.gather(*(submit(batcher, f"t{i}") for i in range(3)))
+        await batcher.stop()
+        return timings
+
+    timings = asyncio.run(scenario())
+    assert [t.stages for t in timings] == [{"forward": 0.01}] * 3
+    # Hors d'une requête enregistrée, rien n'est retenu
+    record_stage("forward", 1.0)
+
+
+def spin_for_the_profiler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_returns_collapsed_stacks_of_busy_threads():
+    profiler = SamplingProfiler()
+    stop = threading.Event()
+    busy = threading.Thread(target=spin_for_the_profiler, args=(stop,), name="busy-worker")
+    busy.start()
+    try:
+        second = []
+        sampler = threading.Thread(target=lambda: second.append(profiler.sample(0.3, interval=0.002)))
+        sampler.start()
+        time.sleep(0.05)
+        with pytest.raises(ProfilerBusy):
+            profiler.sample(0.01)
+        sampler.join()
+        stacks = profiler.sample(0.1, interval=0.002, thread_prefix="busy")
+    finally:
+        stop.set()
+        busy.join()
+
+    lines = stacks.splitlines()
+    assert lines and all(line.startswith("busy-worker;") for line in lines)
+    frames, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "spin_for_the_profiler (test_profiling.py:" in frames
+    assert "busy-worker;" in second[0]
+
+
+def test_slow_request_endpoints(stub_model):
+    def score(texts, pack):
+        record_stage("forward", 0.002)
+        return [{"sentiment": "Positif", "confidence": 1.0, "raw_score": 1.0} for _ in texts]
+
+    main.slow_requests.clear()
+    headers = {"X-Admin-Token": "secret"}
+
+    with stub_model(score) as client:
+        # Un petit lot passe par le micro-batcher, un grand lot directement par le pool d'inférence
+        assert client.post("/predict-batch", json={"texts": ["a", "b"]}).status_code == 200
+        texts = ["x"] * (main.BATCH_MAX_SIZE + 1)
+        assert client.post("/predict-batch", json={"texts": texts}).status_code == 200
+        assert client.get("/stats").status_code == 200
+
+        assert client.get("/admin/slow-requests").status_code == 401
+        snapshot = client.get("/admin/slow-requests", headers=headers).json()
+        assert snapshot["recorded"] == 2
+        assert sorted(request["texts"] for request in snapshot["requests"]) == [2, len(texts)]
+        for request in snapshot["requests"]:
+            assert request["path"] == "/predict-batch" and request["status"] == 200
+            assert {"forward", "queue_wait", "serialize", "other"} <= set(request["stages_ms"])
+
+        assert client.delete("/admin/slow-requests", headers=headers).status_code == 200
+        assert client.get("/admin/slow-requests", headers=headers).json()["requests"] == []
+
+        response = client.post("/admin/profile?seconds=0.05&idle=true", headers=headers)
+        assert response.status_code == 200 and response.text.endswith("\n")
+        assert client.post("/admin/profile?seconds=0", headers=headers).status_code == 422
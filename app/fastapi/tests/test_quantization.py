@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+import pytest
+from tensorflow.keras.preprocessing.text import Tokenizer
+
+import main
+from benchmarks.synthetic import build_model, sample_texts
+from quantization import (
+    VARIANTS_DIR, compress_model, count_tokens, embedding_layer, parse_variant, prune_vocabulary,
+    read_texts, select_rows,
+)
+from runtime import KERAS_MODEL_FILE, TFLiteRuntime, export_model
+from vocabulary import Vocabulary, VocabularyEncoder
+
+MAXLEN = 20
+WORDS = [f"w{i}" for i in range(120)]
+
+
+@pytest.fixture(scope="module")
+def model():
+    return build_model(vocabulary_size=150, embedding_dim=8, maxlen=MAXLEN, units=(8, 4))
+
+
+@pytest.fixture(scope="module")
+def vocabulary():
+    tokenizer = Tokenizer(oov_token="<OOV>")
+    tokenizer.fit_on_texts(sample_texts(300, WORDS, seed=3, unknown_rate=0.0))
+    return Vocabulary.from_tokenizer(tokenizer)
+
+
+def test_compressed_embedding_keeps_the_scores(model, tmp_path):
+    tokens = np.random.default_rng(0).integers(1, 150, size=(8, MAXLEN)).astype(np.float32)
+    expected = model(tokens).numpy()
+
+    for dtype, weight_dtypes in [("float16", ["float16"]), ("int8", ["int8", "float32"])]:
+        compressed = compress_model(model, dtype)
+        embedding = embedding_layer(compressed)
+        assert [weight.dtype for weight in embedding.weights] == weight_dtypes
+        np.testing.assert_allclose(compressed(tokens).numpy(), expected, atol=1e-3)
+
+        # Export TFLite avec quantification des poids (TFLite n'a pas de gather en float16)
+        metadata = export_model(compressed, tmp_path / dtype, MAXLEN, tflite_batch_sizes=(8,), quantization=dtype)
+        tflite = TFLiteRuntime({8: tmp_path / dtype / metadata["tflite"]["8"]}, metadata["input_dtype"])
+        np.testing.assert_allclose(tflite.predict(tokens), expected[:, 0], atol=1e-2)
+
+    with pytest.raises(ValueError):
+        parse_variant("int4")
+    assert parse_variant("int8-top5000") == ("int8", 5000)
+
+
+def test_pruned_vocabulary_keeps_frequent_tokens_and_maps_the_rest_to_oov(model, vocabulary):
+    # Le trafic n'utilise que les 30 derniers mots : ce sont eux qui sont conservés
+    traffic = [" ".join(WORDS[-30:][i:i + 10]) for i in range(0, 30, 5)] * 3
+    counts = count_tokens(VocabularyEncoder(vocabulary), traffic, MAXLEN, rows=150)
+    kept = select_rows(vocabulary, 31, counts)
+    assert vocabulary.oov_index in kept and len(kept) == 31
+    assert set(kept) == {vocabulary.oov_index} | {vocabulary.get(word) for word in WORDS[-30:]}
+
+    pruned = prune_vocabulary(vocabulary, kept)
+    assert len(pruned) == 31 and pruned.get("<OOV>") == 1
+    assert pruned.texts_to_sequences([f"{WORDS[0]} {WORDS[-1]}"]) == [[1, pruned.get(WORDS[-1])]]
+
+    # Sur des textes faits de mots conservés, la variante élaguée donne les scores du modèle d'origine
+    compressed = compress_model(model, "float16", kept)
+    assert embedding_layer(compressed).input_dim == 32
+    original = VocabularyEncoder(vocabulary).encode(traffic[:8], MAXLEN)
+    renumbered = VocabularyEncoder(pruned).encode(traffic[:8], MAXLEN)
+    np.testing.assert_allclose(
+        compressed(renumbered.astype(np.float32)).numpy(), model(original.astype(np.float32)).numpy(), atol=1e-3
+    )
+
+
+def test_load_model_builds_the_variant_once_and_reuses_it(tmp_path, model, vocabulary, monkeypatch):
+    model.save(tmp_path / KERAS_MODEL_FILE)
+    vocabulary.save(tmp_path / "vocabulary.bin")
+    with open(tmp_path / "parameters.json", "w") as f:
+        json.dump({"max_sequence_length": MAXLEN}, f)
+    monkeypatch.setattr(main, "MODEL_VARIANT", "int8-top40")
+    monkeypatch.setattr(main, "MODEL_BACKEND", "keras")
+    monkeypatch.setattr(main, "load_text_artifacts", lambda model_dir: {"model_dir": model_dir})
+
+    pack = main.load_model("run", tmp_path)
+    variant_dir = tmp_path / VARIANTS_DIR / "int8-top40"
+    assert pack["model_dir"] == variant_dir and pack["variant"] == "int8-top40"
+    assert pack["cache_namespace"] != "run"
+    assert len(Vocabulary.open(variant_dir / "vocabulary.bin")) == 40
+    assert pack["runtime"].predict(np.zeros((2, MAXLEN), dtype=np.int32)).shape == (2,)
+
+    # Second chargement : la variante existante est réutilisée telle quelle
+    monkeypatch.setattr("quantization.build_variant", lambda *args, **kwargs: pytest.fail("variante reconstruite"))
+    assert main.load_model("run", tmp_path)["model_dir"] == variant_dir
+
+
+def test_read_texts_reads_feedback_exports(tmp_path):
+    (tmp_path / "feedback.csv").write_text('"4","1","date","NO_QUERY","feedback","great flight"\n'
+                                           '"0","2","date","NO_QUERY","feedback","lost, my bag"\n', encoding="latin-1")
+    assert read_texts(tmp_path / "feedback.csv") == (["great flight", "lost, my bag"], [1, 0])
+    (tmp_path / "feedback.ndjson").write_text('{"text": "ok", "label": 1}\n', encoding="utf-8")
+    assert read_texts(tmp_path / "feedback.ndjson") == (["ok"], [1])
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+import main
+from registry import ModelRegistry, UnknownModel
+
+
+def test_swap_keeps_in_flight_requests_on_the_old_model():
+    released = []
+    registry = ModelRegistry(max_models=1, release=lambda pack: released.append(pack["run_id"]))
+    registry.publish("a", {"run_id": "a"})
+
+    with registry.acquire() as pack:
+        # Bascule pendant une requête : l'ancien modèle est retiré mais pas encore libéré
+        registry.publish("b", {"run_id": "b"})
+        assert pack["run_id"] == "a" and released == []
+        with registry.acquire() as new_pack:
+            assert new_pack["run_id"] == "b"
+    assert released == ["a"]
+
+    with pytest.raises(UnknownModel):
+        with registry.acquire("a"):
+            pass
+
+
+def test_least_recently_used_model_is_evicted_and_default_is_protected():
+    released = []
+    registry = ModelRegistry(max_models=2, release=lambda pack: released.append(pack["run_id"]))
+    registry.publish("a", {"run_id": "a"})
+    registry.publish("b", {"run_id": "b"}, make_default=False)
+    assert registry.default == "a"
+
+    with pytest.raises(ValueError):
+        registry.retire("a")
+
+    assert registry.publish("c", {"run_id": "c"}, make_default=False) == ["b"]
+    assert released == ["b"]
+    assert [model["run_id"] for model in registry.snapshot()["models"]] == ["a", "c"]
+
+
+def test_admin_endpoint_swaps_the_default_model(stub_model):
+    with stub_model() as client:
+        assert client.post("/predict", json={"text": "bon vol"}).json()["run_id"] == "run-a"
+
+        assert client.post("/admin/models", json={"run_id": "run-b"}).status_code == 401
+        response = client.post("/admin/models", json={"run_id": "run-b"}, headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 202
+
+        deadline = time.monotonic() + 10
+        while client.get("/models").json()["default"] != "run-b" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.post("/predict", json={"text": "bon vol"}).json()["run_id"] == "run-b"
+
+        # L'ancien modèle reste disponible à la demande
+        response = client.post("/predict-batch", json={"texts": ["a", "b"], "run_id": "run-a"})
+        assert [result["run_id"] for result in response.json()["results"]] == ["run-a", "run-a"]
+        assert client.post("/predict", json={"text": "x", "run_id": "run-z"}).status_code == 404
+
+        headers = {"X-Admin-Token": "secret"}
+        assert client.delete("/admin/models/run-b", headers=headers).status_code == 409
+        assert client.delete("/admin/models/run-a", headers=headers).status_code == 200
+        assert [model["run_id"] for model in client.get("/models").json()["models"]] == ["run-b"]
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import build_model
+from runtime import (
+    KERAS_MODEL_FILE, CompiledRuntime, KerasRuntime, LengthBucketedRuntime, SavedModelRuntime, TFLiteRuntime,
+    export_model, load_runtime, sequence_lengths, split_into_buckets,
+)
+
+MAXLEN = 20
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    model_dir = tmp_path_factory.mktemp("model")
+    build_model(vocabulary_size=300, embedding_dim=8, maxlen=MAXLEN, units=(8, 4)).save(model_dir / KERAS_MODEL_FILE)
+    return model_dir
+
+
+@pytest.fixture(scope="module")
+def tokens():
+    rng = np.random.default_rng(0)
+    tokens = rng.integers(1, 300, size=(6, MAXLEN), dtype=np.int32)
+    # Séquences complétées par des zéros à la fin, comme en production
+    for row, length in enumerate([1, 3, 8, 12, 20, 5]):
+        tokens[row, length:] = 0
+    return tokens
+
+
+def test_exported_backends_match_keras(model_dir, tokens):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(str(model_dir / KERAS_MODEL_FILE))
+    expected = KerasRuntime(model).predict(tokens)
+    metadata = export_model(model, model_dir / "export", MAXLEN, tflite_batch_sizes=(1, 4))
+
+    savedmodel = SavedModelRuntime(model_dir / "export" / metadata["savedmodel"], metadata["input_dtype"])
+    np.testing.assert_allclose(savedmodel.predict(tokens), expected, atol=1e-5)
+
+    # 6 lignes : un morceau de 4, puis un morceau de 2 complété jusqu'à 4
+    files = {int(size): model_dir / "export" / name for size, name in metadata["tflite"].items()}
+    tflite = TFLiteRuntime(files, metadata["input_dtype"])
+    np.testing.assert_allclose(tflite.predict(tokens), expected, atol=1e-5)
+    np.testing.assert_allclose(tflite.predict(tokens[:1]), expected[:1], atol=1e-5)
+    assert tflite.predict(tokens[:0]).shape == (0,)
+
+
+def test_load_runtime_uses_existing_export(model_dir, tokens):
+    runtime = load_runtime("savedmodel", model_dir, MAXLEN)
+    assert runtime.name == "savedmodel"
+    assert runtime.predict(tokens).shape == (len(tokens),)
+
+    with pytest.raises(ValueError):
+        load_runtime("onnx", model_dir, MAXLEN)
+
+
+def test_split_into_buckets_pads_to_the_nearest_size():
+    tokens = np.arange(11 * 2).reshape(11, 2)
+    chunks = list(split_into_buckets(tokens, [1, 4, 8]))
+
+    assert [(size, rows) for size, _, rows in chunks] == [(8, 8), (4, 3)]
+    assert np.array_equal(chunks[1][1][:3], tokens[8:])
+    assert not chunks[1][1][3:].any()
+
+
+def test_compiled_runtime_matches_keras(model_dir, tokens):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(str(model_dir / KERAS_MODEL_FILE))
+    expected = KerasRuntime(model).predict(tokens)
+    runtime = CompiledRuntime(model, MAXLEN, batch_sizes=(1, 4))
+
+    np.testing.assert_allclose(runtime.predict(tokens), expected, atol=1e-6)
+    np.testing.assert_allclose(runtime.predict(tokens[:1]), expected[:1], atol=1e-6)
+    assert runtime.predict(tokens[:0]).shape == (0,)
+
+
+def test_length_bucketed_runtime_restores_order_and_checks_parity(model_dir, tokens):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(str(model_dir / KERAS_MODEL_FILE))
+    full = CompiledRuntime(model, MAXLEN, batch_sizes=(1, 4)).predict(tokens)
+    runtime = LengthBucketedRuntime(model, MAXLEN, lengths=(4, 10), batch_sizes=(1, 4))
+    assert list(sequence_lengths(tokens)) == [1, 3, 8, 12, 20, 5]
+
+    # Avant le contrôle de parité, tout est exécuté à pleine longueur
+    np.testing.assert_allclose(runtime.predict(tokens), full, atol=1e-6)
+
+    # Une tolérance nulle n'est respectée par aucune marge : la troncature reste désactivée
+    report = runtime.calibrate(tokens, tolerance=0.0, margins=(0, 2))
+    assert report["margin"] is None and set(report["margins"]) == {"0", "2"}
+    np.testing.assert_allclose(runtime.predict(tokens), full, atol=1e-6)
+
+    # Longueurs minimales (marge de 2) : 4, 10, 10, 20, 20, 10 ; la ligne seule de longueur 4
+    # est regroupée avec les trois lignes de longueur 10 plutôt que d'occuper un lot à elle seule
+    assert list(runtime._merge_buckets(np.array([1, 3, 2]))) == [1, 1, 2]
+
+    # Troncature activée : chaque ligne a le score de sa séquence tronquée, dans l'ordre du lot
+    report = runtime.calibrate(tokens, tolerance=1.0, margins=(2,))
+    assert report["margin"] == 2
+    scores = runtime.predict(tokens)
+    for row, length in enumerate([10, 10, 10, MAXLEN, MAXLEN, 10]):
+        expected = full[row]
+        if length < MAXLEN:
+            expected = runtime._truncated[(length, 1)](tf.constant(tokens[row:row + 1, :length], dtype=tf.float32))[0]
+        np.testing.assert_allclose(scores[row], expected, atol=1e-6)
+    # Les écarts restent faibles sur ce modèle non entraîné
+    np.testing.assert_allclose(scores, full, atol=0.05)
@@ -0,0 +1,89 @@
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from score import score_file
+
+
+def fake_score(chunk):
+    return [{"sentiment": "Positif", "confidence": 1.0, "raw_score": float(len(text))} for _, text in chunk]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["tweet_id", "text"])
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_csv_scoring_keeps_input_order_and_ids(tmp_path):
+    source = tmp_path / "tweets.csv"
+    write_csv(source, [(f"t{i}", "x" * i) for i in range(25)])
+    output = tmp_path / "scores.csv"
+
+    total = score_file(source, output, id_column="tweet_id", chunk_size=4, score_chunk=fake_score, initializer=None)
+
+    rows = read_csv(output)
+    assert total == 25
+    assert [row["id"] for row in rows] == [f"t{i}" for i in range(25)]
+    assert [float(row["raw_score"]) for row in rows] == [float(i) for i in range(25)]
+    assert not (tmp_path / "scores.csv.checkpoint.json").exists()
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    source = tmp_path / "tweets.txt"
+    source.write_text("\n".join(f"tweet {i}" for i in range(20)) + "\n", encoding="utf-8")
+    output = tmp_path / "scores.ndjson"
+    calls = []
+
+    def failing_score(chunk):
+        calls.append(chunk[0][0])
+        if len(calls) == 3:
+            raise RuntimeError("interruption")
+        return fake_score(chunk)
+
+    with pytest.raises(RuntimeError):
+        score_file(source, output, chunk_size=3, score_chunk=failing_score, initializer=None)
+    checkpoint = json.loads((tmp_path / "scores.ndjson.checkpoint.json").read_text())
+    assert checkpoint["rows_done"] == 6
+
+    calls.clear()
+    total = score_file(source, output, chunk_size=3, score_chunk=fake_score, initializer=None)
+
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert total == 14
+    assert [line["id"] for line in lines] == list(range(20))
+
+
+def test_scoring_workers_do_not_import_the_service():
+    # Un processus de travail n'importe pas main.py : ni application, ni bases, ni télémétrie
+    script = """
+import sys
+import numpy as np
+import score
+
+class Stub:
+    def preprocess_batch(self, texts):
+        return texts
+    def encode(self, texts, max_length):
+        return np.zeros((len(texts), max_length), dtype=np.int32)
+    def predict(self, tokens):
+        return np.full(len(tokens), 0.75, dtype=np.float32)
+
+score._worker_model_pack = {"runtime": Stub(), "encoder": Stub(), "preprocess": Stub(), "params": {}}
+results = score._score_chunk([(0, "bon vol"), (1, "bon vol")])
+assert [result["raw_score"] for result in results] == [0.75, 0.75], results
+assert not {"main", "fastapi", "feedback_store", "jobs", "telemetry"} & set(sys.modules), sorted(sys.modules)
+"""
+    completed = subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).resolve().parents[1],
+                               capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
@@ -0,0 +1,59 @@
+import os
+import signal
+
+import pytest
+
+import main
+import serve
+
+
+def test_threads_are_split_between_workers():
+    assert serve.threads_per_worker(4, cpu_count=8) == 2
+    assert serve.threads_per_worker(3, cpu_count=8) == 2
+    # Jamais moins d'un thread, même avec plus de processus que de cœurs
+    assert serve.threads_per_worker(8, cpu_count=2) == 1
+
+
+def test_worker_count_ignores_web_concurrency(monkeypatch):
+    # Heroku fixe WEB_CONCURRENCY d'après la taille du dyno : il ne doit pas multiplier les processus
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.delenv("API_WORKERS", raising=False)
+    assert serve.default_workers() == 1
+    monkeypatch.setenv("API_WORKERS", "3")
+    assert serve.default_workers() == 3
+
+
+def test_load_model_reuses_artifacts_preloaded_before_fork(tmp_path, monkeypatch):
+    vocabulary, encoder, preprocess = object(), object(), object()
+    monkeypatch.setattr(main, "shared_artifacts", {
+        str(tmp_path.resolve()): {"vocabulary": vocabulary, "encoder": encoder, "preprocess": preprocess}
+    })
+
+    # Aucun fichier n'est lu : ni tokenizer.pickle ni vocabulary.bin n'existent dans tmp_path
+    artifacts = main.load_text_artifacts(tmp_path)
+    assert artifacts["vocabulary"] is vocabulary and artifacts["encoder"] is encoder and artifacts["preprocess"] is preprocess
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork requis")
+def test_supervisor_respawns_workers_and_gives_up_on_crash_loop(monkeypatch):
+    monkeypatch.setattr(serve, "run_worker", lambda app, sock, log_level: 3)
+    spawned = []
+    original_spawn = serve.Supervisor.spawn
+
+    def spawn(self):
+        spawned.append(1)
+        original_spawn(self)
+
+    monkeypatch.setattr(serve.Supervisor, "spawn", spawn)
+    sock = serve.bind_socket("127.0.0.1", 0)
+    supervisor = serve.Supervisor(app=None, sock=sock, workers=2)
+    try:
+        code = supervisor.run()
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    # Chaque processus s'arrête aussitôt : il est relancé jusqu'à MAX_CRASHES échecs consécutifs
+    assert code == 1
+    assert len(spawned) == 2 + serve.MAX_CRASHES - 1
+    assert supervisor.children == {}
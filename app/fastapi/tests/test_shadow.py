@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import main
+from executor import InferenceExecutor
+from shadow import TrafficRouter
+
+
+def result(score):
+    return {"sentiment": "Positif" if score >= 0.5 else "Négatif", "confidence": max(score, 1 - score), "raw_score": score}
+
+
+def test_mirrored_requests_are_compared_in_the_background():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def candidate(texts, model_id):
+            await release.wait()
+            return [result(0.2) for _ in texts]
+
+        router = TrafficRouter("b", shadow_fraction=1.0, max_shadow_in_flight=1, seed=0)
+        router.mirror(["x", "y"], [result(0.9), result(0.1)], candidate)
+        # Une seule requête miroir à la fois : la suivante est abandonnée
+        router.mirror(["z"], [result(0.9)], candidate)
+        assert router.stats()["shadow"]["in_flight"] == 1
+
+        release.set()
+        await asyncio.sleep(0.01)
+        return router.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shadow"]["mirrored_requests"] == 1 and stats["shadow"]["dropped_requests"] == 1
+    assert stats["shadow"]["compared_predictions"] == 2
+    assert stats["shadow"]["disagreement_rate"] == 0.5
+    assert abs(stats["shadow"]["max_abs_score_diff"] - 0.7) < 1e-9
+    assert stats["latency"]["shadow"]["count"] == 1
+
+
+def test_canary_fraction_routes_requests_to_the_candidate():
+    router = TrafficRouter("b", canary_fraction=0.25, seed=1)
+    routed = [router.choose() for _ in range(2000)]
+    assert set(routed) == {None, "b"}
+    assert 0.2 < routed.count("b") / len(routed) < 0.3
+    assert TrafficRouter(None, canary_fraction=1.0).choose() is None
+
+
+def test_rollout_endpoints(stub_model):
+    scores = {"run-a": 0.9, "run-b": 0.1}
+
+    def score(texts, pack):
+        return [result(scores[pack["run_id"]]) for _ in texts]
+
+    headers = {"X-Admin-Token": "secret"}
+
+    with stub_model(score) as client:
+        client.post("/admin/models", json={"run_id": "run-b", "make_default": False}, headers=headers)
+        deadline = time.monotonic() + 10
+        while "run-b" not in main.registry and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert client.put("/admin/rollout", json={"candidate": "run-z"}, headers=headers).status_code == 404
+        assert client.put("/admin/rollout", json={"candidate": "run-b", "canary_fraction": 2}, headers=headers).status_code == 422
+
+        # Canari : toutes les réponses viennent du candidat
+        client.put("/admin/rollout", json={"candidate": "run-b", "canary_fraction": 1.0}, headers=headers)
+        assert client.post("/predict", json={"text": "bon vol"}).json()["run_id"] == "run-b"
+
+        # Miroir : les réponses restent celles du modèle par défaut, le candidat est comparé en arrière-plan
+        client.put("/admin/rollout", json={"candidate": "run-b", "shadow_fraction": 1.0}, headers=headers)
+        response = client.post("/predict-batch", json={"texts": ["a", "b", "c"]})
+        assert [r["run_id"] for r in response.json()["results"]] == ["run-a"] * 3
+
+        deadline = time.monotonic() + 10
+        while client.get("/rollout").json()["shadow"]["compared_predictions"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = client.get("/rollout").json()
+        assert stats["shadow"]["disagreement_rate"] == 1.0
+        assert stats["latency"]["primary"]["count"] == 1 and stats["latency"]["shadow"]["count"] == 1
+        client.put("/admin/rollout", json={"candidate": None}, headers=headers)
+
+
+def test_saturated_shadow_never_rejects_primary_requests():
+    release = threading.Event()
+
+    async def scenario():
+        executor = InferenceExecutor(max_workers=2, max_queue=0)
+
+        async def candidate(texts, model_id):
+            return await executor.run_background(lambda: release.wait(5) and [result(0.2) for _ in texts])
+
+        router = TrafficRouter("b", shadow_fraction=1.0, max_shadow_in_flight=2, seed=0)
+        for text in ["x", "y", "z"]:
+            router.mirror([text], [result(0.9)], candidate)
+        await asyncio.sleep(0.05)
+        assert router.stats()["shadow"]["in_flight"] == 2
+
+        # Le miroir est saturé : les requêtes réelles disposent toujours de tout leur budget
+        primary = await asyncio.gather(*(executor.run(lambda: [result(0.9)]) for _ in range(2)))
+        stats = executor.stats()
+        release.set()
+        await asyncio.sleep(0.05)
+        await router.stop()
+        executor.shutdown()
+        return primary, stats, router.stats()
+
+    primary, stats, router_stats = asyncio.run(scenario())
+    assert len(primary) == 2 and stats["rejected"] == 0
+    assert stats["background"]["running"] == 1 and stats["background"]["waiting"] == 1
+    assert router_stats["shadow"]["compared_predictions"] == 2
@@ -0,0 +1,54 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+import main
+from startup import DOWNLOADING, FAILED, LOADING, READY, StartupState
+
+
+def test_phases_are_timed_until_ready():
+    state = StartupState()
+    state.record("imports", 0.5)
+    with state.phase(DOWNLOADING):
+        assert state.snapshot()["status"] == DOWNLOADING
+    with state.phase(LOADING):
+        pass
+    state.mark_ready()
+
+    snapshot = state.snapshot()
+    assert snapshot["status"] == READY and snapshot["ready"]
+    assert list(snapshot["phases"]) == ["imports", DOWNLOADING, LOADING]
+    assert state.wait(timeout=0)
+
+
+def test_failure_keeps_the_failed_phase():
+    state = StartupState()
+    with state.phase(LOADING):
+        state.fail("fichier manquant")
+
+    snapshot = state.snapshot()
+    assert snapshot["status"] == FAILED and not snapshot["ready"]
+    assert snapshot["failed_phase"] == LOADING
+    assert snapshot["error"] == "fichier manquant"
+
+
+def test_app_is_live_while_the_model_downloads(monkeypatch):
+    release = threading.Event()
+
+    def slow_download(run_id, model_dir):
+        release.wait(timeout=10)
+        return None
+
+    monkeypatch.setattr(main, "download_artifacts_from_mlflow", slow_download)
+    with TestClient(main.app) as client:
+        assert client.get("/health/live").status_code == 200
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["detail"]["status"] == DOWNLOADING
+
+        release.set()
+        assert main.startup.wait(timeout=10)
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["detail"]["status"] == FAILED
+        assert client.get("/health/live").status_code == 200
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from streaming import format_result, iter_lines, parse_line
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def collect_lines(data: bytes, size: int, **kwargs):
+    async def scenario():
+        return [item async for item in iter_lines(chunked(data, size), **kwargs)]
+    return asyncio.run(scenario())
+
+
+def test_lines_are_reassembled_across_chunks():
+    data = "premier tweet\r\nsecond tweet ✈\n\ndernier sans saut".encode("utf-8")
+    expected = [(0, "premier tweet"), (1, "second tweet ✈"), (2, ""), (3, "dernier sans saut")]
+    for size in (1, 3, 7, len(data)):
+        assert collect_lines(data, size) == expected
+
+
+def test_overlong_lines_are_reported_and_skipped():
+    data = b"ok\n" + b"x" * 100 + b"\nfin\n"
+    assert collect_lines(data, 8, max_line_bytes=50) == [(0, "ok"), (1, None), (2, "fin")]
+
+
+def test_parse_line_modes():
+    assert parse_line(3, "   ", json_lines=False) is None
+    assert parse_line(3, '{"text": "x"}', json_lines=False).text == '{"text": "x"}'
+
+    line = parse_line(3, '{"id": "abc", "text": "great flight"}', json_lines=True)
+    assert (line.id, line.text) == ("abc", "great flight")
+    assert parse_line(4, '"just text"', json_lines=True).id == 4
+    assert parse_line(5, "{not json", json_lines=True).error
+    assert parse_line(6, '{"id": 1}', json_lines=True).error
+    assert parse_line(7, None, json_lines=True).error
+
+
+def test_format_result_carries_the_id():
+    line = parse_line(0, '{"id": "t-1", "text": "x"}', json_lines=True)
+    output = json.loads(format_result(line, {"sentiment": "Positif", "confidence": 0.9, "raw_score": 0.9}))
+    assert output == {"id": "t-1", "sentiment": "Positif", "confidence": 0.9, "raw_score": 0.9}
+    assert json.loads(format_result(parse_line(1, "{", json_lines=True)))["error"]
@@ -0,0 +1,71 @@
+import logging
+import time
+
+import main
+from telemetry import MemorySink, TelemetryQueue, queued_log_handler
+
+
+class SlowSink(MemorySink):
+    def send(self, items):
+        time.sleep(0.2)
+        super().send(items)
+
+
+def test_events_are_batched_by_count_and_time():
+    sink = MemorySink()
+    telemetry = TelemetryQueue(sink, batch_size=3, flush_interval=0.2)
+    telemetry.start()
+    for i in range(4):
+        assert telemetry.track_event("evenement", {"i": str(i)})
+
+    # Un lot complet de 3, puis le dernier élément après le délai
+    deadline = time.monotonic() + 5
+    while len(sink.items) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [len(batch) for batch in sink.batches] == [3, 1]
+    telemetry.stop()
+    assert telemetry.stats()["sent"] == 4
+
+
+def test_full_queue_drops_without_blocking_and_stop_drains():
+    sink = SlowSink()
+    telemetry = TelemetryQueue(sink, max_queue=2, batch_size=1, flush_interval=10)
+    telemetry.start()
+    started = time.perf_counter()
+    accepted = [telemetry.track_metric("latence", i) for i in range(20)]
+    assert time.perf_counter() - started < 0.1
+    assert not all(accepted)
+    assert telemetry.stats()["dropped"] == accepted.count(False)
+
+    telemetry.stop()
+    assert len(sink.items) == accepted.count(True)
+    assert TelemetryQueue(None).track_event("ignoré") is False
+
+
+def test_log_records_go_through_a_bounded_queue():
+    received = []
+    target = logging.Handler()
+    target.emit = received.append
+    handler, listener = queued_log_handler(target, max_queue=1)
+
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+
+    listener.start()
+    listener.stop()
+    assert len(received) == 1
+
+
+def test_feedback_is_queued_and_flushed_on_shutdown(monkeypatch, stub_model):
+    sink = MemorySink()
+    monkeypatch.setattr(main.telemetry, "sink", sink)
+
+    with stub_model() as client:
+        response = client.post("/feedback", json={
+            "tweet_text": "vol retardé", "prediction": "Négatif", "confidence": 0.8, "is_correct": True
+        })
+        assert response.status_code == 200
+
+    assert [item["name"] for item in sink.items if item["type"] == "event"] == ["model_feedback"]
@@ -0,0 +1,136 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+from tensorflow.keras.preprocessing.sequence import pad_sequences
+from tensorflow.keras.preprocessing.text import Tokenizer
+
+import main
+import vocabulary as vocabulary_module
+from benchmarks.synthetic import sample_texts
+from artifacts import MANIFEST_NAME, file_digest
+from inference import load_vocabulary
+from vocabulary import VOCABULARY_FILE, Vocabulary, VocabularyEncoder, convert_tokenizer
+
+MAXLEN = 20
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "<URL> <MENTION> # ! ?",
+    "Été déjà vu — naïve café",
+    "word\x1eseparator inside",
+    "a\tb\nc",
+    "nul\x00 \x00 w1\x00",
+    "x" * 300,
+    " ".join(["repeated"] * 50),
+]
+
+
+def fit_tokenizer(num_words=None, oov_token=None):
+    tokenizer = Tokenizer(num_words=num_words, oov_token=oov_token)
+    tokenizer.fit_on_texts(sample_texts(500, [f"w{i}" for i in range(200)], seed=3) + ["Été naïve café"])
+    return tokenizer
+
+
+@pytest.mark.parametrize("num_words, oov_token", [(None, None), (50, None), (None, "<OOV>"), (50, "<OOV>")])
+def test_memory_mapped_vocabulary_matches_keras(tmp_path, num_words, oov_token):
+    tokenizer = fit_tokenizer(num_words, oov_token)
+    Vocabulary.from_tokenizer(tokenizer).save(tmp_path / "vocabulary.bin")
+    vocabulary = Vocabulary.open(tmp_path / "vocabulary.bin")
+    assert vocabulary.buffer is not None and not vocabulary.table.flags.writeable
+
+    texts = sample_texts(40, [f"w{i}" for i in range(300)], seed=4) + EDGE_CASES
+    assert vocabulary.texts_to_sequences(texts) == tokenizer.texts_to_sequences(texts)
+
+    encoder = VocabularyEncoder(vocabulary)
+    for batch in (texts[:3], texts[:10], texts):
+        reference = pad_sequences(tokenizer.texts_to_sequences(batch), maxlen=MAXLEN, padding='post', truncating='post')
+        encoded = encoder.encode(batch, MAXLEN)
+        assert encoded.dtype == np.int32 and np.array_equal(encoded, reference)
+
+
+def test_tokenizer_is_converted_once_then_never_unpickled(tmp_path, monkeypatch):
+    tokenizer = fit_tokenizer(num_words=50, oov_token="<OOV>")
+    with open(tmp_path / "tokenizer.pickle", "wb") as f:
+        pickle.dump(tokenizer, f)
+
+    first = load_vocabulary(tmp_path)
+    assert (tmp_path / "vocabulary.bin").exists()
+
+    # Démarrage suivant : le vocabulaire est ouvert sans dépickler le tokenizer
+    def refuse(*args, **kwargs):
+        raise AssertionError("tokenizer.pickle ne doit plus être dépicklé")
+
+    monkeypatch.setattr(vocabulary_module.pickle, "load", refuse)
+    second = load_vocabulary(tmp_path)
+    assert second.get("w1") == first.get("w1") == tokenizer.word_index["w1"]
+    monkeypatch.undo()
+
+    # Un nouveau tokenizer déposé à la place de l'ancien est reconverti
+    replacement = Tokenizer(oov_token="<OOV>")
+    replacement.fit_on_texts(["autre vocabulaire complètement"])
+    with open(tmp_path / "tokenizer.pickle", "wb") as f:
+        pickle.dump(replacement, f)
+    assert load_vocabulary(tmp_path).get("autre") == replacement.word_index["autre"]
+
+
+def test_tokenizer_fingerprint_comes_from_the_artifact_manifest(tmp_path, monkeypatch):
+    with open(tmp_path / "tokenizer.pickle", "wb") as f:
+        pickle.dump(fit_tokenizer(), f)
+    convert_tokenizer(tmp_path / "tokenizer.pickle", tmp_path / VOCABULARY_FILE)
+    sha256, size = file_digest(tmp_path / "tokenizer.pickle")
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({"tokenizer.pickle": {"sha256": sha256, "size": size}}))
+
+    # Le tokenizer a été vérifié au téléchargement : il n'est ni relu ni dépicklé au démarrage
+    def refuse(*args, **kwargs):
+        raise AssertionError("tokenizer.pickle ne doit pas être relu")
+
+    monkeypatch.setattr(vocabulary_module, "file_digest", refuse)
+    monkeypatch.setattr(vocabulary_module.pickle, "load", refuse)
+    assert load_vocabulary(tmp_path).get("w1") is not None
+
+
+def test_published_vocabulary_replaces_the_pickled_tokenizer(tmp_path, monkeypatch):
+    mlflow = pytest.importorskip("mlflow")
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in main.MODEL_ARTIFACTS:
+        (source / name).write_bytes(b"{}")
+    with open(source / "tokenizer.pickle", "wb") as f:
+        pickle.dump(fit_tokenizer(), f)
+    convert_tokenizer(source / "tokenizer.pickle", source / VOCABULARY_FILE)
+
+    tracking_uri = (tmp_path / "mlruns").as_uri()
+    monkeypatch.setattr(main, "mlflow_tracking_uri", tracking_uri)
+    client = mlflow.tracking.MlflowClient(tracking_uri)
+    experiment = client.create_experiment("vocabulaire")
+    legacy, published = client.create_run(experiment).info.run_id, client.create_run(experiment).info.run_id
+    for name in main.MODEL_ARTIFACTS + ["tokenizer.pickle"]:
+        client.log_artifact(legacy, str(source / name), "local_artifacts")
+        client.log_artifact(published, str(source / name), "local_artifacts")
+    client.log_artifact(published, str(source / VOCABULARY_FILE), "local_artifacts")
+
+    # Exécution qui publie vocabulary.bin : le tokenizer picklé n'est pas téléchargé
+    run_dir = main.download_artifacts_from_mlflow(published, tmp_path / "store")
+    assert (run_dir / VOCABULARY_FILE).exists() and not (run_dir / "tokenizer.pickle").exists()
+    monkeypatch.setattr(vocabulary_module.pickle, "load", lambda *args: pytest.fail("dépicklage au démarrage"))
+    assert load_vocabulary(run_dir).get("w1") is not None
+    monkeypatch.undo()
+    monkeypatch.setattr(main, "mlflow_tracking_uri", "http://127.0.0.1:9")
+    assert main.download_artifacts_from_mlflow(published, tmp_path / "store") == run_dir
+
+    # Exécution plus ancienne, sans vocabulaire publié : repli sur le tokenizer picklé
+    monkeypatch.setattr(main, "mlflow_tracking_uri", tracking_uri)
+    run_dir = main.download_artifacts_from_mlflow(legacy, tmp_path / "store")
+    assert (run_dir / "tokenizer.pickle").exists()
+    assert load_vocabulary(run_dir).get("w1") is not None
+
+
+def test_truncated_vocabulary_file_is_rejected(tmp_path):
+    path = tmp_path / "vocabulary.bin"
+    Vocabulary.from_tokenizer(fit_tokenizer()).save(path)
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(ValueError):
+        Vocabulary.open(path)
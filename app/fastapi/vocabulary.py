@@ -0,0 +1,399 @@
+"""
+Vocabulaire compact, en lecture seule et projeté en mémoire, qui remplace le
+Tokenizer Keras picklé au chargement du modèle.
+
+`tokenizer.pickle` contient, en plus du `word_index`, les dictionnaires
+`word_counts`, `word_docs` et `index_docs`, inutiles pour l'inférence : le
+dépickler coûte du temps au démarrage et de la mémoire dans chaque processus, et
+exécuter un pickle n'est sûr que s'il vient d'une source de confiance. Le
+tokenizer est donc converti une seule fois en un fichier `vocabulary.bin` :
+
+- un en-tête JSON (configuration du découpage : `filters`, `lower`, `split`,
+  `num_words` et token hors vocabulaire) ;
+- une table triée de chaînes UTF-8 de largeur fixe (seuls les mots d'indice
+  inférieur à `num_words`, les seuls que `texts_to_sequences` peut renvoyer) ;
+- les indices correspondants, en int32.
+
+Le fichier est ouvert par `mmap` : aucun dictionnaire n'est construit, les mots
+sont cherchés par recherche dichotomique vectorisée (`np.searchsorted`) et les
+pages de la table sont partagées par tous les processus qui l'ouvrent.
+`Vocabulary.texts_to_sequences` et `VocabularyEncoder` reproduisent exactement
+`texts_to_sequences` (mots hors vocabulaire et limite `num_words` compris).
+
+Le fichier est publié avec l'exécution MLflow (`--log-to-run`) : le service le
+télécharge à la place de `tokenizer.pickle`, qui n'est alors jamais dépicklé au
+démarrage, même sur un dyno ou un conteneur neuf.
+
+Usage :
+    python vocabulary.py model/tokenizer.pickle model/vocabulary.bin
+    python vocabulary.py model/runs/<run_id>/tokenizer.pickle --log-to-run <run_id>
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from artifacts import file_digest
+from encoding import BATCH_SEPARATOR, BOUNDARY, DEFAULT_FILTERS, DROP, MIN_VECTORIZED_BATCH, fill_batch
+
+logger = logging.getLogger(__name__)
+
+# Nom du fichier de vocabulaire, à côté des artefacts du modèle
+VOCABULARY_FILE = "vocabulary.bin"
+
+MAGIC = b"APVOCAB\x00"
+VERSION = 1
+
+# Alignement (en octets) de la table et des indices dans le fichier
+ALIGNMENT = 64
+
+# Marque des mots absents du vocabulaire dans les résultats de `search`
+MISSING = -3
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class Vocabulary:
+    """
+    Table triée mot -> indice, en lecture seule, avec la configuration de découpage
+    du tokenizer dont elle est issue.
+
+    Les chaînes sont stockées en UTF-8 sur `width` octets, complétées par des zéros ;
+    `width` dépasse d'un octet le mot le plus long, de sorte qu'un mot plus long que
+    tous ceux de la table, tronqué à `width` octets, ne puisse égaler aucune entrée.
+
+    Args:
+        table: Tableau trié de type `S<width>`
+        indices: Indice de chaque mot de la table (int32)
+        config: Configuration du découpage (`filters`, `lower`, `split`, `num_words`,
+            `oov_token`, `oov_index`)
+        buffer: Projection mémoire dont les tableaux sont des vues, conservée ouverte
+    """
+
+    def __init__(self, table: np.ndarray, indices: np.ndarray, config: Dict, buffer=None):
+        self.table = table
+        self.indices = indices
+        self.config = config
+        self.buffer = buffer
+        self.width = table.dtype.itemsize
+        self.num_words: Optional[int] = config.get("num_words")
+        self.oov_token: Optional[str] = config.get("oov_token")
+        self.oov_index: Optional[int] = config.get("oov_index")
+        self.filters: str = config.get("filters", DEFAULT_FILTERS)
+        self.lower: bool = config.get("lower", True)
+        self.split: str = config.get("split", " ")
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @classmethod
+    def from_word_index(
+        cls,
+        word_index: Dict[str, int],
+        num_words: Optional[int] = None,
+        oov_token: Optional[str] = None,
+        filters: str = DEFAULT_FILTERS,
+        lower: bool = True,
+        split: str = ' ',
+    ) -> "Vocabulary":
+        """
+        Construit le vocabulaire (en mémoire) à partir d'un `word_index`, en appliquant
+        déjà la limite `num_words` : les mots au-delà se comportent comme des mots inconnus.
+
+        Raises:
+            ValueError: Si le token hors vocabulaire est absent du `word_index`, ou si un mot
+                contient le caractère nul (non représentable dans la table)
+        """
+        oov_index = None
+        if oov_token is not None:
+            if oov_token not in word_index:
+                raise ValueError(f"Le token hors vocabulaire {oov_token!r} est absent du word_index.")
+            oov_index = int(word_index[oov_token])
+
+        words, indices = [], []
+        for word, index in word_index.items():
+            if num_words and index >= num_words:
+                continue
+            encoded = word.encode('utf-8', 'surrogatepass')
+            if b"\x00" in encoded:
+                raise ValueError(f"Le mot {word!r} contient le caractère nul.")
+            words.append(encoded)
+            indices.append(index)
+
+        width = max(map(len, words), default=0) + 1
+        table = np.array(words, dtype=f"S{width}")
+        order = np.argsort(table, kind="stable")
+        config = {
+            "num_words": num_words or None,
+            "oov_token": oov_token,
+            "oov_index": oov_index,
+            "filters": filters,
+            "lower": lower,
+            "split": split,
+        }
+        return cls(table[order], np.array(indices, dtype=np.int32)[order], config)
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer) -> "Vocabulary":
+        """Construit le vocabulaire à partir d'un Tokenizer Keras."""
+        if getattr(tokenizer, "char_level", False) or getattr(tokenizer, "analyzer", None) is not None:
+            raise ValueError("Seuls les tokenizers au niveau des mots, sans analyseur personnalisé, sont pris en charge.")
+        return cls.from_word_index(
+            tokenizer.word_index,
+            num_words=tokenizer.num_words,
+            oov_token=tokenizer.oov_token,
+            filters=tokenizer.filters,
+            lower=tokenizer.lower,
+            split=tokenizer.split,
+        )
+
+    def save(self, path: Path):
+        """Écrit le vocabulaire dans un fichier temporaire puis le renomme (jamais de fichier partiel)."""
+        path = Path(path)
+        header = json.dumps({
+            "version": VERSION,
+            "count": len(self.table),
+            "width": self.width,
+            **self.config,
+        }).encode("utf-8")
+        table_offset = _align(len(MAGIC) + 4 + len(header))
+        indices_offset = _align(table_offset + self.table.nbytes)
+
+        fd, temp_path = tempfile.mkstemp(prefix=".vocabulary-", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC + struct.pack("<I", len(header)) + header)
+                f.write(b"\x00" * (table_offset - f.tell()))
+                f.write(self.table.tobytes())
+                f.write(b"\x00" * (indices_offset - f.tell()))
+                f.write(self.indices.astype("<i4").tobytes())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def open(cls, path: Path) -> "Vocabulary":
+        """
+        Ouvre un fichier de vocabulaire par projection mémoire, sans rien copier.
+
+        Raises:
+            ValueError: Si le fichier n'est pas un vocabulaire, d'une autre version, ou tronqué
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < len(MAGIC) + 4:
+                raise ValueError(f"{Path(path).name} n'est pas un fichier de vocabulaire.")
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{Path(path).name} n'est pas un fichier de vocabulaire.")
+        (header_size,) = struct.unpack_from("<I", buffer, len(MAGIC))
+        header = json.loads(bytes(buffer[len(MAGIC) + 4:len(MAGIC) + 4 + header_size]))
+        if header.get("version") != VERSION:
+            raise ValueError(f"Version de vocabulaire non prise en charge : {header.get('version')}.")
+
+        count, width = header.pop("count"), header.pop("width")
+        header.pop("version")
+        table_offset = _align(len(MAGIC) + 4 + header_size)
+        indices_offset = _align(table_offset + count * width)
+        if len(buffer) < indices_offset + 4 * count:
+            raise ValueError(f"Le fichier de vocabulaire {Path(path).name} est tronqué.")
+        table = np.frombuffer(buffer, dtype=f"S{width}", count=count, offset=table_offset)
+        indices = np.frombuffer(buffer, dtype="<i4", count=count, offset=indices_offset)
+        return cls(table, indices, header, buffer=buffer)
+
+    def matches_source(self, tokenizer_path: Path, sha256: Optional[str] = None) -> bool:
+        """
+        Indique si le vocabulaire a été converti à partir de ce fichier de tokenizer (même empreinte SHA-256).
+
+        Args:
+            tokenizer_path: Fichier `tokenizer.pickle`
+            sha256: Empreinte déjà connue du fichier (par exemple celle du manifeste du magasin
+                d'artefacts) ; à défaut, elle est calculée
+        """
+        if sha256 is None:
+            sha256 = file_digest(Path(tokenizer_path))[0]
+        return self.config.get("source_sha256") == sha256
+
+    def search(self, query: np.ndarray, default: int = MISSING) -> np.ndarray:
+        """
+        Cherche dans la table des mots déjà convertis en tableau `S<width>` (sans caractère nul).
+
+        Returns:
+            Indice de chaque mot (int64), ou `default` pour les mots absents
+        """
+        if not len(self.table):
+            return np.full(len(query), default, dtype=np.int64)
+        positions = np.searchsorted(self.table, query)
+        np.minimum(positions, len(self.table) - 1, out=positions)
+        found = self.table[positions] == query
+        return np.where(found, self.indices[positions], default).astype(np.int64, copy=False)
+
+    def lookup(self, words: Sequence[bytes], default: int = MISSING) -> np.ndarray:
+        """
+        Renvoie l'indice de chaque mot (UTF-8), ou `default` pour les mots absents.
+
+        Les mots plus longs que la table sont tronqués à `width` octets par la conversion,
+        ce qui suffit à les distinguer de toutes les entrées. Le caractère nul, ignoré en
+        fin de chaîne par NumPy, est traité à part.
+        """
+        ids = self.search(np.array(words, dtype=self.table.dtype), default)
+        if b"\x00" in b"".join(words):
+            for position, word in enumerate(words):
+                if b"\x00" in word:
+                    ids[position] = default
+        return ids
+
+    def get(self, word: str) -> Optional[int]:
+        """Renvoie l'indice d'un mot, ou None s'il est absent de la table."""
+        index = self.lookup([word.encode('utf-8', 'surrogatepass')])[0]
+        return None if index == MISSING else int(index)
+
+    def texts_to_sequences(self, texts: List[str]) -> List[List[int]]:
+        """Équivalent exact de `tokenizer.texts_to_sequences`."""
+        encoder = VocabularyEncoder(self)
+        return [encoder.texts_to_ids(text) for text in texts]
+
+
+class VocabularyEncoder:
+    """
+    Même interface que `encoding.SequenceEncoder` (`texts_to_ids` et `encode`), mais les
+    mots sont cherchés directement dans la table projetée en mémoire d'un `Vocabulary` :
+    aucun dictionnaire n'est construit dans le processus.
+
+    Args:
+        vocabulary: Vocabulaire ouvert par `Vocabulary.open` (ou construit en mémoire)
+    """
+
+    def __init__(self, vocabulary: Vocabulary):
+        self.vocabulary = vocabulary
+        self.num_words = vocabulary.num_words
+        self.oov_index = vocabulary.oov_index
+        self.lower = vocabulary.lower
+        self.split = vocabulary.split
+        self._split_bytes = vocabulary.split.encode('utf-8', 'surrogatepass')
+        # Indice des mots inconnus : celui du token hors vocabulaire, sinon le mot est ignoré
+        self._default = DROP if self.oov_index is None else self.oov_index
+
+        filters = vocabulary.filters
+        self._translate_table = str.maketrans({c: self.split for c in filters})
+        # Les filtres ASCII peuvent être appliqués sur les octets UTF-8, bien plus rapidement
+        self._byte_table = None
+        if (filters + self.split).isascii() and len(self.split) == 1:
+            self._byte_table = bytes.maketrans(filters.encode(), self._split_bytes * len(filters))
+
+        # Le lot est découpé en une passe si le séparateur ne peut pas être un mot du vocabulaire
+        self._separator = BATCH_SEPARATOR.encode()
+        self._batch_ready = BATCH_SEPARATOR not in filters + self.split and vocabulary.get(BATCH_SEPARATOR) is None
+
+    def _clean(self, text: str) -> bytes:
+        # Minuscules puis remplacement des filtres par le séparateur, comme text_to_word_sequence
+        if self.lower:
+            text = text.lower()
+        if self._byte_table is not None:
+            return text.encode('utf-8', 'surrogatepass').translate(self._byte_table)
+        return text.translate(self._translate_table).encode('utf-8', 'surrogatepass')
+
+    def texts_to_ids(self, text: str) -> List[int]:
+        """Renvoie la séquence d'indices d'un texte, comme `texts_to_sequences`."""
+        words = [word for word in self._clean(text).split(self._split_bytes) if word]
+        if not words:
+            return []
+        ids = self.vocabulary.lookup(words, self._default)
+        if self.oov_index is None:
+            ids = ids[ids != DROP]
+        return ids.tolist()
+
+    def encode(self, texts: List[str], maxlen: int) -> np.ndarray:
+        """
+        Encode un lot de textes dans un tableau (len(texts), maxlen) de type int32,
+        tronqué et complété par des zéros à la fin (comme `SequenceEncoder.encode`).
+        """
+        buffer = np.zeros((len(texts), maxlen), dtype=np.int32)
+        if len(texts) < MIN_VECTORIZED_BATCH or not self._batch_ready \
+                or any(BATCH_SEPARATOR in text for text in texts):
+            return self._encode_each(texts, buffer)
+
+        # Découper tout le lot en une seule passe : le séparateur devient un mot sentinelle
+        split = self.split
+        cleaned = self._clean((split + BATCH_SEPARATOR + split).join(texts))
+        if b"\x00" in cleaned:
+            return self._encode_each(texts, buffer)
+        query = np.array(cleaned.split(self._split_bytes), dtype=self.vocabulary.table.dtype)
+        ids = self.vocabulary.search(query, self._default)
+        ids[query == b""] = DROP
+        ids[query == self._separator] = BOUNDARY
+        return fill_batch(buffer, ids)
+
+    def _encode_each(self, texts: List[str], buffer: np.ndarray) -> np.ndarray:
+        maxlen = buffer.shape[1]
+        for row, text in enumerate(texts):
+            ids = self.texts_to_ids(text)[:maxlen]
+            buffer[row, :len(ids)] = ids
+        return buffer
+
+
+def convert_tokenizer(tokenizer_path: Path, output_path: Path) -> Vocabulary:
+    """
+    Convertit une fois pour toutes un Tokenizer Keras picklé en fichier de vocabulaire,
+    puis ouvre ce fichier par projection mémoire.
+
+    Args:
+        tokenizer_path: Fichier `tokenizer.pickle`
+        output_path: Fichier de vocabulaire à écrire
+
+    Returns:
+        Vocabulaire ouvert depuis `output_path` (ou en mémoire si le fichier n'a pas pu être écrit)
+    """
+    with open(tokenizer_path, "rb") as handle:
+        tokenizer = pickle.load(handle)
+    vocabulary = Vocabulary.from_tokenizer(tokenizer)
+    vocabulary.config["source_sha256"] = file_digest(Path(tokenizer_path))[0]
+    try:
+        vocabulary.save(output_path)
+    except OSError as e:
+        # Répertoire des artefacts en lecture seule : le vocabulaire reste en mémoire pour ce processus
+        logger.warning(f"Impossible d'écrire {output_path}: {str(e)}")
+        return vocabulary
+    logger.info(f"Tokenizer converti en vocabulaire compact : {output_path}")
+    return Vocabulary.open(output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tokenizer", type=Path, help="Fichier tokenizer.pickle à convertir")
+    parser.add_argument("output", type=Path, nargs="?", help=f"Fichier de sortie (défaut : {VOCABULARY_FILE} à côté du tokenizer)")
+    parser.add_argument("--log-to-run", metavar="RUN_ID",
+                        help="Publier le vocabulaire dans les artefacts (local_artifacts/) de cette exécution MLflow "
+                             "(serveur : MLFLOW_TRACKING_URI)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    output = args.output or args.tokenizer.parent / VOCABULARY_FILE
+    if args.log_to_run and output.name != VOCABULARY_FILE:
+        parser.error(f"Le fichier publié doit s'appeler {VOCABULARY_FILE} pour être trouvé par le service.")
+    vocabulary = convert_tokenizer(args.tokenizer, output)
+    if vocabulary.buffer is None:
+        parser.exit(1, f"Échec de l'écriture de {output}.\n")
+    logger.info(f"{len(vocabulary)} mots, {output.stat().st_size / 2**20:.2f} Mo "
+                f"(tokenizer picklé : {args.tokenizer.stat().st_size / 2**20:.2f} Mo).")
+
+    if args.log_to_run:
+        # MlflowClient lit lui-même MLFLOW_TRACKING_URI
+        import mlflow
+        mlflow.tracking.MlflowClient().log_artifact(args.log_to_run, str(output), artifact_path="local_artifacts")
+        logger.info(f"{VOCABULARY_FILE} publié avec l'exécution {args.log_to_run}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,28 @@
 'use client'
 
-import { useState } from 'react'
-import { predictSentimentBatch } from '@/utils/actions'
+import { useEffect, useState } from 'react'
+import { listModels, predictSentimentBatch } from '@/utils/actions'
 import BootstrapClient from '@/components/BootstrapClient'
 
 export default function ComparePage() {
   const [tweets, setTweets] = useState(['', ''])
   const [results, setResults] = useState(null)
+  // Modèles chargés par l'API : modèle principal ('' = modèle par défaut) et modèle comparé ('' = aucun)
+  const [models, setModels] = useState([])
+  const [modelA, setModelA] = useState('')
+  const [modelB, setModelB] = useState('')
+  const [resultsB, setResultsB] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
 
+  useEffect(() => {
+    listModels().then(response => {
+      if (response.status) {
+        setModels(response.data.models)
+      }
+    })
+  }, [])
+
   const handleTweetChange = (index, value) => {
     const newTweets = [...tweets]
     newTweets[index] = value
@@ -41,8 +54,12 @@ export default function ComparePage() {
     setError(null)
     
     try {
-      const response = await predictSentimentBatch(tweets)
+      const [response, responseB] = await Promise.all([
+        predictSentimentBatch(tweets, modelA || null),
+        modelB ? predictSentimentBatch(tweets, modelB) : Promise.resolve(null),
+      ])
       setResults(response.results)
+      setResultsB(responseB ? responseB.results : null)
     } catch (err) {
       console.error('Erreur lors de la prédiction par lot:', err)
       setError('Une erreur est survenue lors de l\'analyse. Veuillez réessayer.')
@@ -66,6 +83,31 @@ export default function ComparePage() {
             <div className="card shadow-sm mb-4">
               <div className="card-body">
                 <form onSubmit={handleSubmit}>
+                  {models.length > 1 && (
+                    <div className="row mb-3">
+                      <div className="col-md-6">
+                        <label className="form-label fw-semibold">Modèle</label>
+                        <select className="form-select" value={modelA} onChange={(e) => setModelA(e.target.value)}>
+                          <option value="">Modèle par défaut</option>
+                          {models.map(model => (
+                            <option key={model.run_id} value={model.run_id}>
+                              {model.run_id}{model.default ? ' (par défaut)' : ''}
+                            </option>
+                          ))}
+                        </select>
+                      </div>
+                      <div className="col-md-6">
+                        <label className="form-label fw-semibold">Comparer avec</label>
+                        <select className="form-select" value={modelB} onChange={(e) => setModelB(e.target.value)}>
+                          <option value="">Aucun autre modèle</option>
+                          {models.map(model => (
+                            <option key={model.run_id} value={model.run_id}>{model.run_id}</option>
+                          ))}
+                        </select>
+                      </div>
+                    </div>
+                  )}
+                  
                   {tweets.map((tweet, index) => (
                     <div key={index} className="mb-3">
                       <label className="form-label fw-semibold">
@@ -168,6 +210,17 @@ export default function ComparePage() {
                             <small>Confiance: {confidencePercentage}%</small>
                           </div>
                         </div>
+                        
+                        {resultsB && resultsB[index] && (
+                          <div className="d-flex align-items-center small text-muted">
+                            <span className="me-2">Modèle {resultsB[index].run_id} :</span>
+                            <strong className="me-2">{resultsB[index].sentiment}</strong>
+                            <span className="me-2">({Math.round(resultsB[index].confidence * 100)}%)</span>
+                            {resultsB[index].sentiment !== result.sentiment && (
+                              <span className="badge bg-warning text-dark">Désaccord</span>
+                            )}
+                          </div>
+                        )}
                       </div>
                     )
                   })}
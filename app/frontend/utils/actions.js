@@ -32,14 +32,15 @@ export async function predictSentiment(text) {
 }
 
 // Action pour prédire le sentiment de plusieurs tweets (batch)
-export async function predictSentimentBatch(texts) {
+// runId : modèle à utiliser parmi ceux chargés (par défaut, le modèle par défaut de l'API)
+export async function predictSentimentBatch(texts, runId = null) {
   try {
     const response = await fetch(`${API_URL}/predict-batch`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ texts }),
+      body: JSON.stringify(runId ? { texts, run_id: runId } : { texts }),
       cache: 'no-store',
     })
 
@@ -55,6 +56,23 @@ export async function predictSentimentBatch(texts) {
   }
 }
 
+// Action pour lister les modèles chargés par l'API
+export async function listModels() {
+  try {
+    const response = await fetch(`${API_URL}/models`, {
+      cache: 'no-store',
+    })
+
+    if (!response.ok) {
+      return { status: false, error: response.statusText }
+    }
+
+    return { status: true, data: await response.json() }
+  } catch (error) {
+    return { status: false, error: error.message }
+  }
+}
+
 // Action pour vérifier la santé de l'API
 export async function checkApiHealth() {
   try {